@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""wbabd benchmark suite (`make bench`).
+
+Scenarios, each run in a fresh temporary directory with WBAB_MOCK_EXECUTOR=1:
+- `store`: OperationStore upserts and reads per second.
+- `audit`: AuditLog emits per second.
+- `executor`: wall time per `lint` operation through `Executor.run` with a
+  no-op tool script (registry, tracing and audit as in `wbabd run`), and the
+  overhead left after subtracting a bare spawn of the same script.
+- `http`: `GET /status/{op_id}` latency and throughput from N concurrent
+  keep-alive clients against a `wbabd serve` subprocess.
+
+Each scenario runs `--repeat` times and every metric keeps the median. Results
+are written as JSON (`{"meta": {...}, "metrics": {"store.upsert_per_sec": ...}}`);
+`--compare BASELINE` exits 1 when a metric is worse than the baseline by more
+than its tolerance (`make bench-compare`). Baselines are machine-specific:
+record one with `make bench-baseline` on the host that compares against it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.idempotency import SQLiteRegistry  # noqa: E402
+from core.tracing import tracer_from_env  # noqa: E402
+from core.wbab_core import AuditLog, Executor, OperationStore, Planner  # noqa: E402
+
+DEFAULT_RESULTS = ROOT_DIR / "bench" / "results" / "latest.json"
+
+# metric -> (which direction is better, allowed relative regression)
+METRICS: Dict[str, Tuple[str, float]] = {
+    "store.upsert_per_sec": ("higher", 0.30),
+    "store.get_per_sec": ("higher", 0.30),
+    "audit.emit_per_sec": ("higher", 0.30),
+    "executor.op_ms_p50": ("lower", 0.30),
+    "executor.op_ms_p95": ("lower", 0.50),
+    "executor.overhead_ms_p50": ("lower", 0.50),
+    "http.status_per_sec": ("higher", 0.30),
+    "http.status_ms_p50": ("lower", 0.30),
+    "http.status_ms_p99": ("lower", 0.75),
+}
+
+# (store/audit writes, executor ops, http requests per client)
+SIZES = {"full": (2000, 60, 300), "quick": (200, 10, 40)}
+
+_NOOP_TOOL = "#!/bin/sh\nexit 0\n"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for no values."""
+    if not values:
+        return 0.0
+    ranked = sorted(values)
+    return ranked[max(0, min(len(ranked), math.ceil(pct / 100.0 * len(ranked))) - 1)]
+
+
+def _op_payload(op_id: str) -> Dict[str, Any]:
+    # Shaped like a finished build in the store, so JSON encoding costs are realistic.
+    return {
+        "op_id": op_id,
+        "verb": "build",
+        "args": ["workspace/app"],
+        "status": "succeeded",
+        "source": "local",
+        "step_state": {
+            name: {"status": "succeeded", "attempts": 1, "duration_ms": 12}
+            for name in (
+                "validate_inputs",
+                "execute_build",
+                "generate_sbom",
+                "record_result",
+            )
+        },
+        "result": {
+            "returncode": 0,
+            "artifacts": ["out/App.exe"],
+            "stdout_tail": "x" * 256,
+        },
+    }
+
+
+def _write_noop_tool(root: Path, rel: str = "tools/winbuild-lint.sh") -> Path:
+    tool = root / rel
+    tool.parent.mkdir(parents=True, exist_ok=True)
+    tool.write_text(_NOOP_TOOL, encoding="utf-8")
+    tool.chmod(0o755)
+    return tool
+
+
+def bench_store(
+    tmp: Path, size: Tuple[int, int, int], clients: int
+) -> Dict[str, float]:
+    n = size[0]
+    store = OperationStore(tmp / "store.sqlite")
+    payloads = [_op_payload(f"bench-{i}") for i in range(n)]
+    started = time.perf_counter()
+    for payload in payloads:
+        store.upsert(payload["op_id"], payload)
+    upserts = n / (time.perf_counter() - started)
+    started = time.perf_counter()
+    for payload in payloads:
+        store.get(payload["op_id"])
+    gets = n / (time.perf_counter() - started)
+    return {"store.upsert_per_sec": upserts, "store.get_per_sec": gets}
+
+
+def bench_audit(
+    tmp: Path, size: Tuple[int, int, int], clients: int
+) -> Dict[str, float]:
+    n = size[0]
+    audit = AuditLog(tmp / "audit.sqlite")
+    started = time.perf_counter()
+    for i in range(n):
+        audit.emit(
+            "step.succeeded",
+            op_id=f"bench-{i}",
+            verb="build",
+            status="ok",
+            step="execute_build",
+            details={"rc": 0},
+        )
+    return {"audit.emit_per_sec": n / (time.perf_counter() - started)}
+
+
+def bench_executor(
+    tmp: Path, size: Tuple[int, int, int], clients: int
+) -> Dict[str, float]:
+    n = size[1]
+    tool = _write_noop_tool(tmp)
+    state = tmp / "state"
+    store = OperationStore(state / "core-store.sqlite")
+    executor = Executor(
+        tmp,
+        store,
+        audit=AuditLog(state / "audit-log.sqlite"),
+        registry=SQLiteRegistry(store.path),
+    )
+    executor.tracer = tracer_from_env(store.path)
+    planner = Planner()
+
+    spawns: List[float] = []
+    for _ in range(n):
+        started = time.perf_counter()
+        subprocess.run([str(tool), str(tmp)], cwd=tmp, check=True)
+        spawns.append((time.perf_counter() - started) * 1000)
+    ops: List[float] = []
+    for i in range(n):
+        plan = planner.plan(f"bench-op-{i}", "lint", [str(tmp)])
+        started = time.perf_counter()
+        result = executor.run(plan)
+        ops.append((time.perf_counter() - started) * 1000)
+        if result.get("status") != "succeeded":
+            raise RuntimeError(f"executor bench op failed: {result}")
+    return {
+        "executor.op_ms_p50": percentile(ops, 50),
+        "executor.op_ms_p95": percentile(ops, 95),
+        "executor.overhead_ms_p50": max(
+            0.0, percentile(ops, 50) - percentile(spawns, 50)
+        ),
+    }
+
+
+def _start_server(root: Path) -> Tuple[subprocess.Popen, int]:
+    (root / "tools").mkdir(parents=True)
+    shutil.copy2(ROOT_DIR / "tools" / "wbabd", root / "tools" / "wbabd")
+    shutil.copytree(
+        ROOT_DIR / "core", root / "core", ignore=shutil.ignore_patterns("__pycache__")
+    )
+    _write_noop_tool(root)
+    env = dict(
+        os.environ,
+        WBABD_TLS_DISABLE="1",
+        WBABD_AUTH_MODE="off",
+        WBABD_ALLOW_MULTIPLE_INSTANCES="1",
+        WBABD_STORE_PATH=str(root / "store.sqlite"),
+        WBABD_AUDIT_LOG_PATH=str(root / "audit.sqlite"),
+    )
+    out = root / "serve.out"
+    with open(out, "w") as stdout, open(root / "serve.err", "w") as stderr:
+        proc = subprocess.Popen(
+            [
+                sys.executable,
+                str(root / "tools" / "wbabd"),
+                "serve",
+                "--host",
+                "127.0.0.1",
+                "--port",
+                "0",
+            ],
+            cwd=root,
+            env=env,
+            stdout=stdout,
+            stderr=stderr,
+        )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        first = out.read_text().splitlines()[:1]
+        if first:
+            try:
+                return proc, int(json.loads(first[0])["port"])
+            except (ValueError, KeyError):
+                pass
+        if proc.poll() is not None:
+            break
+        time.sleep(0.05)
+    proc.kill()
+    proc.wait()
+    raise RuntimeError(
+        f"wbabd serve did not start: {(root / 'serve.err').read_text()[-2000:]}"
+    )
+
+
+def bench_http(tmp: Path, size: Tuple[int, int, int], clients: int) -> Dict[str, float]:
+    requests = size[2]
+    proc, port = _start_server(tmp)
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        conn.request(
+            "POST",
+            "/run",
+            body=json.dumps({"op_id": "bench-status", "verb": "lint", "args": ["."]}),
+        )
+        resp = conn.getresponse()
+        body = resp.read()
+        conn.close()
+        if resp.status != 200:
+            raise RuntimeError(f"POST /run failed: {resp.status} {body[:200]!r}")
+
+        latencies: List[List[float]] = [[] for _ in range(clients)]
+        errors: List[str] = []
+        barrier = threading.Barrier(clients + 1)
+
+        def client(samples: List[float]) -> None:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            barrier.wait()
+            try:
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    conn.request("GET", "/status/bench-status")
+                    resp = conn.getresponse()
+                    resp.read()
+                    samples.append((time.perf_counter() - started) * 1000)
+                    if resp.status != 200:
+                        errors.append(f"GET /status returned {resp.status}")
+                        return
+            except (OSError, http.client.HTTPException) as exc:
+                errors.append(repr(exc))
+            finally:
+                conn.close()
+
+        threads = [
+            threading.Thread(target=client, args=(samples,)) for samples in latencies
+        ]
+        for t in threads:
+            t.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - started
+        if errors:
+            raise RuntimeError(f"http bench client failed: {errors[0]}")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+    merged = [v for samples in latencies for v in samples]
+    return {
+        "http.status_per_sec": len(merged) / wall,
+        "http.status_ms_p50": percentile(merged, 50),
+        "http.status_ms_p99": percentile(merged, 99),
+    }
+
+
+SCENARIOS: Dict[str, Callable[[Path, Tuple[int, int, int], int], Dict[str, float]]] = {
+    "store": bench_store,
+    "audit": bench_audit,
+    "executor": bench_executor,
+    "http": bench_http,
+}
+
+
+def run_suite(
+    names: List[str], quick: bool = False, repeat: int = 3, clients: int = 8
+) -> Dict[str, float]:
+    """Runs the named scenarios `repeat` times each; every metric keeps its median."""
+    size = SIZES["quick" if quick else "full"]
+    metrics: Dict[str, float] = {}
+    # Scenarios run through the mocked executor path with tool scripts from their temp root.
+    saved = {k: os.environ.get(k) for k in ("WBAB_MOCK_EXECUTOR", "WBAB_TRACE_PATH")}
+    os.environ["WBAB_MOCK_EXECUTOR"] = "1"
+    os.environ.pop("WBAB_TRACE_PATH", None)
+    try:
+        for name in names:
+            rounds: List[Dict[str, float]] = []
+            for _ in range(repeat):
+                with tempfile.TemporaryDirectory(prefix=f"wbab-bench-{name}-") as tmp:
+                    rounds.append(SCENARIOS[name](Path(tmp), size, clients))
+            for key in rounds[0]:
+                metrics[key] = round(statistics.median(r[key] for r in rounds), 3)
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+    return metrics
+
+
+def compare(
+    current: Dict[str, float],
+    baseline: Dict[str, float],
+    tolerance: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """One row per metric present in both; `regressed` when worse than the tolerance allows.
+
+    `tolerance` overrides the per-metric tolerances in METRICS.
+    """
+    rows: List[Dict[str, Any]] = []
+    for metric in sorted(set(current) & set(baseline)):
+        base, value = float(baseline[metric]), float(current[metric])
+        better, allowed = METRICS.get(
+            metric, ("lower" if "_ms" in metric else "higher", 0.30)
+        )
+        if tolerance is not None:
+            allowed = tolerance
+        change = (value - base) / base if base else 0.0
+        worse = -change if better == "higher" else change
+        rows.append(
+            {
+                "metric": metric,
+                "baseline": base,
+                "current": value,
+                "change": change,
+                "regressed": worse > allowed,
+            }
+        )
+    return rows
+
+
+def _meta(quick: bool, repeat: int, clients: int) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+            check=False,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "quick": quick,
+        "repeat": repeat,
+        "clients": clients,
+    }
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the wbabd store, audit log, executor and HTTP API."
+    )
+    parser.add_argument(
+        "--only",
+        default=",".join(SCENARIOS),
+        help="comma-separated scenarios (default: all)",
+    )
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="smaller runs, for smoke-checking the suite",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="runs per scenario; metrics keep the median",
+    )
+    parser.add_argument(
+        "--clients",
+        type=int,
+        default=8,
+        help="concurrent clients for the http scenario",
+    )
+    parser.add_argument(
+        "--out", type=Path, default=DEFAULT_RESULTS, help="results JSON path"
+    )
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        metavar="BASELINE",
+        help="fail on regressions against this baseline",
+    )
+    parser.add_argument(
+        "--tolerance", type=float, help="allowed relative regression for every metric"
+    )
+    parser.add_argument(
+        "--save-baseline",
+        type=Path,
+        metavar="BASELINE",
+        help="also write the results as a baseline",
+    )
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.only.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown or not names:
+        parser.error(
+            f"unknown scenario(s): {', '.join(unknown) or '(none)'}; choose from {', '.join(SCENARIOS)}"
+        )
+    if args.repeat < 1 or args.clients < 1:
+        parser.error("--repeat and --clients must be >= 1")
+
+    metrics = run_suite(
+        names, quick=args.quick, repeat=args.repeat, clients=args.clients
+    )
+    results = {"meta": _meta(args.quick, args.repeat, args.clients), "metrics": metrics}
+    _write_json(args.out, results)
+    if args.save_baseline:
+        _write_json(args.save_baseline, results)
+    for metric, value in sorted(metrics.items()):
+        print(f"{metric:<28} {value:>12.3f}")
+    print(f"results: {args.out}")
+
+    if not args.compare:
+        return 0
+    try:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        print(f"bench: cannot read baseline {args.compare}: {exc}", file=sys.stderr)
+        return 2
+    base_meta = baseline.get("meta", {})
+    for key in ("quick", "platform", "cpus"):
+        if base_meta.get(key) != results["meta"][key]:
+            print(
+                f"bench: note: baseline {key}={base_meta.get(key)!r} differs from this run ({results['meta'][key]!r})"
+            )
+    rows = compare(metrics, baseline.get("metrics", {}), args.tolerance)
+    print(
+        f"\ncompared with {args.compare} ({base_meta.get('commit') or 'unknown commit'}):"
+    )
+    for row in rows:
+        flag = "REGRESSED" if row["regressed"] else "ok"
+        print(
+            f"{row['metric']:<28} {row['baseline']:>12.3f} -> {row['current']:>12.3f} {row['change']:>+8.1%}  {flag}"
+        )
+    regressed = [row["metric"] for row in rows if row["regressed"]]
+    if regressed:
+        print(f"bench: regression in {', '.join(regressed)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""Admission control for wbabd: in-flight limits, a bounded run queue and per-principal rate limits.
+
+Requests over a limit are rejected up front with a status code and a
+Retry-After estimate instead of being queued without bound. Duplicate runs
+of an op_id already executing are coalesced onto that execution.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Upper bound for computed Retry-After values, in seconds.
+MAX_RETRY_AFTER = 300
+# Principals whose bucket has been full this long are forgotten.
+_BUCKET_IDLE_SECS = 600.0
+# Principals tracked with their own bucket; further ones share a single overflow bucket.
+MAX_RATE_BUCKETS = 4096
+
+
+def default_run_workers() -> int:
+    """Size of the default executor behind asyncio.to_thread, which ran wbabd runs before the run pool."""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is refused; `status` is 429 or 503."""
+
+    def __init__(self, status: int, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = min(MAX_RETRY_AFTER, max(1, math.ceil(retry_after)))
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(
+        self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+
+    def take(self) -> float:
+        """Consumes one token; returns 0 on success or the seconds until one is available."""
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def idle_full(self, now: float) -> bool:
+        return (
+            self.tokens + (now - self.updated) * self.rate >= self.burst
+            and now - self.updated > _BUCKET_IDLE_SECS
+        )
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one execution.
+
+    The first caller starts `fn()` as its own task; callers arriving while it
+    runs await that task instead of starting another, and all of them get its
+    result (or exception). A caller that goes away does not cancel the shared
+    execution.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, asyncio.Future[Any]] = {}
+        self.coalesced = 0
+
+    def active(self, key: str) -> bool:
+        return key in self._calls
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, key: str, task: asyncio.Future[Any]) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Retrieve it so an execution whose callers all left is not logged as unhandled.
+            task.exception()
+
+
+class AdmissionController:
+    """Tracks daemon load and decides whether new work is admitted.
+
+    - `max_in_flight`: concurrent HTTP requests being handled (0 disables).
+    - `run_workers`: threads in the dedicated run pool (None: `default_run_workers()`).
+    - `max_queued_runs`: runs allowed to wait for a worker beyond those running (None: no cap).
+    - `rate_per_sec` / `burst`: per-principal token bucket (rate 0 disables).
+    - `max_buckets`: principals with their own bucket; past it, new principals share one.
+
+    The defaults impose no limits, matching a daemon without admission control.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_in_flight: int = 0,
+        run_workers: Optional[int] = None,
+        max_queued_runs: Optional[int] = None,
+        rate_per_sec: float = 0.0,
+        burst: float = 20.0,
+        max_buckets: int = MAX_RATE_BUCKETS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_in_flight = max_in_flight
+        self.run_workers = run_workers or default_run_workers()
+        self.max_queued_runs = max_queued_runs
+        self.rate_per_sec = rate_per_sec
+        self.burst = max(1.0, burst)
+        self.max_buckets = max(1, max_buckets)
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._overflow: Optional[TokenBucket] = None
+        self._next_prune = 0.0
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.run_workers, thread_name_prefix="wbabd-run"
+        )
+        self.in_flight = 0
+        self.runs_running = 0
+        self.runs_queued = 0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {
+            "in_flight": 0,
+            "rate_limited": 0,
+            "run_queue_full": 0,
+        }
+        # Exponentially weighted average run duration, used for Retry-After.
+        self._avg_run_secs = 0.0
+
+    # -- HTTP requests ---------------------------------------------------------------
+
+    def enter_request(self) -> None:
+        with self._lock:
+            if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                self.rejected["in_flight"] += 1
+                raise AdmissionRejected(503, "too_many_requests_in_flight", 1)
+            self.in_flight += 1
+            self.admitted += 1
+
+    def leave_request(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def check_rate(self, principal: str) -> None:
+        if self.rate_per_sec <= 0:
+            return
+        with self._lock:
+            bucket = self._buckets.get(principal)
+            if bucket is None:
+                bucket = self._new_bucket(principal)
+            wait = bucket.take()
+            if wait > 0:
+                self.rejected["rate_limited"] += 1
+                raise AdmissionRejected(429, "rate_limited", wait)
+
+    def _new_bucket(self, principal: str) -> TokenBucket:
+        now = self.clock()
+        if now >= self._next_prune:
+            # At most once a second, so a flood of new principals is not O(buckets) each.
+            self._prune(now)
+            self._next_prune = now + 1.0
+        if len(self._buckets) < self.max_buckets:
+            bucket = self._buckets[principal] = TokenBucket(
+                self.rate_per_sec, self.burst, self.clock
+            )
+            return bucket
+        # Rotating principal names past the cap must not buy a fresh burst each time.
+        if self._overflow is None:
+            self._overflow = TokenBucket(self.rate_per_sec, self.burst, self.clock)
+        return self._overflow
+
+    def _prune(self, now: float) -> None:
+        for name in [n for n, b in self._buckets.items() if b.idle_full(now)]:
+            del self._buckets[name]
+
+    # -- runs ------------------------------------------------------------------------
+
+    def _run_retry_after(self) -> float:
+        backlog = self.runs_queued + 1
+        return self._avg_run_secs * backlog / max(1, self.run_workers)
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Runs `fn(*args)` on the run pool, or raises AdmissionRejected if the queue is capped and full."""
+        with self._lock:
+            if (
+                self.max_queued_runs is not None
+                and self.runs_running + self.runs_queued
+                >= self.run_workers + self.max_queued_runs
+            ):
+                self.rejected["run_queue_full"] += 1
+                raise AdmissionRejected(503, "run_queue_full", self._run_retry_after())
+            self.runs_queued += 1
+
+        def call() -> T:
+            with self._lock:
+                self.runs_queued -= 1
+                self.runs_running += 1
+            started = time.monotonic()
+            try:
+                return fn(*args)
+            finally:
+                elapsed = time.monotonic() - started
+                with self._lock:
+                    self.runs_running -= 1
+                    self._avg_run_secs = (
+                        elapsed
+                        if self._avg_run_secs == 0
+                        else 0.8 * self._avg_run_secs + 0.2 * elapsed
+                    )
+
+        return await asyncio.get_running_loop().run_in_executor(self._pool, call)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "runs_running": self.runs_running,
+                "runs_queued": self.runs_queued,
+                "run_workers": self.run_workers,
+                "max_queued_runs": self.max_queued_runs,
+                "avg_run_secs": round(self._avg_run_secs, 3),
+                "rate_limit_per_sec": self.rate_per_sec,
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,243 @@
+"""Compiled authorization policy for wbabd, reloaded when the policy file changes."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Optional, Set, Tuple
+
+Decision = Tuple[bool, str]
+
+# Verbs accepted by the Planner; decisions for these are precomputed.
+KNOWN_VERBS = ("build", "package", "sign", "smoke", "doctor", "lint", "test")
+_VERB_OPS = ("plan", "run")
+_PLAIN_OPS = {
+    "events": frozenset({"events", "status"}),
+    "health": frozenset({"health"}),
+    "leases": frozenset({"leases"}),
+    "metrics": frozenset({"metrics", "health"}),
+    "profile": frozenset({"profile"}),
+    "preflight_status": frozenset({"preflight_status", "status"}),
+    "preflight_trend": frozenset({"preflight_trend", "preflight_status", "status"}),
+    "status": frozenset({"status"}),
+    "trace": frozenset({"trace", "status"}),
+}
+
+
+def parse_policy(raw: Any) -> Dict[str, Set[str]]:
+    """Validates a decoded policy document and returns principal -> grants."""
+    if not isinstance(raw, dict):
+        raise ValueError("invalid authz policy: json object required")
+    principals = raw.get("principals")
+    if not isinstance(principals, dict):
+        raise ValueError("invalid authz policy: principals object required")
+    normalized: Dict[str, Set[str]] = {}
+    for principal, entry in principals.items():
+        if not isinstance(principal, str) or not principal:
+            raise ValueError(
+                "invalid authz policy: principal keys must be non-empty strings"
+            )
+        if not isinstance(entry, dict):
+            raise ValueError(
+                f"invalid authz policy: principal '{principal}' entry must be object"
+            )
+        verbs = entry.get("verbs")
+        if not isinstance(verbs, list) or not all(
+            isinstance(v, str) and v.strip() for v in verbs
+        ):
+            raise ValueError(
+                f"invalid authz policy: principal '{principal}' requires verbs[]"
+            )
+        normalized[principal] = {v.strip() for v in verbs}
+    return normalized
+
+
+def parse_peers(raw: Any) -> Dict[str, str]:
+    """Validates the optional `peers` map of unix-socket identities to principals.
+
+    Keys are `uid:<n>`, `gid:<n>` or `user:<name>`; values are principal names.
+    """
+    peers = raw.get("peers", {}) if isinstance(raw, dict) else {}
+    if not isinstance(peers, dict):
+        raise ValueError("invalid authz policy: peers must be an object")
+    normalized: Dict[str, str] = {}
+    for key, principal in peers.items():
+        kind, _, value = str(key).partition(":")
+        if (
+            kind not in {"uid", "gid", "user"}
+            or not value
+            or (kind != "user" and not value.isdigit())
+        ):
+            raise ValueError(
+                f"invalid authz policy: peer key '{key}' must be uid:<n>, gid:<n> or user:<name>"
+            )
+        if not isinstance(principal, str) or not principal.strip():
+            raise ValueError(
+                f"invalid authz policy: peer '{key}' must map to a principal name"
+            )
+        normalized[str(key)] = principal.strip()
+    return normalized
+
+
+def peer_principal(peers: Dict[str, str], uid: int, gid: int, user: str = "") -> str:
+    """Principal for a unix-socket peer: uid, then user name, then gid mappings, else `uid:<n>`."""
+    for key in (f"uid:{uid}", f"user:{user}" if user else "", f"gid:{gid}"):
+        if key and key in peers:
+            return peers[key]
+    return f"uid:{uid}"
+
+
+def _required(op: str, verb: str) -> FrozenSet[str] | str:
+    """Grants that satisfy (op, verb), or a denial reason when none can."""
+    if op in _PLAIN_OPS:
+        return _PLAIN_OPS[op]
+    if op in _VERB_OPS:
+        if not verb:
+            return "missing_verb"
+        return frozenset({op, f"{op}:*", f"{op}:{verb}", verb})
+    return f"unsupported_op:{op}"
+
+
+def _evaluate(effective: FrozenSet[str], op: str, verb: str) -> Decision:
+    required = _required(op, verb)
+    if isinstance(required, str):
+        return False, required
+    if "*" in effective or (effective & required):
+        return True, "allowed"
+    return False, f"missing_permission:{op}:{verb or '-'}"
+
+
+class AuthzPolicy:
+    """Immutable decision table: principal -> (op, verb) -> (allowed, reason).
+
+    Each principal's effective grants include the `*` entry. Principals not named
+    in the policy use the `*` row. Decisions for verbs outside KNOWN_VERBS are
+    evaluated on demand from the same effective grants.
+    """
+
+    def __init__(
+        self, grants: Dict[str, Set[str]], peers: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.peers: Dict[str, str] = dict(peers or {})
+        wildcard = frozenset(grants.get("*", set()))
+        self._effective: Dict[str, FrozenSet[str]] = {
+            principal: wildcard | frozenset(verbs)
+            for principal, verbs in grants.items()
+        }
+        self._default = wildcard
+        self._default_table = self._compile(wildcard)
+        self._tables = {
+            principal: self._compile(eff) for principal, eff in self._effective.items()
+        }
+        self.principals = frozenset(grants)
+
+    @staticmethod
+    def _compile(effective: FrozenSet[str]) -> Dict[Tuple[str, str], Decision]:
+        table: Dict[Tuple[str, str], Decision] = {}
+        for op in _PLAIN_OPS:
+            table[(op, "")] = _evaluate(effective, op, "")
+        for op in _VERB_OPS:
+            table[(op, "")] = _evaluate(effective, op, "")
+            for verb in KNOWN_VERBS:
+                table[(op, verb)] = _evaluate(effective, op, verb)
+        return table
+
+    def decide(self, principal: str, op: str, verb: str = "") -> Decision:
+        table = self._tables.get(principal, self._default_table)
+        # Plain ops ignore the verb, as the uncompiled checks always did.
+        key = (op, "") if op in _PLAIN_OPS else (op, verb)
+        decision = table.get(key)
+        if decision is None:
+            decision = _evaluate(
+                self._effective.get(principal, self._default), op, verb
+            )
+        return decision
+
+
+ReloadCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class AuthzPolicyFile:
+    """AuthzPolicy backed by a JSON file, swapped atomically when the file changes.
+
+    The file's (inode, mtime, size) is checked at most every `check_interval`
+    seconds. A changed file is parsed and compiled before it replaces the active
+    policy; if that fails the previous policy stays in force. `on_reload` is
+    called with ("ok" | "failed", details) after each reload attempt.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        check_interval: float = 1.0,
+        on_reload: Optional[ReloadCallback] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self.on_reload = on_reload
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._stamp, self._policy = self._load()
+        self._next_check = time.monotonic() + check_interval
+
+    def _stat(self) -> Tuple[int, int, int]:
+        st = os.stat(self.path)
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _load(self) -> Tuple[Tuple[int, int, int], AuthzPolicy]:
+        try:
+            stamp = self._stat()
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+        except OSError as exc:
+            raise ValueError(f"failed to read WBABD_AUTHZ_POLICY_FILE: {exc}") from exc
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"invalid authz policy json: {exc}") from exc
+        return stamp, AuthzPolicy(parse_policy(raw), parse_peers(raw))
+
+    @property
+    def policy(self) -> AuthzPolicy:
+        now = time.monotonic()
+        if now >= self._next_check and self._lock.acquire(blocking=False):
+            try:
+                self._next_check = now + self.check_interval
+                self._maybe_reload()
+            finally:
+                self._lock.release()
+        return self._policy
+
+    def _maybe_reload(self) -> None:
+        try:
+            stamp = self._stat()
+        except OSError:
+            # Editors may replace the file non-atomically; retry on the next check.
+            return
+        if stamp == self._stamp:
+            return
+        try:
+            new_stamp, policy = self._load()
+        except ValueError as exc:
+            # Remember the bad version so it is reported once, not on every check.
+            self._stamp = stamp
+            self._notify("failed", {"path": str(self.path), "error": str(exc)})
+            return
+        self._stamp, self._policy = new_stamp, policy
+        self._notify(
+            "ok", {"path": str(self.path), "principals": sorted(policy.principals)}
+        )
+
+    def _notify(self, status: str, details: Dict[str, Any]) -> None:
+        if self.on_reload is not None:
+            try:
+                self.on_reload(status, details)
+            except Exception:
+                pass
+
+    def decide(self, principal: str, op: str, verb: str = "") -> Decision:
+        return self.policy.decide(principal, op, verb)
+
+    def peer_principal(self, uid: int, gid: int, user: str = "") -> str:
+        return peer_principal(self.policy.peers, uid, gid, user)
@@ -0,0 +1,540 @@
+"""Thin client for a running wbabd daemon.
+
+`wbabd status|plan|run` try this module first: when a local daemon is
+reachable the command is forwarded to it over HTTP, so the CLI skips the
+in-process imports, SQLite schema checks and audit writes. Only modules that
+load quickly are imported here (no asyncio, http.client or core.wbab_core);
+ssl is imported only for https endpoints.
+
+Forwarding is opt-in: `WBAB_CLIENT_MODE=auto` forwards when a daemon is
+found, `require` fails without one, and the default `off` always runs
+in-process. A forwarded command names the daemon that handled it on stderr.
+
+Endpoint selection, first match wins:
+- `WBABD_URL` (`http://host:port`, `https://host:port` or `unix:///path`);
+  `WBABD_URL=mdns` picks the least-loaded daemon found by discovery.
+- The endpoint file a serving daemon writes next to the operation store
+  (`wbabd-endpoint.json`), preferring its unix socket when one is listed.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+ENDPOINT_FILE_NAME = "wbabd-endpoint.json"
+CLIENT_COMMANDS = frozenset({"status", "plan", "run"})
+# Attempts for requests answered 429/503 with Retry-After.
+_MAX_ATTEMPTS = 3
+_MAX_RETRY_WAIT_SECS = 30.0
+
+
+class DaemonUnavailable(Exception):
+    """No connection could be made; nothing was sent, so the caller may fall back."""
+
+
+class DaemonClient:
+    """One keep-alive HTTP/1.1 connection to a wbabd endpoint, reused across calls.
+
+    Responses must carry Content-Length or chunked bodies, which is all wbabd
+    sends for non-streaming routes.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        token: str = "",
+        principal: str = "",
+        connect_timeout: float = 2.0,
+        timeout: Optional[float] = None,
+        max_attempts: int = _MAX_ATTEMPTS,
+    ) -> None:
+        parts = urlsplit(url)
+        if parts.scheme not in {"http", "https", "unix"}:
+            raise ValueError(f"unsupported daemon url: {url}")
+        self.url = url
+        self.scheme = parts.scheme
+        self.unix_path = parts.path if parts.scheme == "unix" else ""
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 8787
+        self.token = token
+        self.principal = principal
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.max_attempts = max(1, max_attempts)
+        self._sock: Optional[socket.socket] = None
+        self._buf = b""
+
+    # -- connection ------------------------------------------------------------------
+
+    def _connect(self) -> socket.socket:
+        try:
+            if self.scheme == "unix":
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.settimeout(self.connect_timeout)
+                try:
+                    sock.connect(self.unix_path)
+                except OSError:
+                    sock.close()
+                    raise
+            else:
+                sock = socket.create_connection(
+                    (self.host, self.port), timeout=self.connect_timeout
+                )
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                if self.scheme == "https":
+                    sock = _tls_context().wrap_socket(sock, server_hostname=self.host)
+        except OSError as exc:
+            raise DaemonUnavailable(f"{self.url}: {exc}") from exc
+        sock.settimeout(self.timeout)
+        return sock
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+                self._buf = b""
+
+    def __enter__(self) -> DaemonClient:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # -- requests --------------------------------------------------------------------
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]] = None,
+        *,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[int, Dict[str, str], Any]:
+        """Sends one request; returns (status, lower-cased headers, decoded JSON body).
+
+        429/503 answers with Retry-After are retried a few times. A connection
+        reused from an earlier call that turns out to be closed is reopened once.
+        """
+        body = json.dumps(payload).encode() if payload is not None else b""
+        head = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}",
+            "Accept: application/json",
+        ]
+        if body:
+            head += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+        if self.token and self.scheme != "unix":
+            head.append(f"Authorization: Bearer {self.token}")
+        if self.principal:
+            head.append(f"X-WBABD-Principal: {self.principal}")
+        head += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        raw = ("\r\n".join(head) + "\r\n\r\n").encode() + body
+
+        for attempt in range(1, self.max_attempts + 1):
+            status, resp_headers, data = self._exchange(raw)
+            retry_after = resp_headers.get("retry-after", "")
+            if (
+                status in (429, 503)
+                and retry_after.isdigit()
+                and attempt < self.max_attempts
+            ):
+                wait = float(retry_after)
+                if wait <= _MAX_RETRY_WAIT_SECS:
+                    time.sleep(wait)
+                    continue
+            break
+        try:
+            decoded = json.loads(data) if data else {}
+        except ValueError:
+            decoded = {"error": data.decode("utf-8", "replace")}
+        return status, resp_headers, decoded
+
+    def _exchange(self, raw: bytes) -> Tuple[int, Dict[str, str], bytes]:
+        reused = self._sock is not None
+        if self._sock is None:
+            self._sock = self._connect()
+        try:
+            self._sock.sendall(raw)
+            status, headers, data = self._read_response()
+        except (ConnectionError, EOFError) as exc:
+            self.close()
+            if not reused:
+                raise ConnectionError(f"{self.url}: {exc}") from exc
+            # The server closed an idle keep-alive connection; try once more.
+            self._sock = self._connect()
+            self._sock.sendall(raw)
+            status, headers, data = self._read_response()
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, headers, data
+
+    def _recv(self) -> bytes:
+        chunk = self._sock.recv(65536)  # type: ignore[union-attr]
+        if not chunk:
+            raise EOFError("connection closed by daemon")
+        return chunk
+
+    def _read_until(self, marker: bytes) -> bytes:
+        while marker not in self._buf:
+            self._buf += self._recv()
+        line, _, self._buf = self._buf.partition(marker)
+        return line
+
+    def _read_exact(self, n: int) -> bytes:
+        while len(self._buf) < n:
+            self._buf += self._recv()
+        data, self._buf = self._buf[:n], self._buf[n:]
+        return data
+
+    def _read_response(self) -> Tuple[int, Dict[str, str], bytes]:
+        while True:
+            lines = self._read_until(b"\r\n\r\n").decode("latin-1").split("\r\n")
+            status = int(lines[0].split(" ", 2)[1])
+            headers: Dict[str, str] = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if status != 100:
+                break
+        if status in (204, 304):
+            return status, headers, b""
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            parts: List[bytes] = []
+            while True:
+                size = int(self._read_until(b"\r\n").split(b";")[0], 16)
+                if size == 0:
+                    self._read_until(b"\r\n")
+                    break
+                parts.append(self._read_exact(size))
+                self._read_exact(2)
+            return status, headers, b"".join(parts)
+        if "content-length" in headers:
+            return status, headers, self._read_exact(int(headers["content-length"]))
+        # No framing: the body runs to the end of the connection.
+        data = self._buf
+        self._buf = b""
+        try:
+            while True:
+                data += self._recv()
+        except EOFError:
+            pass
+        self.close()
+        return status, headers, data
+
+    # -- wbabd routes ----------------------------------------------------------------
+
+    def status(self, op_id: str) -> Tuple[int, Any]:
+        status, _, body = self.request("GET", f"/status/{quote(op_id, safe='')}")
+        return status, body
+
+    def plan(
+        self,
+        op_id: str,
+        verb: str,
+        args: List[str],
+        git_url: str = "",
+        git_ref: str = "",
+    ) -> Tuple[int, Any]:
+        status, _, body = self.request(
+            "POST", "/plan", _op_payload(op_id, verb, args, git_url, git_ref)
+        )
+        return status, body
+
+    def run(
+        self,
+        op_id: str,
+        verb: str,
+        args: List[str],
+        git_url: str = "",
+        git_ref: str = "",
+    ) -> Tuple[int, Any]:
+        status, _, body = self.request(
+            "POST", "/run", _op_payload(op_id, verb, args, git_url, git_ref)
+        )
+        return status, body
+
+    # -- discovery -------------------------------------------------------------------
+
+    @classmethod
+    def discover(cls, root_dir: Path) -> Optional[DaemonClient]:
+        """Client for the configured or locally advertised daemon, or None."""
+        url = os.environ.get("WBABD_URL", "").strip()
+        if url == "mdns":
+            url = _least_loaded_peer_url(root_dir)
+            if not url:
+                return None
+        elif not url:
+            info = read_endpoint(default_endpoint_path(root_dir))
+            if info is None:
+                return None
+            url = _endpoint_url(info)
+        return cls(url, token=token_from_env(), principal=principal_from_env())
+
+
+def _least_loaded_peer_url(root_dir: Path) -> str:
+    """URL of the least-loaded discovered daemon (peer cache first, else an mDNS scan), or ""."""
+    # Only this mode pays for the discovery imports.
+    import asyncio
+
+    from core.discovery import (
+        DiscoveryBrowser,
+        PeerCache,
+        default_peer_cache_path,
+        rank_peers,
+    )
+
+    try:
+        peers = asyncio.run(
+            DiscoveryBrowser(
+                cache=PeerCache(default_peer_cache_path(root_dir))
+            ).discover(timeout=2.0)
+        )
+    except ImportError:
+        return ""
+    ranked = rank_peers(peers)
+    if not ranked:
+        return ""
+    peer = ranked[0]
+    return (
+        f"{'https' if peer.get('tls') else 'http'}://{peer['address']}:{peer['port']}"
+    )
+
+
+def _op_payload(
+    op_id: str, verb: str, args: List[str], git_url: str, git_ref: str
+) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {"op_id": op_id, "verb": verb, "args": list(args)}
+    if git_url:
+        payload["git_url"] = git_url
+    if git_ref:
+        payload["git_ref"] = git_ref
+    return payload
+
+
+def _tls_context():
+    import ssl
+
+    ctx = ssl.create_default_context(
+        cafile=os.environ.get("WBABD_CLIENT_CA_FILE") or None
+    )
+    cert = os.environ.get("WBABD_CLIENT_CERT_FILE", "").strip()
+    if cert:
+        ctx.load_cert_chain(
+            cert, os.environ.get("WBABD_CLIENT_KEY_FILE", "").strip() or None
+        )
+    return ctx
+
+
+def token_from_env() -> str:
+    """Bearer token from WBABD_API_TOKEN or WBABD_API_TOKEN_FILE; "" when neither is set."""
+    token = os.environ.get("WBABD_API_TOKEN", "")
+    if token:
+        return token
+    token_file = os.environ.get("WBABD_API_TOKEN_FILE", "").strip()
+    if not token_file:
+        return ""
+    try:
+        return Path(token_file).read_text(encoding="utf-8").strip()
+    except OSError:
+        return ""
+
+
+def principal_from_env() -> str:
+    """Principal sent as X-WBABD-Principal: WBABD_PRINCIPAL, else WBABD_ACTOR."""
+    return os.environ.get("WBABD_PRINCIPAL", "").strip() or os.environ.get(
+        "WBABD_ACTOR", ""
+    )
+
+
+# -- endpoint file ------------------------------------------------------------------------
+
+
+def default_endpoint_path(root_dir: Path) -> Path:
+    """Where a serving daemon records how to reach it: beside the operation store.
+
+    Follows the same rules as core.wbab_core.default_store_path, which this
+    module deliberately does not import.
+    """
+    env_path = os.environ.get("WBABD_ENDPOINT_FILE", "").strip()
+    if env_path:
+        return Path(env_path)
+    store_path = os.environ.get("WBABD_STORE_PATH")
+    if store_path:
+        return Path(store_path).parent / ENDPOINT_FILE_NAME
+    project_root = root_dir.parent if root_dir.name == "workspace" else root_dir
+    state_dir = project_root / "agent-sandbox" / "state"
+    if state_dir.exists() or (project_root / "agent-sandbox").exists():
+        return state_dir / ENDPOINT_FILE_NAME
+    return root_dir / ".wbab" / ENDPOINT_FILE_NAME
+
+
+def write_endpoint(path: Path, info: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(info), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def remove_endpoint(path: Path, pid: int) -> None:
+    """Removes the endpoint file if it still describes process `pid` (a successor may own it now)."""
+    try:
+        if json.loads(path.read_text(encoding="utf-8")).get("pid") == pid:
+            path.unlink()
+    except (OSError, ValueError, AttributeError):
+        pass
+
+
+def read_endpoint(path: Path) -> Optional[Dict[str, Any]]:
+    """The advertised endpoint, or None when missing, malformed or its process is gone."""
+    try:
+        info = json.loads(path.read_text(encoding="utf-8"))
+        pid = int(info["pid"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except PermissionError:
+        pass
+    return info
+
+
+def _endpoint_url(info: Dict[str, Any]) -> str:
+    unix = info.get("unix")
+    if unix and os.access(unix, os.R_OK | os.W_OK):
+        return f"unix://{unix}"
+    host = str(info.get("host") or "127.0.0.1")
+    if host in {"0.0.0.0", ""}:
+        host = "127.0.0.1"
+    elif host == "::":
+        host = "::1"
+    if ":" in host:
+        host = f"[{host}]"
+    scheme = "https" if info.get("tls") else "http"
+    return f"{scheme}://{host}:{int(info['port'])}"
+
+
+# -- CLI forwarding -----------------------------------------------------------------------
+
+
+def _parse_op_args(argv: List[str]) -> Optional[Tuple[str, str, List[str], str, str]]:
+    """Parses `[--git-url U] [--git-ref R] <op-id> <verb> [args...]` like the in-process CLI."""
+    opts = {"--git-url": "", "--git-ref": ""}
+    positional: List[str] = []
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        name, eq, value = arg.partition("=")
+        if name in opts:
+            if not eq:
+                i += 1
+                if i >= len(argv):
+                    return None
+                value = argv[i]
+            opts[name] = value
+        elif arg.startswith("--"):
+            # The in-process parser tolerates unknown options; leave them to it.
+            return None
+        else:
+            positional.append(arg)
+        i += 1
+    if len(positional) < 2:
+        return None
+    return (
+        positional[0],
+        positional[1],
+        positional[2:],
+        opts["--git-url"],
+        opts["--git-ref"],
+    )
+
+
+def forward_cli(argv: List[str], root_dir: Path) -> Optional[int]:
+    """Runs `wbabd status|plan|run` through a running daemon.
+
+    Returns the exit code, or None when the command should run in-process:
+    another command, arguments the in-process parser should judge, no daemon
+    found, the daemon unreachable, or credentials the daemon rejected (all
+    before anything was executed), and always unless WBAB_CLIENT_MODE is
+    `auto` or `require`; `require` turns "no daemon" into an error instead.
+    """
+    mode = os.environ.get("WBAB_CLIENT_MODE", "off").strip().lower()
+    if mode not in ("auto", "require") or not argv or argv[0] not in CLIENT_COMMANDS:
+        return None
+    required = mode == "require"
+    cmd = argv[0]
+    if cmd == "status":
+        # Bulk and watch modes read the store directly.
+        if len(argv) != 2 or argv[1].startswith("--"):
+            return None
+        parsed = None
+    else:
+        parsed = _parse_op_args(argv[1:])
+        if parsed is None:
+            return None
+    try:
+        client = DaemonClient.discover(root_dir)
+    except ValueError as exc:
+        print(f"wbabd: {exc}", file=sys.stderr)
+        return 2
+    if client is None:
+        if required:
+            print(
+                "wbabd: no running daemon found (WBAB_CLIENT_MODE=require)",
+                file=sys.stderr,
+            )
+            return 2
+        return None
+
+    with client:
+        try:
+            if parsed is None:
+                op_id = argv[1]
+                status, body = client.status(op_id)
+            else:
+                op_id, verb, args, git_url, git_ref = parsed
+                status, body = getattr(client, cmd)(op_id, verb, args, git_url, git_ref)
+        except DaemonUnavailable as exc:
+            if required:
+                print(f"wbabd: daemon unavailable: {exc}", file=sys.stderr)
+                return 2
+            return None
+        except (OSError, EOFError, ValueError) as exc:
+            # The request may have reached the daemon; running it again locally could duplicate work.
+            print(f"wbabd: daemon request failed: {exc}", file=sys.stderr)
+            return 1
+
+    if status == 401 and not required:
+        return None
+    print(f"wbabd: handled by daemon at {client.url}", file=sys.stderr)
+    if not isinstance(body, dict):
+        body = {"error": str(body)}
+    if cmd == "status":
+        if status == 200:
+            print(json.dumps(body, indent=2))
+            return 0
+        if status == 404:
+            print(json.dumps({"op_id": op_id, "status": "not_found"}))
+            return 1
+    elif status == 200:
+        print(json.dumps(body, indent=2))
+        return 0
+    elif cmd == "run" and "status" in body and "op_id" in body:
+        print(json.dumps(body, indent=2))
+        return 1
+    if status == 403:
+        print(json.dumps(body))
+        return 1
+    print(f"wbabd: {body.get('error', f'daemon answered {status}')}", file=sys.stderr)
+    return 2 if status in (400, 500) else 1
@@ -1,17 +1,16 @@
 import asyncio
+import json
+import os
 import socket
+import time
 import uuid
 import logging
-from typing import Dict, List, Optional
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
 
 try:
-    from zeroconf import (
-        IPVersion,
-        ServiceInfo,
-        Zeroconf,
-        ServiceBrowser,
-        ServiceStateChange,
-    )
+    from zeroconf import IPVersion, ServiceInfo, ServiceStateChange
+    from zeroconf.asyncio import AsyncServiceBrowser, AsyncServiceInfo, AsyncZeroconf
 
     HAS_ZEROCONF = True
 except ImportError:
@@ -19,6 +18,262 @@ except ImportError:
 
 logger = logging.getLogger("wbab.discovery")
 
+# Per-service resolve budget; resolutions run concurrently.
+_RESOLVE_TIMEOUT_MS = 1500
+# Once at least one peer answered, stop after this long without new answers.
+_SETTLE_SECS = 0.3
+PEER_CACHE_FILE_NAME = "discovery-peers.json"
+
+
+def default_peer_cache_path(root_dir: Path) -> Path:
+    env_path = os.environ.get("WBABD_DISCOVERY_CACHE_PATH", "").strip()
+    if env_path:
+        return Path(env_path)
+    store_path = os.environ.get("WBABD_STORE_PATH")
+    if store_path:
+        return Path(store_path).parent / PEER_CACHE_FILE_NAME
+    project_root = root_dir.parent if root_dir.name == "workspace" else root_dir
+    state_dir = project_root / "agent-sandbox" / "state"
+    if state_dir.exists() or (project_root / "agent-sandbox").exists():
+        return state_dir / PEER_CACHE_FILE_NAME
+    return root_dir / ".wbab" / PEER_CACHE_FILE_NAME
+
+
+def _cache_ttl_secs() -> float:
+    raw = os.environ.get("WBABD_DISCOVERY_CACHE_TTL_SECS", "60").strip()
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        return 60.0
+
+
+class PeerCache:
+    """Discovered peers kept on disk so repeated lookups skip the network scan.
+
+    A scan result (including "no peers") is fresh for `ttl` seconds after it
+    was taken; each peer record also carries its own expiry.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = path
+        self.ttl = _cache_ttl_secs() if ttl is None else ttl
+        self.clock = clock
+
+    def _read(self) -> Dict:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def load(self) -> Optional[List[Dict]]:
+        """Fresh peers from the last scan, or None when a new scan is needed."""
+        data = self._read()
+        now = self.clock()
+        if self.ttl <= 0 or now - float(data.get("scanned_at", 0)) > self.ttl:
+            return None
+        peers = data.get("peers", {})
+        return [p for p in peers.values() if float(p.get("expires_at", 0)) > now]
+
+    def save(self, peers: List[Dict]) -> None:
+        now = self.clock()
+        records = {
+            p["name"]: {
+                **p,
+                "expires_at": now + min(self.ttl, float(p.get("ttl") or self.ttl)),
+            }
+            for p in peers
+        }
+        self._write({"scanned_at": now, "peers": records})
+
+    def put(self, peer: Dict) -> None:
+        """Adds one peer (e.g. the local daemon) without marking a full scan as done."""
+        data = self._read()
+        peers = data.get("peers", {}) if isinstance(data.get("peers"), dict) else {}
+        peers[peer["name"]] = {
+            **peer,
+            "expires_at": self.clock() + float(peer.get("ttl") or self.ttl),
+        }
+        data["peers"] = peers
+        self._write(data)
+
+    def drop(self, name: str) -> None:
+        data = self._read()
+        if name in data.get("peers", {}):
+            del data["peers"][name]
+            self._write(data)
+
+    def _write(self, data: Dict) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(data, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as exc:
+            logger.warning(f"Cannot write discovery cache {self.path}: {exc}")
+
+
+async def _collect(
+    queue: "asyncio.Queue[Dict]",
+    timeout: float,
+    *,
+    done: Optional[Callable[[List[Dict]], bool]] = None,
+    settle: Optional[float] = _SETTLE_SECS,
+) -> List[Dict]:
+    """Drains resolved peers from `queue` until `timeout`, `done(peers)` or a quiet `settle` period."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    peers: Dict[str, Dict] = {}
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        wait = min(remaining, settle) if peers and settle is not None else remaining
+        try:
+            peer = await asyncio.wait_for(queue.get(), wait)
+        except asyncio.TimeoutError:
+            break
+        peers[peer["name"]] = peer
+        if done is not None and done(list(peers.values())):
+            break
+    return list(peers.values())
+
+
+def load_properties(load: Dict) -> Dict[str, str]:
+    """Encodes a load summary as TXT record properties (each well under 255 bytes)."""
+    verbs = ",".join(
+        f"{verb}={n}"
+        for verb, n in sorted(load.get("running_by_verb", {}).items())
+        if n
+    )
+    return {
+        "load_running": str(int(load.get("runs_running", 0))),
+        "load_queued": str(int(load.get("runs_queued", 0))),
+        "load_capacity": str(int(load.get("run_capacity", 0))),
+        "disk_free_mb": str(int(load.get("disk_free_bytes", 0)) // (1024 * 1024)),
+        "verbs": verbs[:200],
+    }
+
+
+def _parse_load(props: Dict) -> Optional[Dict]:
+    if "load_capacity" not in props:
+        return None
+    try:
+        verbs = {}
+        for term in filter(None, str(props.get("verbs", "")).split(",")):
+            verb, _, n = term.partition("=")
+            verbs[verb] = int(n)
+        return {
+            "runs_running": int(props.get("load_running", 0)),
+            "runs_queued": int(props.get("load_queued", 0)),
+            "run_capacity": int(props.get("load_capacity", 0)),
+            "disk_free_mb": int(props.get("disk_free_mb", 0)),
+            "running_by_verb": verbs,
+        }
+    except (TypeError, ValueError):
+        return None
+
+
+def peer_load_score(peer: Dict) -> float:
+    """Busy fraction of a peer's run capacity (queued runs count too); unknown load ranks last."""
+    load = peer.get("load")
+    if not load:
+        return float("inf")
+    return (load["runs_running"] + load["runs_queued"]) / max(1, load["run_capacity"])
+
+
+def rank_peers(
+    peers: List[Dict],
+    *,
+    version: Optional[str] = None,
+    exclude_instance: Optional[str] = None,
+    min_disk_free_mb: int = 0,
+) -> List[Dict]:
+    """Compatible peers, least loaded first; ties go to the peer with more free disk.
+
+    A peer is compatible when it has an address and port, shares the major
+    version with `version` (if given), is not `exclude_instance` and reports
+    at least `min_disk_free_mb` free (when it reports load at all).
+    """
+    major = version.split(".")[0] if version else None
+    candidates = []
+    for peer in peers:
+        if not peer.get("address") or not peer.get("port"):
+            continue
+        if exclude_instance and peer.get("instance_id") == exclude_instance:
+            continue
+        if major is not None and str(peer.get("version") or "").split(".")[0] != major:
+            continue
+        load = peer.get("load")
+        if load and load["disk_free_mb"] < min_disk_free_mb:
+            continue
+        candidates.append(peer)
+    return sorted(
+        candidates,
+        key=lambda p: (
+            peer_load_score(p),
+            -(p.get("load") or {}).get("disk_free_mb", 0),
+        ),
+    )
+
+
+def _peer_record(info: "ServiceInfo") -> Dict:
+    props = {
+        k.decode(): v.decode() if isinstance(v, bytes) else v
+        for k, v in info.properties.items()
+    }
+    addresses = info.parsed_addresses(IPVersion.V4Only)
+    return {
+        "name": info.name,
+        "address": addresses[0] if addresses else None,
+        "port": info.port,
+        "instance_id": props.get("instance_id"),
+        "version": props.get("version"),
+        "mode": props.get("mode"),
+        "tls": props.get("tls") == "1",
+        "load": _parse_load(props),
+        "ttl": info.other_ttl,
+    }
+
+
+async def _browse(
+    aiozc: "AsyncZeroconf",
+    timeout: float,
+    *,
+    done: Optional[Callable[[List[Dict]], bool]] = None,
+    settle: Optional[float] = _SETTLE_SECS,
+) -> List[Dict]:
+    """Browses for WBAB services, resolving each announced name concurrently."""
+    queue: "asyncio.Queue[Dict]" = asyncio.Queue()
+    pending: set = set()
+
+    async def resolve(service_type: str, name: str) -> None:
+        info = AsyncServiceInfo(service_type, name)
+        if await info.async_request(aiozc.zeroconf, _RESOLVE_TIMEOUT_MS):
+            queue.put_nowait(_peer_record(info))
+
+    def on_change(zeroconf, service_type: str, name: str, state_change) -> None:
+        # Called on the event loop: never block here, resolve in a task.
+        if state_change in (ServiceStateChange.Added, ServiceStateChange.Updated):
+            task = asyncio.ensure_future(resolve(service_type, name))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+    browser = AsyncServiceBrowser(
+        aiozc.zeroconf, DiscoveryManager.SERVICE_TYPE, handlers=[on_change]
+    )
+    try:
+        return await _collect(queue, timeout, done=done, settle=settle)
+    finally:
+        await browser.async_cancel()
+        for task in list(pending):
+            task.cancel()
+
 
 class DiscoveryManager:
     SERVICE_TYPE = "_wbab-api._tcp.local."
@@ -28,6 +283,7 @@ class DiscoveryManager:
         base_name: str = "WBAB-Daemon",
         version: str = "1.0.0",
         instance_id: Optional[str] = None,
+        cache: Optional[PeerCache] = None,
     ):
         if not HAS_ZEROCONF:
             raise ImportError(
@@ -36,9 +292,18 @@ class DiscoveryManager:
         self.base_name = base_name
         self.version = version
         self.instance_id = instance_id or str(uuid.uuid4())
-        self.zc: Optional[Zeroconf] = None
+        self.cache = cache
+        self.aiozc: Optional[AsyncZeroconf] = None
         self.service_info: Optional[ServiceInfo] = None
-        self._peers: Dict[str, Dict] = {}
+        self._registration: Optional[asyncio.Future] = None
+        self._cached_name = ""
+        self._desc: Dict[str, str] = {}
+        self._load_props: Dict[str, str] = {}
+        self._address = ""
+        self._port = 0
+        self._tracker: Optional[AsyncServiceBrowser] = None
+        self._tracking_tasks: set = set()
+        self.peers: Dict[str, Dict] = {}
 
     def _get_ip(self) -> str:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -52,138 +317,219 @@ class DiscoveryManager:
             s.close()
         return IP
 
+    def _zeroconf(self) -> "AsyncZeroconf":
+        if self.aiozc is None:
+            self.aiozc = AsyncZeroconf(ip_version=IPVersion.V4Only)
+        return self.aiozc
+
     async def find_existing_instances(self, timeout: float = 2.0) -> List[Dict]:
-        """Scans the network for existing WBAB services."""
+        """Scans the network for other WBAB services; returns at the first foreign instance."""
         if not HAS_ZEROCONF:
             return []
-        zc = Zeroconf(ip_version=IPVersion.V4Only)
-        found = []
-
-        def on_service_state_change(
-            zeroconf: "Zeroconf",
-            service_type: str,
-            name: str,
-            state_change: "ServiceStateChange",
-        ) -> None:
-            if state_change is ServiceStateChange.Added:
-                info = zeroconf.get_service_info(service_type, name)
-                if info:
-                    props = {
-                        k.decode(): v.decode() if isinstance(v, bytes) else v
-                        for k, v in info.properties.items()
-                    }
-                    found.append(
-                        {
-                            "name": name,
-                            "address": socket.inet_ntoa(info.addresses[0]),
-                            "port": info.port,
-                            "instance_id": props.get("instance_id"),
-                            "version": props.get("version"),
-                        }
-                    )
-
-        _browser = ServiceBrowser(
-            zc, self.SERVICE_TYPE, handlers=[on_service_state_change]
+        return await _browse(
+            self._zeroconf(),
+            timeout,
+            done=lambda peers: any(p["instance_id"] != self.instance_id for p in peers),
+            settle=None,
         )
-        await asyncio.sleep(timeout)
-        zc.close()
-        return found
 
-    async def start_announcing(self, port: int, allow_multi: bool = False):
-        """Probes name, handles collisions, and registers the service."""
+    async def start_announcing(
+        self,
+        port: int,
+        allow_multi: bool = False,
+        probe_timeout: float = 1.0,
+        *,
+        tls: bool = False,
+        load: Optional[Dict] = None,
+    ):
+        """Checks for a conflicting instance (singleton mode), then registers the service.
+
+        Registration (mDNS probing, renaming on a name collision) completes in
+        the background, so the caller can start serving right away.
+        """
+        existing: List[Dict] = []
         if not allow_multi:
-            existing = await self.find_existing_instances()
+            existing = await self.find_existing_instances(probe_timeout)
             for inst in existing:
                 if inst["instance_id"] != self.instance_id:
                     raise RuntimeError(
                         f"ConflictError: Another WBAB instance ({inst['name']}) is active at {inst['address']}:{inst['port']}"
                     )
 
-        self.zc = Zeroconf(ip_version=IPVersion.V4Only)
-
-        # Collision handling for name
+        # Skip names already seen; zeroconf renames on any collision it finds while probing.
+        taken = {p["name"] for p in existing}
         current_name = self.base_name
         suffix = 1
-        while True:
-            full_name = f"{current_name}.{self.SERVICE_TYPE}"
-            info = self.zc.get_service_info(self.SERVICE_TYPE, full_name)
-            if not info:
-                break
+        while f"{current_name}.{self.SERVICE_TYPE}" in taken:
             suffix += 1
             current_name = f"{self.base_name}-{suffix}"
 
-        desc = {
+        self._desc = {
             "version": self.version,
             "mode": "multi" if allow_multi else "singleton",
             "instance_id": self.instance_id,
+            "tls": "1" if tls else "0",
         }
+        self._load_props = load_properties(load) if load else {}
+        self._address = self._get_ip()
+        self._port = port
+        self.service_info = self._build_info(f"{current_name}.{self.SERVICE_TYPE}")
+
+        logger.info(f"Registering service: {current_name} on port {port}")
+        registration = asyncio.ensure_future(
+            self._zeroconf().async_register_service(
+                self.service_info, allow_name_change=True
+            )
+        )
+        registration.add_done_callback(self._on_registered)
+        self._registration = registration
+        if self.cache is not None:
+            self._cached_name = self.service_info.name
+            self.cache.put(self._own_record())
 
-        self.service_info = ServiceInfo(
+    def _build_info(self, name: str) -> "ServiceInfo":
+        return ServiceInfo(
             self.SERVICE_TYPE,
-            f"{current_name}.{self.SERVICE_TYPE}",
-            addresses=[socket.inet_aton(self._get_ip())],
-            port=port,
-            properties=desc,
-            server=f"{current_name}.local.",
+            name,
+            addresses=[socket.inet_aton(self._address)],
+            port=self._port,
+            properties={**self._desc, **self._load_props},
+            server=f"{name[: -len(self.SERVICE_TYPE) - 1]}.local.",
         )
 
-        logger.info(f"Registering service: {current_name} on port {port}")
-        self.zc.register_service(self.service_info)
+    def _own_record(self) -> Dict:
+        return {
+            "name": self._cached_name,
+            "address": self._address,
+            "port": self._port,
+            "instance_id": self.instance_id,
+            "version": self.version,
+            "mode": self._desc["mode"],
+            "tls": self._desc["tls"] == "1",
+            "load": _parse_load(self._load_props),
+            "ttl": self.service_info.other_ttl if self.service_info else None,
+        }
+
+    def _on_registered(self, fut: "asyncio.Future") -> None:
+        if fut.cancelled():
+            return
+        exc = fut.exception()
+        if exc is not None:
+            logger.warning(f"Service registration failed: {exc}")
+
+    async def update_load(self, load: Dict) -> bool:
+        """Republishes the TXT record when the load summary changed; returns True if it did.
+
+        Each update is a multicast announcement, so callers should rate-limit it.
+        """
+        props = load_properties(load)
+        aiozc = self.aiozc
+        if aiozc is None or self.service_info is None or props == self._load_props:
+            return False
+        if self._registration is None or not self._registration.done():
+            return False  # still probing; the next update carries the latest load
+        self._load_props = props
+        # Keep whatever name registration settled on.
+        self.service_info = self._build_info(self.service_info.name)
+        await aiozc.async_update_service(self.service_info)
+        if self.cache is not None and self._cached_name:
+            self.cache.put(self._own_record())
+        return True
 
-    def stop_announcing(self):
-        if self.zc:
+    def start_tracking(self) -> None:
+        """Keeps `self.peers` (and the peer cache) current from a long-running browser.
+
+        Resolutions run in tasks; a TXT change (e.g. a peer's load) arrives as an update.
+        """
+        if self._tracker is not None:
+            return
+        aiozc = self._zeroconf()
+
+        async def resolve(service_type: str, name: str) -> None:
+            info = AsyncServiceInfo(service_type, name)
+            if await info.async_request(aiozc.zeroconf, _RESOLVE_TIMEOUT_MS):
+                self.peers[name] = _peer_record(info)
+                self.save_peers()
+
+        def on_change(zeroconf, service_type: str, name: str, state_change) -> None:
+            if state_change is ServiceStateChange.Removed:
+                if self.peers.pop(name, None) is not None:
+                    self.save_peers()
+                return
+            task = asyncio.ensure_future(resolve(service_type, name))
+            self._tracking_tasks.add(task)
+            task.add_done_callback(self._tracking_tasks.discard)
+
+        self._tracker = AsyncServiceBrowser(
+            aiozc.zeroconf, self.SERVICE_TYPE, handlers=[on_change]
+        )
+
+    def save_peers(self) -> None:
+        """Writes the tracked peers to the cache as a fresh scan (callers refresh it periodically)."""
+        if self.cache is not None and self._tracker is not None:
+            self.cache.save(list(self.peers.values()))
+
+    async def stop_announcing(self):
+        if self.aiozc:
+            if self._tracker is not None:
+                await self._tracker.async_cancel()
+                self._tracker = None
+                for task in list(self._tracking_tasks):
+                    task.cancel()
+            if self._registration is not None and not self._registration.done():
+                self._registration.cancel()
             if self.service_info:
-                self.zc.unregister_service(self.service_info)
-            self.zc.close()
-            self.zc = None
+                try:
+                    await self.aiozc.async_unregister_service(self.service_info)
+                except Exception as exc:  # not registered yet, or already gone
+                    logger.debug(f"Unregister failed: {exc}")
+                if self.cache is not None and self._cached_name:
+                    self.cache.drop(self._cached_name)
+            await self.aiozc.async_close()
+            self.aiozc = None
 
 
 class DiscoveryBrowser:
-    """Client-side helper to discover and track WBAB peers."""
+    """Client-side helper to discover WBAB peers.
 
-    def __init__(self):
-        if not HAS_ZEROCONF:
-            raise ImportError(
-                "zeroconf library is required for DiscoveryBrowser. Install with: pip install zeroconf"
-            )
-        self.zc = Zeroconf(ip_version=IPVersion.V4Only)
+    Answers from the on-disk peer cache when it is fresh; otherwise scans,
+    returning once `expected` peers answered or the answers stop coming in,
+    and refreshes the cache.
+    """
+
+    def __init__(self, cache: Optional[PeerCache] = None):
+        self.cache = cache
         self.found_peers: Dict[str, Dict] = {}
 
-    def on_service_state_change(
+    async def discover(
         self,
-        zeroconf: "Zeroconf",
-        service_type: str,
-        name: str,
-        state_change: "ServiceStateChange",
-    ) -> None:
+        timeout: float = 3.0,
+        *,
+        expected: Optional[int] = None,
+        refresh: bool = False,
+    ) -> List[Dict]:
+        if self.cache is not None and not refresh:
+            cached = self.cache.load()
+            if cached is not None and (expected is None or len(cached) >= expected):
+                self.found_peers = {p["name"]: p for p in cached}
+                return cached
         if not HAS_ZEROCONF:
-            return
-        if state_change is ServiceStateChange.Added:
-            info = zeroconf.get_service_info(service_type, name)
-            if info:
-                props = {
-                    k.decode(): v.decode() if isinstance(v, bytes) else v
-                    for k, v in info.properties.items()
-                }
-                self.found_peers[name] = {
-                    "name": name,
-                    "address": socket.inet_ntoa(info.addresses[0]),
-                    "port": info.port,
-                    "version": props.get("version"),
-                    "mode": props.get("mode"),
-                }
-        elif state_change is ServiceStateChange.Removed:
-            if name in self.found_peers:
-                del self.found_peers[name]
-
-    async def discover(self, timeout: float = 3.0) -> List[Dict]:
-        _browser = ServiceBrowser(
-            self.zc,
-            DiscoveryManager.SERVICE_TYPE,
-            handlers=[self.on_service_state_change],
-        )
-        await asyncio.sleep(timeout)
-        return list(self.found_peers.values())
+            raise ImportError(
+                "zeroconf library is required for DiscoveryBrowser. Install with: pip install zeroconf"
+            )
+        aiozc = AsyncZeroconf(ip_version=IPVersion.V4Only)
+        try:
+            peers = await _browse(
+                aiozc,
+                timeout,
+                done=(lambda found: len(found) >= expected) if expected else None,
+            )
+        finally:
+            await aiozc.async_close()
+        self.found_peers = {p["name"]: p for p in peers}
+        if self.cache is not None:
+            self.cache.save(peers)
+        return peers
 
     def close(self):
-        self.zc.close()
+        """Kept for callers of the earlier API; discover() releases its sockets itself."""
@@ -0,0 +1,620 @@
+"""Incremental HTTP/1.1 server protocol for wbabd (asyncio.Protocol based).
+
+The protocol parses requests as bytes arrive instead of reading line by line:
+header blocks are bounded, Content-Length is validated, chunked request bodies
+are decoded, pipelined requests are answered in order on persistent
+connections, and responses are either sized (optionally gzip/deflate encoded)
+or streamed with chunked transfer encoding.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import socket
+import struct
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from urllib.parse import parse_qs, urlparse
+
+_TOKEN_RE = re.compile(r"^[!#$%&'*+\-.^_`|~0-9A-Za-z]+$")
+_DIGITS_RE = re.compile(r"^[0-9]+$")
+_HEX_RE = re.compile(rb"^[0-9A-Fa-f]+$")
+
+# Parser states
+_HEAD = 0
+_BODY = 1
+_CHUNK_SIZE = 2
+_CHUNK_DATA = 3
+_TRAILERS = 4
+_DEAD = 5
+
+# Parsed-but-unanswered requests allowed per connection before reading pauses.
+MAX_PIPELINED_REQUESTS = 16
+_MAX_CHUNK_SIZE_LINE = 1024
+_COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+class HttpError(Exception):
+    """Protocol-level failure answered with `status` before closing the connection."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+@dataclass
+class HttpLimits:
+    max_header_bytes: int = 16384
+    max_body_bytes: int = 1048576
+    request_timeout: float = 15.0
+    max_requests: int = 100
+    # Responses smaller than this are sent uncompressed; 0 disables compression.
+    compress_min_bytes: int = 1024
+
+
+@dataclass
+class HttpRequest:
+    method: str
+    target: str
+    version: str
+    headers: Dict[str, str]
+    body: bytes = b""
+    connection: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def path(self) -> str:
+        return urlparse(self.target).path
+
+    @property
+    def query(self) -> Dict[str, List[str]]:
+        return parse_qs(urlparse(self.target).query)
+
+    @property
+    def client_ip(self) -> str:
+        peer = self.connection.get("peername")
+        if isinstance(peer, (tuple, list)) and peer:
+            return str(peer[0])
+        return ""
+
+    @property
+    def keep_alive(self) -> bool:
+        tokens = {
+            t.strip().lower() for t in self.headers.get("connection", "").split(",")
+        }
+        if self.version == "HTTP/1.1":
+            return "close" not in tokens
+        return "keep-alive" in tokens
+
+    def json(self) -> Any:
+        return json.loads(self.body.decode("utf-8"))
+
+
+@dataclass
+class HttpResponse:
+    status: int = 200
+    body: bytes = b""
+    headers: Dict[str, str] = field(default_factory=dict)
+    content_type: str = "application/json"
+    # When set, the body is streamed (chunked on HTTP/1.1) instead of sized.
+    stream: Optional[AsyncIterator[bytes]] = None
+
+    @classmethod
+    def json(
+        cls, status: int, payload: Any, headers: Optional[Dict[str, str]] = None
+    ) -> "HttpResponse":
+        return cls(
+            status=status,
+            body=json.dumps(payload).encode(),
+            headers=dict(headers or {}),
+        )
+
+
+Handler = Callable[[HttpRequest], Awaitable[HttpResponse]]
+_QueueItem = Union[HttpRequest, HttpError]
+
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    """Picks gzip or deflate from an Accept-Encoding header, or '' for identity."""
+    if not accept_encoding:
+        return ""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.lower().startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    wildcard = weights.get("*", 0.0)
+    for candidate in ("gzip", "deflate"):
+        if weights.get(candidate, wildcard) > 0:
+            return candidate
+    return ""
+
+
+def encode_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        return compressor.compress(body) + compressor.flush()
+    if encoding == "deflate":
+        return zlib.compress(body, 6)
+    return body
+
+
+def peer_credentials(sock: Optional[socket.socket]) -> Optional[Tuple[int, int, int]]:
+    """(pid, uid, gid) of the process on the other end of a unix socket, where supported."""
+    so_peercred = getattr(socket, "SO_PEERCRED", None)
+    if (
+        sock is None
+        or so_peercred is None
+        or sock.family != getattr(socket, "AF_UNIX", None)
+    ):
+        return None
+    try:
+        raw = sock.getsockopt(socket.SOL_SOCKET, so_peercred, struct.calcsize("3i"))
+    except OSError:
+        return None
+    pid, uid, gid = struct.unpack("3i", raw)
+    return pid, uid, gid
+
+
+def _reason(status: int) -> str:
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return "Unknown"
+
+
+class HttpProtocol(asyncio.Protocol):
+    """One instance per connection; requests are handed to `handler` strictly in order."""
+
+    def __init__(self, handler: Handler, limits: HttpLimits) -> None:
+        self.handler = handler
+        self.limits = limits
+        self.transport: Optional[asyncio.Transport] = None
+        self.connection: Dict[str, Any] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._buf = bytearray()
+        self._state = _HEAD
+        self._pending: Optional[HttpRequest] = None
+        self._remaining = 0
+        self._chunks: List[bytes] = []
+        self._chunked_size = 0
+        self._trailer_bytes = 0
+        self._queue: Deque[_QueueItem] = deque()
+        self._worker: Optional[asyncio.Task] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._served = 0
+        self._closed = False
+        self._eof = False
+        self._streaming = False
+        self._reading_paused = False
+        self._can_write = asyncio.Event()
+        self._can_write.set()
+
+    # -- asyncio.Protocol callbacks -------------------------------------------------
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+        self._loop = asyncio.get_running_loop()
+        sock = transport.get_extra_info("socket")
+        unix = sock is not None and sock.family == getattr(socket, "AF_UNIX", None)
+        self.connection = {
+            "peername": transport.get_extra_info("peername"),
+            "sockname": transport.get_extra_info("sockname"),
+            "socket": sock,
+            "tls": transport.get_extra_info("sslcontext") is not None,
+            "unix": unix,
+            "peercred": peer_credentials(sock) if unix else None,
+        }
+        self._arm_timer()
+
+    def data_received(self, data: bytes) -> None:
+        if self._closed or self._state == _DEAD:
+            return
+        self._buf += data
+        self._parse()
+
+    def eof_received(self) -> bool:
+        # Finish answering what was already received, then close. TLS transports
+        # cannot stay half-open, so they close as soon as the peer does.
+        self._eof = True
+        if self._worker is None and not self._queue:
+            self._close()
+        return not self.connection.get("tls", False)
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self._closed = True
+        self._cancel_timer()
+        self._can_write.set()
+        if self._worker is not None and self._streaming:
+            self._worker.cancel()
+
+    def pause_writing(self) -> None:
+        self._can_write.clear()
+
+    def resume_writing(self) -> None:
+        self._can_write.set()
+
+    # -- parsing ------------------------------------------------------------------------
+
+    def _parse(self) -> None:
+        try:
+            while not self._closed and self._state != _DEAD:
+                if len(self._queue) >= MAX_PIPELINED_REQUESTS:
+                    self._pause_reading()
+                    return
+                if not self._parse_step():
+                    return
+        except HttpError as exc:
+            self._state = _DEAD
+            self._buf.clear()
+            self._enqueue(exc)
+
+    def _parse_step(self) -> bool:
+        """Consumes one unit from the buffer; returns False when more bytes are needed."""
+        limits = self.limits
+        if self._state == _HEAD:
+            # Tolerate stray CRLFs between pipelined requests (RFC 9112 section 2.2).
+            while self._buf[:2] == b"\r\n":
+                del self._buf[:2]
+            end = self._buf.find(b"\r\n\r\n")
+            if end < 0:
+                if len(self._buf) > limits.max_header_bytes:
+                    raise HttpError(431, "request_header_too_large")
+                return False
+            if end + 4 > limits.max_header_bytes:
+                raise HttpError(431, "request_header_too_large")
+            head = bytes(self._buf[:end])
+            del self._buf[: end + 4]
+            self._start_request(head)
+            return True
+
+        if self._state == _BODY:
+            if len(self._buf) < self._remaining:
+                return False
+            body = bytes(self._buf[: self._remaining])
+            del self._buf[: self._remaining]
+            self._complete(body)
+            return True
+
+        if self._state == _CHUNK_SIZE:
+            idx = self._buf.find(b"\r\n")
+            if idx < 0:
+                if len(self._buf) > _MAX_CHUNK_SIZE_LINE:
+                    raise HttpError(400, "invalid_chunk_size")
+                return False
+            line = bytes(self._buf[:idx]).split(b";", 1)[0].strip()
+            del self._buf[: idx + 2]
+            if not _HEX_RE.match(line):
+                raise HttpError(400, "invalid_chunk_size")
+            size = int(line, 16)
+            if size == 0:
+                self._state = _TRAILERS
+                self._trailer_bytes = 0
+                return True
+            self._chunked_size += size
+            if self._chunked_size > limits.max_body_bytes:
+                raise HttpError(
+                    413,
+                    f"payload_too_large:{self._chunked_size}>{limits.max_body_bytes}",
+                )
+            self._remaining = size
+            self._state = _CHUNK_DATA
+            return True
+
+        if self._state == _CHUNK_DATA:
+            if len(self._buf) < self._remaining + 2:
+                return False
+            if self._buf[self._remaining : self._remaining + 2] != b"\r\n":
+                raise HttpError(400, "invalid_chunk_terminator")
+            self._chunks.append(bytes(self._buf[: self._remaining]))
+            del self._buf[: self._remaining + 2]
+            self._state = _CHUNK_SIZE
+            return True
+
+        if self._state == _TRAILERS:
+            idx = self._buf.find(b"\r\n")
+            if idx < 0:
+                if self._trailer_bytes + len(self._buf) > limits.max_header_bytes:
+                    raise HttpError(431, "request_header_too_large")
+                return False
+            del self._buf[: idx + 2]
+            self._trailer_bytes += idx + 2
+            if self._trailer_bytes > limits.max_header_bytes:
+                raise HttpError(431, "request_header_too_large")
+            if idx == 0:
+                body = b"".join(self._chunks)
+                self._chunks = []
+                self._complete(body)
+            return True
+
+        return False
+
+    def _start_request(self, head: bytes) -> None:
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ")
+        if len(parts) != 3 or not _TOKEN_RE.match(parts[0]) or not parts[1]:
+            raise HttpError(400, "malformed_request_line")
+        method, target, version = parts
+        if version not in ("HTTP/1.0", "HTTP/1.1"):
+            raise HttpError(505, "http_version_not_supported")
+
+        headers: Dict[str, str] = {}
+        for line in lines[1:]:
+            if line[:1] in (" ", "\t"):
+                raise HttpError(400, "obsolete_line_folding")
+            name, sep, value = line.partition(":")
+            if not sep or not _TOKEN_RE.match(name):
+                raise HttpError(400, "malformed_header")
+            key = name.lower()
+            value = value.strip()
+            if key in headers:
+                if key == "content-length":
+                    if headers[key] != value:
+                        raise HttpError(400, "conflicting_content_length")
+                    continue
+                headers[key] = f"{headers[key]}, {value}"
+            else:
+                headers[key] = value
+
+        self._pending = HttpRequest(
+            method=method,
+            target=target,
+            version=version,
+            headers=headers,
+            connection=self.connection,
+        )
+
+        transfer_encoding = headers.get("transfer-encoding")
+        content_length = headers.get("content-length")
+        if transfer_encoding is not None:
+            if content_length is not None:
+                raise HttpError(400, "content_length_with_transfer_encoding")
+            if transfer_encoding.strip().lower() != "chunked":
+                raise HttpError(501, "unsupported_transfer_encoding")
+            self._chunks = []
+            self._chunked_size = 0
+            self._state = _CHUNK_SIZE
+            self._maybe_continue(headers)
+            return
+        if content_length is not None:
+            if not _DIGITS_RE.match(content_length):
+                raise HttpError(400, "invalid_content_length")
+            length = int(content_length)
+            if length > self.limits.max_body_bytes:
+                raise HttpError(
+                    413, f"payload_too_large:{length}>{self.limits.max_body_bytes}"
+                )
+            if length > 0:
+                self._remaining = length
+                self._state = _BODY
+                self._maybe_continue(headers)
+                return
+        self._complete(b"")
+
+    def _maybe_continue(self, headers: Dict[str, str]) -> None:
+        # Only safe when no earlier response is being written on this connection.
+        if (
+            headers.get("expect", "").lower() == "100-continue"
+            and self._worker is None
+            and not self._queue
+            and self.transport is not None
+        ):
+            self.transport.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+
+    def _complete(self, body: bytes) -> None:
+        request = self._pending
+        self._pending = None
+        self._state = _HEAD
+        if request is None:
+            return
+        request.body = body
+        self._enqueue(request)
+
+    # -- request processing ------------------------------------------------------------
+
+    def _enqueue(self, item: _QueueItem) -> None:
+        self._queue.append(item)
+        self._cancel_timer()
+        if self._worker is None and self._loop is not None:
+            self._worker = self._loop.create_task(self._process())
+
+    async def _process(self) -> None:
+        try:
+            while self._queue and not self._closed:
+                item = self._queue.popleft()
+                if (
+                    self._reading_paused
+                    and len(self._queue) < MAX_PIPELINED_REQUESTS // 2
+                ):
+                    self._resume_reading()
+                if isinstance(item, HttpError):
+                    await self._send(
+                        None,
+                        HttpResponse.json(item.status, {"error": item.message}),
+                        False,
+                    )
+                    self._close()
+                    return
+                self._served += 1
+                keep_alive = item.keep_alive and self._served < self.limits.max_requests
+                try:
+                    response = await self.handler(item)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as exc:
+                    response = HttpResponse.json(500, {"error": str(exc)})
+                    keep_alive = False
+                keep_alive = await self._send(item, response, keep_alive)
+                if not keep_alive:
+                    self._close()
+                    return
+        finally:
+            self._worker = None
+            if not self._closed:
+                if self._buf and self._state != _DEAD:
+                    self._parse()
+                if self._worker is None and not self._closed:
+                    if self._eof:
+                        self._close()
+                    else:
+                        self._arm_timer()
+
+    async def _send(
+        self, request: Optional[HttpRequest], response: HttpResponse, keep_alive: bool
+    ) -> bool:
+        """Writes a response; returns whether the connection stays open afterwards."""
+        if self.transport is None or self._closed:
+            return False
+        version = request.version if request is not None else "HTTP/1.1"
+        headers: Dict[str, str] = {"Content-Type": response.content_type}
+        headers.update(response.headers)
+
+        if response.stream is not None:
+            chunked = version == "HTTP/1.1"
+            if chunked:
+                headers["Transfer-Encoding"] = "chunked"
+            else:
+                keep_alive = False
+            self._set_connection_headers(headers, keep_alive)
+            self.transport.write(self._head(response.status, headers))
+            self._streaming = True
+            try:
+                async for chunk in response.stream:
+                    if self._closed:
+                        return False
+                    if not chunk:
+                        continue
+                    if chunked:
+                        self.transport.write(b"%x\r\n%b\r\n" % (len(chunk), chunk))
+                    else:
+                        self.transport.write(chunk)
+                    await self._drain()
+            finally:
+                self._streaming = False
+            if self._closed:
+                return False
+            if chunked:
+                self.transport.write(b"0\r\n\r\n")
+            await self._drain()
+            return keep_alive
+
+        body = response.body
+        if response.status in (204, 304):
+            body = b""
+        else:
+            encoding = ""
+            if (
+                request is not None
+                and self.limits.compress_min_bytes > 0
+                and len(body) >= self.limits.compress_min_bytes
+                and "Content-Encoding" not in headers
+                and response.content_type.startswith(_COMPRESSIBLE_TYPES)
+            ):
+                encoding = negotiate_encoding(
+                    request.headers.get("accept-encoding", "")
+                )
+            if encoding:
+                body = encode_body(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Vary"] = "Accept-Encoding"
+            headers["Content-Length"] = str(len(body))
+        self._set_connection_headers(headers, keep_alive)
+        self.transport.write(self._head(response.status, headers) + body)
+        await self._drain()
+        return keep_alive
+
+    def _set_connection_headers(
+        self, headers: Dict[str, str], keep_alive: bool
+    ) -> None:
+        if keep_alive:
+            headers["Connection"] = "keep-alive"
+            headers["Keep-Alive"] = (
+                f"timeout={int(self.limits.request_timeout)}, max={self.limits.max_requests}"
+            )
+        else:
+            headers["Connection"] = "close"
+
+    @staticmethod
+    def _head(status: int, headers: Dict[str, str]) -> bytes:
+        lines = [f"HTTP/1.1 {status} {_reason(status)}"]
+        lines.extend(f"{k}: {v}" for k, v in headers.items())
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def _drain(self) -> None:
+        if not self._can_write.is_set():
+            await self._can_write.wait()
+
+    # -- connection management ------------------------------------------------------------
+
+    def _pause_reading(self) -> None:
+        if not self._reading_paused and self.transport is not None:
+            self._reading_paused = True
+            self.transport.pause_reading()
+
+    def _resume_reading(self) -> None:
+        if self._reading_paused and self.transport is not None and not self._closed:
+            self._reading_paused = False
+            self.transport.resume_reading()
+
+    def _arm_timer(self) -> None:
+        self._cancel_timer()
+        if self._loop is not None and not self._closed:
+            self._timer = self._loop.call_later(
+                self.limits.request_timeout, self._on_timeout
+            )
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _on_timeout(self) -> None:
+        self._timer = None
+        if self._closed or self._worker is not None:
+            return
+        if self._buf or self._state != _HEAD:
+            # A request was started but not completed in time.
+            self._state = _DEAD
+            self._buf.clear()
+            self._enqueue(HttpError(408, "request_timeout"))
+            return
+        self._close()
+
+    def _close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._cancel_timer()
+        if self.transport is not None:
+            self.transport.close()
+
+
+def protocol_factory(
+    handler: Handler, limits: HttpLimits
+) -> Callable[[], HttpProtocol]:
+    return lambda: HttpProtocol(handler, limits)
@@ -0,0 +1,461 @@
+"""Idempotency registry: leases with fencing tokens that keep one execution per op_id.
+
+The executor claims a lease on an op_id before running it. While the lease is
+held (and renewed), other executions of the same op_id - in another thread,
+process or node sharing the registry - wait for it and return its result
+instead of building again. Every claim gets the next fencing token for the
+op_id, and only the current token may renew or finish the lease, so a holder
+that stalled past its lease cannot overwrite the result of its successor.
+
+Backends:
+- `SQLiteRegistry`: a table in a local SQLite file (by default the operation
+  store, so the registry spans every process on the host).
+- `SharedSQLiteRegistry`: the same table in a file on a shared filesystem,
+  with each transaction additionally serialized by an fcntl lock file.
+- `HttpRegistry`: a lease service over HTTP; `wbabd serve` provides one at
+  `/leases/<op_id>` backed by its local registry.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+# Lease states. Only `running` blocks new claims; `failed` may be retried.
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class RegistryUnavailable(Exception):
+    """Raised when the registry cannot be reached; the run is refused rather than duplicated."""
+
+
+class Lease:
+    """One op_id's registry record: the current holder, its fencing token and outcome."""
+
+    def __init__(
+        self,
+        op_id: str,
+        holder: str,
+        token: int,
+        state: str,
+        expires_at: float,
+        result: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.op_id = op_id
+        self.holder = holder
+        self.token = token
+        self.state = state
+        self.expires_at = expires_at
+        self.result = result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "op_id": self.op_id,
+            "holder": self.holder,
+            "token": self.token,
+            "state": self.state,
+            "expires_at": self.expires_at,
+            "result": self.result,
+        }
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any]) -> Lease:
+        return cls(
+            str(raw["op_id"]),
+            str(raw["holder"]),
+            int(raw["token"]),
+            str(raw["state"]),
+            float(raw["expires_at"]),
+            raw.get("result"),
+        )
+
+
+class IdempotencyRegistry(ABC):
+    """Interface shared by the registry backends."""
+
+    @abstractmethod
+    def acquire(
+        self,
+        op_id: str,
+        holder: str,
+        ttl: float,
+        *,
+        rerun: bool = False,
+        joined_token: Optional[int] = None,
+    ) -> Tuple[bool, Lease]:
+        """Claims op_id for `holder`; returns (acquired, lease).
+
+        The claim fails while another holder's lease is running and unexpired,
+        when the op_id already succeeded (unless `rerun`), and when the
+        execution with `joined_token` has finished - the caller then returns
+        that execution's result instead of starting a new one.
+        """
+
+    @abstractmethod
+    def renew(self, lease: Lease, ttl: float) -> bool:
+        """Extends a running lease; False once its token has been superseded."""
+
+    @abstractmethod
+    def finish(self, lease: Lease, state: str, result: Dict[str, Any]) -> bool:
+        """Records the outcome of a lease; False (nothing written) when it was fenced off."""
+
+    @abstractmethod
+    def abandon(self, op_id: str, holder_prefix: str) -> bool:
+        """Marks a running lease failed if one of `holder_prefix`'s (crashed) executions holds it."""
+
+    @abstractmethod
+    def get(self, op_id: str) -> Optional[Lease]:
+        """Current lease for op_id, or None if it was never claimed."""
+
+
+class SQLiteRegistry(IdempotencyRegistry):
+    """Registry table in a SQLite file; claims run in `BEGIN IMMEDIATE` transactions."""
+
+    def __init__(self, path: Path, clock: Callable[[], float] = time.time) -> None:
+        self.path = path
+        self.clock = clock
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._tx() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS idempotency_leases (
+                    op_id TEXT PRIMARY KEY,
+                    holder TEXT NOT NULL,
+                    token INTEGER NOT NULL,
+                    state TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    result TEXT
+                )"""
+            )
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        yield
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        with self._locked():
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    yield conn
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+
+    @staticmethod
+    def _lease(row: sqlite3.Row) -> Lease:
+        result = json.loads(row["result"]) if row["result"] else None
+        return Lease(
+            row["op_id"],
+            row["holder"],
+            row["token"],
+            row["state"],
+            row["expires_at"],
+            result,
+        )
+
+    def acquire(
+        self,
+        op_id: str,
+        holder: str,
+        ttl: float,
+        *,
+        rerun: bool = False,
+        joined_token: Optional[int] = None,
+    ) -> Tuple[bool, Lease]:
+        now = self.clock()
+        with self._tx() as conn:
+            row = conn.execute(
+                "SELECT * FROM idempotency_leases WHERE op_id = ?", (op_id,)
+            ).fetchone()
+            if row is not None:
+                current = self._lease(row)
+                if current.state == RUNNING and current.expires_at > now:
+                    return False, current
+                if current.state != RUNNING and current.token == joined_token:
+                    return False, current
+                if current.state == SUCCEEDED and not rerun:
+                    return False, current
+            lease = Lease(
+                op_id, holder, (row["token"] if row else 0) + 1, RUNNING, now + ttl
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO idempotency_leases VALUES (?, ?, ?, ?, ?, NULL)",
+                (op_id, holder, lease.token, RUNNING, lease.expires_at),
+            )
+            return True, lease
+
+    def renew(self, lease: Lease, ttl: float) -> bool:
+        expires_at = self.clock() + ttl
+        with self._tx() as conn:
+            cur = conn.execute(
+                "UPDATE idempotency_leases SET expires_at = ? WHERE op_id = ? AND token = ? AND state = ?",
+                (expires_at, lease.op_id, lease.token, RUNNING),
+            )
+        if cur.rowcount:
+            lease.expires_at = expires_at
+        return cur.rowcount == 1
+
+    def finish(self, lease: Lease, state: str, result: Dict[str, Any]) -> bool:
+        with self._tx() as conn:
+            cur = conn.execute(
+                "UPDATE idempotency_leases SET state = ?, result = ?, expires_at = ? WHERE op_id = ? AND token = ?",
+                (state, json.dumps(result), self.clock(), lease.op_id, lease.token),
+            )
+        return cur.rowcount == 1
+
+    def abandon(self, op_id: str, holder_prefix: str) -> bool:
+        result = {
+            "status": FAILED,
+            "op_id": op_id,
+            "result": {"error": "Lease holder crashed", "step": "system_recovery"},
+        }
+        with self._tx() as conn:
+            cur = conn.execute(
+                "UPDATE idempotency_leases SET state = ?, result = ?, expires_at = ? "
+                "WHERE op_id = ? AND state = ? AND substr(holder, 1, ?) = ?",
+                (
+                    FAILED,
+                    json.dumps(result),
+                    self.clock(),
+                    op_id,
+                    RUNNING,
+                    len(holder_prefix),
+                    holder_prefix,
+                ),
+            )
+        return cur.rowcount == 1
+
+    def get(self, op_id: str) -> Optional[Lease]:
+        with self._tx() as conn:
+            row = conn.execute(
+                "SELECT * FROM idempotency_leases WHERE op_id = ?", (op_id,)
+            ).fetchone()
+        return self._lease(row) if row else None
+
+
+class SharedSQLiteRegistry(SQLiteRegistry):
+    """Registry on a shared filesystem (e.g. NFS) used by several hosts.
+
+    SQLite's own locking is unreliable on network filesystems and WAL needs
+    shared memory, so the database stays in rollback-journal mode and every
+    transaction also holds an exclusive fcntl lock on `<path>.lock`. Lease
+    expiry compares wall clocks of different hosts; keep them in sync (NTP)
+    and the lease TTL well above the expected skew.
+    """
+
+    def __init__(self, path: Path, clock: Callable[[], float] = time.time) -> None:
+        self.lock_path = path.with_name(path.name + ".lock")
+        super().__init__(path, clock)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+
+class HttpRegistry(IdempotencyRegistry):
+    """Client for a lease service (`wbabd serve` answers `/leases/<op_id>`)."""
+
+    def __init__(self, url: str, *, token: str = "", principal: str = "") -> None:
+        from core.client import DaemonClient
+
+        self.url = url
+        self._client = DaemonClient(
+            url, token=token, principal=principal, max_attempts=1
+        )
+        # One keep-alive connection shared by the run threads; requests are tiny.
+        self._lock = threading.Lock()
+
+    def _call(self, op_id: str, action: str, **fields: Any) -> Dict[str, Any]:
+        from core.client import DaemonUnavailable
+
+        with self._lock:
+            try:
+                status, _, body = self._client.request(
+                    "POST", f"/leases/{op_id}", {"action": action, **fields}
+                )
+            except DaemonUnavailable as exc:
+                raise RegistryUnavailable(f"{self.url}: {exc}") from exc
+        if status != 200 or not isinstance(body, dict):
+            raise RegistryUnavailable(
+                f"{self.url}: lease {action} answered {status}: {body}"
+            )
+        return body
+
+    def acquire(
+        self,
+        op_id: str,
+        holder: str,
+        ttl: float,
+        *,
+        rerun: bool = False,
+        joined_token: Optional[int] = None,
+    ) -> Tuple[bool, Lease]:
+        body = self._call(
+            op_id,
+            "acquire",
+            holder=holder,
+            ttl=ttl,
+            rerun=rerun,
+            joined_token=joined_token,
+        )
+        return bool(body["acquired"]), Lease.from_dict(body["lease"])
+
+    def renew(self, lease: Lease, ttl: float) -> bool:
+        return bool(self._call(lease.op_id, "renew", token=lease.token, ttl=ttl)["ok"])
+
+    def finish(self, lease: Lease, state: str, result: Dict[str, Any]) -> bool:
+        return bool(
+            self._call(
+                lease.op_id, "finish", token=lease.token, state=state, result=result
+            )["ok"]
+        )
+
+    def abandon(self, op_id: str, holder_prefix: str) -> bool:
+        return bool(self._call(op_id, "abandon", holder_prefix=holder_prefix)["ok"])
+
+    def get(self, op_id: str) -> Optional[Lease]:
+        lease = self._call(op_id, "get").get("lease")
+        return Lease.from_dict(lease) if lease else None
+
+
+def serve_lease_request(
+    registry: IdempotencyRegistry, op_id: str, payload: Dict[str, Any]
+) -> Tuple[int, Dict[str, Any]]:
+    """Answers one `POST /leases/<op_id>` call of `HttpRegistry` from a local registry."""
+    action = payload.get("action")
+    try:
+        if action == "acquire":
+            joined = payload.get("joined_token")
+            acquired, lease = registry.acquire(
+                op_id,
+                str(payload["holder"]),
+                float(payload["ttl"]),
+                rerun=bool(payload.get("rerun")),
+                joined_token=int(joined) if joined is not None else None,
+            )
+            return 200, {"acquired": acquired, "lease": lease.to_dict()}
+        if action in {"renew", "finish"}:
+            lease = Lease(op_id, "", int(payload["token"]), RUNNING, 0.0)
+            if action == "renew":
+                return 200, {"ok": registry.renew(lease, float(payload["ttl"]))}
+            state = str(payload["state"])
+            if state not in {SUCCEEDED, FAILED} or not isinstance(
+                payload.get("result"), dict
+            ):
+                return 400, {"error": "invalid lease outcome"}
+            return 200, {"ok": registry.finish(lease, state, payload["result"])}
+        if action == "abandon":
+            return 200, {"ok": registry.abandon(op_id, str(payload["holder_prefix"]))}
+        if action == "get":
+            current = registry.get(op_id)
+            return 200, {"lease": current.to_dict() if current else None}
+    except (KeyError, TypeError, ValueError) as exc:
+        return 400, {"error": f"invalid lease request: {exc}"}
+    return 400, {"error": f"unsupported lease action: {action}"}
+
+
+class LeaseKeeper:
+    """Renews a lease every ttl/3 in a background thread while an execution runs."""
+
+    def __init__(self, registry: IdempotencyRegistry, lease: Lease, ttl: float) -> None:
+        self.registry = registry
+        self.lease = lease
+        self.ttl = ttl
+        # Set once a renewal finds the token superseded; finish() will then be fenced off.
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._loop, name=f"wbab-lease-{lease.op_id}", daemon=True
+        )
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                if not self.registry.renew(self.lease, self.ttl):
+                    self.lost = True
+                    return
+            except RegistryUnavailable:
+                # Keep trying; the lease only lapses if the registry stays away past the TTL.
+                continue
+
+    def __enter__(self) -> LeaseKeeper:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def lease_secs() -> float:
+    raw = os.environ.get("WBAB_IDEMPOTENCY_LEASE_SECS", "30").strip()
+    try:
+        val = float(raw)
+    except ValueError as exc:
+        raise ValueError(f"invalid WBAB_IDEMPOTENCY_LEASE_SECS: {raw}") from exc
+    if val <= 0:
+        raise ValueError("WBAB_IDEMPOTENCY_LEASE_SECS must be > 0")
+    return val
+
+
+def wait_secs() -> float:
+    raw = os.environ.get("WBAB_IDEMPOTENCY_WAIT_SECS", "3600").strip()
+    try:
+        val = float(raw)
+    except ValueError as exc:
+        raise ValueError(f"invalid WBAB_IDEMPOTENCY_WAIT_SECS: {raw}") from exc
+    if val < 0:
+        raise ValueError("WBAB_IDEMPOTENCY_WAIT_SECS must be >= 0")
+    return val
+
+
+def registry_from_env(store_path: Path) -> IdempotencyRegistry:
+    """Builds the registry named by WBAB_IDEMPOTENCY_REGISTRY.
+
+    `local` (default) keeps leases in the operation store at `store_path`;
+    `sqlite:<path>` uses a shared SQLite file; `http://`, `https://` and
+    `unix://` URLs name a lease service (token from WBAB_IDEMPOTENCY_TOKEN or
+    WBAB_IDEMPOTENCY_TOKEN_FILE, else the daemon client's WBABD_API_TOKEN).
+    """
+    spec = os.environ.get("WBAB_IDEMPOTENCY_REGISTRY", "local").strip() or "local"
+    if spec == "local":
+        return SQLiteRegistry(store_path)
+    if spec.startswith("sqlite:"):
+        path = spec[len("sqlite:") :]
+        if not path:
+            raise ValueError(
+                "invalid WBAB_IDEMPOTENCY_REGISTRY: sqlite: requires a path"
+            )
+        return SharedSQLiteRegistry(Path(path))
+    if spec.startswith(("http://", "https://", "unix://")):
+        from core.client import principal_from_env, token_from_env
+
+        token = os.environ.get("WBAB_IDEMPOTENCY_TOKEN", "")
+        token_file = os.environ.get("WBAB_IDEMPOTENCY_TOKEN_FILE", "").strip()
+        if not token and token_file:
+            token = Path(token_file).read_text(encoding="utf-8").strip()
+        return HttpRegistry(
+            spec, token=token or token_from_env(), principal=principal_from_env()
+        )
+    raise ValueError(f"invalid WBAB_IDEMPOTENCY_REGISTRY: {spec}")
@@ -0,0 +1,357 @@
+"""Open-loop HTTP load against a running `wbabd serve` (`tools/wbabd-loadgen`).
+
+Arrivals are scheduled at `rate` per second (evenly spaced, or exponential
+gaps with `arrival="poisson"`) whether or not the daemon keeps up. Latency is
+measured from each request's scheduled start, so time spent queued behind a
+slow daemon is counted instead of hidden (no coordinated omission). Requests
+are sent over `connections` keep-alive `DaemonClient` connections; when all of
+them are busy, new arrivals wait in the queue and `max_queue_lag_ms` grows.
+
+Request kinds, weighted by `mix`:
+- `health`: GET /health
+- `status`: GET /status/{op_id} of a seeded operation
+- `plan`: POST /plan with a fresh op_id
+- `run`: POST /run with a fresh op_id (point it at a daemon running
+  WBAB_MOCK_EXECUTOR=1 unless real builds are intended). `{conn}` in
+  `run_args` is replaced by the connection index, giving each connection its
+  own workspace; runs sharing one fail fast on the workspace lock.
+- `run_cached`: POST /run of a seeded op_id, answered from the stored result
+
+Seeded operations are `run_verb` runs submitted once before the measurement.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import queue
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.client import DaemonClient, DaemonUnavailable
+
+KINDS = ("health", "status", "plan", "run", "run_cached")
+# Upper bounds of the report histogram, in milliseconds (+Inf is implied).
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+DEFAULT_RUN_ARGS = ("agent-sandbox/loadgen/{conn}",)
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """`health=1,status=4,run=1` -> weights; unknown kinds and non-positive totals raise ValueError."""
+    weights: Dict[str, float] = {}
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, raw = part.partition("=")
+        name = name.strip()
+        if name not in KINDS:
+            raise ValueError(
+                f"unknown request kind in mix: {name} (choose from {', '.join(KINDS)})"
+            )
+        try:
+            weight = float(raw) if raw.strip() else 1.0
+        except ValueError as exc:
+            raise ValueError(f"invalid weight for {name}: {raw}") from exc
+        if weight < 0 or not math.isfinite(weight):
+            raise ValueError(f"invalid weight for {name}: {raw}")
+        weights[name] = weights.get(name, 0.0) + weight
+    if sum(weights.values()) <= 0:
+        raise ValueError("mix must give at least one request kind a positive weight")
+    return {k: w for k, w in weights.items() if w > 0}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of `values`; 0.0 when empty."""
+    if not values:
+        return 0.0
+    ranked = sorted(values)
+    return ranked[max(0, min(len(ranked), math.ceil(pct / 100.0 * len(ranked))) - 1)]
+
+
+class LatencyRecorder:
+    """Latencies (ms) and status codes of one request kind; code 0 is a transport error."""
+
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.codes: Counter[int] = Counter()
+        self.sample_error = ""
+
+    def add(self, latency_ms: float, code: int) -> None:
+        self.latencies.append(latency_ms)
+        self.codes[code] += 1
+
+    def merge(self, other: "LatencyRecorder") -> None:
+        self.latencies += other.latencies
+        self.codes.update(other.codes)
+        self.sample_error = self.sample_error or other.sample_error
+
+    def summary(self, elapsed_secs: float) -> Dict[str, Any]:
+        values = self.latencies
+        buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        for v in values:
+            for i, bound in enumerate(LATENCY_BUCKETS_MS):
+                if v <= bound:
+                    buckets[i] += 1
+                    break
+            else:
+                buckets[-1] += 1
+        bounds: List[Any] = list(LATENCY_BUCKETS_MS) + ["+Inf"]
+        summary = {
+            "count": len(values),
+            "errors": sum(
+                n for code, n in self.codes.items() if code == 0 or code >= 400
+            ),
+            "codes": {str(code): n for code, n in sorted(self.codes.items())},
+            "throughput_rps": round(len(values) / elapsed_secs, 3)
+            if elapsed_secs > 0
+            else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(values, 50), 3),
+                "p95": round(percentile(values, 95), 3),
+                "p99": round(percentile(values, 99), 3),
+                "max": round(max(values), 3) if values else 0.0,
+                "mean": round(sum(values) / len(values), 3) if values else 0.0,
+            },
+            "histogram": [{"le_ms": b, "count": n} for b, n in zip(bounds, buckets)],
+        }
+        if self.sample_error:
+            summary["sample_error"] = self.sample_error
+        return summary
+
+
+@dataclass
+class LoadConfig:
+    url: str
+    rate: float = 50.0
+    duration_secs: float = 10.0
+    connections: int = 8
+    mix: Dict[str, float] = field(
+        default_factory=lambda: {"health": 1.0, "status": 4.0, "plan": 1.0, "run": 1.0}
+    )
+    arrival: str = "constant"
+    run_verb: str = "lint"
+    run_args: List[str] = field(default_factory=lambda: list(DEFAULT_RUN_ARGS))
+    seed_ops: int = 4
+    token: str = ""
+    principal: str = ""
+    timeout_secs: float = 30.0
+    drain_secs: float = 30.0
+    seed: Optional[int] = None
+
+
+class LoadGenerator:
+    def __init__(self, config: LoadConfig) -> None:
+        if config.rate <= 0 or config.duration_secs <= 0 or config.connections < 1:
+            raise ValueError("rate and duration must be > 0 and connections >= 1")
+        if config.arrival not in ("constant", "poisson"):
+            raise ValueError(f"arrival must be constant or poisson: {config.arrival}")
+        self.config = config
+        self.run_id = uuid.uuid4().hex[:8]
+        self.seeded: List[str] = []
+        self._random = random.Random(config.seed)
+        self._queue: "queue.Queue[Optional[Tuple[float, str]]]" = queue.Queue()
+        # One recorder map and queue-lag list per connection thread, merged in the report.
+        self._recorders: List[Dict[str, LatencyRecorder]] = []
+        self._lags: List[List[float]] = []
+        self._counter = 0
+        self._counter_lock = threading.Lock()
+
+    def _client(self) -> DaemonClient:
+        # One attempt per request: retries after 429/503 would hide the rejections being measured.
+        return DaemonClient(
+            self.config.url,
+            token=self.config.token,
+            principal=self.config.principal,
+            connect_timeout=self.config.timeout_secs,
+            timeout=self.config.timeout_secs,
+            max_attempts=1,
+        )
+
+    def _op_id(self, prefix: str) -> str:
+        with self._counter_lock:
+            self._counter += 1
+            return f"loadgen-{self.run_id}-{prefix}-{self._counter}"
+
+    def _payload(self, op_id: str, conn: str) -> Dict[str, Any]:
+        args = [arg.replace("{conn}", conn) for arg in self.config.run_args]
+        return {"op_id": op_id, "verb": self.config.run_verb, "args": args}
+
+    def seed(self) -> None:
+        """Submits the operations `status` and `run_cached` refer to; raises RuntimeError if one fails."""
+        if not {"status", "run_cached"} & set(self.config.mix):
+            return
+        with self._client() as client:
+            for _ in range(max(1, self.config.seed_ops)):
+                op_id = self._op_id("seed")
+                code, _, body = client.request(
+                    "POST", "/run", self._payload(op_id, "seed")
+                )
+                if code != 200:
+                    raise RuntimeError(
+                        f"seeding {op_id} failed: HTTP {code} {json.dumps(body)[:200]}"
+                    )
+                self.seeded.append(op_id)
+
+    def _request(
+        self, kind: str, conn: str
+    ) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+        if kind == "health":
+            return "GET", "/health", None
+        if kind == "status":
+            return "GET", f"/status/{self._random.choice(self.seeded)}", None
+        if kind == "plan":
+            return "POST", "/plan", self._payload(self._op_id("plan"), conn)
+        if kind == "run":
+            return "POST", "/run", self._payload(self._op_id("run"), conn)
+        # Same verb and args as the seeded run, so the daemon answers from its stored result.
+        return "POST", "/run", self._payload(self._random.choice(self.seeded), "seed")
+
+    def _worker(
+        self, conn: int, recorders: Dict[str, LatencyRecorder], lags: List[float]
+    ) -> None:
+        client = self._client()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                scheduled, kind = item
+                lags.append(max(0.0, time.monotonic() - scheduled) * 1000)
+                method, path, payload = self._request(kind, str(conn))
+                try:
+                    code, _, body = client.request(method, path, payload)
+                except (DaemonUnavailable, OSError, EOFError, ValueError) as exc:
+                    code, body = 0, {"error": repr(exc)}
+                    client.close()
+                recorder = recorders.setdefault(kind, LatencyRecorder())
+                recorder.add((time.monotonic() - scheduled) * 1000, code)
+                if (code == 0 or code >= 400) and not recorder.sample_error:
+                    recorder.sample_error = (
+                        f"{method} {path}: {code} {json.dumps(body)[:300]}"
+                    )
+        finally:
+            client.close()
+
+    def run(self) -> Dict[str, Any]:
+        """Seeds, drives the configured load, and returns the report (see `format_text`)."""
+        cfg = self.config
+        self.seed()
+        kinds = list(cfg.mix)
+        weights = [cfg.mix[k] for k in kinds]
+        threads = []
+        for n in range(cfg.connections):
+            recorders: Dict[str, LatencyRecorder] = {}
+            lags: List[float] = []
+            self._recorders.append(recorders)
+            self._lags.append(lags)
+            t = threading.Thread(
+                target=self._worker,
+                args=(n, recorders, lags),
+                name=f"loadgen-{n}",
+                daemon=True,
+            )
+            t.start()
+            threads.append(t)
+
+        started = time.monotonic()
+        deadline = started + cfg.duration_secs
+        next_at = started
+        sent = 0
+        while next_at < deadline:
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            kind = self._random.choices(kinds, weights)[0]
+            self._queue.put((next_at, kind))
+            sent += 1
+            gap = (
+                self._random.expovariate(cfg.rate)
+                if cfg.arrival == "poisson"
+                else 1.0 / cfg.rate
+            )
+            next_at += gap
+        for _ in threads:
+            self._queue.put(None)
+        drain_deadline = time.monotonic() + cfg.drain_secs
+        for t in threads:
+            t.join(max(0.0, drain_deadline - time.monotonic()))
+        elapsed = time.monotonic() - started
+        unfinished = sum(1 for t in threads if t.is_alive())
+        return self._report(sent, elapsed, unfinished)
+
+    def _report(self, sent: int, elapsed: float, unfinished: int) -> Dict[str, Any]:
+        cfg = self.config
+        by_kind: Dict[str, LatencyRecorder] = {}
+        overall = LatencyRecorder()
+        for recorders in self._recorders:
+            for kind, rec in list(recorders.items()):
+                by_kind.setdefault(kind, LatencyRecorder()).merge(rec)
+                overall.merge(rec)
+        lags = [v for part in self._lags for v in part]
+        return {
+            "config": {
+                "url": cfg.url,
+                "rate": cfg.rate,
+                "arrival": cfg.arrival,
+                "duration_secs": cfg.duration_secs,
+                "connections": cfg.connections,
+                "mix": cfg.mix,
+                "run_verb": cfg.run_verb,
+            },
+            "run_id": self.run_id,
+            "elapsed_secs": round(elapsed, 3),
+            "sent": sent,
+            "completed": len(overall.latencies),
+            "unfinished_connections": unfinished,
+            "max_queue_lag_ms": round(max(lags), 3) if lags else 0.0,
+            "overall": overall.summary(elapsed),
+            "kinds": {
+                kind: by_kind[kind].summary(elapsed)
+                for kind in KINDS
+                if kind in by_kind
+            },
+        }
+
+
+def format_text(report: Dict[str, Any]) -> str:
+    """Human-readable report: a row per request kind and the overall latency histogram."""
+    cfg = report["config"]
+    lines = [
+        f"wbabd-loadgen {cfg['url']}: {cfg['rate']:g} req/s {cfg['arrival']} for {cfg['duration_secs']:g}s "
+        f"over {cfg['connections']} connections",
+        f"sent {report['sent']}, completed {report['completed']} in {report['elapsed_secs']:.2f}s; "
+        f"max queue lag {report['max_queue_lag_ms']:.1f} ms",
+        "",
+        f"{'kind':<11} {'count':>7} {'errors':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  codes",
+    ]
+    rows = list(report["kinds"].items()) + [("all", report["overall"])]
+    for kind, s in rows:
+        lat = s["latency_ms"]
+        codes = " ".join(f"{code}:{n}" for code, n in s["codes"].items())
+        lines.append(
+            f"{kind:<11} {s['count']:>7} {s['errors']:>6} {s['throughput_rps']:>8.1f} "
+            f"{lat['p50']:>8.2f} {lat['p95']:>8.2f} {lat['p99']:>8.2f} {lat['max']:>8.2f}  {codes}"
+        )
+    errors = [
+        (kind, s["sample_error"])
+        for kind, s in report["kinds"].items()
+        if s.get("sample_error")
+    ]
+    if errors:
+        lines += ["", "first error per kind:"] + [
+            f"  {kind}: {text}" for kind, text in errors
+        ]
+    lines += ["", "latency histogram (ms, all requests):"]
+    total = max(1, report["overall"]["count"])
+    for bucket in report["overall"]["histogram"]:
+        if not bucket["count"]:
+            continue
+        bar = "#" * max(1, round(40 * bucket["count"] / total))
+        lines.append(f"  <= {str(bucket['le_ms']):>6} {bucket['count']:>7}  {bar}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,356 @@
+"""In-memory Prometheus-style metrics for wbabd (`GET /metrics`).
+
+Collectors are plain counters, histograms and callback gauges held in process
+memory; a scrape renders them in the text exposition format without touching
+the operation store or audit log. Each serving process keeps its own set, so
+with several workers a scrape describes the worker that answered it (`pid` in
+`wbabd_process_info`).
+
+Sources:
+- HTTP requests: the serve loop records every response by route and status.
+- Operations and steps: the executor reports run outcomes (`cached` runs are
+  cache hits), step durations, and time spent waiting for workspace locks and
+  idempotency leases.
+- SQLite: store and audit methods decorated with `sqlite_timed` (also traced).
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from core.tracing import span
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DURATION_BUCKETS = (
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+    600.0,
+    1800.0,
+    3600.0,
+)
+
+# Routes reported as-is; anything else is folded so clients cannot create unbounded series.
+_ROUTES = {
+    "/health",
+    "/load",
+    "/metrics",
+    "/preflight-status",
+    "/preflight-trend",
+    "/events",
+    "/batch",
+    "/plan",
+    "/run",
+    "/profile",
+}
+_ROUTE_PREFIXES = ("/status/", "/leases/", "/trace/")
+# Any token parses as a method, so label only the ones the daemon serves.
+_METHODS = {"GET", "POST", "HEAD"}
+
+T = TypeVar("T")
+Labels = Tuple[str, ...]
+
+
+def route_label(path: str) -> str:
+    if path in _ROUTES:
+        return path
+    for prefix in _ROUTE_PREFIXES:
+        if path.startswith(prefix):
+            return prefix + "{op_id}"
+    return "other"
+
+
+def method_label(method: str) -> str:
+    return method if method in _METHODS else "OTHER"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(
+        self, name: str, help_text: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [
+            f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items
+        ]
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts..., sum, count]
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            row[-2] += value
+            row[-1] += 1
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - started, *labels)
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            row = self._values.get(labels)
+            return int(row[-1]) if row else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, row in items:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets, row):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {_number(cumulative)}"
+                )
+            le = 'le="+Inf"'
+            lines.append(
+                f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {_number(row[-1])}"
+            )
+            lines.append(
+                f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(row[-2])}"
+            )
+            lines.append(
+                f"{self.name}_count{_labels(self.labelnames, labels)} {_number(row[-1])}"
+            )
+        return lines
+
+
+class Gauge:
+    """Read at scrape time from `fn`: a number, or a dict of label tuples to numbers.
+
+    `kind="counter"` exposes a monotonically increasing value kept elsewhere (e.g. admission counters).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        fn: Callable[[], Any],
+        labelnames: Sequence[str] = (),
+        kind: str = "gauge",
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        value = self.fn()
+        items = sorted(value.items()) if isinstance(value, dict) else [((), value)]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [
+            f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items
+        ]
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._collectors: Dict[str, Any] = {}
+
+    def _add(self, collector: T) -> T:
+        self._collectors[collector.name] = collector  # type: ignore[attr-defined]
+        return collector
+
+    def counter(
+        self, name: str, help_text: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self._add(Counter(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(
+        self,
+        name: str,
+        help_text: str,
+        fn: Callable[[], Any],
+        labelnames: Sequence[str] = (),
+        kind: str = "gauge",
+    ) -> Gauge:
+        return self._add(Gauge(name, help_text, fn, labelnames, kind))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for collector in self._collectors.values():
+            lines += collector.render()
+        return "\n".join(lines) + "\n"
+
+
+class DaemonMetrics(MetricsRegistry):
+    """The wbabd collector set; the serve loop adds its own gauges (queue depth, in-flight runs)."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        started = time.time()
+        self.gauge(
+            "wbabd_process_info",
+            "Serving process answering this scrape.",
+            lambda: {(str(os.getpid()),): 1},
+            ("pid",),
+        )
+        self.gauge(
+            "wbabd_process_start_time_seconds",
+            "Start time of the serving process (unix seconds).",
+            lambda: started,
+        )
+        self.http_requests = self.counter(
+            "wbabd_http_requests_total",
+            "HTTP requests answered, by route, method and status code.",
+            ("route", "method", "code"),
+        )
+        self.http_seconds = self.histogram(
+            "wbabd_http_request_duration_seconds",
+            "HTTP request latency until the response is ready.",
+            ("route", "method"),
+        )
+        self.operations = self.counter(
+            "wbabd_operations_total",
+            "Operations finished, by verb and status (succeeded, failed, cached).",
+            ("verb", "status"),
+        )
+        self.operation_seconds = self.histogram(
+            "wbabd_operation_duration_seconds",
+            "Operation duration by verb and status.",
+            ("verb", "status"),
+            DURATION_BUCKETS,
+        )
+        self.step_seconds = self.histogram(
+            "wbabd_step_duration_seconds",
+            "Step duration by verb, step and outcome.",
+            ("verb", "step", "status"),
+            DURATION_BUCKETS,
+        )
+        self.cache = self.counter(
+            "wbabd_cache_requests_total",
+            "Runs answered from a previous result (hit) or executed (miss).",
+            ("verb", "result"),
+        )
+        self.lock_wait_seconds = self.histogram(
+            "wbabd_lock_wait_seconds",
+            "Time spent acquiring workspace locks and idempotency leases.",
+            ("lock",),
+        )
+        self.sqlite_seconds = self.histogram(
+            "wbabd_sqlite_operation_duration_seconds",
+            "SQLite call latency by database and operation.",
+            ("db", "op"),
+        )
+
+    def observe_operation(self, verb: str, status: str, seconds: float) -> None:
+        self.operations.inc(verb, status)
+        self.operation_seconds.observe(seconds, verb, status)
+        self.cache.inc(verb, "hit" if status == "cached" else "miss")
+
+
+def sqlite_timed(db: str, op: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Times a store method into `self.metrics.sqlite_seconds` when metrics are attached.
+
+    Calls made during a traced run also get a `sqlite.<db>.<op>` span.
+    """
+    name = f"sqlite.{db}.{op}"
+
+    def wrap(fn: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(fn)
+        def timed(self: Any, *args: Any, **kwargs: Any) -> T:
+            with span(name):
+                metrics: Optional[DaemonMetrics] = getattr(self, "metrics", None)
+                if metrics is None:
+                    return fn(self, *args, **kwargs)
+                started = time.monotonic()
+                try:
+                    return fn(self, *args, **kwargs)
+                finally:
+                    metrics.sqlite_seconds.observe(time.monotonic() - started, db, op)
+
+        return timed
+
+    return wrap
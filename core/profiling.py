@@ -0,0 +1,286 @@
+"""On-demand profiling of a serving wbabd process (`POST /profile`, `WBABD_PROFILE`).
+
+A session profiles the answering process for a time window and/or its next N
+HTTP requests, then writes its results under the profiles directory
+(default `agent-sandbox/state/profiles/`, next to the operation store):
+
+- `cprofile`: deterministic cProfile of the event loop thread (HTTP parsing,
+  routing, JSON encoding/decoding), dumped as `<stamp>-<pid>-cprofile.pstats`.
+- `sample`: wall-clock stack sampling of every thread (run workers and their
+  SQLite calls included) every `interval_ms`, written as collapsed stacks
+  `<stamp>-<pid>-sample.folded` for flamegraph.pl or speedscope.
+- `tracemalloc` (either mode): allocation snapshot at the end of the session,
+  as `<stamp>-<pid>.tracemalloc` plus a `-tracemalloc.txt` top list.
+
+Nothing is installed while no session is active; the serve loop only checks
+`DaemonProfiler.counting` after each request.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from pathlib import Path
+from types import FrameType
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+MODES = ("cprofile", "sample")
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(
+        ";", ":"
+    )
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, interval_secs: float) -> None:
+        super().__init__(name="wbabd-profile-sampler", daemon=True)
+        self.interval_secs = interval_secs
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval_secs):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, top in sys._current_frames().items():
+                if ident == self.ident:
+                    continue
+                labels: List[str] = []
+                frame: Optional[FrameType] = top
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(
+                    names.get(ident, f"thread-{ident}")
+                    .replace(";", ":")
+                    .replace(" ", "_")
+                )
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def stop(self) -> None:
+        self._done.set()
+        self.join()
+
+
+class ProfileSession:
+    def __init__(
+        self,
+        mode: str,
+        duration_secs: float,
+        requests: int,
+        with_tracemalloc: bool,
+        interval_ms: float,
+    ) -> None:
+        self.mode = mode
+        self.duration_secs = duration_secs
+        self.requests = requests
+        self.tracemalloc = with_tracemalloc
+        self.interval_ms = interval_ms
+        self.started_at = time.time()
+        self.requests_seen = 0
+        self._t0 = time.monotonic()
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[_Sampler] = None
+        self._started_tracemalloc = False
+        self._timer: Any = None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "started_at": int(self.started_at),
+            "elapsed_ms": int((time.monotonic() - self._t0) * 1000),
+            "duration_secs": self.duration_secs,
+            "requests": self.requests,
+            "requests_seen": self.requests_seen,
+            "tracemalloc": self.tracemalloc,
+            "pid": os.getpid(),
+        }
+
+
+class DaemonProfiler:
+    """At most one session per process; finished sessions are listed in `recent`."""
+
+    def __init__(self, out_dir: Path, max_secs: float = 600.0) -> None:
+        self.out_dir = out_dir
+        self.max_secs = max_secs
+        # Schedules the end of a time-boxed session; the serve loop passes loop.call_later so a
+        # cProfile session is disabled on the thread that enabled it.
+        self.call_later: Callable[[float, Callable[[], Any]], Any] | None = None
+        self.active: Optional[ProfileSession] = None
+        self.counting = False
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=20)
+        self._lock = threading.Lock()
+
+    def start(
+        self,
+        mode: str,
+        duration_secs: float = 0.0,
+        requests: int = 0,
+        with_tracemalloc: bool = False,
+        interval_ms: float = 10.0,
+    ) -> Dict[str, Any]:
+        """Starts a session; raises ValueError for bad options and RuntimeError if one is running."""
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if duration_secs < 0 or requests < 0 or not 1 <= interval_ms <= 1000:
+            raise ValueError(
+                "duration_secs and requests must be >= 0, interval_ms between 1 and 1000"
+            )
+        if not duration_secs and not requests:
+            duration_secs = 30.0
+        # A session bounded only by requests still ends after max_secs on an idle daemon.
+        duration_secs = min(duration_secs or self.max_secs, self.max_secs)
+        with self._lock:
+            if self.active is not None:
+                raise RuntimeError("a profiling session is already active")
+            session = ProfileSession(
+                mode, duration_secs, requests, with_tracemalloc, interval_ms
+            )
+            self.active = session
+        if with_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            session._started_tracemalloc = True
+        if mode == "cprofile":
+            session._profile = cProfile.Profile()
+            session._profile.enable()
+        else:
+            session._sampler = _Sampler(interval_ms / 1000.0)
+            session._sampler.start()
+        self.counting = requests > 0
+        if self.call_later is not None:
+            session._timer = self.call_later(
+                duration_secs, lambda: self.stop("duration")
+            )
+        else:
+            session._timer = threading.Timer(
+                duration_secs, lambda: self.stop("duration")
+            )
+            session._timer.daemon = True
+            session._timer.start()
+        return session.describe()
+
+    def request_done(self) -> None:
+        session = self.active
+        if session is None:
+            return
+        session.requests_seen += 1
+        if session.requests and session.requests_seen >= session.requests:
+            self.stop("requests")
+
+    def stop(self, reason: str = "stopped") -> Optional[Dict[str, Any]]:
+        """Ends the active session and writes its files; None when nothing was running."""
+        with self._lock:
+            session = self.active
+            if session is None:
+                return None
+            self.counting = False
+            try:
+                result = self._finish(session, reason)
+            finally:
+                self.active = None
+            self.recent.appendleft(result)
+            return result
+
+    def _finish(self, session: ProfileSession, reason: str) -> Dict[str, Any]:
+        if session._timer is not None:
+            session._timer.cancel()
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        started = time.gmtime(session.started_at)
+        millis = int(session.started_at * 1000) % 1000
+        stem = (
+            self.out_dir
+            / f"{time.strftime('%Y%m%dT%H%M%S', started)}.{millis:03d}-{os.getpid()}"
+        )
+        result = session.describe()
+        result.update(reason=reason, files=[])
+        if session._profile is not None:
+            session._profile.disable()
+            path = stem.with_name(stem.name + "-cprofile.pstats")
+            session._profile.dump_stats(str(path))
+            result["files"].append(str(path))
+            result["top"] = _top_functions(session._profile)
+        if session._sampler is not None:
+            session._sampler.stop()
+            path = stem.with_name(stem.name + "-sample.folded")
+            ranked = session._sampler.stacks.most_common()
+            path.write_text(
+                "".join(f"{stack} {n}\n" for stack, n in ranked), encoding="utf-8"
+            )
+            result["files"].append(str(path))
+            result["samples"] = session._sampler.samples
+            result["top"] = [
+                f"{stack.rsplit(';', 1)[-1]} {n}" for stack, n in ranked[:10]
+            ]
+        if session.tracemalloc and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            if session._started_tracemalloc:
+                tracemalloc.stop()
+            path = stem.with_name(stem.name + ".tracemalloc")
+            snapshot.dump(str(path))
+            text = stem.with_name(stem.name + "-tracemalloc.txt")
+            text.write_text(
+                "".join(f"{stat}\n" for stat in snapshot.statistics("lineno")[:50]),
+                encoding="utf-8",
+            )
+            result["files"] += [str(path), str(text)]
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        session = self.active
+        return {
+            "active": session.describe() if session else None,
+            "dir": str(self.out_dir),
+            "recent": list(self.recent),
+        }
+
+
+def _top_functions(profile: cProfile.Profile, limit: int = 10) -> List[str]:
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    ranked = sorted(stats.stats.items(), key=lambda kv: kv[1][2], reverse=True)[:limit]  # type: ignore[attr-defined]
+    return [
+        f"{os.path.basename(f)}:{line}({fn}) tottime={row[2]:.4f}s calls={row[1]}"
+        for (f, line, fn), row in ranked
+    ]
+
+
+def profiler_from_env(store_path: Path) -> DaemonProfiler:
+    """Profiles directory from WBABD_PROFILE_DIR (default `profiles/` next to the store)."""
+    raw_dir = os.environ.get("WBABD_PROFILE_DIR")
+    out_dir = Path(raw_dir) if raw_dir else store_path.parent / "profiles"
+    try:
+        max_secs = float(os.environ.get("WBABD_PROFILE_MAX_SECS", "600"))
+    except ValueError as exc:
+        raise ValueError(f"invalid WBABD_PROFILE_MAX_SECS: {exc}") from exc
+    if max_secs <= 0:
+        raise ValueError("WBABD_PROFILE_MAX_SECS must be > 0")
+    return DaemonProfiler(out_dir, max_secs)
+
+
+def startup_session_from_env() -> Optional[Dict[str, Any]]:
+    """`start()` options for a session beginning with the serve loop (WBABD_PROFILE=cprofile|sample)."""
+    mode = os.environ.get("WBABD_PROFILE", "off").strip() or "off"
+    if mode == "off":
+        return None
+    if mode not in MODES:
+        raise ValueError(f"WBABD_PROFILE must be off, cprofile or sample: {mode}")
+    try:
+        return {
+            "mode": mode,
+            "duration_secs": float(os.environ.get("WBABD_PROFILE_SECS", "0")),
+            "requests": int(os.environ.get("WBABD_PROFILE_REQUESTS", "0")),
+            "with_tracemalloc": os.environ.get("WBABD_PROFILE_TRACEMALLOC", "0") == "1",
+            "interval_ms": float(os.environ.get("WBABD_PROFILE_INTERVAL_MS", "10")),
+        }
+    except ValueError as exc:
+        raise ValueError(f"invalid WBABD_PROFILE_* setting: {exc}") from exc
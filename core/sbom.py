@@ -0,0 +1,430 @@
+"""Per-operation CycloneDX SBOMs for build outputs, with a content-addressed analysis cache.
+
+After a successful build the executor writes `out/sbom.cdx.json`, describing
+the build outputs in `out/` and the third-party inputs they were built from:
+
+- dependency manifests: `vcpkg.json`, `conanfile.txt`
+- CMake lockfiles: CPM `package-lock.cmake` (project root or `cmake/`)
+- vendored trees: each directory under `third_party/`, `3rdparty/`, `vendor/`
+  and `external/`
+
+Each input is analyzed into components once per content hash; the result is
+kept in the `sbom_component_cache` table (by default in the operation store),
+so a build only re-analyzes the inputs that changed. Vendored trees are first
+matched by a stat fingerprint (paths, sizes, mtimes) so that an unchanged
+tree is not re-read on every build.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+SBOM_NAME = "sbom.cdx.json"
+MANIFESTS = (
+    "vcpkg.json",
+    "conanfile.txt",
+    "package-lock.cmake",
+    "cmake/package-lock.cmake",
+)
+VENDOR_DIRS = ("third_party", "3rdparty", "vendor", "external")
+# Cache rows unused for this long are dropped.
+CACHE_MAX_AGE_SECS = 30 * 86400
+
+_LICENSE_MARKERS = (
+    ("Apache License", "Apache-2.0"),
+    ("MIT License", "MIT"),
+    ("Permission is hereby granted, free of charge", "MIT"),
+    ("Boost Software License", "BSL-1.0"),
+    ("GNU LESSER GENERAL PUBLIC LICENSE", "LGPL"),
+    ("GNU GENERAL PUBLIC LICENSE", "GPL"),
+    ("Mozilla Public License", "MPL-2.0"),
+    ("zlib License", "Zlib"),
+    ("Redistribution and use in source and binary forms", "BSD"),
+)
+# Markers above that name an exact SPDX identifier; the others are license families.
+_SPDX_IDS = {"Apache-2.0", "MIT", "BSL-1.0", "MPL-2.0", "Zlib"}
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _walk_files(root: Path) -> Iterator[Path]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d != ".git")
+        for name in sorted(filenames):
+            yield Path(dirpath) / name
+
+
+def _component(
+    kind: str, name: str, version: str = "", purl: str = "", **extra: Any
+) -> Dict[str, Any]:
+    comp: Dict[str, Any] = {"type": "library", "name": name}
+    if version:
+        comp["version"] = version
+    if not purl and version:
+        purl = f"pkg:generic/{name}@{version}"
+    if purl:
+        comp["purl"] = purl
+    comp["bom-ref"] = purl or f"{kind}:{name}"
+    comp.update(extra)
+    comp["properties"] = [{"name": "wbab:source", "value": kind}]
+    return comp
+
+
+def analyze_vcpkg(text: str) -> List[Dict[str, Any]]:
+    data = json.loads(text)
+    overrides = {
+        o.get("name"): o.get("version", "")
+        for o in data.get("overrides", [])
+        if isinstance(o, dict)
+    }
+    comps = []
+    for dep in data.get("dependencies", []):
+        if isinstance(dep, str):
+            name, version = dep, ""
+        elif isinstance(dep, dict) and dep.get("name"):
+            name, version = dep["name"], dep.get("version>=", "")
+        else:
+            continue
+        comps.append(_component("vcpkg.json", name, overrides.get(name) or version))
+    return comps
+
+
+def analyze_conanfile(text: str) -> List[Dict[str, Any]]:
+    comps = []
+    section = ""
+    for raw in text.splitlines():
+        line = raw.split("#", 1)[0].strip()
+        if line.startswith("[") and line.endswith("]"):
+            section = line[1:-1]
+        elif line and section in {"requires", "tool_requires", "build_requires"}:
+            ref = line.split("@", 1)[0]
+            name, _, version = ref.partition("/")
+            comps.append(
+                _component(
+                    "conanfile.txt",
+                    name,
+                    version,
+                    f"pkg:conan/{name}@{version}" if version else "",
+                )
+            )
+    return comps
+
+
+def analyze_cpm_lock(text: str) -> List[Dict[str, Any]]:
+    comps = []
+    for match in re.finditer(
+        r"CPMDeclarePackage\(\s*([^\s)]+)(.*?)\)", text, re.DOTALL
+    ):
+        fields = dict(
+            re.findall(
+                r"\b(NAME|VERSION|GIT_TAG|GITHUB_REPOSITORY|GIT_REPOSITORY|URL)\s+\"?([^\s\")]+)",
+                match.group(2),
+            )
+        )
+        name = fields.get("NAME", match.group(1))
+        version = fields.get("VERSION") or fields.get("GIT_TAG", "")
+        purl = ""
+        if fields.get("GITHUB_REPOSITORY") and version:
+            purl = f"pkg:github/{fields['GITHUB_REPOSITORY'].lower()}@{version}"
+        source = fields.get("GIT_REPOSITORY") or fields.get("URL") or ""
+        extra = (
+            {"externalReferences": [{"type": "vcs", "url": source}]} if source else {}
+        )
+        comps.append(_component("package-lock.cmake", name, version, purl, **extra))
+    return comps
+
+
+def analyze_vendored(tree: Path) -> List[Dict[str, Any]]:
+    version = ""
+    version_file = tree / "VERSION"
+    if version_file.is_file():
+        words = version_file.read_text(errors="replace").split()
+        version = words[0] if words else ""
+    cmake = tree / "CMakeLists.txt"
+    if not version and cmake.is_file():
+        m = re.search(
+            r"project\s*\([^)]*\bVERSION\s+([0-9][\w.\-]*)",
+            cmake.read_text(errors="replace"),
+            re.IGNORECASE,
+        )
+        version = m.group(1) if m else ""
+    extra: Dict[str, Any] = {}
+    for lic in sorted(tree.glob("LICENSE*")) + sorted(tree.glob("COPYING*")):
+        if not lic.is_file():
+            continue
+        head = lic.read_text(errors="replace")[:4096]
+        spdx = next(
+            (
+                ident
+                for marker, ident in _LICENSE_MARKERS
+                if marker.lower() in head.lower()
+            ),
+            "",
+        )
+        if spdx:
+            extra["licenses"] = [
+                {"license": {"id" if spdx in _SPDX_IDS else "name": spdx}}
+            ]
+        break
+    return [_component("vendored", tree.name, version, **extra)]
+
+
+_ANALYZERS = {
+    "vcpkg.json": analyze_vcpkg,
+    "conanfile.txt": analyze_conanfile,
+    "package-lock.cmake": analyze_cpm_lock,
+}
+
+
+class SbomCache:
+    """Component analyses keyed by input content hash, plus stat fingerprints of vendored trees."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sbom_component_cache (
+                    digest TEXT PRIMARY KEY,
+                    components TEXT NOT NULL,
+                    used_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sbom_tree_fingerprints (
+                    fingerprint TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL,
+                    used_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30.0)
+
+    def get(self, digest: str) -> Optional[List[Dict[str, Any]]]:
+        with self._conn() as conn:
+            row = conn.execute(
+                "SELECT components FROM sbom_component_cache WHERE digest = ?",
+                (digest,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE sbom_component_cache SET used_at = ? WHERE digest = ?",
+                (time.time(), digest),
+            )
+        return json.loads(row[0])
+
+    def put(self, digest: str, components: List[Dict[str, Any]]) -> None:
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sbom_component_cache (digest, components, used_at) VALUES (?, ?, ?)",
+                (digest, json.dumps(components), now),
+            )
+            conn.execute(
+                "DELETE FROM sbom_component_cache WHERE used_at < ?",
+                (now - CACHE_MAX_AGE_SECS,),
+            )
+            conn.execute(
+                "DELETE FROM sbom_tree_fingerprints WHERE used_at < ?",
+                (now - CACHE_MAX_AGE_SECS,),
+            )
+
+    def tree_digest(self, fingerprint: str) -> Optional[str]:
+        with self._conn() as conn:
+            row = conn.execute(
+                "SELECT digest FROM sbom_tree_fingerprints WHERE fingerprint = ?",
+                (fingerprint,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE sbom_tree_fingerprints SET used_at = ? WHERE fingerprint = ?",
+                (time.time(), fingerprint),
+            )
+        return row[0]
+
+    def put_tree_digest(self, fingerprint: str, digest: str) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sbom_tree_fingerprints (fingerprint, digest, used_at) VALUES (?, ?, ?)",
+                (fingerprint, digest, time.time()),
+            )
+
+
+class SbomGenerator:
+    """Writes `out/sbom.cdx.json` for a build, re-analyzing only inputs whose content changed.
+
+    With `strict`, a failed SBOM fails the build; otherwise the build succeeds
+    and the failure is recorded in its `sbom` summary.
+    """
+
+    def __init__(self, cache: SbomCache, strict: bool = False) -> None:
+        self.cache = cache
+        self.strict = strict
+
+    def _inputs(self, project_dir: Path) -> Iterator[Tuple[str, Path]]:
+        for rel in MANIFESTS:
+            path = project_dir / rel
+            if path.is_file():
+                yield path.name, path
+        for vendor in VENDOR_DIRS:
+            base = project_dir / vendor
+            if base.is_dir():
+                for tree in sorted(
+                    p
+                    for p in base.iterdir()
+                    if p.is_dir() and not p.name.startswith(".")
+                ):
+                    yield "vendored", tree
+
+    def _tree_digest(self, tree: Path) -> str:
+        files = list(_walk_files(tree))
+        stat_h = hashlib.sha256(f"{tree.resolve()}\n".encode())
+        for f in files:
+            st = f.stat()
+            stat_h.update(
+                f"{f.relative_to(tree)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode()
+            )
+        fingerprint = stat_h.hexdigest()
+        digest = self.cache.tree_digest(fingerprint)
+        if digest is None:
+            content_h = hashlib.sha256(b"vendored\0")
+            for f in files:
+                content_h.update(f"{f.relative_to(tree)}\0{_sha256_file(f)}\n".encode())
+            digest = content_h.hexdigest()
+            self.cache.put_tree_digest(fingerprint, digest)
+        return digest
+
+    def _analyze(self, kind: str, path: Path) -> Tuple[List[Dict[str, Any]], bool]:
+        """Returns (components, served_from_cache) for one input."""
+        if kind == "vendored":
+            digest = self._tree_digest(path)
+        else:
+            digest = hashlib.sha256(
+                kind.encode() + b"\0" + path.read_bytes()
+            ).hexdigest()
+        cached = self.cache.get(digest)
+        if cached is not None:
+            return cached, True
+        try:
+            if kind == "vendored":
+                comps = analyze_vendored(path)
+                comps[0]["hashes"] = [{"alg": "SHA-256", "content": digest}]
+            else:
+                comps = _ANALYZERS[kind](path.read_text(errors="replace"))
+        except (ValueError, OSError) as exc:
+            # A malformed manifest is reported in the SBOM rather than failing the build.
+            comps = [_component(kind, path.name, description=f"analysis failed: {exc}")]
+        self.cache.put(digest, comps)
+        return comps, False
+
+    def generate(self, project_dir: Path, op_id: str) -> Dict[str, Any]:
+        """Writes the SBOM for `project_dir`'s build outputs and returns a summary for the op result."""
+        started = time.monotonic()
+        out_dir = project_dir / "out"
+        if not out_dir.is_dir():
+            return {"skipped": "no out/ directory"}
+
+        components: List[Dict[str, Any]] = []
+        seen = set()
+        inputs = analyzed = 0
+        for kind, path in self._inputs(project_dir):
+            comps, from_cache = self._analyze(kind, path)
+            inputs += 1
+            analyzed += 0 if from_cache else 1
+            for comp in comps:
+                if comp["bom-ref"] not in seen:
+                    seen.add(comp["bom-ref"])
+                    components.append(comp)
+        libraries = [c["bom-ref"] for c in components]
+
+        sbom_path = out_dir / SBOM_NAME
+        for f in _walk_files(out_dir):
+            if f == sbom_path or f.name.startswith(f".{SBOM_NAME}"):
+                continue
+            rel = f.relative_to(out_dir).as_posix()
+            components.append(
+                {
+                    "type": "file",
+                    "bom-ref": f"file:out/{rel}",
+                    "name": f"out/{rel}",
+                    "hashes": [{"alg": "SHA-256", "content": _sha256_file(f)}],
+                }
+            )
+
+        name, version = project_dir.name, ""
+        vcpkg = project_dir / "vcpkg.json"
+        if vcpkg.is_file():
+            try:
+                meta = json.loads(vcpkg.read_text())
+                name, version = (
+                    meta.get("name") or name,
+                    meta.get("version") or meta.get("version-string") or "",
+                )
+            except ValueError:
+                pass
+        root: Dict[str, Any] = {
+            "type": "application",
+            "bom-ref": f"project:{name}",
+            "name": name,
+        }
+        if version:
+            root["version"] = version
+        doc = {
+            "$schema": "http://cyclonedx.org/schema/bom-1.6.schema.json",
+            "bomFormat": "CycloneDX",
+            "specVersion": "1.6",
+            "serialNumber": f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, f'wbab:op:{op_id}')}",
+            "version": 1,
+            "metadata": {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "tools": {"components": [{"type": "application", "name": "wbabd"}]},
+                "component": root,
+                "properties": [{"name": "wbab:op_id", "value": op_id}],
+            },
+            "components": components,
+            "dependencies": [{"ref": root["bom-ref"], "dependsOn": libraries}],
+        }
+        tmp = out_dir / f".{SBOM_NAME}.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps(doc, indent=2) + "\n")
+        os.replace(tmp, sbom_path)
+        return {
+            "path": str(sbom_path),
+            "components": len(components),
+            "inputs": inputs,
+            "analyzed": analyzed,
+            "cached": inputs - analyzed,
+            "duration_ms": int((time.monotonic() - started) * 1000),
+        }
+
+
+def sbom_from_env(store_path: Path) -> Optional[SbomGenerator]:
+    """Builds the SBOM stage from WBAB_SBOM_DISABLE / WBAB_SBOM_STRICT / WBAB_SBOM_CACHE_PATH (default: the operation store)."""
+    if os.environ.get("WBAB_SBOM_DISABLE", "0") == "1":
+        return None
+    cache_path = os.environ.get("WBAB_SBOM_CACHE_PATH")
+    strict = os.environ.get("WBAB_SBOM_STRICT", "0") == "1"
+    return SbomGenerator(
+        SbomCache(Path(cache_path) if cache_path else store_path), strict=strict
+    )
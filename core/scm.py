@@ -1,12 +1,17 @@
 import shutil
 import subprocess
 import tempfile
+import threading
+import time
 import os
+from concurrent.futures import Future, ThreadPoolExecutor
 from urllib.parse import urlparse, urlunparse
 from pathlib import Path
-from typing import Optional, Generator
+from typing import Dict, Optional, Generator, Tuple
 from contextlib import contextmanager
 
+from core import tracing
+
 
 def sanitize_git_url(url: str) -> str:
     """Redacts credentials from a git URL."""
@@ -35,6 +40,18 @@ class GitSourceManager:
         Clones a git repository to a directory under agent-sandbox/ and checks out the specified ref.
         Yields the path to the directory and ensures cleanup on exit.
         """
+        with tracing.span("git.fetch", url=sanitize_git_url(url), ref=ref):
+            temp_dir = self.fetch(url, ref)
+        try:
+            yield temp_dir
+        finally:
+            self.cleanup(temp_dir)
+
+    def fetch(self, url: str, ref: str) -> Path:
+        """
+        Clones a git repository to a fresh directory under agent-sandbox/ and checks out the ref.
+        Returns the directory; the caller owns it and must release it with cleanup().
+        """
         timeout = int(os.environ.get("WBAB_GIT_TIMEOUT_SECS", "300"))
 
         # Security: Whitelist check
@@ -57,53 +74,163 @@ class GitSourceManager:
 
         try:
             # Clone the repository
-            subprocess.run(
-                ["git", "clone", "--quiet", "--", url, str(temp_dir)],
-                check=True,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-            )
-
-            # Checkout the specific ref
-            if ref:
-                if ref.startswith("-"):
-                    raise ValueError(f"Invalid ref: {ref}")
+            with tracing.span("git.clone"):
                 subprocess.run(
-                    ["git", "checkout", "--quiet", ref],
-                    cwd=temp_dir,
+                    ["git", "clone", "--quiet", "--", url, str(temp_dir)],
                     check=True,
                     capture_output=True,
                     text=True,
                     timeout=timeout,
                 )
 
+            # Checkout the specific ref
+            if ref:
+                if ref.startswith("-"):
+                    raise ValueError(f"Invalid ref: {ref}")
+                with tracing.span("git.checkout"):
+                    subprocess.run(
+                        ["git", "checkout", "--quiet", ref],
+                        cwd=temp_dir,
+                        check=True,
+                        capture_output=True,
+                        text=True,
+                        timeout=timeout,
+                    )
+
             # Update submodules unless explicitly disabled
             recursive = os.environ.get("WBAB_GIT_CLONE_RECURSIVE", "1")
             if recursive != "0":
-                subprocess.run(
-                    ["git", "submodule", "update", "--init", "--recursive", "--quiet"],
-                    cwd=temp_dir,
-                    check=True,
-                    capture_output=True,
-                    text=True,
-                    timeout=timeout,
-                )
+                with tracing.span("git.submodules"):
+                    subprocess.run(
+                        [
+                            "git",
+                            "submodule",
+                            "update",
+                            "--init",
+                            "--recursive",
+                            "--quiet",
+                        ],
+                        cwd=temp_dir,
+                        check=True,
+                        capture_output=True,
+                        text=True,
+                        timeout=timeout,
+                    )
 
-            yield temp_dir
+            return temp_dir
 
         except subprocess.TimeoutExpired as e:
+            self.cleanup(temp_dir)
             raise RuntimeError(
                 f"Git operation timed out after {timeout} seconds"
             ) from e
         except subprocess.CalledProcessError as e:
+            self.cleanup(temp_dir)
             raise RuntimeError(f"Git operation failed: {e.stderr.strip()}") from e
         except Exception as e:
-            raise RuntimeError(f"Failed to prepare git source: {e}") from e
-        finally:
             self.cleanup(temp_dir)
+            raise RuntimeError(f"Failed to prepare git source: {e}") from e
 
     def cleanup(self, path: Path):
         """Removes the temporary directory."""
         if path.exists():
-            shutil.rmtree(path, ignore_errors=True)
+            with tracing.span("git.cleanup"):
+                shutil.rmtree(path, ignore_errors=True)
+
+
+class _Prefetch:
+    def __init__(self, key: Tuple[str, str], future: "Future[Path]") -> None:
+        self.key = key
+        self.future = future
+        self.created = time.monotonic()
+
+
+class SourcePrefetcher:
+    """
+    Fetches git sources in the background at plan time so that a later run of the
+    same op_id can attach to the in-flight (or finished) clone instead of starting one.
+    """
+
+    def __init__(
+        self,
+        manager: GitSourceManager,
+        max_concurrency: int = 2,
+        ttl_secs: float = 600.0,
+    ) -> None:
+        self.manager = manager
+        self.ttl_secs = ttl_secs
+        # Queued-but-unclaimed fetches are capped so a plan flood cannot fill the disk.
+        self.max_pending = max_concurrency * 4
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="wbab-prefetch"
+        )
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Prefetch] = {}
+
+    def submit(self, op_id: str, url: str, ref: str) -> bool:
+        """Schedules a fetch for op_id. Returns False if nothing new was scheduled."""
+        key = (url, ref)
+        with self._lock:
+            self._expire_locked()
+            existing = self._entries.get(op_id)
+            if existing is not None:
+                if existing.key == key:
+                    return False
+                del self._entries[op_id]
+                self._discard(existing)
+            if len(self._entries) >= self.max_pending:
+                return False
+            future = self._pool.submit(self.manager.fetch, url, ref)
+            self._entries[op_id] = _Prefetch(key, future)
+        return True
+
+    def claim(self, op_id: str, url: str, ref: str) -> Optional["Future[Path]"]:
+        """
+        Hands the prefetch for op_id over to the caller, who becomes responsible for
+        cleaning up the fetched directory. Returns None if no matching prefetch exists.
+        """
+        with self._lock:
+            entry = self._entries.pop(op_id, None)
+        if entry is None:
+            return None
+        if entry.key != (url, ref):
+            self._discard(entry)
+            return None
+        return entry.future
+
+    def expire(self) -> int:
+        """Drops prefetches older than ttl_secs that no run claimed; returns how many."""
+        with self._lock:
+            before = len(self._entries)
+            self._expire_locked()
+            return before - len(self._entries)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            self._discard(entry)
+        self._pool.shutdown(wait=False)
+
+    def _expire_locked(self) -> None:
+        now = time.monotonic()
+        for op_id, entry in list(self._entries.items()):
+            if now - entry.created > self.ttl_secs:
+                del self._entries[op_id]
+                self._discard(entry)
+
+    def _discard(self, entry: _Prefetch) -> None:
+        if entry.future.cancel():
+            return
+
+        def _release(future: "Future[Path]") -> None:
+            if future.cancelled() or future.exception() is not None:
+                return
+            self.manager.cleanup(future.result())
+
+        entry.future.add_done_callback(_release)
@@ -0,0 +1,383 @@
+"""Warm WineBot session pool for daemon-run smoke tests.
+
+`tools/winebot-smoke.sh` pulls, starts and tears down WineBot for every
+installer under one fixed compose project. The pool instead keeps `size`
+WineBot sessions running, each its own compose project
+(`COMPOSE_PROJECT_NAME`), so installers can be smoke-tested in parallel and
+each smoke only pays for the install. After warm-up the session's wine prefix
+is snapshotted; after every use it is restored from that snapshot, and a
+session whose reset fails is recreated.
+
+Settings mirror winebot-smoke.sh (`WBAB_WINEBOT_*`, `WBAB_INSTALLER_ARGS`,
+`WBAB_SANITY_EXE`, `WBAB_SMOKE_EXTRACT_PATH`, ...).
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+Runner = Callable[..., subprocess.CompletedProcess]
+
+_SNAPSHOT = "/tmp/wbab-prefix-snapshot.tar"
+
+
+class SmokeSession:
+    """One pre-started WineBot compose project."""
+
+    def __init__(self, project: str) -> None:
+        self.project = project
+        self.ready = False
+        self.uses = 0
+
+
+class SmokePool:
+    """`size` WineBot sessions shared by smoke runs; a run waits for an idle session."""
+
+    def __init__(
+        self,
+        root_dir: Path,
+        size: int,
+        *,
+        project_prefix: str = "wbab-smoke",
+        runner: Optional[Runner] = None,
+    ) -> None:
+        self.root_dir = root_dir
+        self.size = size
+        self.compose = root_dir / "tools" / "compose.sh"
+        self.trust_helper = root_dir / "tools" / "winebot-trust-dev-cert.sh"
+        self.winebot_dir = Path(
+            os.environ.get("WBAB_WINEBOT_DIR") or root_dir / "tools" / "WineBot"
+        )
+        self.base_compose = self.winebot_dir / "compose" / "docker-compose.yml"
+        self.profile = os.environ.get("WBAB_WINEBOT_PROFILE", "headless")
+        self.service = os.environ.get("WBAB_WINEBOT_SERVICE", "winebot")
+        self.image = os.environ.get(
+            "WBAB_WINEBOT_IMAGE", "ghcr.io/mark-e-deyoung/winebot"
+        )
+        self.tag = os.environ.get("WBAB_WINEBOT_TAG", "v0.9.5")
+        self.prefix = os.environ.get("WBAB_WINEBOT_PREFIX", "/wineprefix")
+        self._runner = runner or subprocess.run
+        self._state_dir: Optional[Path] = None
+        self.override = Path(os.devnull)
+        self.sessions = [
+            SmokeSession(f"{project_prefix}-{os.getpid()}-{i}") for i in range(size)
+        ]
+        self._idle: queue.Queue[SmokeSession] = queue.Queue()
+        self._warmer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+    # -- compose ----------------------------------------------------------------------
+
+    def _compose(
+        self, session: SmokeSession, *args: str, timeout: float = 600
+    ) -> subprocess.CompletedProcess:
+        cmd = [
+            str(self.compose),
+            "-f",
+            str(self.base_compose),
+            "-f",
+            str(self.override),
+            "--profile",
+            self.profile,
+            *args,
+        ]
+        return self._call(cmd, session, timeout)
+
+    def _exec(
+        self, session: SmokeSession, user: str, *args: str, timeout: float = 600
+    ) -> subprocess.CompletedProcess:
+        return self._compose(
+            session, "exec", "--user", user, self.service, *args, timeout=timeout
+        )
+
+    def _call(
+        self, cmd: List[str], session: SmokeSession, timeout: float
+    ) -> subprocess.CompletedProcess:
+        env = {**os.environ, "COMPOSE_PROJECT_NAME": session.project}
+        try:
+            return self._runner(
+                cmd,
+                cwd=self.root_dir,
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                check=False,
+                timeout=timeout,
+            )
+        except subprocess.TimeoutExpired:
+            return subprocess.CompletedProcess(
+                cmd, 124, f"ERROR: timed out after {timeout} seconds: {cmd}\n", ""
+            )
+
+    # -- lifecycle --------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Pulls the image once and warms every session in the background."""
+        with self._start_lock:
+            if self._warmer is not None:
+                return
+            self._state_dir = Path(tempfile.mkdtemp(prefix="wbab-smoke-pool-"))
+            self.override = self._state_dir / "winebot.pool.override.yml"
+            self.override.write_text(
+                f"services:\n  {self.service}:\n    image: {self.image}:{self.tag}\n    pull_policy: missing\n",
+                encoding="utf-8",
+            )
+            self._warmer = threading.Thread(
+                target=self._warm_all, name="wbab-smoke-pool", daemon=True
+            )
+            self._warmer.start()
+
+    def _warm_all(self) -> None:
+        if not self.sessions:
+            return
+        self._compose(self.sessions[0], "pull")
+        with ThreadPoolExecutor(
+            max_workers=len(self.sessions), thread_name_prefix="wbab-smoke-warm"
+        ) as pool:
+            for session in self.sessions:
+                pool.submit(self._warm_and_offer, session)
+
+    def _warm_and_offer(self, session: SmokeSession) -> None:
+        if self._closed:
+            return
+        self._warm(session)
+        # A session that failed to come up is offered anyway; its next user retries the warm-up.
+        self._idle.put(session)
+
+    def _warm(self, session: SmokeSession) -> str:
+        """(Re)creates a session and snapshots its wine prefix; returns the failure output, if any."""
+        session.ready = False
+        self._compose(session, "down", "-v")
+        proc = self._compose(session, "up", "-d", "--no-build")
+        if proc.returncode != 0:
+            return proc.stdout
+        if os.environ.get("WBAB_SMOKE_TRUST_DEV_CERT", "0") == "1":
+            dev_dir = Path(
+                os.environ.get("WBAB_DEV_CERT_DIR")
+                or self.root_dir.parent / "agent-privileged" / "signing" / "dev"
+            )
+            cert = os.environ.get("WBAB_DEV_CERT_CRT") or str(dev_dir / "dev.crt.pem")
+            cmd = [
+                str(self.trust_helper),
+                str(self.base_compose),
+                str(self.override),
+                self.profile,
+                self.service,
+                cert,
+            ]
+            proc = self._call(cmd, session, 300)
+            if proc.returncode != 0:
+                return proc.stdout
+        proc = self._exec(
+            session,
+            "winebot",
+            "sh",
+            "-c",
+            f"wineserver -w 2>/dev/null; tar -C {self.prefix} -cf {_SNAPSHOT} .",
+        )
+        if proc.returncode != 0:
+            return proc.stdout
+        session.ready = True
+        return ""
+
+    def _reset(self, session: SmokeSession) -> bool:
+        proc = self._exec(
+            session,
+            "winebot",
+            "sh",
+            "-c",
+            f"wineserver -k 2>/dev/null; find {self.prefix} -mindepth 1 -delete && tar -C {self.prefix} -xf {_SNAPSHOT}",
+        )
+        return proc.returncode == 0
+
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "sessions": self.size,
+            "ready": sum(1 for s in self.sessions if s.ready),
+            "idle": self._idle.qsize(),
+            "uses": sum(s.uses for s in self.sessions),
+        }
+
+    def shutdown(self) -> None:
+        """Stops every session; a warm-up still in progress finds the pool closed."""
+        self._closed = True
+        if self._state_dir is None:
+            return
+        with ThreadPoolExecutor(max_workers=max(1, len(self.sessions))) as pool:
+            for session in self.sessions:
+                pool.submit(self._compose, session, "down", "-v")
+        shutil.rmtree(self._state_dir, ignore_errors=True)
+
+    # -- smoke ------------------------------------------------------------------------
+
+    def describe(self, args: List[str]) -> List[str]:
+        """Command recorded for a pooled smoke (there is no single process to show)."""
+        return ["smoke-pool", *args]
+
+    def run(
+        self, args: List[str], timeout: float = 3600
+    ) -> subprocess.CompletedProcess:
+        """Smoke-tests installer `args[0]` in an idle session; output and exit codes follow winebot-smoke.sh."""
+        cmd = self.describe(args)
+        installer = Path(args[0])
+        if not installer.is_file():
+            return subprocess.CompletedProcess(
+                cmd, 2, f"ERROR: installer not found: {installer}\n", ""
+            )
+        if not self.base_compose.is_file():
+            return subprocess.CompletedProcess(
+                cmd,
+                3,
+                f"ERROR: WineBot compose file not found: {self.base_compose}\n",
+                "",
+            )
+        self.start()
+        try:
+            session = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            return subprocess.CompletedProcess(
+                cmd,
+                124,
+                f"ERROR: no WineBot session became idle within {timeout} seconds\n",
+                "",
+            )
+        try:
+            if not session.ready:
+                failure = self._warm(session)
+                if failure:
+                    return subprocess.CompletedProcess(
+                        cmd,
+                        1,
+                        f"ERROR: WineBot session {session.project} failed to start\n{failure}",
+                        "",
+                    )
+            rc, output = self._smoke(session, installer)
+            return subprocess.CompletedProcess(cmd, rc, output, "")
+        finally:
+            session.uses += 1
+            if session.ready and not self._reset(session):
+                self._warm(session)
+            self._idle.put(session)
+
+    def _smoke(self, session: SmokeSession, installer: Path) -> tuple[int, str]:
+        out: List[str] = []
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        artifacts = Path(
+            os.environ.get("WBAB_ARTIFACTS_DIR")
+            or self.root_dir.parent
+            / "agent-sandbox"
+            / "artifacts"
+            / "winebot"
+            / f"{stamp}-{session.project}"
+        )
+        since = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        # Sessions share the bind-mounted apps folder, so each stages under its own name.
+        apps = self.winebot_dir / "apps"
+        apps.mkdir(parents=True, exist_ok=True)
+        staged = apps / f"{session.project}-{installer.name}"
+        shutil.copyfile(installer, staged)
+        rc = 0
+        try:
+            started = time.monotonic()
+            if os.environ.get("WBAB_SMOKE_SKIP_INSTALL", "0") != "1":
+                installer_args = os.environ.get("WBAB_INSTALLER_ARGS", "/S").split()
+                out.append(
+                    f"INFO: Installing {installer} in {session.project} with args: {' '.join(installer_args)}...\n"
+                )
+                proc = self._exec(
+                    session,
+                    "winebot",
+                    "timeout",
+                    "60s",
+                    "wine",
+                    f"apps/{staged.name}",
+                    *installer_args,
+                )
+                out.append(proc.stdout)
+                rc = proc.returncode
+            else:
+                out.append("INFO: WBAB_SMOKE_SKIP_INSTALL=1; skipping installation\n")
+            sanity = os.environ.get("WBAB_SANITY_EXE", "")
+            if rc == 0 and sanity:
+                app_args = os.environ.get("WBAB_APP_ARGS", "").split()
+                out.append(
+                    f"INFO: Running sanity check: {sanity} with args: {' '.join(app_args)}...\n"
+                )
+                proc = self._exec(
+                    session, "winebot", "timeout", "60s", "wine", sanity, *app_args
+                )
+                out.append(proc.stdout)
+                rc = proc.returncode
+            self._exec(session, "winebot", "./automation/screenshot.sh")
+            out.append(
+                f"INFO: smoke finished in {time.monotonic() - started:.1f}s (session {session.project})\n"
+            )
+            verify_rc, verify_out = self._verify(session, artifacts)
+            out.append(verify_out)
+            rc = rc or verify_rc
+        finally:
+            artifacts.mkdir(parents=True, exist_ok=True)
+            logs = self._compose(session, "logs", "--no-color", "--since", since)
+            (artifacts / "compose.log").write_text(logs.stdout, encoding="utf-8")
+            shutil.copyfile(self.override, artifacts / "winebot.override.yml")
+            shutil.copyfile(installer, artifacts / installer.name)
+            staged.unlink(missing_ok=True)
+        return rc, "".join(out)
+
+    def _verify(self, session: SmokeSession, artifacts: Path) -> tuple[int, str]:
+        extract = os.environ.get("WBAB_SMOKE_EXTRACT_PATH", "")
+        expect = os.environ.get("WBAB_SMOKE_EXPECT_CONTENT", "")
+        if not extract:
+            return 0, ""
+        path = extract
+        if len(path) > 2 and path[0] in "Cc" and path[1] == ":" and path[2] in "\\/":
+            path = f"{self.prefix}/drive_c/" + path[3:].replace("\\", "/")
+        proc = self._exec(session, "winebot", "cat", path)
+        if proc.returncode != 0 and "/public/" in path:
+            proc = self._exec(
+                session, "winebot", "cat", path.replace("/public/", "/Public/")
+            )
+        artifacts.mkdir(parents=True, exist_ok=True)
+        if proc.returncode != 0:
+            return (
+                (6, "ERROR: Extraction failed, cannot verify content.\n")
+                if expect
+                else (0, "")
+            )
+        (artifacts / "extracted_output.txt").write_text(proc.stdout, encoding="utf-8")
+        if not expect:
+            return 0, ""
+        actual = " ".join(proc.stdout.replace("\r", "").replace("\n", "").split())
+        expected = " ".join(expect.split())
+        if actual == expected:
+            return 0, "SUCCESS: Content matches expected value.\n"
+        return 5, f"ERROR: Content mismatch! expected [{expected}] actual [{actual}]\n"
+
+
+def smoke_pool_from_env(root_dir: Path) -> Optional[SmokePool]:
+    raw = os.environ.get("WBABD_SMOKE_POOL_SIZE", "0").strip()
+    try:
+        size = int(raw)
+    except ValueError as exc:
+        raise ValueError(f"invalid WBABD_SMOKE_POOL_SIZE: {raw}") from exc
+    if size < 0:
+        raise ValueError("WBABD_SMOKE_POOL_SIZE must be >= 0")
+    if size == 0:
+        return None
+    return SmokePool(
+        root_dir,
+        size,
+        project_prefix=os.environ.get("WBABD_SMOKE_POOL_PREFIX", "wbab-smoke"),
+    )
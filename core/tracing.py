@@ -0,0 +1,270 @@
+"""Nested trace spans for operation runs (`GET /trace/{op_id}`).
+
+`Executor.run` opens a root `operation` span whose trace_id is the op_id. Code
+it calls (source fetch, locks, steps, subprocesses, SQLite) opens children with
+`span(name, **attrs)`, which does nothing when no trace is active in the
+current context, e.g. for store reads made by the HTTP loop. Durations come
+from a monotonic clock; `start` is wall time, for ordering runs.
+
+Finished traces are appended to a size-rotated JSONL file, one span per line.
+`TraceLog.read` collects an op_id's spans again and `folded` turns them into
+collapsed stacks (`operation;step.execute_build;exec 812000`, self time in
+microseconds) that flamegraph.pl and speedscope read directly.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+_current: ContextVar[Optional["Span"]] = ContextVar("wbab_trace_span", default=None)
+
+
+class Trace:
+    def __init__(self, trace_id: str) -> None:
+        self.trace_id = trace_id
+        self.spans: List[Dict[str, Any]] = []
+        self.open: Dict[str, Span] = {}
+        self._lock = threading.Lock()
+
+    def record(self, span: "Span") -> None:
+        with self._lock:
+            self.open.pop(span.span_id, None)
+            self.spans.append(span.to_dict())
+
+
+class Span:
+    def __init__(
+        self, trace: Trace, name: str, parent: Optional["Span"], attrs: Dict[str, Any]
+    ) -> None:
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.name = name
+        self.attrs = attrs
+        self.status = "ok"
+        self.start = time.time()
+        self.duration_us: Optional[int] = None
+        self._t0 = time.monotonic()
+        trace.open[self.span_id] = self
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def end(self, status: Optional[str] = None) -> None:
+        if self.duration_us is not None:
+            return
+        self.duration_us = int((time.monotonic() - self._t0) * 1_000_000)
+        if status:
+            self.status = status
+        if _current.get() is self:
+            _current.set(self.parent)
+        self.trace.record(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_us": self.duration_us,
+            "status": self.status,
+            "attrs": self.attrs,
+        }
+
+
+def begin(name: str, **attrs: Any) -> Optional[Span]:
+    """Opens a child of the current span and makes it current; None outside a trace.
+
+    For spans that do not fit a `with` block; the caller must `end()` it.
+    """
+    parent = _current.get()
+    if parent is None:
+        return None
+    child = Span(parent.trace, name, parent, attrs)
+    _current.set(child)
+    return child
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+    child = begin(name, **attrs)
+    if child is None:
+        yield None
+        return
+    try:
+        yield child
+    except BaseException as exc:
+        child.set(error=type(exc).__name__)
+        child.end("error")
+        raise
+    child.end()
+
+
+def folded(spans: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Collapsed stacks (`root;child;leaf` -> self time in microseconds) summed over spans."""
+    by_id = {s["span_id"]: s for s in spans}
+    child_time: Dict[str, int] = {}
+    for s in spans:
+        if s.get("parent_id") in by_id:
+            child_time[s["parent_id"]] = child_time.get(s["parent_id"], 0) + int(
+                s.get("duration_us") or 0
+            )
+    stacks: Dict[str, int] = {}
+    for s in spans:
+        names = []
+        node: Optional[Dict[str, Any]] = s
+        while node is not None:
+            names.append(str(node["name"]).replace(";", ":").replace(" ", "_"))
+            node = by_id.get(node.get("parent_id"))
+        stack = ";".join(reversed(names))
+        own = max(0, int(s.get("duration_us") or 0) - child_time.get(s["span_id"], 0))
+        stacks[stack] = stacks.get(stack, 0) + own
+    return stacks
+
+
+def folded_lines(spans: List[Dict[str, Any]], limit: int = 0) -> List[str]:
+    """`folded` as text lines, heaviest first; `limit` keeps the top entries."""
+    ranked = sorted(folded(spans).items(), key=lambda kv: (-kv[1], kv[0]))
+    if limit:
+        ranked = ranked[:limit]
+    return [f"{stack} {us}" for stack, us in ranked]
+
+
+class TraceLog:
+    """Append-only JSONL span log rotated at `max_bytes` (`path.1` .. `path.<keep>`)."""
+
+    def __init__(
+        self, path: Path, max_bytes: int = 16 * 1024 * 1024, keep: int = 3
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.keep = keep
+
+    def files(self) -> List[Path]:
+        """Oldest first."""
+        rotated = [
+            self.path.with_name(f"{self.path.name}.{n}")
+            for n in range(self.keep, 0, -1)
+        ]
+        return [p for p in rotated + [self.path] if p.exists()]
+
+    def write(self, spans: List[Dict[str, Any]]) -> None:
+        if not spans:
+            return
+        data = "".join(
+            json.dumps(s, sort_keys=True, separators=(",", ":")) + "\n" for s in spans
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as fh:
+            # Serve workers share the file; the lock covers rotation and the append.
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            size = os.fstat(fh.fileno()).st_size
+            if (
+                size
+                and size + len(data) > self.max_bytes
+                and os.stat(self.path).st_ino == os.fstat(fh.fileno()).st_ino
+            ):
+                self._rotate()
+                with open(self.path, "a", encoding="utf-8") as fresh:
+                    fresh.write(data)
+                return
+            fh.write(data)
+
+    def _rotate(self) -> None:
+        for n in range(self.keep, 0, -1):
+            src = (
+                self.path.with_name(f"{self.path.name}.{n - 1}") if n > 1 else self.path
+            )
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{n}"))
+
+    def read(self, trace_id: str) -> List[Dict[str, Any]]:
+        needle = json.dumps(trace_id)
+        spans: List[Dict[str, Any]] = []
+        for path in self.files():
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    for line in fh:
+                        if needle not in line:
+                            continue
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        if entry.get("trace_id") == trace_id:
+                            spans.append(entry)
+            except OSError:
+                continue
+        spans.sort(key=lambda s: (s.get("start", 0), s.get("parent_id") is not None))
+        return spans
+
+
+class Tracer:
+    def __init__(self, log: TraceLog, slow_secs: float = 60.0) -> None:
+        self.log = log
+        self.slow_secs = slow_secs
+
+    @contextmanager
+    def trace(
+        self, trace_id: str, name: str = "operation", **attrs: Any
+    ) -> Iterator[Span]:
+        """Root span for one run; nested inside another trace it becomes a child span."""
+        outer = _current.get()
+        if outer is not None:
+            with span(name, trace_id=trace_id, **attrs) as child:
+                yield child  # type: ignore[misc]
+            return
+        root = Span(Trace(trace_id), name, None, attrs)
+        _current.set(root)
+        try:
+            yield root
+        except BaseException as exc:
+            root.set(error=type(exc).__name__)
+            root.end("error")
+            raise
+        finally:
+            _current.set(None)
+            root.end()
+            for left in list(root.trace.open.values()):
+                left.end("abandoned")
+            try:
+                self.log.write(root.trace.spans)
+            except OSError:
+                pass  # Tracing must never fail a run.
+
+    def is_slow(self, root: Span) -> bool:
+        return (
+            self.slow_secs > 0
+            and root.parent is None
+            and (root.duration_us or 0) >= self.slow_secs * 1_000_000
+        )
+
+    def read(self, trace_id: str) -> List[Dict[str, Any]]:
+        return self.log.read(trace_id)
+
+
+def tracer_from_env(store_path: Path) -> Optional[Tracer]:
+    """Builds the tracer from WBAB_TRACE_* (default log: traces.jsonl next to the operation store)."""
+    if os.environ.get("WBAB_TRACE_DISABLE", "0") == "1":
+        return None
+    raw_path = os.environ.get("WBAB_TRACE_PATH")
+    path = Path(raw_path) if raw_path else store_path.parent / "traces.jsonl"
+    try:
+        max_bytes = int(os.environ.get("WBAB_TRACE_MAX_BYTES", str(16 * 1024 * 1024)))
+        keep = int(os.environ.get("WBAB_TRACE_KEEP", "3"))
+        slow_secs = float(os.environ.get("WBAB_TRACE_SLOW_SECS", "60"))
+    except ValueError as exc:
+        raise ValueError(f"invalid WBAB_TRACE_* setting: {exc}") from exc
+    if max_bytes < 1 or keep < 1:
+        raise ValueError("WBAB_TRACE_MAX_BYTES and WBAB_TRACE_KEEP must be >= 1")
+    return Tracer(TraceLog(path, max_bytes, keep), slow_secs)
@@ -12,11 +12,38 @@ import uuid
 import subprocess
 import time
 import tempfile
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
-from core.scm import GitSourceManager, sanitize_git_url
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+from core.idempotency import (
+    FAILED,
+    RUNNING,
+    SUCCEEDED,
+    IdempotencyRegistry,
+    Lease,
+    LeaseKeeper,
+    RegistryUnavailable,
+    lease_secs,
+    wait_secs,
+)
+from core import tracing
+from core.metrics import DaemonMetrics, sqlite_timed
+from core.sbom import SbomGenerator
+from core.scm import GitSourceManager, SourcePrefetcher, sanitize_git_url
+from core.smoke_pool import SmokePool
+from core.tracing import Tracer
 
 
 @dataclass
@@ -26,28 +53,38 @@ class Plan:
     args: List[str]
     steps: List[Dict[str, Any]]
     source: Dict[str, str]
+    # Requesting principal; recorded as the actor of the run's audit events.
+    principal: str = ""
 
 
 class WorkspaceLock:
     """Advisory lock for project workspaces to prevent concurrent modification."""
 
     def __init__(self, project_path: Path) -> None:
-        self.lock_file = project_path / ".wbab.lock"
+        self.lock_file = self.path_for(project_path)
         self._fd: Optional[int] = None
 
+    @staticmethod
+    def path_for(project_path: Path) -> Path:
+        # Smoke runs name an installer file rather than a project directory.
+        if project_path.is_file():
+            return project_path.with_name(project_path.name + ".wbab.lock")
+        return project_path / ".wbab.lock"
+
     def __enter__(self) -> WorkspaceLock:
-        self.lock_file.parent.mkdir(parents=True, exist_ok=True)
-        self._fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT)
-        try:
-            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
-            # Write PID to lock file for recovery/cancellation
-            os.ftruncate(self._fd, 0)
-            os.write(self._fd, str(os.getpid()).encode())
-        except BlockingIOError:
-            os.close(self._fd)
-            raise RuntimeError(
-                f"Workspace is locked by another WBAB process: {self.lock_file}"
-            )
+        with tracing.span("lock.workspace", path=str(self.lock_file)):
+            self.lock_file.parent.mkdir(parents=True, exist_ok=True)
+            self._fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT)
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                # Write PID to lock file for recovery/cancellation
+                os.ftruncate(self._fd, 0)
+                os.write(self._fd, str(os.getpid()).encode())
+            except BlockingIOError:
+                os.close(self._fd)
+                raise RuntimeError(
+                    f"Workspace is locked by another WBAB process: {self.lock_file}"
+                )
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
@@ -58,12 +95,25 @@ class WorkspaceLock:
                 os.close(self._fd)
 
 
+def _enable_wal(conn: sqlite3.Connection) -> None:
+    # WAL lets readers proceed while another process (e.g. a sibling serve
+    # worker) writes. The mode is stored in the database file, so this only
+    # needs to succeed once; filesystems without shared memory keep the default.
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+    except sqlite3.DatabaseError:
+        pass
+
+
 class OperationStore:
     """SQLite-backed store for idempotent operations."""
 
     def __init__(self, path: Path) -> None:
         self.path = path
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._listeners: List[Callable[[str, int], None]] = []
+        # In-memory collectors timing SQLite calls; set by `wbabd serve`.
+        self.metrics: DaemonMetrics | None = None
         self._init_db()
 
     def _get_conn(self) -> sqlite3.Connection:
@@ -88,12 +138,51 @@ class OperationStore:
                             f"Database path {self.path} is NOT a sqlite database. Header: {header!r}. Content start: {content!r}"
                         )
         with self._get_conn() as conn:
+            _enable_wal(conn)
             conn.execute(
                 "CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)"
             )
             conn.execute(
                 "CREATE TABLE IF NOT EXISTS operations (op_id TEXT PRIMARY KEY, payload TEXT)"
             )
+            # Every write stamps the row with the next store-wide version, so a
+            # version identifies one payload of one operation (used for ETags and
+            # change polling) without reading the payload itself.
+            columns = {
+                row["name"] for row in conn.execute("PRAGMA table_info(operations)")
+            }
+            if "version" not in columns:
+                conn.execute(
+                    "ALTER TABLE operations ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+                )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS operations_version ON operations (version)"
+            )
+            # status and verb are copied out of the payload on write so bulk
+            # queries (`wbabd status --all --filter ...`) use an index instead
+            # of decoding every payload.
+            if "status" not in columns:
+                conn.execute(
+                    "ALTER TABLE operations ADD COLUMN status TEXT NOT NULL DEFAULT ''"
+                )
+                conn.execute(
+                    "ALTER TABLE operations ADD COLUMN verb TEXT NOT NULL DEFAULT ''"
+                )
+                for row in conn.execute(
+                    "SELECT op_id, payload FROM operations"
+                ).fetchall():
+                    payload = json.loads(row["payload"])
+                    conn.execute(
+                        "UPDATE operations SET status = ?, verb = ? WHERE op_id = ?",
+                        (
+                            str(payload.get("status", "")),
+                            str(payload.get("verb", "")),
+                            row["op_id"],
+                        ),
+                    )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS operations_status_verb ON operations (status, verb)"
+            )
 
             res = conn.execute(
                 "SELECT value FROM metadata WHERE key = 'instance_id'"
@@ -111,6 +200,7 @@ class OperationStore:
             ).fetchone()
             return res["value"] if res else str(uuid.uuid4())
 
+    @sqlite_timed("store", "get")
     def get(self, op_id: str) -> Dict[str, Any] | None:
         with self._get_conn() as conn:
             res = conn.execute(
@@ -120,11 +210,120 @@ class OperationStore:
                 return json.loads(res["payload"])
         return None
 
-    def upsert(self, op_id: str, payload: Dict[str, Any]) -> None:
+    @sqlite_timed("store", "get_raw")
+    def get_raw(self, op_id: str) -> Tuple[str, int] | None:
+        """Returns the stored JSON text and version without decoding the payload."""
         with self._get_conn() as conn:
+            res = conn.execute(
+                "SELECT payload, version FROM operations WHERE op_id = ?", (op_id,)
+            ).fetchone()
+            if res:
+                return res["payload"], int(res["version"])
+        return None
+
+    @sqlite_timed("store", "get_version")
+    def get_version(self, op_id: str) -> int | None:
+        with self._get_conn() as conn:
+            res = conn.execute(
+                "SELECT version FROM operations WHERE op_id = ?", (op_id,)
+            ).fetchone()
+            return int(res["version"]) if res else None
+
+    @sqlite_timed("store", "upsert")
+    def upsert(self, op_id: str, payload: Dict[str, Any]) -> int:
+        with self._get_conn() as conn:
+            # BEGIN IMMEDIATE serializes writers so versions stay unique across processes.
+            conn.execute("BEGIN IMMEDIATE")
+            version = conn.execute(
+                "SELECT COALESCE(MAX(version), 0) + 1 FROM operations"
+            ).fetchone()[0]
             conn.execute(
-                "INSERT OR REPLACE INTO operations (op_id, payload) VALUES (?, ?)",
-                (op_id, json.dumps(payload, sort_keys=True)),
+                "INSERT OR REPLACE INTO operations (op_id, payload, version, status, verb) VALUES (?, ?, ?, ?, ?)",
+                (
+                    op_id,
+                    json.dumps(payload, sort_keys=True),
+                    version,
+                    str(payload.get("status", "")),
+                    str(payload.get("verb", "")),
+                ),
+            )
+        for listener in list(self._listeners):
+            listener(op_id, version)
+        return version
+
+    def add_listener(self, listener: Callable[[str, int], None]) -> None:
+        """Calls `listener(op_id, version)` after each write made through this store."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str, int], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def iter_raw(
+        self,
+        *,
+        statuses: Iterable[str] = (),
+        verbs: Iterable[str] = (),
+        op_ids: Iterable[str] = (),
+        since_version: Optional[int] = None,
+        page_size: int = 500,
+    ) -> Iterator[Tuple[str, str, int]]:
+        """Yields (op_id, payload JSON text, version) in version order, one page in memory at a time.
+
+        Empty filters match everything; values within a filter are alternatives.
+        With `since_version` only rows written after it are returned, so a
+        caller can follow changes by passing the last version it saw.
+        """
+        filters: List[str] = []
+        params: List[Any] = []
+        for column, values in (
+            ("status", statuses),
+            ("verb", verbs),
+            ("op_id", op_ids),
+        ):
+            values = list(values)
+            if values:
+                filters.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        tail = (
+            "".join(f" AND {clause}" for clause in filters)
+            + " ORDER BY version, op_id LIMIT ?"
+        )
+        select = "SELECT op_id, payload, version FROM operations WHERE "
+        # Later pages continue from the last (version, op_id): rows written
+        # before versions existed all carry version 0.
+        sql, key = (
+            select + "version > ?" + tail,
+            [-1 if since_version is None else since_version],
+        )
+        while True:
+            with self._get_conn() as conn:
+                rows = conn.execute(sql, [*key, *params, page_size]).fetchall()
+            for row in rows:
+                yield row["op_id"], row["payload"], int(row["version"])
+            if len(rows) < page_size:
+                return
+            sql, key = (
+                select + "(version, op_id) > (?, ?)" + tail,
+                [int(rows[-1]["version"]), rows[-1]["op_id"]],
+            )
+
+    @sqlite_timed("store", "count_by_verb")
+    def count_by_verb(self, status: str) -> Dict[str, int]:
+        """Operations currently in `status`, per verb (served by the status/verb index)."""
+        with self._get_conn() as conn:
+            rows = conn.execute(
+                "SELECT verb, COUNT(*) AS n FROM operations WHERE status = ? GROUP BY verb",
+                (status,),
+            ).fetchall()
+            return {row["verb"]: int(row["n"]) for row in rows}
+
+    def max_version(self) -> int:
+        with self._get_conn() as conn:
+            return int(
+                conn.execute(
+                    "SELECT COALESCE(MAX(version), 0) FROM operations"
+                ).fetchone()[0]
             )
 
     def list_all(self) -> Dict[str, Dict[str, Any]]:
@@ -139,6 +338,8 @@ class AuditLog:
     def __init__(self, path: Path, source: str = "wbabd") -> None:
         self.path = path
         self.source = source
+        self._listeners: List[Callable[[int], None]] = []
+        self.metrics: DaemonMetrics | None = None
         self.path.parent.mkdir(parents=True, exist_ok=True)
         self._init_db()
 
@@ -162,6 +363,7 @@ class AuditLog:
                             f"Database path {self.path} is NOT a sqlite database. Header: {header!r}. Content start: {content!r}"
                         )
         with self._get_conn() as conn:
+            _enable_wal(conn)
             conn.execute(
                 """CREATE TABLE IF NOT EXISTS audit_events (
                     event_id TEXT PRIMARY KEY,
@@ -190,32 +392,117 @@ class AuditLog:
         status: str = "",
         step: str = "",
         details: Dict[str, Any] | None = None,
+        actor: str | None = None,
     ) -> None:
-        event_id = str(uuid.uuid4())
-        ts = self._now()
-        actor = os.environ.get("WBABD_ACTOR", "unknown")
+        self.emit_many(
+            [
+                {
+                    "event_type": event_type,
+                    "op_id": op_id,
+                    "verb": verb,
+                    "status": status,
+                    "step": step,
+                    "details": details,
+                    "actor": actor,
+                }
+            ]
+        )
+
+    @sqlite_timed("audit", "emit")
+    def emit_many(self, events: List[Dict[str, Any]]) -> None:
+        """Writes several events (dicts of `emit` keyword arguments) in one transaction.
+
+        `actor` defaults to WBABD_ACTOR; daemon requests pass the requesting principal.
+        """
+        if not events:
+            return
+        default_actor = os.environ.get("WBABD_ACTOR", "unknown")
         session_id = os.environ.get("WBABD_SESSION_ID", "")
-        details_json = json.dumps(details) if details else None
+        rows = []
+        for event in events:
+            details = event.get("details")
+            rows.append(
+                (
+                    str(uuid.uuid4()),
+                    self._now(),
+                    self.source,
+                    event.get("actor") or default_actor,
+                    session_id,
+                    event["event_type"],
+                    event.get("op_id", ""),
+                    event.get("verb", ""),
+                    event.get("status", ""),
+                    event.get("step", ""),
+                    json.dumps(details) if details else None,
+                )
+            )
 
         with self._get_conn() as conn:
-            conn.execute(
+            conn.executemany(
                 """INSERT INTO audit_events 
                    (event_id, ts, source, actor, session_id, event_type, op_id, verb, status, step, details)
                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    event_id,
-                    ts,
-                    self.source,
-                    actor,
-                    session_id,
-                    event_type,
-                    op_id,
-                    verb,
-                    status,
-                    step,
-                    details_json,
-                ),
+                rows,
+            )
+            last_id = conn.execute("SELECT MAX(rowid) FROM audit_events").fetchone()[0]
+        for listener in list(self._listeners):
+            listener(last_id)
+
+    def add_listener(self, listener: Callable[[int], None]) -> None:
+        """Calls `listener(last_event_id)` after each write made through this log."""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[int], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def last_event_id(self) -> int:
+        with self._get_conn() as conn:
+            return conn.execute(
+                "SELECT COALESCE(MAX(rowid), 0) FROM audit_events"
+            ).fetchone()[0]
+
+    @sqlite_timed("audit", "read_since")
+    def read_since(
+        self,
+        after_id: int,
+        *,
+        prefixes: Tuple[str, ...] = (),
+        op_id: str = "",
+        verb: str = "",
+        actor: str = "",
+        limit: int = 500,
+    ) -> List[Dict[str, Any]]:
+        """Events with rowid > `after_id`, oldest first, as dicts keyed by column.
+
+        The rowid is the event's position in the log and serves as a resume cursor.
+        `prefixes` restricts event types (e.g. ("operation.", "step.")).
+        """
+        clauses = ["rowid > ?"]
+        params: List[Any] = [after_id]
+        if prefixes:
+            clauses.append(
+                "(" + " OR ".join("event_type LIKE ?" for _ in prefixes) + ")"
             )
+            params.extend(f"{p}%" for p in prefixes)
+        for column, value in (("op_id", op_id), ("verb", verb), ("actor", actor)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        params.append(limit)
+        with self._get_conn() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                f"""SELECT rowid AS id, ts, actor, event_type, op_id, verb, status, step, details
+                    FROM audit_events WHERE {" AND ".join(clauses)} ORDER BY rowid LIMIT ?""",
+                params,
+            ).fetchall()
+        events = []
+        for row in rows:
+            event = dict(row)
+            event["details"] = json.loads(event["details"]) if event["details"] else {}
+            events.append(event)
+        return events
 
 
 class Planner:
@@ -226,6 +513,7 @@ class Planner:
         args: List[str],
         git_url: Optional[str] = None,
         git_ref: Optional[str] = None,
+        principal: str = "",
     ) -> Plan:
         if verb not in {"build", "package", "sign", "smoke", "doctor", "lint", "test"}:
             raise ValueError(f"unsupported verb: {verb}")
@@ -234,26 +522,47 @@ class Planner:
         if git_url:
             source = {"type": "git", "url": git_url, "ref": git_ref or ""}
 
+        steps = [{"name": "validate_inputs"}, {"name": f"execute_{verb}"}]
+        if verb == "build":
+            steps.append({"name": "generate_sbom"})
+        steps.append({"name": "record_result"})
+
         return Plan(
             op_id=op_id,
             verb=verb,
             args=args,
-            steps=[
-                {"name": "validate_inputs"},
-                {"name": f"execute_{verb}"},
-                {"name": "record_result"},
-            ],
+            steps=steps,
             source=source,
+            principal=principal,
         )
 
 
 class Executor:
     def __init__(
-        self, root_dir: Path, store: OperationStore, audit: AuditLog | None = None
+        self,
+        root_dir: Path,
+        store: OperationStore,
+        audit: AuditLog | None = None,
+        prefetcher: SourcePrefetcher | None = None,
+        registry: IdempotencyRegistry | None = None,
     ) -> None:
         self.root_dir = root_dir
         self.store = store
         self.audit = audit
+        self.prefetcher = prefetcher
+        # Shared op_id leases; without one, idempotency is per store only.
+        self.registry = registry
+        # Warm WineBot sessions for `smoke`; set by the daemon (WBABD_SMOKE_POOL_SIZE).
+        self.smoke_pool: SmokePool | None = None
+        # Post-build SBOM stage; set by wbabd unless WBAB_SBOM_DISABLE=1.
+        self.sbom: SbomGenerator | None = None
+        # In-memory operation/step/lock collectors; set by `wbabd serve`.
+        self.metrics: DaemonMetrics | None = None
+        self._step_clock: Dict[Tuple[str, str], float] = {}
+        # Trace spans per run (trace_id = op_id); set by wbabd unless WBAB_TRACE_DISABLE=1.
+        self.tracer: Tracer | None = None
+        self._step_spans: Dict[Tuple[str, str], tracing.Span] = {}
+        self._holder_prefix = ""
 
     def recover_zombies(self) -> int:
         """
@@ -270,7 +579,7 @@ class Executor:
                 if not project_dir.is_absolute():
                     project_dir = self.root_dir / project_dir
 
-                lock_file = project_dir / ".wbab.lock"
+                lock_file = WorkspaceLock.path_for(project_dir)
                 is_stale = False
                 if not lock_file.exists():
                     is_stale = True
@@ -296,6 +605,14 @@ class Executor:
                         "step": "system_recovery",
                     }
                     self.store.upsert(op_id, op)
+                    if self.registry is not None:
+                        try:
+                            # No process on this host holds the workspace, so any local holder crashed.
+                            self.registry.abandon(
+                                op_id, f"{self.store.get_instance_id()}/"
+                            )
+                        except RegistryUnavailable:
+                            pass
                     if self.audit:
                         self.audit.emit(
                             "operation.recovered",
@@ -303,14 +620,17 @@ class Executor:
                             verb=op.get("verb", ""),
                             status="failed",
                             details={"reason": "stale_lock"},
+                            actor=op.get("principal") or None,
                         )
                     count += 1
         return count
 
     def cleanup_sandbox(self, max_age_secs: int = 86400) -> int:
         """
-        Prunes directories in agent-sandbox/ that are older than max_age_secs
-        and not associated with a currently 'running' operation.
+        Prunes git source workspaces (`agent-sandbox/git-source-*`) older than
+        max_age_secs that are neither used by a 'running' operation nor locked.
+        Nothing else under agent-sandbox/ is touched; in particular `state/`,
+        which holds the operation store and audit log.
         """
         count = 0
         project_root = _get_project_root(self.root_dir)
@@ -318,6 +638,11 @@ class Executor:
         if not sandbox_dir.exists():
             return 0
 
+        protected = {self.store.path.resolve().parent}
+        audit_path = getattr(self.audit, "path", None)
+        if isinstance(audit_path, Path):
+            protected.add(audit_path.resolve().parent)
+
         active_dirs = set()
         ops = self.store.list_all()
 
@@ -329,26 +654,29 @@ class Executor:
 
         now = time.time()
         for item in sandbox_dir.iterdir():
-            if not item.is_dir():
+            if not item.is_dir() or not item.name.startswith("git-source-"):
                 continue
             if str(item) in active_dirs:
                 continue
+            resolved = item.resolve()
+            if any(resolved == d or resolved in d.parents for d in protected):
+                continue
 
             if (now - item.stat().st_mtime) > max_age_secs:
                 lock_file = item / ".wbab.lock"
                 if lock_file.exists():
                     try:
                         fd = os.open(lock_file, os.O_RDWR)
+                    except OSError:
+                        fd = -1
+                    if fd >= 0:
                         try:
                             fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
                             fcntl.flock(fd, fcntl.LOCK_UN)
                         except BlockingIOError:
-                            os.close(fd)
                             continue
                         finally:
                             os.close(fd)
-                    except OSError:
-                        pass
 
                 try:
                     shutil.rmtree(item, ignore_errors=True)
@@ -381,7 +709,7 @@ class Executor:
         if not project_dir.is_absolute():
             project_dir = self.root_dir / project_dir
 
-        lock_file = project_dir / ".wbab.lock"
+        lock_file = WorkspaceLock.path_for(project_dir)
         if not lock_file.exists():
             op["status"] = "failed"
             op["finished_at"] = self._now()
@@ -424,7 +752,14 @@ class Executor:
         self.store.upsert(op_id, op)
         self._audit(
             "operation.cancelled",
-            plan=Plan(op_id, op.get("verb", ""), op.get("args", []), [], {}),
+            plan=Plan(
+                op_id,
+                op.get("verb", ""),
+                op.get("args", []),
+                [],
+                {},
+                op.get("principal", ""),
+            ),
             status="failed",
             details={"pid": pid},
         )
@@ -440,9 +775,12 @@ class Executor:
     def _run(self, cmd: List[str]) -> subprocess.CompletedProcess[str]:
         """Runs a command with timeout and streams output to a temporary file."""
         timeout = float(os.environ.get("WBAB_EXECUTION_TIMEOUT_SECS", "3600"))
-        with tempfile.NamedTemporaryFile(
-            mode="w+", delete=False, prefix="wbab-log-"
-        ) as tmp:
+        with (
+            tracing.span("exec", command=Path(cmd[0]).name if cmd else "") as sp,
+            tempfile.NamedTemporaryFile(
+                mode="w+", delete=False, prefix="wbab-log-"
+            ) as tmp,
+        ):
             tmp_path = tmp.name
             try:
                 proc = subprocess.run(
@@ -456,10 +794,14 @@ class Executor:
                 )
                 tmp.seek(0)
                 output = tmp.read()
+                if sp is not None:
+                    sp.set(exit_code=proc.returncode)
                 return subprocess.CompletedProcess(
                     args=cmd, returncode=proc.returncode, stdout=output, stderr=""
                 )
             except subprocess.TimeoutExpired:
+                if sp is not None:
+                    sp.set(exit_code=124, timed_out=True)
                 return subprocess.CompletedProcess(
                     args=cmd,
                     returncode=124,
@@ -503,9 +845,90 @@ class Executor:
             return (project_dir / "dist").exists()
         return True
 
+    def prefetch(self, plan: Plan) -> bool:
+        """Starts fetching a git source in the background for a later run of the same op_id."""
+        if self.prefetcher is None or plan.source.get("type") != "git":
+            return False
+        url = plan.source["url"]
+        ref = plan.source.get("ref", "")
+        scheduled = self.prefetcher.submit(plan.op_id, url, ref)
+        if scheduled:
+            self._audit(
+                "source.prefetch",
+                plan=plan,
+                status="scheduled",
+                details={"url": sanitize_git_url(url), "ref": ref},
+            )
+        return scheduled
+
+    @contextmanager
+    def _git_source(self, plan: Plan) -> Generator[tuple[Path, bool], None, None]:
+        """Yields (source_path, prefetched), attaching to a plan-time prefetch when one exists."""
+        git_mgr = GitSourceManager(self.root_dir)
+        url = plan.source["url"]
+        ref = plan.source.get("ref", "")
+        pending = (
+            self.prefetcher.claim(plan.op_id, url, ref) if self.prefetcher else None
+        )
+        path: Optional[Path] = None
+        if pending is not None:
+            try:
+                with tracing.span("source.prefetch_wait", ready=pending.done()):
+                    path = pending.result()
+            except Exception as exc:
+                # A failed prefetch may be stale (e.g. a transient network error); fetch again.
+                self._audit(
+                    "source.prefetch",
+                    plan=plan,
+                    status="failed",
+                    details={"error": str(exc)},
+                )
+        if path is None:
+            with git_mgr.prepare_source(url, ref) as fetched:
+                yield fetched, False
+            return
+        try:
+            yield path, True
+        finally:
+            git_mgr.cleanup(path)
+
     def run(self, plan: Plan) -> Dict[str, Any]:
+        started = time.monotonic()
+        if self.tracer is None:
+            result = self._run_plan(plan)
+        else:
+            with self.tracer.trace(
+                plan.op_id, verb=plan.verb, source=plan.source.get("type", "local")
+            ) as root:
+                try:
+                    result = self._run_plan(plan)
+                finally:
+                    for key in [
+                        k for k in list(self._step_spans) if k[0] == plan.op_id
+                    ]:
+                        self._step_spans.pop(key, None)
+                root.set(result=result["status"])
+                if result["status"] == "failed":
+                    root.status = "error"
+            if self.tracer.is_slow(root):
+                self._audit(
+                    "operation.slow",
+                    plan=plan,
+                    status=result["status"],
+                    details={
+                        "duration_ms": (root.duration_us or 0) // 1000,
+                        "trace": f"/trace/{plan.op_id}",
+                        "breakdown": tracing.folded_lines(root.trace.spans, limit=20),
+                    },
+                )
+        if self.metrics is not None:
+            self.metrics.observe_operation(
+                plan.verb, result["status"], time.monotonic() - started
+            )
+        return result
+
+    def _run_plan(self, plan: Plan) -> Dict[str, Any]:
         if plan.source.get("type") == "git":
-            git_mgr = GitSourceManager(self.root_dir)
             url = plan.source["url"]
             safe_url = sanitize_git_url(url)
             ref = plan.source.get("ref", "")
@@ -516,12 +939,15 @@ class Executor:
                 details={"url": safe_url, "ref": ref},
             )
             try:
-                with git_mgr.prepare_source(url, ref) as temp_source_path:
+                with self._git_source(plan) as (temp_source_path, prefetched):
                     self._audit(
                         "source.fetch",
                         plan=plan,
                         status="succeeded",
-                        details={"path": str(temp_source_path)},
+                        details={
+                            "path": str(temp_source_path),
+                            "prefetched": prefetched,
+                        },
                     )
                     if not plan.args or plan.args[0] == ".":
                         effective_project_dir = temp_source_path
@@ -574,6 +1000,8 @@ class Executor:
         effective_project_dir = resolved_project_dir
 
         existing = self.store.get(plan.op_id)
+        # Git sources are fetched fresh, so their runs are never served from cache.
+        rerun = plan.source.get("type") == "git"
         if existing and existing.get("status") == "succeeded":
             if plan.source.get("type") != "git":
                 if self._validate_outputs(plan):
@@ -585,6 +1013,7 @@ class Executor:
                         "result": existing.get("result", {}),
                     }
                 else:
+                    rerun = True
                     self._audit(
                         "operation.cache_invalidated",
                         plan=plan,
@@ -592,8 +1021,124 @@ class Executor:
                         details={"reason": "expected outputs missing from disk"},
                     )
 
+        if self.registry is None:
+            return self._execute_locked(plan, effective_project_dir, existing)
+        waited = time.monotonic()
+        with tracing.span("lock.lease", rerun=rerun):
+            claim = self._claim_lease(plan, rerun)
+        if self.metrics is not None:
+            self.metrics.lock_wait_seconds.observe(time.monotonic() - waited, "lease")
+        if isinstance(claim, dict):
+            return claim
+        ttl = lease_secs()
+        with LeaseKeeper(self.registry, claim, ttl) as keeper:
+            result = self._execute_locked(plan, effective_project_dir, existing)
+        state = SUCCEEDED if result["status"] == "succeeded" else FAILED
         try:
+            fenced = keeper.lost or not self.registry.finish(claim, state, result)
+        except RegistryUnavailable:
+            # The lease lapses on its own; waiting duplicates then claim it and run again.
+            fenced = False
+        if fenced:
+            self._audit(
+                "operation.fenced",
+                plan=plan,
+                status=result["status"],
+                details={"holder": claim.holder, "token": claim.token},
+            )
+        return result
+
+    def _lease_holder_prefix(self) -> str:
+        if not self._holder_prefix:
+            self._holder_prefix = f"{self.store.get_instance_id()}/{os.getpid()}/"
+        return self._holder_prefix
+
+    def _claim_lease(self, plan: Plan, rerun: bool) -> Lease | Dict[str, Any]:
+        """Claims the op_id's lease, or waits for the execution holding it and returns its result."""
+        assert self.registry is not None
+        holder = self._lease_holder_prefix() + uuid.uuid4().hex[:12]
+        ttl = lease_secs()
+        deadline = time.monotonic() + wait_secs()
+        delay = 0.1
+        joined: Optional[Lease] = None
+        while True:
+            try:
+                acquired, lease = self.registry.acquire(
+                    plan.op_id,
+                    holder,
+                    ttl,
+                    rerun=rerun,
+                    joined_token=joined.token if joined else None,
+                )
+            except RegistryUnavailable as exc:
+                return {
+                    "status": "failed",
+                    "op_id": plan.op_id,
+                    "verb": plan.verb,
+                    "result": {
+                        "error": f"Idempotency registry unavailable: {exc}",
+                        "step": "idempotency_lease",
+                    },
+                }
+            if acquired:
+                return lease
+            if lease.state != RUNNING:
+                if joined is not None and lease.token == joined.token:
+                    # The execution we waited for finished: its result is ours.
+                    return lease.result or {
+                        "status": lease.state,
+                        "op_id": plan.op_id,
+                        "verb": plan.verb,
+                        "result": {},
+                    }
+                self._audit(
+                    "operation.cached",
+                    plan=plan,
+                    status="cached",
+                    details={"holder": lease.holder},
+                )
+                return {
+                    "status": "cached",
+                    "op_id": plan.op_id,
+                    "verb": plan.verb,
+                    "result": (lease.result or {}).get("result", {}),
+                }
+            if joined is None or joined.token != lease.token:
+                self._audit(
+                    "operation.joined",
+                    plan=plan,
+                    status="running",
+                    details={"holder": lease.holder, "token": lease.token},
+                )
+            joined = lease
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return {
+                    "status": "failed",
+                    "op_id": plan.op_id,
+                    "verb": plan.verb,
+                    "result": {
+                        "error": f"Operation is still running on {lease.holder}",
+                        "step": "idempotency_lease",
+                        "retry_after_secs": max(1, int(lease.expires_at - time.time())),
+                    },
+                }
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 2.0)
+
+    def _execute_locked(
+        self,
+        plan: Plan,
+        effective_project_dir: Path,
+        existing: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        try:
+            waited = time.monotonic()
             with WorkspaceLock(effective_project_dir):
+                if self.metrics is not None:
+                    self.metrics.lock_wait_seconds.observe(
+                        time.monotonic() - waited, "workspace"
+                    )
                 new_args = [str(effective_project_dir)]
                 if len(plan.args) > 1:
                     new_args.extend(plan.args[1:])
@@ -604,6 +1149,7 @@ class Executor:
                     args=new_args,
                     steps=plan.steps,
                     source=plan.source,
+                    principal=plan.principal,
                 )
 
                 result = self._run_operation(runtime_plan, existing)
@@ -666,6 +1212,8 @@ class Executor:
                 "retry_count": 0,
             }
         op["status"] = "running"
+        if plan.principal:
+            op["principal"] = plan.principal
         op["last_attempt_at"] = started
         op["attempts"] = int(op.get("attempts", 0)) + 1
         op["step_state"] = self._ensure_step_state(op, plan)
@@ -726,7 +1274,12 @@ class Executor:
         if op["step_state"][exec_step]["status"] != "succeeded":
             self._mark_step_running(op, exec_step)
             self._persist(plan, op)
-            cmd = self._command_for(plan.verb, plan.args)
+            pool = self.smoke_pool if plan.verb == "smoke" else None
+            cmd = (
+                pool.describe(plan.args)
+                if pool is not None
+                else self._command_for(plan.verb, plan.args)
+            )
             self._audit(
                 "step.started",
                 plan=plan,
@@ -737,7 +1290,16 @@ class Executor:
                     "command": cmd,
                 },
             )
-            proc = self._run(cmd)
+            if pool is not None:
+                with tracing.span("smoke_pool.run"):
+                    proc = pool.run(
+                        plan.args,
+                        timeout=float(
+                            os.environ.get("WBAB_EXECUTION_TIMEOUT_SECS", "3600")
+                        ),
+                    )
+            else:
+                proc = self._run(cmd)
             exec_result = {
                 "exit_code": proc.returncode,
                 "stdout": proc.stdout,
@@ -782,6 +1344,78 @@ class Executor:
                 details={"exit_code": proc.returncode},
             )
 
+        sbom_step = "generate_sbom"
+        if (
+            sbom_step in op["step_state"]
+            and op["step_state"][sbom_step]["status"] != "succeeded"
+        ):
+            self._mark_step_running(op, sbom_step)
+            self._persist(plan, op)
+            self._audit(
+                "step.started",
+                plan=plan,
+                status="running",
+                step=sbom_step,
+                details={"step_attempt": op["step_state"][sbom_step]["attempts"]},
+            )
+            project_dir = Path(plan.args[0]) if plan.args else self.root_dir
+            sbom = self.sbom
+            try:
+                op["sbom"] = (
+                    sbom.generate(project_dir, plan.op_id)
+                    if sbom
+                    else {"skipped": "disabled"}
+                )
+            except Exception as exc:
+                if sbom is None or not sbom.strict:
+                    # The artifacts are built; a failed SBOM is reported in the result, not fatal.
+                    op["sbom"] = {"error": f"SBOM generation failed: {exc}"}
+                    self._audit(
+                        "sbom.failed",
+                        plan=plan,
+                        status="warning",
+                        step=sbom_step,
+                        details=op["sbom"],
+                    )
+                else:
+                    self._mark_step_failed(op, sbom_step, str(exc))
+                    op["status"] = "failed"
+                    op["finished_at"] = self._now()
+                    op["result"] = {
+                        "error": f"SBOM generation failed: {exc}",
+                        "step": sbom_step,
+                    }
+                    self._persist(plan, op)
+                    self._audit(
+                        "step.failed",
+                        plan=plan,
+                        status="failed",
+                        step=sbom_step,
+                        details={"error": str(exc)},
+                    )
+                    self._audit(
+                        "operation.failed",
+                        plan=plan,
+                        status="failed",
+                        step=sbom_step,
+                        details=op["result"],
+                    )
+                    return {
+                        "status": "failed",
+                        "op_id": plan.op_id,
+                        "verb": plan.verb,
+                        "result": op["result"],
+                    }
+            self._mark_step_succeeded(op, sbom_step)
+            self._persist(plan, op)
+            self._audit(
+                "step.succeeded",
+                plan=plan,
+                status="succeeded",
+                step=sbom_step,
+                details=op["sbom"],
+            )
+
         record_step = "record_result"
         if op["step_state"][record_step]["status"] != "succeeded":
             self._mark_step_running(op, record_step)
@@ -800,6 +1434,8 @@ class Executor:
                 "stderr": execution.get("stderr", ""),
                 "command": execution.get("command", []),
             }
+            if "sbom" in op:
+                op["result"]["sbom"] = op["sbom"]
             self._mark_step_succeeded(op, record_step)
             self._persist(plan, op)
             self._audit(
@@ -842,18 +1478,36 @@ class Executor:
         st["attempts"] = int(st.get("attempts", 0)) + 1
         st["started_at"] = self._now()
         st["last_error"] = None
+        if self.metrics is not None:
+            # step_state times are whole seconds; histograms use a monotonic clock.
+            self._step_clock[(op["op_id"], step)] = time.monotonic()
+        step_span = tracing.begin(f"step.{step}", attempt=st["attempts"])
+        if step_span is not None:
+            self._step_spans[(op["op_id"], step)] = step_span
 
     def _mark_step_succeeded(self, op: Dict[str, Any], step: str) -> None:
         st = op["step_state"][step]
         st["status"] = "succeeded"
         st["finished_at"] = self._now()
         st["last_error"] = None
+        self._observe_step(op, step, "succeeded")
 
     def _mark_step_failed(self, op: Dict[str, Any], step: str, err: str) -> None:
         st = op["step_state"][step]
         st["status"] = "failed"
         st["finished_at"] = self._now()
         st["last_error"] = err
+        self._observe_step(op, step, "failed")
+
+    def _observe_step(self, op: Dict[str, Any], step: str, status: str) -> None:
+        step_span = self._step_spans.pop((op["op_id"], step), None)
+        if step_span is not None:
+            step_span.end("ok" if status == "succeeded" else "error")
+        started = self._step_clock.pop((op["op_id"], step), None)
+        if self.metrics is not None and started is not None:
+            self.metrics.step_seconds.observe(
+                time.monotonic() - started, str(op.get("verb", "")), step, status
+            )
 
     def _persist(self, plan: Plan, op: Dict[str, Any]) -> None:
         self.store.upsert(plan.op_id, op)
@@ -876,6 +1530,7 @@ class Executor:
             status=status,
             step=step,
             details=details,
+            actor=plan.principal or None,
         )
 
     def _validate_inputs(self, plan: Plan) -> None:
@@ -26,12 +26,71 @@ require_file() {
 }
 
 validate_limits() {
-  local max_body timeout
+  local max_body timeout max_requests
   max_body="${WBABD_HTTP_MAX_BODY_BYTES:-1048576}"
   timeout="${WBABD_HTTP_REQUEST_TIMEOUT_SECS:-15}"
+  max_requests="${WBABD_HTTP_MAX_REQUESTS_PER_CONN:-100}"
+  max_header="${WBABD_HTTP_MAX_HEADER_BYTES:-16384}"
+  compress_min="${WBABD_HTTP_COMPRESS_MIN_BYTES:-1024}"
+  batch_max="${WBABD_BATCH_MAX_ITEMS:-100}"
+  run_workers="${WBABD_RUN_WORKERS:-1}"
+  max_queued="${WBABD_MAX_QUEUED_RUNS:-0}"
+  max_inflight="${WBABD_MAX_INFLIGHT_REQUESTS:-0}"
+  events_max="${WBABD_EVENTS_MAX_SUBSCRIBERS:-64}"
+  drain_timeout="${WBABD_DRAIN_TIMEOUT_SECS:-300}"
+  prune_age="${WBABD_SANDBOX_PRUNE_AGE_SECS:-0}"
+  discovery_probe="${WBABD_DISCOVERY_PROBE_SECS:-1}"
+  discovery_load="${WBABD_DISCOVERY_LOAD_INTERVAL_SECS:-10}"
+  forward_min_disk="${WBABD_FORWARD_MIN_DISK_FREE_MB:-1024}"
+  forward_plaintext="${WBABD_FORWARD_ALLOW_PLAINTEXT:-0}"
+  lease_secs="${WBAB_IDEMPOTENCY_LEASE_SECS:-30}"
+  registry="${WBAB_IDEMPOTENCY_REGISTRY:-local}"
+  smoke_pool="${WBABD_SMOKE_POOL_SIZE:-0}"
+  sbom_disable="${WBAB_SBOM_DISABLE:-0}"
+  sbom_strict="${WBAB_SBOM_STRICT:-0}"
+  trace_disable="${WBAB_TRACE_DISABLE:-0}"
+  trace_max_bytes="${WBAB_TRACE_MAX_BYTES:-16777216}"
+  trace_keep="${WBAB_TRACE_KEEP:-3}"
+  trace_slow="${WBAB_TRACE_SLOW_SECS:-60}"
+  profile_mode="${WBABD_PROFILE:-off}"
 
   [[ "${max_body}" =~ ^[0-9]+$ ]] || fail "WBABD_HTTP_MAX_BODY_BYTES must be an integer: ${max_body}"
   (( max_body > 0 )) || fail "WBABD_HTTP_MAX_BODY_BYTES must be > 0"
+  [[ "${max_requests}" =~ ^[0-9]+$ ]] || fail "WBABD_HTTP_MAX_REQUESTS_PER_CONN must be an integer: ${max_requests}"
+  (( max_requests > 0 )) || fail "WBABD_HTTP_MAX_REQUESTS_PER_CONN must be > 0"
+  [[ "${max_header}" =~ ^[0-9]+$ ]] || fail "WBABD_HTTP_MAX_HEADER_BYTES must be an integer: ${max_header}"
+  (( max_header > 0 )) || fail "WBABD_HTTP_MAX_HEADER_BYTES must be > 0"
+  [[ "${compress_min}" =~ ^[0-9]+$ ]] || fail "WBABD_HTTP_COMPRESS_MIN_BYTES must be an integer: ${compress_min}"
+  [[ "${batch_max}" =~ ^[0-9]+$ ]] || fail "WBABD_BATCH_MAX_ITEMS must be an integer: ${batch_max}"
+  (( batch_max > 0 )) || fail "WBABD_BATCH_MAX_ITEMS must be > 0"
+  [[ "${run_workers}" =~ ^[0-9]+$ ]] || fail "WBABD_RUN_WORKERS must be an integer: ${run_workers}"
+  (( run_workers > 0 )) || fail "WBABD_RUN_WORKERS must be > 0"
+  [[ "${max_queued}" =~ ^[0-9]+$ ]] || fail "WBABD_MAX_QUEUED_RUNS must be an integer: ${max_queued}"
+  [[ "${max_inflight}" =~ ^[0-9]+$ ]] || fail "WBABD_MAX_INFLIGHT_REQUESTS must be an integer: ${max_inflight}"
+  [[ "${events_max}" =~ ^[0-9]+$ ]] || fail "WBABD_EVENTS_MAX_SUBSCRIBERS must be an integer: ${events_max}"
+  (( events_max > 0 )) || fail "WBABD_EVENTS_MAX_SUBSCRIBERS must be > 0"
+  [[ "${drain_timeout}" =~ ^[0-9]+([.][0-9]+)?$ ]] || fail "WBABD_DRAIN_TIMEOUT_SECS must be a non-negative number: ${drain_timeout}"
+  [[ "${prune_age}" =~ ^[0-9]+$ ]] || fail "WBABD_SANDBOX_PRUNE_AGE_SECS must be an integer: ${prune_age}"
+  [[ "${discovery_probe}" =~ ^[0-9]+([.][0-9]+)?$ ]] || fail "WBABD_DISCOVERY_PROBE_SECS must be a non-negative number: ${discovery_probe}"
+  [[ "${discovery_load}" =~ ^[0-9]+([.][0-9]+)?$ ]] || fail "WBABD_DISCOVERY_LOAD_INTERVAL_SECS must be a non-negative number: ${discovery_load}"
+  [[ "${forward_min_disk}" =~ ^[0-9]+$ ]] || fail "WBABD_FORWARD_MIN_DISK_FREE_MB must be an integer: ${forward_min_disk}"
+  if [[ -n "${WBABD_FORWARD_TOKEN_FILE:-}" && ! -r "${WBABD_FORWARD_TOKEN_FILE}" ]]; then
+    fail "WBABD_FORWARD_TOKEN_FILE is not readable: ${WBABD_FORWARD_TOKEN_FILE}"
+  fi
+  if [[ "${WBABD_FORWARD_RUNS:-0}" == "1" && -z "${WBABD_FORWARD_TOKEN:-}" && -z "${WBABD_FORWARD_TOKEN_FILE:-}" ]]; then
+    fail "WBABD_FORWARD_RUNS=1 requires WBABD_FORWARD_TOKEN or WBABD_FORWARD_TOKEN_FILE"
+  fi
+  [[ "${forward_plaintext}" =~ ^[01]$ ]] || fail "WBABD_FORWARD_ALLOW_PLAINTEXT must be 0 or 1: ${forward_plaintext}"
+  [[ "${lease_secs}" =~ ^[0-9]+([.][0-9]+)?$ ]] && [[ ! "${lease_secs}" =~ ^0*([.]0*)?$ ]] || fail "WBAB_IDEMPOTENCY_LEASE_SECS must be a positive number: ${lease_secs}"
+  [[ "${registry}" =~ ^(local|sqlite:.+|https?://.+|unix://.+)$ ]] || fail "WBAB_IDEMPOTENCY_REGISTRY must be local, sqlite:<path> or a lease service URL: ${registry}"
+  [[ "${smoke_pool}" =~ ^[0-9]+$ ]] || fail "WBABD_SMOKE_POOL_SIZE must be an integer: ${smoke_pool}"
+  [[ "${sbom_disable}" =~ ^[01]$ ]] || fail "WBAB_SBOM_DISABLE must be 0 or 1: ${sbom_disable}"
+  [[ "${sbom_strict}" =~ ^[01]$ ]] || fail "WBAB_SBOM_STRICT must be 0 or 1: ${sbom_strict}"
+  [[ "${trace_disable}" =~ ^[01]$ ]] || fail "WBAB_TRACE_DISABLE must be 0 or 1: ${trace_disable}"
+  [[ "${trace_max_bytes}" =~ ^[0-9]+$ ]] && (( trace_max_bytes > 0 )) || fail "WBAB_TRACE_MAX_BYTES must be a positive integer: ${trace_max_bytes}"
+  [[ "${trace_keep}" =~ ^[0-9]+$ ]] && (( trace_keep > 0 )) || fail "WBAB_TRACE_KEEP must be a positive integer: ${trace_keep}"
+  [[ "${trace_slow}" =~ ^[0-9]+([.][0-9]+)?$ ]] || fail "WBAB_TRACE_SLOW_SECS must be a non-negative number: ${trace_slow}"
+  [[ "${profile_mode}" =~ ^(off|cprofile|sample)$ ]] || fail "WBABD_PROFILE must be off, cprofile or sample: ${profile_mode}"
 
   set +e
   python3 - "${timeout}" <<'PY'
@@ -123,13 +182,19 @@ for principal, entry in principals.items():
     if not isinstance(verbs, list) or not all(isinstance(v, str) and v.strip() for v in verbs):
         print(f"principal requires verbs[]: {principal}", file=sys.stderr)
         raise SystemExit(6)
+peers = raw.get("peers", {})
+if not isinstance(peers, dict) or not all(
+    isinstance(v, str) and v.strip() and str(k).partition(":")[0] in {"uid", "gid", "user"} for k, v in peers.items()
+):
+    print("peers must map uid:<n>/gid:<n>/user:<name> to principal names", file=sys.stderr)
+    raise SystemExit(7)
 PY
   local rc=$?
   set -e
   case "${rc}" in
     0) ;;
     2) fail "WBABD_AUTHZ_POLICY_FILE is invalid json: ${path}" ;;
-    3|4|5|6) fail "WBABD_AUTHZ_POLICY_FILE schema invalid: ${path}" ;;
+    3|4|5|6|7) fail "WBABD_AUTHZ_POLICY_FILE schema invalid: ${path}" ;;
     *) fail "WBABD_AUTHZ_POLICY_FILE validation failed: ${path}" ;;
   esac
 }
@@ -18,6 +18,7 @@ export WBAB_MOCK_EXECUTOR=1
 "${ROOT_DIR}/tests/shell/test_dev_cert_lifecycle.sh"
 "${ROOT_DIR}/tests/shell/test_signing_pki_lifecycle.sh"
 "${ROOT_DIR}/tests/shell/test_sign_dev_cert_mode.sh"
+"${ROOT_DIR}/tests/shell/test_sign_batch.sh"
 "${ROOT_DIR}/tests/shell/test_smoke_trust_dev_cert.sh"
 "${ROOT_DIR}/tests/shell/test_e2e_real_requires_installer.sh"
 "${ROOT_DIR}/tests/shell/test_validate_installer_artifact.sh"
@@ -25,6 +26,25 @@ export WBAB_MOCK_EXECUTOR=1
 "${ROOT_DIR}/tests/shell/test_wbabd_idempotent.sh"
 "${ROOT_DIR}/tests/shell/test_wbabd_retry_resume.sh"
 "${ROOT_DIR}/tests/shell/test_wbabd_http_api.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_batch_api.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_http_keepalive.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_http_status_longpoll.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_admission.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_unix_socket.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_serve_workers.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_serve_drain.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_events_sse.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_thin_client.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_status_bulk.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_run_forwarding.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_idempotency_registry.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_run_coalescing.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_smoke_pool.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_metrics.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_trace.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_profile.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_loadgen.sh"
+"${ROOT_DIR}/tests/shell/test_wbabd_janitor.sh"
 "${ROOT_DIR}/tests/shell/test_wbabd_concurrency.sh"
 "${ROOT_DIR}/tests/shell/test_wbabd_audit_log.sh"
 "${ROOT_DIR}/tests/shell/test_wbabd_store_migration.sh"
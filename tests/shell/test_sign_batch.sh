@@ -0,0 +1,84 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+trap 'rm -rf "${TMP}"' EXIT
+
+mkdir -p "${TMP}/project/dist/sub" "${TMP}/cert" "${TMP}/mockbin"
+echo "pfx" > "${TMP}/cert/dev.pfx"
+echo "pass" > "${TMP}/cert/dev.pfx.pass"
+for name in A.exe B.dll sub/C.exe D.msi; do echo "unsigned ${name}" > "${TMP}/project/dist/${name}"; done
+
+# Mock osslsigncode: 1s per file, fails for inputs named *bad*.
+cat > "${TMP}/mockbin/osslsigncode" <<'MOCK'
+#!/usr/bin/env bash
+while (( $# )); do
+  case "$1" in
+    -in) in="$2"; shift ;;
+    -out) out="$2"; shift ;;
+  esac
+  shift
+done
+echo "${in}" >> "${MOCK_LOG}"
+sleep 1
+[[ "${in}" == *bad* ]] && { echo "bad signature input" >&2; exit 1; }
+{ cat "${in}"; echo "signature"; } > "${out}"
+MOCK
+chmod +x "${TMP}/mockbin/osslsigncode"
+
+export PATH="${TMP}/mockbin:${PATH}"
+export MOCK_LOG="${TMP}/ossl.log"
+export WBAB_SIGN_USE_DEV_CERT=1 WBAB_DEV_CERT_DIR="${TMP}/cert" WBAB_SIGN_JOBS=4
+manifest="${TMP}/project/dist/signed/sign-manifest.tsv"
+batch() {
+  (cd "${TMP}/project" && bash "${ROOT_DIR}/tools/signing/sign-batch.sh" 'dist/*.exe' 'dist/*.dll' 'dist/sub/*.exe' 'dist/*.msi')
+}
+statuses() {
+  awk -F'\t' 'NR > 1 { print $1 "=" $2 }' "${manifest}" | sort | tr '\n' ' '
+}
+
+# 1. Four artifacts are signed in parallel in one invocation.
+start="$(date +%s%N)"
+batch > "${TMP}/out1.log"
+elapsed_ms=$(( ($(date +%s%N) - start) / 1000000 ))
+(( elapsed_ms < 2500 )) || { echo "Expected parallel signing, took ${elapsed_ms}ms" >&2; exit 1; }
+[[ "$(statuses)" == "dist/A.exe=signed dist/B.dll=signed dist/D.msi=signed dist/sub/C.exe=signed " ]] || { echo "Unexpected manifest: $(statuses)" >&2; exit 1; }
+grep -q "signature" "${TMP}/project/dist/signed/sub/C.exe" || { echo "Expected mirrored signed output" >&2; exit 1; }
+
+# 2. A rerun skips everything already signed; changed inputs and tampered outputs are re-signed.
+: > "${MOCK_LOG}"
+batch > /dev/null
+[[ ! -s "${MOCK_LOG}" ]] || { echo "Expected no signer calls on rerun" >&2; cat "${MOCK_LOG}" >&2; exit 1; }
+[[ "$(statuses)" == "dist/A.exe=skipped dist/B.dll=skipped dist/D.msi=skipped dist/sub/C.exe=skipped " ]] || { echo "Unexpected manifest: $(statuses)" >&2; exit 1; }
+echo "changed" >> "${TMP}/project/dist/B.dll"
+echo "tampered" > "${TMP}/project/dist/signed/A.exe"
+batch > /dev/null
+[[ "$(statuses)" == "dist/A.exe=signed dist/B.dll=signed dist/D.msi=skipped dist/sub/C.exe=skipped " ]] || { echo "Unexpected manifest: $(statuses)" >&2; exit 1; }
+
+# 3. A failing file is recorded and fails the batch without stopping the others.
+echo "unsigned" > "${TMP}/project/dist/bad.exe"
+rc=0
+batch > /dev/null 2>&1 || rc=$?
+[[ "${rc}" == "1" ]] || { echo "Expected batch failure rc=1, got ${rc}" >&2; exit 1; }
+[[ "$(statuses)" == "dist/A.exe=skipped dist/B.dll=skipped dist/D.msi=skipped dist/bad.exe=failed dist/sub/C.exe=skipped " ]] || { echo "Unexpected manifest: $(statuses)" >&2; exit 1; }
+[[ ! -e "${TMP}/project/dist/signed/bad.exe" ]] || { echo "Failed output must not be left behind" >&2; exit 1; }
+
+# 4. sign-dev.sh batch mode runs the batch script in a single signer container.
+mkdir -p "${TMP}/repo/tools/signing" "${TMP}/repo/scripts/signing"
+cp "${ROOT_DIR}/tools/sign-dev.sh" "${TMP}/repo/tools/sign-dev.sh"
+cp "${ROOT_DIR}/tools/signing/sign-batch.sh" "${TMP}/repo/tools/signing/sign-batch.sh"
+cat > "${TMP}/mockbin/docker" <<'MOCK'
+#!/usr/bin/env bash
+echo "DOCKER $*" >> "${DOCKER_LOG}"
+MOCK
+chmod +x "${TMP}/mockbin/docker"
+DOCKER_LOG="${TMP}/docker.log" WBAB_SIGN_BATCH=1 WBAB_SIGN_AUTOGEN_DEV_CERT=0 WBAB_SIGN_BATCH_GLOB="dist/*.exe" \
+  bash "${TMP}/repo/tools/sign-dev.sh" "${TMP}/project"
+[[ "$(grep -c '^DOCKER run ' "${TMP}/docker.log")" == "1" ]] || { echo "Expected one signer container" >&2; cat "${TMP}/docker.log" >&2; exit 1; }
+run="$(grep '^DOCKER run ' "${TMP}/docker.log")"
+for expected in "sign-batch.sh:/opt/wbab/sign-batch.sh:ro" "WBAB_SIGN_JOBS=4" "WBAB_SIGN_BATCH_GLOB=dist/\*.exe" "WBAB_DEV_CERT_DIR=/opt/wbab/dev-cert" "bash /opt/wbab/sign-batch.sh"; do
+  grep -q -- "${expected}" <<< "${run}" || { echo "Expected '${expected}' in: ${run}" >&2; exit 1; }
+done
+
+echo "OK: batch signing"
@@ -0,0 +1,96 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+SERVER_PID=""
+cleanup() {
+  if [[ -n "${SERVER_PID}" ]]; then
+    kill "${SERVER_PID}" 2>/dev/null || true
+    wait "${SERVER_PID}" 2>/dev/null || true
+  fi
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+mkdir -p "${TMP}/tools" "${TMP}/core"
+cp "${ROOT_DIR}/tools/wbabd" "${TMP}/tools/wbabd"
+cp -r "${ROOT_DIR}/core/"* "${TMP}/core/"
+chmod +x "${TMP}/tools/wbabd"
+
+cat > "${TMP}/authz-policy.json" <<'EOF'
+{
+  "principals": {
+    "burst-client": { "verbs": ["health", "status"] },
+    "other-client": { "verbs": ["health", "status"] },
+    "*": { "verbs": ["health", "status"] }
+  }
+}
+EOF
+
+(
+  cd "${TMP}"
+  WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 \
+  WBABD_STORE_PATH="${TMP}/store.sqlite" WBABD_AUDIT_LOG_PATH="${TMP}/audit.sqlite" \
+  WBABD_RATE_LIMIT_PER_SEC=0.5 WBABD_RATE_LIMIT_BURST=2 WBABD_AUTHZ_POLICY_FILE="${TMP}/authz-policy.json" \
+  exec ./tools/wbabd serve --host 127.0.0.1 --port 0 > "${TMP}/serve.out" 2> "${TMP}/serve.err"
+) &
+SERVER_PID=$!
+
+port=""
+for _ in $(seq 1 100); do
+  port="$(python3 -c 'import json,sys; print(json.loads(open(sys.argv[1]).readline())["port"])' "${TMP}/serve.out" 2>/dev/null || true)"
+  [[ -n "${port}" ]] && break
+  sleep 0.1
+done
+[[ -n "${port}" ]] || { echo "wbabd serve did not start" >&2; cat "${TMP}/serve.err" >&2; exit 1; }
+
+python3 - "${port}" <<'PY'
+import http.client
+import json
+import os
+import sys
+
+port = int(sys.argv[1])
+
+
+def get(path, principal):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request("GET", path, headers={"X-WBABD-Principal": principal})
+    resp = conn.getresponse()
+    data = resp.read()
+    conn.close()
+    return resp, data
+
+
+# 1. A principal over its token bucket gets 429 with a computed Retry-After.
+for _ in range(2):
+    resp, _ = get("/status/none", "burst-client")
+    assert resp.status == 404, resp.status
+resp, data = get("/status/none", "burst-client")
+assert resp.status == 429, resp.status
+assert resp.getheader("Retry-After") == "2", resp.getheader("Retry-After")
+assert json.loads(data)["error"] == "rate_limited"
+
+# 2. Other principals keep their own budget; health probes are never limited.
+resp, _ = get("/status/none", "other-client")
+assert resp.status == 404, resp.status
+for _ in range(5):
+    resp, _ = get("/health", "burst-client")
+    assert resp.status == 200, resp.status
+
+# 3. Load counters are exposed.
+resp, data = get("/load", "burst-client")
+assert resp.status == 200, resp.status
+load = json.loads(data)
+assert load["rejected"]["rate_limited"] == 1, load
+assert load["runs_queued"] == 0 and load["run_workers"] == min(32, (os.cpu_count() or 1) + 4), load
+# No caps unless configured: the in-flight limit and run queue bound are off by default.
+assert load["max_in_flight"] == 0 and load["max_queued_runs"] is None, load
+
+# 4. Principals the policy does not name share their address's bucket, so rotating them gains nothing.
+codes = [get("/status/none", f"rotating-{i}")[0].status for i in range(3)]
+assert codes == [404, 404, 429], codes
+PY
+
+echo "OK: wbabd admission control"
@@ -72,4 +72,52 @@ set -e
 [[ "${rc_status_denied}" -ne 0 ]] || { echo "Expected status denial for unknown principal" >&2; exit 1; }
 grep -q '"error": "forbidden"' <<< "${status_denied}" || { echo "Expected forbidden status denial" >&2; exit 1; }
 
+# plan-time prefetch only starts for principals that may also run the verb
+policy_prefetch="${TMP}/authz-policy-prefetch.json"
+cat > "${policy_prefetch}" <<'EOF'
+{
+  "principals": {
+    "builder": { "verbs": ["plan", "run:build"] },
+    "planner": { "verbs": ["plan"] }
+  }
+}
+EOF
+(
+  cd "${TMP}"
+  exec env WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 WBABD_SOURCE_PREFETCH=1 \
+    WBABD_AUTHZ_POLICY_FILE="${policy_prefetch}" WBABD_STORE_PATH="${TMP}/serve-store.sqlite" \
+    WBABD_AUDIT_LOG_PATH="${TMP}/serve-audit.sqlite" ./tools/wbabd serve --host 127.0.0.1 --port 0 \
+    > "${TMP}/serve.out" 2> "${TMP}/serve.err"
+) &
+serve_pid=$!
+trap 'kill "${serve_pid}" 2>/dev/null || true; wait "${serve_pid}" 2>/dev/null || true; rm -rf "${TMP}"' EXIT
+for _ in $(seq 1 100); do
+  [[ -s "${TMP}/serve.out" ]] && break
+  sleep 0.1
+done
+[[ -s "${TMP}/serve.out" ]] || { echo "wbabd serve did not start" >&2; cat "${TMP}/serve.err" >&2; exit 1; }
+
+python3 - "${TMP}/serve.out" <<'PY'
+import http.client
+import json
+import sys
+
+port = json.loads(open(sys.argv[1]).readline())["port"]
+
+
+def plan(principal, op_id):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    body = {"op_id": op_id, "verb": "build", "args": ["."], "git_url": "https://git.invalid/app.git", "git_ref": "main"}
+    conn.request("POST", "/plan", body=json.dumps(body), headers={"X-WBABD-Principal": principal})
+    resp = conn.getresponse()
+    data = json.loads(resp.read())
+    conn.close()
+    assert resp.status == 200, (resp.status, data)
+    return data
+
+
+assert plan("builder", "prefetch-op-1").get("prefetch") == "scheduled"
+assert "prefetch" not in plan("planner", "prefetch-op-2")
+PY
+
 echo "OK: wbabd authz policy enforcement"
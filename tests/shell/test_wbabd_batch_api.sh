@@ -0,0 +1,149 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+SERVER_PID=""
+cleanup() {
+  if [[ -n "${SERVER_PID}" ]]; then
+    kill "${SERVER_PID}" 2>/dev/null || true
+    wait "${SERVER_PID}" 2>/dev/null || true
+  fi
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+mkdir -p "${TMP}/tools" "${TMP}/core"
+cp "${ROOT_DIR}/tools/wbabd" "${TMP}/tools/wbabd"
+cp -r "${ROOT_DIR}/core/"* "${TMP}/core/"
+chmod +x "${TMP}/tools/wbabd"
+
+cat > "${TMP}/tools/winbuild-build.sh" <<'EOF'
+#!/usr/bin/env bash
+set -euo pipefail
+sleep "${BUILD_SLEEP:-0}"
+mkdir -p out
+echo "artifact" > out/FakeApp.exe
+EOF
+chmod +x "${TMP}/tools/winbuild-build.sh"
+
+policy="${TMP}/authz-policy.json"
+cat > "${policy}" <<'EOF'
+{
+  "principals": {
+    "builder": { "verbs": ["health", "status", "plan", "run:build"] }
+  }
+}
+EOF
+
+store="${TMP}/store.sqlite"
+audit="${TMP}/audit.sqlite"
+
+api() {
+  (
+    cd "${TMP}"
+    WBAB_MOCK_EXECUTOR=1 WBABD_STORE_PATH="${store}" WBABD_AUDIT_LOG_PATH="${audit}" \
+    WBABD_AUTHZ_POLICY_FILE="${policy}" WBABD_PRINCIPAL=builder WBABD_BATCH_MAX_ITEMS=5 \
+    ./tools/wbabd api "$1"
+  )
+}
+
+# 1. Mixed batch: results come back in request order, failures are per item.
+set +e
+resp="$(api '{"op":"batch","requests":[
+  {"op":"plan","op_id":"batch-op-1","verb":"build","args":["."]},
+  {"op":"run","op_id":"batch-op-1","verb":"build","args":["."]},
+  {"op":"status","op_id":"batch-op-1"},
+  {"op":"run","op_id":"batch-op-2","verb":"package","args":["."]},
+  {"op":"health"}
+]}')"
+rc=$?
+set -e
+[[ "${rc}" -eq 1 ]] || { echo "Expected exit 1 when a batch item fails (rc=${rc})" >&2; exit 1; }
+python3 - "${resp}" <<'PY'
+import json
+import sys
+
+resp = json.loads(sys.argv[1])
+codes = [r["code"] for r in resp["results"]]
+assert codes == [200, 200, 200, 403, 400], codes
+assert resp["results"][0]["body"]["op_id"] == "batch-op-1"
+assert resp["results"][1]["body"]["status"] == "succeeded"
+assert resp["results"][2]["body"]["status"] == "succeeded"
+assert resp["results"][3]["body"]["error"] == "forbidden"
+assert resp["failed"] == 2
+PY
+
+# 2. Authz/summary events for the batch land together; one summary per batch.
+python3 - "${audit}" <<'PY'
+import sqlite3
+import sys
+
+with sqlite3.connect(sys.argv[1]) as conn:
+    counts = dict(conn.execute(
+        "SELECT event_type, COUNT(*) FROM audit_events WHERE event_type IN ('command.batch','authz.allowed','authz.denied') GROUP BY event_type"
+    ).fetchall())
+assert counts == {"command.batch": 1, "authz.allowed": 3, "authz.denied": 1}, counts
+PY
+
+# 3. Oversized batches are rejected before any item runs.
+set +e
+too_big="$(api '{"op":"batch","requests":[{"op":"health"},{"op":"health"},{"op":"health"},{"op":"health"},{"op":"health"},{"op":"health"}]}')"
+rc=$?
+set -e
+[[ "${rc}" -ne 0 ]] || { echo "Expected oversized batch to fail" >&2; exit 1; }
+grep -q 'batch_too_large:6>5' <<< "${too_big}" || { echo "Expected batch_too_large error" >&2; echo "${too_big}" >&2; exit 1; }
+
+# 4. HTTP adapter: POST /batch.
+mkdir -p "${TMP}/ws/1" "${TMP}/ws/2" "${TMP}/ws/3"
+(
+  cd "${TMP}"
+  WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 WBAB_MOCK_EXECUTOR=1 \
+  WBABD_STORE_PATH="${store}" WBABD_AUDIT_LOG_PATH="${audit}" BUILD_SLEEP=1 \
+  exec ./tools/wbabd serve --host 127.0.0.1 --port 0 > "${TMP}/serve.out" 2> "${TMP}/serve.err"
+) &
+SERVER_PID=$!
+
+port=""
+for _ in $(seq 1 100); do
+  port="$(python3 -c 'import json,sys; print(json.loads(open(sys.argv[1]).readline())["port"])' "${TMP}/serve.out" 2>/dev/null || true)"
+  [[ -n "${port}" ]] && break
+  sleep 0.1
+done
+[[ -n "${port}" ]] || { echo "wbabd serve did not start" >&2; cat "${TMP}/serve.err" >&2; exit 1; }
+
+python3 - "${port}" <<'PY'
+import http.client
+import json
+import sys
+import time
+
+conn = http.client.HTTPConnection("127.0.0.1", int(sys.argv[1]), timeout=10)
+body = {"requests": [{"op": "status", "op_id": "batch-op-1"}, {"op": "status", "op_id": "missing"}]}
+conn.request("POST", "/batch", body=json.dumps(body))
+resp = conn.getresponse()
+assert resp.status == 200, resp.status
+results = json.loads(resp.read())["results"]
+assert [r["code"] for r in results] == [200, 404], results
+assert results[0]["body"]["status"] == "succeeded"
+
+# Run items are dispatched like POST /run and answered concurrently, in request order;
+# duplicates of one op_id join a single execution.
+items = [{"op": "run", "op_id": f"batch-http-{i}", "verb": "build", "args": [f"ws/{i}"]} for i in (1, 2, 3, 1)]
+items.insert(2, {"op": "status", "op_id": "batch-op-1"})
+started = time.monotonic()
+conn.request("POST", "/batch", body=json.dumps({"requests": items}))
+resp = conn.getresponse()
+assert resp.status == 200, resp.status
+results = json.loads(resp.read())["results"]
+elapsed = time.monotonic() - started
+assert [r["code"] for r in results] == [200] * 5, results
+assert [r["body"]["op_id"] for r in results] == ["batch-http-1", "batch-http-2", "batch-op-1", "batch-http-3", "batch-http-1"], results
+assert all(r["body"]["status"] == "succeeded" for r in results), results
+assert elapsed < 2.5, f"batch runs were not concurrent: {elapsed:.2f}s"
+conn.request("GET", "/load")
+load = json.loads(conn.getresponse().read())
+assert load["runs_coalesced"] >= 1, load
+PY
+
+echo "OK: wbabd batch API"
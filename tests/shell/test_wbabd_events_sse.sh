@@ -0,0 +1,121 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+SERVER_PID=""
+cleanup() {
+  if [[ -n "${SERVER_PID}" ]]; then
+    kill "${SERVER_PID}" 2>/dev/null || true
+    wait "${SERVER_PID}" 2>/dev/null || true
+  fi
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+mkdir -p "${TMP}/tools" "${TMP}/core"
+cp "${ROOT_DIR}/tools/wbabd" "${TMP}/tools/wbabd"
+cp -r "${ROOT_DIR}/core/"* "${TMP}/core/"
+chmod +x "${TMP}/tools/wbabd"
+
+cat > "${TMP}/tools/winbuild-build.sh" <<'EOF'
+#!/usr/bin/env bash
+set -euo pipefail
+mkdir -p out
+echo "artifact" > out/FakeApp.exe
+EOF
+chmod +x "${TMP}/tools/winbuild-build.sh"
+
+(
+  cd "${TMP}"
+  WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 WBAB_MOCK_EXECUTOR=1 \
+  WBABD_STORE_PATH="${TMP}/store.sqlite" WBABD_AUDIT_LOG_PATH="${TMP}/audit.sqlite" \
+  exec ./tools/wbabd serve --host 127.0.0.1 --port 0 > "${TMP}/serve.out" 2> "${TMP}/serve.err"
+) &
+SERVER_PID=$!
+
+port=""
+for _ in $(seq 1 100); do
+  port="$(python3 -c 'import json,sys; print(json.loads(open(sys.argv[1]).readline())["port"])' "${TMP}/serve.out" 2>/dev/null || true)"
+  [[ -n "${port}" ]] && break
+  sleep 0.1
+done
+[[ -n "${port}" ]] || { echo "wbabd serve did not start" >&2; cat "${TMP}/serve.err" >&2; exit 1; }
+
+python3 - "${port}" <<'PY'
+import http.client
+import json
+import sys
+
+port = int(sys.argv[1])
+
+
+def subscribe(path, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("GET", path, headers=headers or {})
+    resp = conn.getresponse()
+    assert resp.status == 200, resp.status
+    assert resp.getheader("Content-Type", "").startswith("text/event-stream"), resp.getheaders()
+    return conn, resp
+
+
+def read_until(resp, event_type):
+    events, frame = [], {}
+    while True:
+        line = resp.readline().decode().rstrip("\n")
+        if line:
+            key, _, value = line.partition(": ")
+            frame[key] = value
+            continue
+        if "data" in frame:
+            event = json.loads(frame["data"])
+            assert str(event["id"]) == frame["id"] and event["event_type"] == frame["event"], frame
+            events.append(event)
+            if event["event_type"] == event_type:
+                return events
+        frame = {}
+
+
+def run(op_id):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("POST", "/run", body=json.dumps({"op_id": op_id, "verb": "build", "args": ["."]}),
+                 headers={"X-WBABD-Principal": "ci-stage"})
+    resp = conn.getresponse()
+    body = json.loads(resp.read())
+    conn.close()
+    assert resp.status == 200 and body["status"] == "succeeded", (resp.status, body)
+
+
+# 1. A live subscriber sees each transition of its operation, and only that one.
+conn, resp = subscribe("/events?op_id=sse-op-1")
+run("sse-op-0")
+run("sse-op-1")
+events = read_until(resp, "operation.succeeded")
+conn.close()
+types = [e["event_type"] for e in events]
+assert types[0] == "operation.started" and "step.started" in types and "step.succeeded" in types, types
+assert all(e["op_id"] == "sse-op-1" for e in events), events
+assert all(e["principal"] == "ci-stage" for e in events), events
+assert [e["id"] for e in events] == sorted(e["id"] for e in events), events
+
+# 2. Last-Event-ID resumes right after the given event, replayed from the audit log.
+conn, resp = subscribe("/events?op_id=sse-op-1", {"Last-Event-ID": str(events[1]["id"])})
+resumed = read_until(resp, "operation.succeeded")
+conn.close()
+assert [e["id"] for e in resumed] == [e["id"] for e in events[2:]], (resumed, events)
+
+# 3. Filters combine: principal plus verb, replayed from the start of the log.
+conn, resp = subscribe("/events?principal=ci-stage&verb=build&last_event_id=0")
+replayed = read_until(resp, "operation.succeeded")
+conn.close()
+assert replayed[0]["op_id"] == "sse-op-0" and replayed[-1]["op_id"] == "sse-op-0", replayed
+
+# 4. A malformed cursor is rejected.
+conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+conn.request("GET", "/events", headers={"Last-Event-ID": "abc"})
+resp = conn.getresponse()
+assert resp.status == 400, resp.status
+conn.close()
+PY
+
+echo "OK: wbabd server-sent event stream"
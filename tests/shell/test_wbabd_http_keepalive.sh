@@ -0,0 +1,87 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+SERVER_PID=""
+cleanup() {
+  if [[ -n "${SERVER_PID}" ]]; then
+    kill "${SERVER_PID}" 2>/dev/null || true
+    wait "${SERVER_PID}" 2>/dev/null || true
+  fi
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+mkdir -p "${TMP}/tools" "${TMP}/core"
+cp "${ROOT_DIR}/tools/wbabd" "${TMP}/tools/wbabd"
+cp -r "${ROOT_DIR}/core/"* "${TMP}/core/"
+chmod +x "${TMP}/tools/wbabd"
+
+(
+  cd "${TMP}"
+  WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 \
+  WBABD_STORE_PATH="${TMP}/store.sqlite" WBABD_AUDIT_LOG_PATH="${TMP}/audit.sqlite" \
+  WBABD_HTTP_MAX_REQUESTS_PER_CONN=3 WBABD_HTTP_REQUEST_TIMEOUT_SECS=1 \
+  exec ./tools/wbabd serve --host 127.0.0.1 --port 0 > "${TMP}/serve.out" 2> "${TMP}/serve.err"
+) &
+SERVER_PID=$!
+
+port=""
+for _ in $(seq 1 100); do
+  port="$(python3 -c 'import json,sys; print(json.loads(open(sys.argv[1]).readline())["port"])' "${TMP}/serve.out" 2>/dev/null || true)"
+  [[ -n "${port}" ]] && break
+  sleep 0.1
+done
+[[ -n "${port}" ]] || { echo "wbabd serve did not start" >&2; cat "${TMP}/serve.err" >&2; exit 1; }
+
+python3 - "${port}" <<'PY'
+import http.client
+import socket
+import sys
+import time
+
+port = int(sys.argv[1])
+
+# 1. Sequential requests reuse one connection until max requests per connection.
+conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+for i in range(3):
+    conn.request("GET", "/health")
+    resp = conn.getresponse()
+    assert resp.status == 200, resp.status
+    resp.read()
+    if i == 0:
+        sock = conn.sock
+        assert resp.getheader("Connection") == "keep-alive", resp.getheader("Connection")
+        assert "max=3" in (resp.getheader("Keep-Alive") or ""), resp.getheader("Keep-Alive")
+    if i < 2:
+        assert conn.sock is sock, "expected connection reuse"
+assert resp.getheader("Connection") == "close", "expected close on last allowed request"
+conn.close()
+
+# 2. Pipelined requests are answered in order on one socket.
+s = socket.create_connection(("127.0.0.1", port), timeout=5)
+s.sendall(
+    b"GET /health HTTP/1.1\r\nHost: x\r\n\r\n"
+    b"GET /status/missing-op HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n"
+)
+data = b""
+while True:
+    chunk = s.recv(65536)
+    if not chunk:
+        break
+    data += chunk
+s.close()
+first = data.find(b"HTTP/1.1 200")
+second = data.find(b"HTTP/1.1 404")
+assert 0 <= first < second, data
+
+# 3. Idle connections are closed after WBABD_HTTP_REQUEST_TIMEOUT_SECS.
+s = socket.create_connection(("127.0.0.1", port), timeout=5)
+start = time.monotonic()
+assert s.recv(1) == b"", "expected idle connection to be closed"
+assert time.monotonic() - start < 4
+s.close()
+PY
+
+echo "OK: wbabd HTTP keep-alive and pipelining"
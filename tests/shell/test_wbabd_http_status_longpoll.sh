@@ -0,0 +1,124 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+SERVER_PID=""
+cleanup() {
+  if [[ -n "${SERVER_PID}" ]]; then
+    kill "${SERVER_PID}" 2>/dev/null || true
+    wait "${SERVER_PID}" 2>/dev/null || true
+  fi
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+mkdir -p "${TMP}/tools" "${TMP}/core"
+cp "${ROOT_DIR}/tools/wbabd" "${TMP}/tools/wbabd"
+cp -r "${ROOT_DIR}/core/"* "${TMP}/core/"
+chmod +x "${TMP}/tools/wbabd"
+
+cat > "${TMP}/tools/winbuild-build.sh" <<'EOF'
+#!/usr/bin/env bash
+set -euo pipefail
+mkdir -p out
+echo "artifact" > out/FakeApp.exe
+EOF
+chmod +x "${TMP}/tools/winbuild-build.sh"
+
+(
+  cd "${TMP}"
+  WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 \
+  WBABD_STORE_PATH="${TMP}/store.sqlite" WBABD_AUDIT_LOG_PATH="${TMP}/audit.sqlite" \
+  WBAB_MOCK_EXECUTOR=1 WBABD_STATUS_MAX_WAIT_SECS=5 \
+  exec ./tools/wbabd serve --host 127.0.0.1 --port 0 > "${TMP}/serve.out" 2> "${TMP}/serve.err"
+) &
+SERVER_PID=$!
+
+port=""
+for _ in $(seq 1 100); do
+  port="$(python3 -c 'import json,sys; print(json.loads(open(sys.argv[1]).readline())["port"])' "${TMP}/serve.out" 2>/dev/null || true)"
+  [[ -n "${port}" ]] && break
+  sleep 0.1
+done
+[[ -n "${port}" ]] || { echo "wbabd serve did not start" >&2; cat "${TMP}/serve.err" >&2; exit 1; }
+
+python3 - "${port}" "${TMP}" <<'PY'
+import http.client
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+port = int(sys.argv[1])
+tmp = Path(sys.argv[2])
+sys.path.insert(0, str(tmp))
+
+
+def request(method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers or {})
+    resp = conn.getresponse()
+    data = resp.read()
+    conn.close()
+    return resp, data
+
+
+def long_poll(path, out):
+    start = time.monotonic()
+    resp, data = request("GET", path)
+    out.update(status=resp.status, elapsed=time.monotonic() - start, data=data, etag=resp.getheader("ETag"))
+
+
+# 1. Status responses carry a version ETag; a matching If-None-Match gets 304.
+resp, _ = request("POST", "/run", {"op_id": "lp-op-1", "verb": "build", "args": ["."]})
+assert resp.status == 200, resp.status
+resp, data = request("GET", "/status/lp-op-1")
+etag = resp.getheader("ETag")
+assert resp.status == 200 and etag and etag.startswith('W/"'), (resp.status, etag)
+assert json.loads(data)["status"] == "succeeded"
+resp, data = request("GET", "/status/lp-op-1", headers={"If-None-Match": etag})
+assert resp.status == 304 and data == b"", (resp.status, data)
+assert resp.getheader("ETag") == etag
+
+# 2. A long-poll with an unchanged version times out with the body; only a conditional one gets 304.
+version = etag[3:-1]
+start = time.monotonic()
+resp, data = request("GET", f"/status/lp-op-1?wait=1&since={version}")
+assert resp.status == 200 and json.loads(data)["status"] == "succeeded", (resp.status, data)
+assert 0.9 <= time.monotonic() - start < 3
+start = time.monotonic()
+resp, data = request("GET", "/status/lp-op-1?wait=1", headers={"If-None-Match": etag})
+assert resp.status == 304 and data == b"", (resp.status, data)
+assert 0.9 <= time.monotonic() - start < 3
+
+# 3. A parked long-poll is woken by a run in the daemon process.
+out = {}
+t = threading.Thread(target=long_poll, args=("/status/lp-op-2?wait=5&since=0", out))
+t.start()
+time.sleep(0.3)
+resp, _ = request("POST", "/run", {"op_id": "lp-op-2", "verb": "build", "args": ["."]})
+assert resp.status == 200, resp.status
+t.join()
+assert out["status"] == 200 and out["elapsed"] < 3, out
+assert out["etag"] != 'W/"0"'
+
+# 4. Writes from another process sharing the store are picked up as well.
+from core.wbab_core import OperationStore  # noqa: E402
+
+out = {}
+t = threading.Thread(target=long_poll, args=("/status/lp-op-3?wait=5&since=0", out))
+t.start()
+time.sleep(0.3)
+OperationStore(tmp / "store.sqlite").upsert("lp-op-3", {"op_id": "lp-op-3", "status": "running"})
+t.join()
+assert out["status"] == 200 and out["elapsed"] < 3, out
+assert json.loads(out["data"])["status"] == "running"
+
+# 5. Malformed long-poll parameters are rejected.
+resp, _ = request("GET", "/status/lp-op-1?wait=soon")
+assert resp.status == 400, resp.status
+PY
+
+echo "OK: wbabd HTTP status ETag and long-poll"
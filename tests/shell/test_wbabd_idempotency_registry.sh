@@ -0,0 +1,104 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+PIDS=()
+cleanup() {
+  for pid in "${PIDS[@]}"; do
+    kill "${pid}" 2>/dev/null || true
+    wait "${pid}" 2>/dev/null || true
+  done
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+# Two nodes with their own stores; every build appends to one shared file so duplicates are visible.
+for name in a b; do
+  mkdir -p "${TMP}/${name}/tools" "${TMP}/${name}/core"
+  cp "${ROOT_DIR}/tools/wbabd" "${TMP}/${name}/tools/wbabd"
+  cp -r "${ROOT_DIR}/core/"* "${TMP}/${name}/core/"
+  chmod +x "${TMP}/${name}/tools/wbabd"
+  cat > "${TMP}/${name}/tools/winbuild-build.sh" <<EOF
+#!/usr/bin/env bash
+set -euo pipefail
+echo "${name}" >> "${TMP}/builds.log"
+sleep 1
+mkdir -p out
+echo "artifact" > out/FakeApp.exe
+EOF
+  chmod +x "${TMP}/${name}/tools/winbuild-build.sh"
+done
+
+start_daemon() {
+  local name="$1"
+  shift
+  (
+    cd "${TMP}/${name}"
+    exec env WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 WBAB_MOCK_EXECUTOR=1 \
+      WBABD_STORE_PATH="${TMP}/${name}/store.sqlite" WBABD_AUDIT_LOG_PATH="${TMP}/${name}/audit.sqlite" \
+      "$@" ./tools/wbabd serve --host 127.0.0.1 --port 0 > "${TMP}/${name}/serve.out" 2> "${TMP}/${name}/serve.err"
+  ) &
+  PIDS+=($!)
+  for _ in $(seq 1 100); do
+    [[ -s "${TMP}/${name}/serve.out" ]] && return 0
+    sleep 0.1
+  done
+  echo "wbabd serve (${name}) did not start" >&2
+  cat "${TMP}/${name}/serve.err" >&2
+  exit 1
+}
+
+# A keeps leases in its own store and serves them; B claims them from A over HTTP.
+start_daemon a
+port_a="$(python3 -c 'import json,sys; print(json.loads(open(sys.argv[1]).readline())["port"])' "${TMP}/a/serve.out")"
+start_daemon b WBAB_IDEMPOTENCY_REGISTRY="http://127.0.0.1:${port_a}" WBAB_IDEMPOTENCY_LEASE_SECS=2
+
+python3 - "${TMP}/a/serve.out" "${TMP}/b/serve.out" <<'PY'
+import json
+import sys
+import threading
+import urllib.request
+
+ports = [json.loads(open(p).readline())["port"] for p in sys.argv[1:3]]
+
+
+def run(port, op_id, out):
+    req = urllib.request.Request(
+        f"http://127.0.0.1:{port}/run",
+        data=json.dumps({"op_id": op_id, "verb": "build", "args": ["."]}).encode(),
+        method="POST",
+    )
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        out.append(json.loads(resp.read()))
+
+
+# 1. The same op_id sent to both nodes at once builds once; both callers get that build's result.
+results = []
+threads = [threading.Thread(target=run, args=(port, "dedup-1", results)) for port in ports]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+assert sorted(r["status"] for r in results) == ["succeeded", "succeeded"], results
+
+# 2. A retry on the node that did not build is answered from the registry.
+cached = []
+run(ports[1], "dedup-1", cached)
+assert cached[0]["status"] == "cached", cached
+PY
+
+[[ "$(wc -l < "${TMP}/builds.log")" == "1" ]] || { echo "Expected one build across nodes:" >&2; cat "${TMP}/builds.log" >&2; exit 1; }
+
+python3 - "${TMP}/a/audit.sqlite" "${TMP}/b/audit.sqlite" <<'PY'
+import sqlite3
+import sys
+
+joined = sum(
+    sqlite3.connect(path).execute("select count(*) from audit_events where event_type = 'operation.joined'").fetchone()[0]
+    for path in sys.argv[1:3]
+)
+assert joined == 1, joined
+PY
+
+echo "OK: wbabd cluster-wide op_id leases"
@@ -0,0 +1,97 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+SERVER_PID=""
+cleanup() {
+  if [[ -n "${SERVER_PID}" ]]; then
+    kill "${SERVER_PID}" 2>/dev/null || true
+    wait "${SERVER_PID}" 2>/dev/null || true
+  fi
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+mkdir -p "${TMP}/tools" "${TMP}/core"
+cp "${ROOT_DIR}/tools/wbabd" "${TMP}/tools/wbabd"
+cp -r "${ROOT_DIR}/core/"* "${TMP}/core/"
+chmod +x "${TMP}/tools/wbabd"
+cat > "${TMP}/tools/winbuild-lint.sh" <<'EOF2'
+#!/usr/bin/env bash
+exit 0
+EOF2
+chmod +x "${TMP}/tools/winbuild-lint.sh"
+
+# Store and audit log in their default place, agent-sandbox/state, aged past the prune age,
+# next to a stale and a fresh git source workspace and an unrelated old directory.
+STATE="${TMP}/agent-sandbox/state"
+mkdir -p "${STATE}" "${TMP}/agent-sandbox/git-source-old" "${TMP}/agent-sandbox/git-source-new" "${TMP}/agent-sandbox/out"
+(
+  cd "${TMP}"
+  WBABD_STORE_PATH="${STATE}/core-store.sqlite" WBABD_AUDIT_LOG_PATH="${STATE}/audit-log.sqlite" \
+    ./tools/wbabd api '{"op":"health"}' > /dev/null
+)
+touch -d "2 days ago" "${STATE}" "${TMP}/agent-sandbox/git-source-old" "${TMP}/agent-sandbox/out"
+
+start_server() {
+  (
+    cd "${TMP}"
+    exec env WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 WBAB_MOCK_EXECUTOR=1 \
+    WBABD_STORE_PATH="${STATE}/core-store.sqlite" WBABD_AUDIT_LOG_PATH="${STATE}/audit-log.sqlite" \
+    WBABD_JANITOR_INTERVAL_SECS=0.2 "$@" \
+    ./tools/wbabd serve --host 127.0.0.1 --port 0 > "${TMP}/serve.out" 2> "${TMP}/serve.err"
+  ) &
+  SERVER_PID=$!
+  port=""
+  for _ in $(seq 1 100); do
+    port="$(python3 -c 'import json,sys; print(json.loads(open(sys.argv[1]).readline())["port"])' "${TMP}/serve.out" 2>/dev/null || true)"
+    [[ -n "${port}" ]] && break
+    sleep 0.1
+  done
+  [[ -n "${port}" ]] || { echo "wbabd serve did not start" >&2; cat "${TMP}/serve.err" >&2; exit 1; }
+}
+
+stop_server() {
+  kill "${SERVER_PID}" 2>/dev/null || true
+  wait "${SERVER_PID}" 2>/dev/null || true
+  SERVER_PID=""
+}
+
+run_op() {
+  python3 - "${port}" "$1" <<'PY'
+import http.client, json, sys
+conn = http.client.HTTPConnection("127.0.0.1", int(sys.argv[1]), timeout=30)
+conn.request("POST", "/run", body=json.dumps({"op_id": sys.argv[2], "verb": "lint", "args": ["."]}))
+resp = conn.getresponse()
+body = json.loads(resp.read())
+assert resp.status == 200 and body["status"] == "succeeded", (resp.status, body)
+PY
+}
+
+# 1. Default janitor: zombie recovery only, nothing under agent-sandbox/ is pruned.
+start_server
+sleep 1
+[[ -d "${TMP}/agent-sandbox/git-source-old" ]] || { echo "Default janitor pruned a workspace" >&2; exit 1; }
+run_op janitor-1
+stop_server
+
+# 2. Opt-in pruning removes only stale git-source-* workspaces, never the store or audit log.
+start_server WBABD_SANDBOX_PRUNE_AGE_SECS=3600
+for _ in $(seq 1 50); do
+  [[ ! -d "${TMP}/agent-sandbox/git-source-old" ]] && break
+  sleep 0.1
+done
+[[ ! -d "${TMP}/agent-sandbox/git-source-old" ]] || { echo "Stale git source workspace was not pruned" >&2; exit 1; }
+[[ -d "${TMP}/agent-sandbox/git-source-new" ]] || { echo "Fresh git source workspace was pruned" >&2; exit 1; }
+[[ -d "${TMP}/agent-sandbox/out" ]] || { echo "Non-workspace directory was pruned" >&2; exit 1; }
+[[ -f "${STATE}/core-store.sqlite" && -f "${STATE}/audit-log.sqlite" ]] || { echo "Janitor deleted the store or audit log" >&2; exit 1; }
+sleep 0.5
+run_op janitor-2
+if grep -q "janitor:" "${TMP}/serve.err"; then
+  echo "Janitor reported errors:" >&2
+  cat "${TMP}/serve.err" >&2
+  exit 1
+fi
+
+echo "OK: wbabd janitor"
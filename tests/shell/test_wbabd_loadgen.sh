@@ -0,0 +1,84 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+SERVER_PID=""
+cleanup() {
+  if [[ -n "${SERVER_PID}" ]]; then
+    kill "${SERVER_PID}" 2>/dev/null || true
+    wait "${SERVER_PID}" 2>/dev/null || true
+  fi
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+mkdir -p "${TMP}/tools" "${TMP}/core"
+cp "${ROOT_DIR}/tools/wbabd" "${ROOT_DIR}/tools/wbabd-loadgen" "${TMP}/tools/"
+cp -r "${ROOT_DIR}/core/"* "${TMP}/core/"
+chmod +x "${TMP}/tools/wbabd" "${TMP}/tools/wbabd-loadgen"
+cat > "${TMP}/tools/winbuild-lint.sh" <<'EOF2'
+#!/usr/bin/env bash
+exit 0
+EOF2
+chmod +x "${TMP}/tools/winbuild-lint.sh"
+
+(
+  cd "${TMP}"
+  WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=token WBABD_API_TOKEN=load-token WBABD_ALLOW_MULTIPLE_INSTANCES=1 WBAB_MOCK_EXECUTOR=1 \
+  WBABD_STORE_PATH="${TMP}/store.sqlite" WBABD_AUDIT_LOG_PATH="${TMP}/audit.sqlite" \
+  exec ./tools/wbabd serve --host 127.0.0.1 --port 0 > "${TMP}/serve.out" 2> "${TMP}/serve.err"
+) &
+SERVER_PID=$!
+
+port=""
+for _ in $(seq 1 100); do
+  port="$(python3 -c 'import json,sys; print(json.loads(open(sys.argv[1]).readline())["port"])' "${TMP}/serve.out" 2>/dev/null || true)"
+  [[ -n "${port}" ]] && break
+  sleep 0.1
+done
+[[ -n "${port}" ]] || { echo "wbabd serve did not start" >&2; cat "${TMP}/serve.err" >&2; exit 1; }
+URL="http://127.0.0.1:${port}"
+
+# 1. Every request kind at a fixed rate, authenticated, with a JSON report.
+WBABD_API_TOKEN=load-token "${TMP}/tools/wbabd-loadgen" --url "${URL}" --rate 40 --duration 2 --connections 4 \
+  --mix health=1,status=2,plan=1,run=1,run_cached=1 --seed 7 --json --out "${TMP}/report.json" > "${TMP}/stdout.json"
+
+python3 - "${TMP}/report.json" "${TMP}/stdout.json" <<'PY'
+import json
+import sys
+
+report = json.load(open(sys.argv[1]))
+assert report == json.load(open(sys.argv[2]))
+assert 70 <= report["sent"] <= 90, report["sent"]
+assert report["completed"] == report["sent"], report
+overall = report["overall"]
+assert overall["errors"] == 0, report["kinds"]
+assert set(report["kinds"]) == {"health", "status", "plan", "run", "run_cached"}, report["kinds"].keys()
+lat = overall["latency_ms"]
+assert 0 < lat["p50"] <= lat["p95"] <= lat["p99"] <= lat["max"], lat
+assert sum(b["count"] for b in overall["histogram"]) == overall["count"]
+assert overall["histogram"][-1]["le_ms"] == "+Inf"
+PY
+
+# 2. Text report.
+text="$(WBABD_API_TOKEN=load-token "${TMP}/tools/wbabd-loadgen" --url "${URL}" --rate 20 --duration 1 --mix health=1 --arrival poisson)"
+grep -q '^health ' <<< "${text}" || { echo "Missing health row: ${text}" >&2; exit 1; }
+grep -q 'latency histogram' <<< "${text}" || { echo "Missing histogram: ${text}" >&2; exit 1; }
+
+# 3. A wrong token fails the seeding step and exits 2.
+set +e
+out="$("${TMP}/tools/wbabd-loadgen" --url "${URL}" --token wrong --rate 10 --duration 1 --mix status=1 2>&1)"
+rc=$?
+set -e
+[[ "${rc}" == "2" ]] || { echo "Expected exit 2 for a rejected token, got ${rc}: ${out}" >&2; exit 1; }
+grep -q 'HTTP 401' <<< "${out}" || { echo "Expected 401 in: ${out}" >&2; exit 1; }
+
+# 4. Unknown request kinds are rejected before any load is sent.
+set +e
+"${TMP}/tools/wbabd-loadgen" --url "${URL}" --mix bogus=1 2> "${TMP}/mix.err"
+rc=$?
+set -e
+[[ "${rc}" == "2" ]] && grep -q 'unknown request kind' "${TMP}/mix.err" || { echo "Expected mix validation error" >&2; exit 1; }
+
+echo "OK: wbabd-loadgen"
@@ -0,0 +1,101 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+SERVER_PID=""
+cleanup() {
+  if [[ -n "${SERVER_PID}" ]]; then
+    kill "${SERVER_PID}" 2>/dev/null || true
+    wait "${SERVER_PID}" 2>/dev/null || true
+  fi
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+mkdir -p "${TMP}/tools" "${TMP}/core"
+cp "${ROOT_DIR}/tools/wbabd" "${TMP}/tools/wbabd"
+cp -r "${ROOT_DIR}/core/"* "${TMP}/core/"
+chmod +x "${TMP}/tools/wbabd"
+cat > "${TMP}/tools/winbuild-build.sh" <<'EOF2'
+#!/usr/bin/env bash
+set -euo pipefail
+mkdir -p out
+echo "artifact" > out/FakeApp.exe
+EOF2
+chmod +x "${TMP}/tools/winbuild-build.sh"
+
+(
+  cd "${TMP}"
+  WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 WBAB_MOCK_EXECUTOR=1 \
+  WBABD_STORE_PATH="${TMP}/store.sqlite" WBABD_AUDIT_LOG_PATH="${TMP}/audit.sqlite" \
+  exec ./tools/wbabd serve --host 127.0.0.1 --port 0 > "${TMP}/serve.out" 2> "${TMP}/serve.err"
+) &
+SERVER_PID=$!
+
+port=""
+for _ in $(seq 1 100); do
+  port="$(python3 -c 'import json,sys; print(json.loads(open(sys.argv[1]).readline())["port"])' "${TMP}/serve.out" 2>/dev/null || true)"
+  [[ -n "${port}" ]] && break
+  sleep 0.1
+done
+[[ -n "${port}" ]] || { echo "wbabd serve did not start" >&2; cat "${TMP}/serve.err" >&2; exit 1; }
+
+python3 - "${port}" <<'PY'
+import http.client
+import json
+import re
+import sys
+
+port = int(sys.argv[1])
+
+
+def call(method, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request(method, path, body=json.dumps(body) if body is not None else None)
+    resp = conn.getresponse()
+    data = resp.read()
+    conn.close()
+    return resp.status, resp.getheader("Content-Type"), data
+
+
+def scrape():
+    status, ctype, data = call("GET", "/metrics")
+    assert status == 200 and ctype.startswith("text/plain; version=0.0.4"), (status, ctype)
+    return data.decode()
+
+
+def value(text, series):
+    m = re.search(r"^" + re.escape(series) + r" (\S+)$", text, re.M)
+    assert m, (series, text)
+    return float(m.group(1))
+
+
+# 1. A build, its cached repeat and a status miss.
+run = {"op_id": "metrics-1", "verb": "build", "args": ["."]}
+assert call("POST", "/run", run)[0] == 200
+assert call("POST", "/run", run)[0] == 200
+assert call("GET", "/status/missing-op")[0] == 404
+call("BREW", "/health")
+
+text = scrape()
+assert value(text, 'wbabd_http_requests_total{route="/run",method="POST",code="200"}') == 2
+assert value(text, 'wbabd_http_requests_total{route="/status/{op_id}",method="GET",code="404"}') == 1
+assert value(text, 'wbabd_http_request_duration_seconds_count{route="/run",method="POST"}') == 2
+assert value(text, 'wbabd_http_request_duration_seconds_count{route="/health",method="OTHER"}') == 1
+assert 'method="BREW"' not in text
+assert value(text, 'wbabd_cache_requests_total{verb="build",result="hit"}') == 1
+assert value(text, 'wbabd_cache_requests_total{verb="build",result="miss"}') == 1
+assert value(text, 'wbabd_operation_duration_seconds_count{verb="build",status="succeeded"}') == 1
+assert value(text, 'wbabd_step_duration_seconds_count{verb="build",step="execute_build",status="succeeded"}') == 1
+assert value(text, 'wbabd_lock_wait_seconds_count{lock="workspace"}') == 1
+assert value(text, 'wbabd_sqlite_operation_duration_seconds_count{db="store",op="upsert"}') > 0
+assert value(text, "wbabd_runs_in_flight") == 0
+assert value(text, "wbabd_run_queue_depth") == 0
+
+# 2. Scrapes are served from memory: no SQLite calls between two of them.
+sqlite_lines = lambda t: sorted(l for l in t.splitlines() if l.startswith("wbabd_sqlite_operation_duration_seconds_count"))
+assert sqlite_lines(scrape()) == sqlite_lines(scrape())
+PY
+
+echo "OK: wbabd /metrics"
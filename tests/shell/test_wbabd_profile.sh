@@ -0,0 +1,99 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+SERVER_PID=""
+cleanup() {
+  if [[ -n "${SERVER_PID}" ]]; then
+    kill "${SERVER_PID}" 2>/dev/null || true
+    wait "${SERVER_PID}" 2>/dev/null || true
+  fi
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+mkdir -p "${TMP}/tools" "${TMP}/core"
+cp "${ROOT_DIR}/tools/wbabd" "${TMP}/tools/wbabd"
+cp -r "${ROOT_DIR}/core/"* "${TMP}/core/"
+chmod +x "${TMP}/tools/wbabd"
+cat > "${TMP}/tools/winbuild-build.sh" <<'EOF2'
+#!/usr/bin/env bash
+set -euo pipefail
+mkdir -p out
+echo "artifact" > out/FakeApp.exe
+EOF2
+chmod +x "${TMP}/tools/winbuild-build.sh"
+
+(
+  cd "${TMP}"
+  WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 WBAB_MOCK_EXECUTOR=1 \
+  WBABD_STORE_PATH="${TMP}/store.sqlite" WBABD_AUDIT_LOG_PATH="${TMP}/audit.sqlite" WBABD_PROFILE_DIR="${TMP}/profiles" \
+  exec ./tools/wbabd serve --host 127.0.0.1 --port 0 > "${TMP}/serve.out" 2> "${TMP}/serve.err"
+) &
+SERVER_PID=$!
+
+port=""
+for _ in $(seq 1 100); do
+  port="$(python3 -c 'import json,sys; print(json.loads(open(sys.argv[1]).readline())["port"])' "${TMP}/serve.out" 2>/dev/null || true)"
+  [[ -n "${port}" ]] && break
+  sleep 0.1
+done
+[[ -n "${port}" ]] || { echo "wbabd serve did not start" >&2; cat "${TMP}/serve.err" >&2; exit 1; }
+
+python3 - "${port}" "${TMP}/profiles" <<'PY'
+import http.client
+import json
+import os
+import pstats
+import sys
+import time
+
+port, profiles = int(sys.argv[1]), sys.argv[2]
+
+
+def call(method, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request(method, path, body=json.dumps(body) if body is not None else None)
+    resp = conn.getresponse()
+    data = json.loads(resp.read())
+    conn.close()
+    return resp.status, data
+
+
+# 1. Nothing runs until asked.
+status, body = call("GET", "/profile")
+assert status == 200 and body["active"] is None and body["recent"] == [], body
+assert not os.path.exists(profiles)
+
+# 2. cProfile of the next 3 requests, with an allocation snapshot.
+status, body = call("POST", "/profile", {"mode": "cprofile", "requests": 3, "tracemalloc": True})
+assert status == 200 and body["status"] == "started", body
+assert call("POST", "/profile", {"mode": "sample"})[0] == 409
+assert call("POST", "/run", {"op_id": "profile-1", "verb": "build", "args": ["."]})[0] == 200
+assert call("GET", "/status/profile-1")[0] == 200
+assert call("GET", "/profile")[1]["active"]["requests_seen"] == 2
+assert call("GET", "/health")[0] == 200
+status, body = call("GET", "/profile")
+assert body["active"] is None, body
+result = body["recent"][0]
+assert (result["reason"], result["requests_seen"]) == ("requests", 3), result
+pstats_path = next(f for f in result["files"] if f.endswith("-cprofile.pstats"))
+assert os.path.dirname(pstats_path) == profiles, pstats_path
+functions = {fn for _, _, fn in pstats.Stats(pstats_path).stats}
+assert "dumps" in functions, sorted(functions)[:20]
+assert any(f.endswith(".tracemalloc") for f in result["files"]), result
+
+# 3. Sampling for a time window, stopped early by the operator.
+status, body = call("POST", "/profile", {"mode": "sample", "duration_secs": 60, "interval_ms": 5})
+assert status == 200, body
+time.sleep(0.3)
+status, body = call("POST", "/profile", {"action": "stop"})
+assert status == 200 and body["reason"] == "stopped" and body["samples"] > 0, body
+folded = open(body["files"][0]).read().splitlines()
+assert folded and all(line.rsplit(" ", 1)[1].isdigit() for line in folded), folded[:3]
+assert call("POST", "/profile", {"action": "stop"})[0] == 409
+assert call("POST", "/profile", {"mode": "perf"})[0] == 400
+PY
+
+echo "OK: wbabd /profile"
@@ -0,0 +1,86 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+SERVER_PID=""
+cleanup() {
+  if [[ -n "${SERVER_PID}" ]]; then
+    kill "${SERVER_PID}" 2>/dev/null || true
+    wait "${SERVER_PID}" 2>/dev/null || true
+  fi
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+mkdir -p "${TMP}/tools" "${TMP}/core"
+cp "${ROOT_DIR}/tools/wbabd" "${TMP}/tools/wbabd"
+cp -r "${ROOT_DIR}/core/"* "${TMP}/core/"
+chmod +x "${TMP}/tools/wbabd"
+cat > "${TMP}/tools/winbuild-build.sh" <<EOF
+#!/usr/bin/env bash
+set -euo pipefail
+echo "build" >> "${TMP}/builds.log"
+sleep 1
+mkdir -p out
+echo "artifact" > out/FakeApp.exe
+EOF
+chmod +x "${TMP}/tools/winbuild-build.sh"
+
+# One run slot and no queue: duplicates must not need a slot of their own.
+(
+  cd "${TMP}"
+  WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 WBAB_MOCK_EXECUTOR=1 \
+  WBABD_STORE_PATH="${TMP}/store.sqlite" WBABD_AUDIT_LOG_PATH="${TMP}/audit.sqlite" \
+  WBABD_RUN_WORKERS=1 WBABD_MAX_QUEUED_RUNS=0 \
+  exec ./tools/wbabd serve --host 127.0.0.1 --port 0 > "${TMP}/serve.out" 2> "${TMP}/serve.err"
+) &
+SERVER_PID=$!
+
+port=""
+for _ in $(seq 1 100); do
+  port="$(python3 -c 'import json,sys; print(json.loads(open(sys.argv[1]).readline())["port"])' "${TMP}/serve.out" 2>/dev/null || true)"
+  [[ -n "${port}" ]] && break
+  sleep 0.1
+done
+[[ -n "${port}" ]] || { echo "wbabd serve did not start" >&2; cat "${TMP}/serve.err" >&2; exit 1; }
+
+python3 - "${port}" <<'PY'
+import http.client
+import json
+import sys
+import threading
+
+port = int(sys.argv[1])
+
+
+def call(method, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request(method, path, body=json.dumps(body) if body is not None else None)
+    resp = conn.getresponse()
+    data = json.loads(resp.read())
+    conn.close()
+    return resp.status, data
+
+
+# 1. Five concurrent POST /run for one op_id: one execution, five identical successes.
+results = []
+threads = [
+    threading.Thread(target=lambda: results.append(call("POST", "/run", {"op_id": "dup-1", "verb": "build", "args": ["."]})))
+    for _ in range(5)
+]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+assert [code for code, _ in results] == [200] * 5, results
+assert all(body == results[0][1] and body["status"] == "succeeded" for _, body in results), results
+
+# 2. Every duplicate was attached to the running execution.
+status, load = call("GET", "/load")
+assert status == 200 and load["runs_coalesced"] == 4, load
+PY
+
+[[ "$(wc -l < "${TMP}/builds.log")" == "1" ]] || { echo "Expected a single build:" >&2; cat "${TMP}/builds.log" >&2; exit 1; }
+
+echo "OK: wbabd duplicate run coalescing"
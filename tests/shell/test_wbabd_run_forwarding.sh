@@ -0,0 +1,183 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+PIDS=()
+cleanup() {
+  for pid in "${PIDS[@]}"; do
+    kill "${pid}" 2>/dev/null || true
+    wait "${pid}" 2>/dev/null || true
+  done
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+# Daemons with their own trees and stores; A forwards to B when its run queue is full.
+# C (no plaintext opt-out) and D (peer allowlist without B) must not forward to plain-HTTP B.
+for name in a b c d; do
+  mkdir -p "${TMP}/${name}/tools" "${TMP}/${name}/core"
+  cp "${ROOT_DIR}/tools/wbabd" "${TMP}/${name}/tools/wbabd"
+  cp -r "${ROOT_DIR}/core/"* "${TMP}/${name}/core/"
+  chmod +x "${TMP}/${name}/tools/wbabd"
+  cat > "${TMP}/${name}/tools/winbuild-build.sh" <<'EOF'
+#!/usr/bin/env bash
+set -euo pipefail
+sleep "${BUILD_SLEEP:-0}"
+mkdir -p out
+echo "artifact" > out/FakeApp.exe
+EOF
+  chmod +x "${TMP}/${name}/tools/winbuild-build.sh"
+done
+
+start_daemon() {
+  local name="$1"
+  shift
+  (
+    cd "${TMP}/${name}"
+    exec env WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 WBAB_MOCK_EXECUTOR=1 \
+      WBABD_STORE_PATH="${TMP}/${name}/store.sqlite" WBABD_AUDIT_LOG_PATH="${TMP}/${name}/audit.sqlite" \
+      WBABD_RUN_WORKERS=1 WBABD_MAX_QUEUED_RUNS=0 WBABD_FORWARD_RUNS=1 WBABD_FORWARD_MIN_DISK_FREE_MB=0 \
+      WBABD_FORWARD_TOKEN=peer-token \
+      "$@" ./tools/wbabd serve --host 127.0.0.1 --port 0 > "${TMP}/${name}/serve.out" 2> "${TMP}/${name}/serve.err"
+  ) &
+  PIDS+=($!)
+  for _ in $(seq 1 100); do
+    [[ -s "${TMP}/${name}/serve.out" ]] && return 0
+    sleep 0.1
+  done
+  echo "wbabd serve (${name}) did not start" >&2
+  cat "${TMP}/${name}/serve.err" >&2
+  exit 1
+}
+
+start_daemon a BUILD_SLEEP=2 WBABD_FORWARD_ALLOW_PLAINTEXT=1
+start_daemon b BUILD_SLEEP=0
+start_daemon c BUILD_SLEEP=2
+start_daemon d BUILD_SLEEP=2 WBABD_FORWARD_ALLOW_PLAINTEXT=1 WBABD_FORWARD_PEERS=busy
+port_b="$(python3 -c 'import json,sys; print(json.loads(open(sys.argv[1]).readline())["port"])' "${TMP}/b/serve.out")"
+
+# The peer view A would get from mDNS, seeded into its discovery cache: B idle, plus a full peer that must be skipped.
+instance_b="$(python3 -c 'import json,sys; print(json.loads(open(sys.argv[1]).readline())["instance_id"])' "${TMP}/b/serve.out")"
+python3 - "${port_b}" "${instance_b}" "${TMP}"/{a,c,d}/discovery-peers.json <<'PY'
+import json
+import sys
+import time
+
+port_b, instance_b, paths = int(sys.argv[1]), sys.argv[2], sys.argv[3:]
+now = time.time()
+load = lambda running, capacity: {"runs_running": running, "runs_queued": 0, "run_capacity": capacity, "disk_free_mb": 50000, "running_by_verb": {}}
+peers = {
+    "busy": {"name": "busy", "address": "127.0.0.1", "port": 9, "instance_id": "busy", "version": "1.0.0",
+             "tls": False, "load": load(4, 4), "expires_at": now + 600},
+    "b": {"name": "b", "address": "127.0.0.1", "port": port_b, "instance_id": instance_b, "version": "1.0.0",
+          "tls": False, "load": load(0, 1), "expires_at": now + 600},
+}
+for path in paths:
+    json.dump({"scanned_at": now, "peers": peers}, open(path, "w"))
+PY
+
+python3 - "${TMP}/a/serve.out" "${port_b}" <<'PY'
+import http.client
+import json
+import sys
+import threading
+import time
+
+port_a = json.loads(open(sys.argv[1]).readline())["port"]
+port_b = int(sys.argv[2])
+
+
+def call(port, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers or {})
+    resp = conn.getresponse()
+    data = json.loads(resp.read())
+    conn.close()
+    return resp.status, dict(resp.getheaders()), data
+
+
+# /load reports what gets published in the TXT record.
+status, _, load = call(port_a, "GET", "/load")
+assert status == 200 and load["run_capacity"] == 1 and load["disk_free_bytes"] > 0, load
+assert load["running_by_verb"] == {}, load
+
+# 1. Fill A's only run slot.
+slow = threading.Thread(target=lambda: call(port_a, "POST", "/run", {"op_id": "fwd-slow", "verb": "build", "args": ["."]}))
+slow.start()
+for _ in range(100):
+    status, _, body = call(port_a, "GET", "/status/fwd-slow")
+    if status == 200 and body["status"] == "running":
+        break
+    time.sleep(0.05)
+_, _, load = call(port_a, "GET", "/load")
+assert load["running_by_verb"] == {"build": 1}, load
+
+# 2. A full daemon hands a new run to the idle peer.
+status, headers, body = call(port_a, "POST", "/run", {"op_id": "fwd-1", "verb": "build", "args": ["."]},
+                             {"X-WBABD-Principal": "ci"})
+assert status == 200 and body["status"] == "succeeded", (status, body)
+assert headers.get("X-WBABD-Forwarded-To") == "b", headers
+status, _, body = call(port_b, "GET", "/status/fwd-1")
+assert status == 200 and body["principal"] == "ci", (status, body)
+assert call(port_a, "GET", "/status/fwd-1")[0] == 404
+
+# 3. A forwarded run is never forwarded again.
+status, _, body = call(port_a, "POST", "/run", {"op_id": "fwd-2", "verb": "build", "args": ["."]},
+                       {"X-WBABD-Forwarded": "elsewhere"})
+assert status == 503 and body["error"] == "run_queue_full", (status, body)
+
+# 4. A duplicate of the run A is executing joins it rather than going to a peer.
+status, headers, body = call(port_a, "POST", "/run", {"op_id": "fwd-slow", "verb": "build", "args": ["."]})
+assert status == 200 and body["status"] == "succeeded", (status, body)
+assert "X-WBABD-Forwarded-To" not in headers, headers
+slow.join(30)
+PY
+
+# 5. Plain-HTTP peers need the opt-out, and an allowlist limits which peers are used.
+for name in c d; do
+  python3 - "${TMP}/${name}/serve.out" <<'PY'
+import http.client
+import json
+import sys
+import threading
+import time
+
+port = json.loads(open(sys.argv[1]).readline())["port"]
+
+
+def call(method, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request(method, path, body=json.dumps(body) if body is not None else None)
+    resp = conn.getresponse()
+    data = json.loads(resp.read())
+    conn.close()
+    return resp.status, dict(resp.getheaders()), data
+
+
+slow = threading.Thread(target=lambda: call("POST", "/run", {"op_id": "fwd-slow", "verb": "build", "args": ["."]}))
+slow.start()
+for _ in range(100):
+    status, _, body = call("GET", "/status/fwd-slow")
+    if status == 200 and body["status"] == "running":
+        break
+    time.sleep(0.05)
+status, headers, body = call("POST", "/run", {"op_id": "fwd-1", "verb": "build", "args": ["."]})
+assert status == 503 and body["error"] == "run_queue_full", (status, body)
+assert "X-WBABD-Forwarded-To" not in headers, headers
+slow.join(30)
+PY
+done
+
+python3 - "${TMP}/a/audit.sqlite" <<'PY'
+import json
+import sqlite3
+import sys
+
+rows = sqlite3.connect(sys.argv[1]).execute(
+    "select op_id, status, details from audit_events where event_type = 'run.forwarded'"
+).fetchall()
+assert [(op, status, json.loads(d)["peer"]) for op, status, d in rows] == [("fwd-1", "ok", "b")], rows
+PY
+
+echo "OK: wbabd load-aware run forwarding"
@@ -0,0 +1,225 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+SERVER_PID=""
+cleanup() {
+  if [[ -n "${SERVER_PID}" ]]; then
+    kill "${SERVER_PID}" 2>/dev/null || true
+    wait "${SERVER_PID}" 2>/dev/null || true
+  fi
+  if [[ -f "${TMP}/serve.out" ]]; then
+    for pid in $(python3 -c 'import json,sys; [print(json.loads(l)["pid"]) for l in open(sys.argv[1]) if l.strip()]' "${TMP}/serve.out" 2>/dev/null); do
+      kill "${pid}" 2>/dev/null || true
+    done
+  fi
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+mkdir -p "${TMP}/tools" "${TMP}/core"
+cp "${ROOT_DIR}/tools/wbabd" "${TMP}/tools/wbabd"
+cp -r "${ROOT_DIR}/core/"* "${TMP}/core/"
+chmod +x "${TMP}/tools/wbabd"
+
+# A slow build, so a run is still in progress when the daemon is told to stop.
+cat > "${TMP}/tools/winbuild-build.sh" <<'EOF'
+#!/usr/bin/env bash
+set -euo pipefail
+sleep 2
+mkdir -p out
+echo "artifact" > out/FakeApp.exe
+EOF
+chmod +x "${TMP}/tools/winbuild-build.sh"
+
+start_server() {
+  : > "${TMP}/serve.out"
+  (
+    cd "${TMP}"
+    WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 WBAB_MOCK_EXECUTOR=1 \
+    WBABD_STORE_PATH="${TMP}/store.sqlite" WBABD_AUDIT_LOG_PATH="${TMP}/audit.sqlite" \
+    WBABD_DRAIN_TIMEOUT_SECS=30 \
+    exec ./tools/wbabd serve --host 127.0.0.1 --port 0 --unix "${TMP}/wbabd.sock" >> "${TMP}/serve.out" 2> "${TMP}/serve.err"
+  ) &
+  SERVER_PID=$!
+  for _ in $(seq 1 100); do
+    [[ -s "${TMP}/serve.out" ]] && return 0
+    sleep 0.1
+  done
+  echo "wbabd serve did not start" >&2
+  cat "${TMP}/serve.err" >&2
+  exit 1
+}
+
+# 1. SIGTERM drains: the in-flight run completes, new runs are refused, the process exits cleanly.
+start_server
+python3 - "${TMP}/serve.out" "${SERVER_PID}" <<'PY'
+import http.client
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+banner = json.loads(open(sys.argv[1]).readline())
+port, pid = banner["port"], int(sys.argv[2])
+assert banner["pid"] == pid, banner
+
+
+def call(conn, method, path, body=None):
+    conn.request(method, path, body=json.dumps(body) if body is not None else None)
+    resp = conn.getresponse()
+    return resp.status, json.loads(resp.read())
+
+
+result = {}
+runner = threading.Thread(target=lambda: result.update(
+    zip(("status", "body"), call(http.client.HTTPConnection("127.0.0.1", port, timeout=60), "POST", "/run",
+                                 {"op_id": "drain-op-1", "verb": "build", "args": ["."]}))))
+runner.start()
+idle = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+for _ in range(100):
+    status, body = call(idle, "GET", "/status/drain-op-1")
+    if status == 200 and body["status"] == "running":
+        break
+    time.sleep(0.05)
+else:
+    raise AssertionError("run never started")
+
+os.kill(pid, signal.SIGTERM)
+time.sleep(0.3)
+status, body = call(idle, "POST", "/run", {"op_id": "drain-op-2", "verb": "build", "args": ["."]})
+assert status == 503 and body["error"] == "draining", (status, body)
+status, body = call(idle, "GET", "/health")
+assert status == 503 and body["status"] == "draining", (status, body)
+idle.close()
+
+runner.join(30)
+assert result.get("status") == 200 and result["body"]["status"] == "succeeded", result
+PY
+wait "${SERVER_PID}" || { echo "Expected a clean exit after draining" >&2; cat "${TMP}/serve.err" >&2; exit 1; }
+SERVER_PID=""
+[[ ! -e "${TMP}/wbabd.sock" ]] || { echo "Expected unix socket removed after drain" >&2; exit 1; }
+status="$(cd "${TMP}" && WBABD_STORE_PATH="${TMP}/store.sqlite" WBABD_AUDIT_LOG_PATH="${TMP}/audit.sqlite" ./tools/wbabd status drain-op-1 | python3 -c 'import json,sys; print(json.load(sys.stdin)["status"])')"
+[[ "${status}" == "succeeded" ]] || { echo "Expected drained run to succeed, got ${status}" >&2; exit 1; }
+
+# 2. SIGUSR2 hands the listening sockets to a successor; the old process finishes its run and exits.
+start_server
+python3 - "${TMP}/serve.out" "${TMP}/wbabd.sock" <<'PY'
+import http.client
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+out_path, sock_path = sys.argv[1], sys.argv[2]
+banner = json.loads(open(out_path).readline())
+port, old_pid = banner["port"], banner["pid"]
+
+
+def call(method, path, body=None, conn=None):
+    conn = conn or http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    conn.request(method, path, body=json.dumps(body) if body is not None else None)
+    resp = conn.getresponse()
+    return resp.status, json.loads(resp.read())
+
+
+result = {}
+runner = threading.Thread(target=lambda: result.update(
+    zip(("status", "body"), call("POST", "/run", {"op_id": "handover-op-1", "verb": "build", "args": ["."]}))))
+runner.start()
+for _ in range(100):
+    status, body = call("GET", "/status/handover-op-1")
+    if status == 200 and body["status"] == "running":
+        break
+    time.sleep(0.05)
+
+os.kill(old_pid, signal.SIGUSR2)
+new_pid = None
+for _ in range(100):
+    lines = [json.loads(l) for l in open(out_path) if l.strip()]
+    if len(lines) > 1:
+        new_pid = lines[-1]["pid"]
+        assert lines[-1]["port"] == port, lines
+        break
+    time.sleep(0.1)
+assert new_pid and new_pid != old_pid, "successor did not start"
+
+# New connections reach the successor while the old process drains.
+seen = set()
+for _ in range(20):
+    status, body = call("GET", "/load")
+    assert status == 200, (status, body)
+    seen.add(body["pid"])
+    time.sleep(0.05)
+assert new_pid in seen, seen
+
+runner.join(30)
+assert result.get("status") == 200 and result["body"]["status"] == "succeeded", result
+for _ in range(100):
+    try:
+        os.kill(old_pid, 0)
+    except ProcessLookupError:
+        break
+    time.sleep(0.1)
+else:
+    raise AssertionError("old process did not exit after draining")
+
+# The successor kept the unix socket and still serves on it.
+s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+s.settimeout(10)
+s.connect(sock_path)
+s.sendall(b"GET /health HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n")
+reply = b""
+while chunk := s.recv(4096):
+    reply += chunk
+assert reply.startswith(b"HTTP/1.1 200"), reply
+os.kill(new_pid, signal.SIGTERM)
+PY
+SERVER_PID=""
+
+# 3. systemd socket activation: the daemon serves on the inherited fd 3 (LISTEN_FDS/LISTEN_PID).
+: > "${TMP}/serve.out"
+(
+  cd "${TMP}"
+  WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 \
+  WBABD_STORE_PATH="${TMP}/store.sqlite" WBABD_AUDIT_LOG_PATH="${TMP}/audit.sqlite" \
+  exec python3 -c '
+import os, socket, sys
+sock = socket.create_server(("127.0.0.1", 0))
+print(sock.getsockname()[1], flush=True)
+os.dup2(sock.fileno(), 3)
+os.set_inheritable(3, True)
+os.environ.update(LISTEN_FDS="1", LISTEN_PID=str(os.getpid()))
+os.execv(sys.executable, [sys.executable, "./tools/wbabd", "serve", "--port", "1"])
+' > "${TMP}/serve.out" 2> "${TMP}/serve.err"
+) &
+SERVER_PID=$!
+for _ in $(seq 1 100); do
+  [[ "$(wc -l < "${TMP}/serve.out")" -ge 2 ]] && break
+  sleep 0.1
+done
+python3 - "${TMP}/serve.out" <<'PY'
+import http.client
+import json
+import sys
+
+lines = open(sys.argv[1]).read().splitlines()
+port = int(lines[0])
+banner = json.loads(lines[1])
+assert banner["port"] == port, (port, banner)
+conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+conn.request("GET", "/health")
+resp = conn.getresponse()
+assert resp.status == 200, resp.status
+PY
+kill -TERM "${SERVER_PID}"
+wait "${SERVER_PID}" || { echo "Expected a clean exit" >&2; exit 1; }
+SERVER_PID=""
+
+echo "OK: wbabd graceful drain and socket handover"
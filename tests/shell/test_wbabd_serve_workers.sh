@@ -0,0 +1,124 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+SERVER_PID=""
+cleanup() {
+  if [[ -n "${SERVER_PID}" ]]; then
+    kill "${SERVER_PID}" 2>/dev/null || true
+    wait "${SERVER_PID}" 2>/dev/null || true
+  fi
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+mkdir -p "${TMP}/tools" "${TMP}/core"
+cp "${ROOT_DIR}/tools/wbabd" "${TMP}/tools/wbabd"
+cp -r "${ROOT_DIR}/core/"* "${TMP}/core/"
+chmod +x "${TMP}/tools/wbabd"
+
+cat > "${TMP}/tools/winbuild-build.sh" <<'EOF'
+#!/usr/bin/env bash
+set -euo pipefail
+mkdir -p out
+echo "artifact" > out/FakeApp.exe
+EOF
+chmod +x "${TMP}/tools/winbuild-build.sh"
+
+(
+  cd "${TMP}"
+  WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 WBAB_MOCK_EXECUTOR=1 \
+  WBABD_STORE_PATH="${TMP}/store.sqlite" WBABD_AUDIT_LOG_PATH="${TMP}/audit.sqlite" \
+  exec ./tools/wbabd serve --host 127.0.0.1 --port 0 --workers 3 > "${TMP}/serve.out" 2> "${TMP}/serve.err"
+) &
+SERVER_PID=$!
+
+port=""
+for _ in $(seq 1 100); do
+  port="$(python3 -c 'import json,sys; print(json.loads(open(sys.argv[1]).readline())["port"])' "${TMP}/serve.out" 2>/dev/null || true)"
+  [[ -n "${port}" ]] && break
+  sleep 0.1
+done
+[[ -n "${port}" ]] || { echo "wbabd serve did not start" >&2; cat "${TMP}/serve.err" >&2; exit 1; }
+
+python3 - "${port}" "${TMP}/serve.out" <<'PY'
+import http.client
+import json
+import os
+import signal
+import sys
+import time
+
+port = int(sys.argv[1])
+banner = json.loads(open(sys.argv[2]).readline())
+assert banner["workers"] == 3 and len(banner["worker_pids"]) == 3, banner
+
+
+def call(method, path, body=None):
+    # A fresh connection per call so the kernel spreads them across workers.
+    for _ in range(50):
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            conn.request(method, path, body=json.dumps(body) if body is not None else None)
+            resp = conn.getresponse()
+            data = json.loads(resp.read())
+            conn.close()
+            return resp.status, data
+        except ConnectionError:
+            time.sleep(0.1)
+    raise AssertionError("daemon unreachable")
+
+
+# 1. Connections are spread over several worker processes sharing the port.
+pids = set()
+deadline = time.monotonic() + 10
+while len(pids) < 2 and time.monotonic() < deadline:
+    status, body = call("GET", "/load")
+    assert status == 200, status
+    pids.add(body["pid"])
+assert len(pids) >= 2, pids
+assert pids <= set(banner["worker_pids"]), (pids, banner)
+
+# 2. Workers coordinate through the shared store.
+status, body = call("POST", "/run", {"op_id": "workers-op-1", "verb": "build", "args": ["."]})
+assert status == 200 and body["status"] == "succeeded", (status, body)
+for _ in range(6):
+    status, body = call("GET", "/status/workers-op-1")
+    assert status == 200 and body["status"] == "succeeded", (status, body)
+
+# 3. A crashed worker is replaced by the supervisor.
+victim = banner["worker_pids"][0]
+os.kill(victim, signal.SIGKILL)
+seen = set()
+deadline = time.monotonic() + 15
+while time.monotonic() < deadline:
+    status, body = call("GET", "/load")
+    seen.add(body["pid"])
+    if seen - set(banner["worker_pids"]):
+        break
+    time.sleep(0.05)
+assert seen - set(banner["worker_pids"]), "expected a replacement worker to serve requests"
+
+# 4. SIGUSR2 replaces every worker without taking the port down.
+before = set(banner["worker_pids"]) | seen
+os.kill(banner["pid"], signal.SIGUSR2)
+fresh = 0
+deadline = time.monotonic() + 30
+while fresh < 20 and time.monotonic() < deadline:
+    status, body = call("GET", "/load")
+    assert status == 200, status
+    fresh = fresh + 1 if body["pid"] not in before else 0
+    time.sleep(0.05)
+assert fresh >= 20, "expected only replacement workers after a rolling restart"
+PY
+
+pids="$(python3 -c 'import json,sys; print(" ".join(map(str, json.loads(open(sys.argv[1]).readline())["worker_pids"])))' "${TMP}/serve.out")"
+kill -TERM "${SERVER_PID}"
+wait "${SERVER_PID}" 2>/dev/null || true
+SERVER_PID=""
+for pid in ${pids}; do
+  if kill -0 "${pid}" 2>/dev/null; then echo "Expected worker ${pid} to stop with the supervisor" >&2; exit 1; fi
+done
+
+echo "OK: wbabd multi-process workers"
@@ -0,0 +1,109 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+SERVER_PID=""
+cleanup() {
+  if [[ -n "${SERVER_PID}" ]]; then
+    kill "${SERVER_PID}" 2>/dev/null || true
+    wait "${SERVER_PID}" 2>/dev/null || true
+  fi
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+mkdir -p "${TMP}/repo/tools/WineBot/compose" "${TMP}/repo/core" "${TMP}/repo/dist"
+cp "${ROOT_DIR}/tools/wbabd" "${TMP}/repo/tools/wbabd"
+cp -r "${ROOT_DIR}/core/"* "${TMP}/repo/core/"
+chmod +x "${TMP}/repo/tools/wbabd"
+echo "services: {}" > "${TMP}/repo/tools/WineBot/compose/docker-compose.yml"
+for name in A B; do echo "installer ${name}" > "${TMP}/repo/dist/${name}Setup.exe"; done
+
+# Stub compose: logs each call with its project; starting a session takes 2s, an install 1s.
+cat > "${TMP}/repo/tools/compose.sh" <<EOF
+#!/usr/bin/env bash
+set -euo pipefail
+echo "\${COMPOSE_PROJECT_NAME} \$*" >> "${TMP}/compose.log"
+case " \$* " in
+  *" up "*) sleep 2 ;;
+  *" wine apps/"*) sleep 1 ;;
+esac
+EOF
+chmod +x "${TMP}/repo/tools/compose.sh"
+
+(
+  cd "${TMP}/repo"
+  WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 \
+  WBABD_STORE_PATH="${TMP}/store.sqlite" WBABD_AUDIT_LOG_PATH="${TMP}/audit.sqlite" \
+  WBABD_SMOKE_POOL_SIZE=2 WBAB_ARTIFACTS_DIR="${TMP}/artifacts" \
+  exec ./tools/wbabd serve --host 127.0.0.1 --port 0 > "${TMP}/serve.out" 2> "${TMP}/serve.err"
+) &
+SERVER_PID=$!
+
+port=""
+for _ in $(seq 1 100); do
+  port="$(python3 -c 'import json,sys; print(json.loads(open(sys.argv[1]).readline())["port"])' "${TMP}/serve.out" 2>/dev/null || true)"
+  [[ -n "${port}" ]] && break
+  sleep 0.1
+done
+[[ -n "${port}" ]] || { echo "wbabd serve did not start" >&2; cat "${TMP}/serve.err" >&2; exit 1; }
+
+python3 - "${port}" "${TMP}/repo/dist" <<'PY'
+import http.client
+import json
+import sys
+import threading
+import time
+
+port, dist = int(sys.argv[1]), sys.argv[2]
+
+
+def call(method, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    conn.request(method, path, body=json.dumps(body) if body is not None else None)
+    resp = conn.getresponse()
+    data = json.loads(resp.read())
+    conn.close()
+    return resp.status, data
+
+
+def smoke(op_id, installer, out):
+    out.append(call("POST", "/run", {"op_id": op_id, "verb": "smoke", "args": [f"{dist}/{installer}"]}))
+
+
+# 1. Sessions warm up in the background after the daemon starts.
+for _ in range(100):
+    _, load = call("GET", "/load")
+    if load["smoke_pool"]["ready"] == 2:
+        break
+    time.sleep(0.1)
+assert load["smoke_pool"] == {"sessions": 2, "ready": 2, "idle": 2, "uses": 0}, load
+
+# 2. Two installers smoke in parallel, each paying only for its install.
+results = []
+start = time.monotonic()
+threads = [threading.Thread(target=smoke, args=(f"smoke-{n}", f"{n}Setup.exe", results)) for n in "AB"]
+for t in threads:
+    t.start()
+for t in threads:
+    t.join()
+elapsed = time.monotonic() - start
+assert [code for code, _ in results] == [200, 200], results
+assert all(body["status"] == "succeeded" for _, body in results), results
+assert elapsed < 1.9, elapsed
+assert results[0][1]["result"]["command"][0] == "smoke-pool", results
+PY
+
+python3 - "${TMP}/compose.log" <<'PY'
+import sys
+
+lines = [line.split(" ", 1) for line in open(sys.argv[1]).read().splitlines()]
+installs = {project for project, args in lines if " wine apps/" in f" {args}"}
+assert len(installs) == 2, lines
+assert sum(1 for _, args in lines if args.endswith(" pull")) == 1, lines
+assert sum(1 for _, args in lines if " up -d " in f" {args} ") == 2, lines
+assert sum(1 for _, args in lines if " -xf " in args) == 2, lines
+PY
+
+echo "OK: wbabd warm smoke session pool"
@@ -0,0 +1,92 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+WATCH_PID=""
+cleanup() {
+  if [[ -n "${WATCH_PID}" ]]; then
+    kill "${WATCH_PID}" 2>/dev/null || true
+    wait "${WATCH_PID}" 2>/dev/null || true
+  fi
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+mkdir -p "${TMP}/tools" "${TMP}/core"
+cp "${ROOT_DIR}/tools/wbabd" "${TMP}/tools/wbabd"
+cp -r "${ROOT_DIR}/core/"* "${TMP}/core/"
+chmod +x "${TMP}/tools/wbabd"
+
+for verb in build lint; do
+  cat > "${TMP}/tools/winbuild-${verb}.sh" <<'EOF'
+#!/usr/bin/env bash
+set -euo pipefail
+[[ "${FAIL_STEP:-0}" == "1" ]] && exit 7
+mkdir -p out
+echo "artifact" > out/FakeApp.exe
+EOF
+  chmod +x "${TMP}/tools/winbuild-${verb}.sh"
+done
+
+export WBAB_MOCK_EXECUTOR=1 WBAB_CLIENT_MODE=off
+export WBABD_STORE_PATH="${TMP}/store.sqlite"
+export WBABD_AUDIT_LOG_PATH="${TMP}/audit.sqlite"
+wbabd() {
+  (cd "${TMP}" && ./tools/wbabd "$@")
+}
+op_ids() {
+  python3 -c 'import json,sys; print(" ".join(json.loads(l)["op_id"] for l in sys.stdin))'
+}
+
+wbabd run bulk-build-1 build . > /dev/null
+wbabd run bulk-lint-1 lint . > /dev/null
+FAIL_STEP=1 wbabd run bulk-build-2 build . > /dev/null || true
+
+# 1. --all streams one JSON document per line, oldest write first.
+[[ "$(wbabd status --all | op_ids)" == "bulk-build-1 bulk-lint-1 bulk-build-2" ]] || { echo "Unexpected --all output" >&2; exit 1; }
+
+# 2. Filters combine across keys and alternate within a key.
+[[ "$(wbabd status --filter status=succeeded,verb=build | op_ids)" == "bulk-build-1" ]] || { echo "Unexpected filtered output" >&2; exit 1; }
+[[ "$(wbabd status --filter verb=build --filter verb=lint,status=succeeded | op_ids)" == "bulk-build-1 bulk-lint-1" ]] || { echo "Unexpected alternative filter output" >&2; exit 1; }
+[[ -z "$(wbabd status --filter status=running)" ]] || { echo "Expected no running operations" >&2; exit 1; }
+
+set +e
+wbabd status --filter owner=me > /dev/null 2> "${TMP}/bad.err"
+rc=$?
+set -e
+[[ "${rc}" == "2" ]] && grep -q "unsupported filter key" "${TMP}/bad.err" || { echo "Expected exit 2 for an unknown filter key" >&2; exit 1; }
+
+# 3. --watch prints the current matches, then each later matching write as it happens.
+(cd "${TMP}" && exec ./tools/wbabd status --filter verb=build --watch --interval 0.1 > "${TMP}/watch.out") &
+WATCH_PID=$!
+for _ in $(seq 1 50); do
+  [[ "$(wc -l < "${TMP}/watch.out")" -ge 2 ]] && break
+  sleep 0.1
+done
+wbabd run bulk-lint-2 lint . > /dev/null
+wbabd run bulk-build-3 build . > /dev/null
+for _ in $(seq 1 50); do
+  grep -q '"op_id": "bulk-build-3", .*"status": "succeeded", "step_state"' "${TMP}/watch.out" && break
+  sleep 0.1
+done
+kill "${WATCH_PID}"
+wait "${WATCH_PID}" 2>/dev/null || true
+WATCH_PID=""
+python3 - "${TMP}/watch.out" <<'PY'
+import json
+import sys
+
+lines = [json.loads(line) for line in open(sys.argv[1])]
+assert [l["op_id"] for l in lines[:2]] == ["bulk-build-1", "bulk-build-2"], lines
+assert all(l["verb"] == "build" for l in lines), lines
+assert lines[-1]["op_id"] == "bulk-build-3" and lines[-1]["status"] == "succeeded", lines
+PY
+
+# 4. A single-op watch stops following other operations.
+set +e
+timeout 1 bash -c "cd '${TMP}' && ./tools/wbabd status bulk-lint-1 --watch --interval 0.1" > "${TMP}/one.out"
+set -e
+[[ "$(op_ids < "${TMP}/one.out")" == "bulk-lint-1" ]] || { echo "Unexpected single-op watch output" >&2; exit 1; }
+
+echo "OK: wbabd bulk and watch status"
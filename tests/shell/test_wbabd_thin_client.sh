@@ -0,0 +1,113 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+SERVER_PID=""
+cleanup() {
+  if [[ -n "${SERVER_PID}" ]]; then
+    kill "${SERVER_PID}" 2>/dev/null || true
+    wait "${SERVER_PID}" 2>/dev/null || true
+  fi
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+mkdir -p "${TMP}/tools" "${TMP}/core"
+cp "${ROOT_DIR}/tools/wbabd" "${TMP}/tools/wbabd"
+cp -r "${ROOT_DIR}/core/"* "${TMP}/core/"
+chmod +x "${TMP}/tools/wbabd"
+
+cat > "${TMP}/tools/winbuild-build.sh" <<'EOF'
+#!/usr/bin/env bash
+set -euo pipefail
+mkdir -p out
+echo "artifact" > out/FakeApp.exe
+EOF
+chmod +x "${TMP}/tools/winbuild-build.sh"
+
+export WBAB_MOCK_EXECUTOR=1
+export WBABD_STORE_PATH="${TMP}/store.sqlite"
+export WBABD_AUDIT_LOG_PATH="${TMP}/audit.sqlite"
+ENDPOINT="${TMP}/wbabd-endpoint.json"
+
+# In-process commands leave command.received in the audit log; forwarded ones do not.
+received() {
+  python3 -c 'import sqlite3,sys; print(sqlite3.connect(sys.argv[1]).execute("select count(*) from audit_events where event_type = ?", ("command.received",)).fetchone()[0])' "${WBABD_AUDIT_LOG_PATH}"
+}
+wbabd() {
+  (cd "${TMP}" && ./tools/wbabd "$@")
+}
+
+# 1. No daemon: the CLI runs in-process.
+wbabd run thin-op-1 build . > "${TMP}/run1.json"
+[[ "$(received)" == "1" ]] || { echo "Expected an in-process run without a daemon" >&2; exit 1; }
+
+(
+  cd "${TMP}"
+  WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 \
+  exec ./tools/wbabd serve --host 127.0.0.1 --port 0 --unix "${TMP}/wbabd.sock" > "${TMP}/serve.out" 2> "${TMP}/serve.err"
+) &
+SERVER_PID=$!
+for _ in $(seq 1 100); do
+  [[ -s "${ENDPOINT}" ]] && break
+  sleep 0.1
+done
+[[ -s "${ENDPOINT}" ]] || { echo "Expected the daemon to advertise its endpoint" >&2; cat "${TMP}/serve.err" >&2; exit 1; }
+port="$(python3 -c 'import json,sys; print(json.load(open(sys.argv[1]))["port"])' "${ENDPOINT}")"
+
+# 2. Forwarding is opt-in: by default the CLI stays in-process even with a daemon advertised.
+base="$(received)"
+wbabd status thin-op-1 > /dev/null 2> "${TMP}/default.err"
+[[ "$(received)" == "$((base + 1))" ]] || { echo "Expected in-process status without WBAB_CLIENT_MODE" >&2; exit 1; }
+! grep -q "handled by daemon" "${TMP}/default.err" || { echo "Unexpected forwarding note" >&2; exit 1; }
+export WBAB_CLIENT_MODE=auto
+base="$(received)"
+
+# 3. With WBAB_CLIENT_MODE=auto, status/plan/run are forwarded and print what the in-process CLI prints;
+#    stderr names the daemon that handled the command.
+wbabd run thin-op-2 build . > "${TMP}/run2.json" 2> "${TMP}/run2.err"
+grep -q "wbabd: handled by daemon at unix://${TMP}/wbabd.sock" "${TMP}/run2.err" || { echo "Expected the handling daemon on stderr" >&2; cat "${TMP}/run2.err" >&2; exit 1; }
+python3 - "${TMP}/run1.json" "${TMP}/run2.json" <<'PY'
+import json
+import sys
+
+local, forwarded = (json.load(open(p)) for p in sys.argv[1:])
+assert forwarded["status"] == "succeeded" and forwarded["op_id"] == "thin-op-2", forwarded
+assert sorted(local) == sorted(forwarded), (local, forwarded)
+PY
+wbabd status thin-op-2 2> /dev/null | python3 -c 'import json,sys; assert json.load(sys.stdin)["status"] == "succeeded"'
+wbabd plan thin-op-3 build . 2> /dev/null | python3 -c 'import json,sys; assert json.load(sys.stdin)["steps"]'
+set +e
+missing="$(wbabd status thin-missing 2> /dev/null)"
+rc=$?
+wbabd run thin-op-4 not-a-verb 2> "${TMP}/bad.err"
+bad_rc=$?
+set -e
+[[ "${rc}" == "1" && "${missing}" == '{"op_id": "thin-missing", "status": "not_found"}' ]] || { echo "Unexpected not_found output: ${rc} ${missing}" >&2; exit 1; }
+[[ "${bad_rc}" == "2" ]] && grep -q "unsupported verb" "${TMP}/bad.err" || { echo "Expected exit 2 for a bad verb" >&2; exit 1; }
+[[ "$(received)" == "${base}" ]] || { echo "Expected commands to be forwarded to the daemon" >&2; exit 1; }
+
+# 4. WBABD_URL selects an endpoint explicitly; WBAB_CLIENT_MODE=off forces in-process.
+WBABD_URL="http://127.0.0.1:${port}" wbabd status thin-op-2 > /dev/null 2> "${TMP}/url.err"
+[[ "$(received)" == "${base}" ]] || { echo "Expected WBABD_URL to forward" >&2; exit 1; }
+grep -q "handled by daemon at http://127.0.0.1:${port}" "${TMP}/url.err" || { echo "Expected the WBABD_URL daemon on stderr" >&2; exit 1; }
+WBAB_CLIENT_MODE=off wbabd status thin-op-2 > /dev/null
+[[ "$(received)" == "$((base + 1))" ]] || { echo "Expected WBAB_CLIENT_MODE=off to run in-process" >&2; exit 1; }
+
+# 5. The endpoint file goes away with the daemon; a required daemon then fails fast.
+kill -TERM "${SERVER_PID}"
+wait "${SERVER_PID}" 2>/dev/null || true
+SERVER_PID=""
+[[ ! -e "${ENDPOINT}" ]] || { echo "Expected endpoint file removed on shutdown" >&2; exit 1; }
+set +e
+WBAB_CLIENT_MODE=require wbabd status thin-op-2 > /dev/null 2>&1
+rc=$?
+set -e
+[[ "${rc}" == "2" ]] || { echo "Expected WBAB_CLIENT_MODE=require to fail without a daemon, got ${rc}" >&2; exit 1; }
+
+# 6. A stale endpoint (process gone) falls back to in-process.
+echo '{"pid": 999999, "host": "127.0.0.1", "port": 9, "tls": false, "unix": null}' > "${ENDPOINT}"
+wbabd status thin-op-2 | python3 -c 'import json,sys; assert json.load(sys.stdin)["status"] == "succeeded"'
+
+echo "OK: wbabd thin client forwarding"
@@ -0,0 +1,90 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+SERVER_PID=""
+cleanup() {
+  if [[ -n "${SERVER_PID}" ]]; then
+    kill "${SERVER_PID}" 2>/dev/null || true
+    wait "${SERVER_PID}" 2>/dev/null || true
+  fi
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+mkdir -p "${TMP}/tools" "${TMP}/core"
+cp "${ROOT_DIR}/tools/wbabd" "${TMP}/tools/wbabd"
+cp -r "${ROOT_DIR}/core/"* "${TMP}/core/"
+chmod +x "${TMP}/tools/wbabd"
+cat > "${TMP}/tools/winbuild-build.sh" <<'EOF2'
+#!/usr/bin/env bash
+set -euo pipefail
+mkdir -p out
+echo "artifact" > out/FakeApp.exe
+EOF2
+chmod +x "${TMP}/tools/winbuild-build.sh"
+
+(
+  cd "${TMP}"
+  WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=off WBABD_ALLOW_MULTIPLE_INSTANCES=1 WBAB_MOCK_EXECUTOR=1 \
+  WBABD_STORE_PATH="${TMP}/store.sqlite" WBABD_AUDIT_LOG_PATH="${TMP}/audit.sqlite" WBAB_TRACE_SLOW_SECS=0.000001 \
+  exec ./tools/wbabd serve --host 127.0.0.1 --port 0 > "${TMP}/serve.out" 2> "${TMP}/serve.err"
+) &
+SERVER_PID=$!
+
+port=""
+for _ in $(seq 1 100); do
+  port="$(python3 -c 'import json,sys; print(json.loads(open(sys.argv[1]).readline())["port"])' "${TMP}/serve.out" 2>/dev/null || true)"
+  [[ -n "${port}" ]] && break
+  sleep 0.1
+done
+[[ -n "${port}" ]] || { echo "wbabd serve did not start" >&2; cat "${TMP}/serve.err" >&2; exit 1; }
+
+python3 - "${port}" "${TMP}" <<'PY'
+import http.client
+import json
+import sqlite3
+import sys
+
+port, tmp = int(sys.argv[1]), sys.argv[2]
+
+
+def call(method, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request(method, path, body=json.dumps(body) if body is not None else None)
+    resp = conn.getresponse()
+    data = resp.read()
+    conn.close()
+    return resp.status, resp.getheader("Content-Type"), data
+
+
+# 1. A build records one trace with every phase nested under the run.
+assert call("POST", "/run", {"op_id": "trace-1", "verb": "build", "args": ["."]})[0] == 200
+status, _, data = call("GET", "/trace/trace-1")
+assert status == 200, (status, data)
+trace = json.loads(data)
+assert trace["op_id"] == "trace-1" and trace["runs"] == 1, trace
+names = {s["name"] for s in trace["spans"]}
+assert {"operation", "lock.workspace", "step.execute_build", "exec", "sqlite.store.upsert"} <= names, names
+assert all(s["trace_id"] == "trace-1" and s["duration_us"] >= 0 for s in trace["spans"])
+assert any(line.startswith("operation;step.execute_build;exec ") for line in trace["folded"]), trace["folded"]
+
+# 2. Collapsed stacks for flame graph tools.
+status, ctype, data = call("GET", "/trace/trace-1?format=folded")
+assert status == 200 and ctype.startswith("text/plain"), (status, ctype)
+for line in data.decode().splitlines():
+    stack, us = line.rsplit(" ", 1)
+    assert stack.startswith("operation") and us.isdigit(), line
+
+# 3. Unknown op_ids are 404; the slow run was audited with its breakdown.
+assert call("GET", "/trace/missing-op")[0] == 404
+with sqlite3.connect(f"{tmp}/audit.sqlite") as conn:
+    rows = conn.execute("SELECT details FROM audit_events WHERE event_type = 'operation.slow' AND op_id = 'trace-1'").fetchall()
+assert len(rows) == 1, rows
+assert json.loads(rows[0][0])["trace"] == "/trace/trace-1"
+PY
+
+test -s "${TMP}/traces.jsonl"
+
+echo "OK: wbabd /trace"
@@ -0,0 +1,101 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+ROOT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+TMP="$(mktemp -d)"
+SERVER_PID=""
+cleanup() {
+  if [[ -n "${SERVER_PID}" ]]; then
+    kill "${SERVER_PID}" 2>/dev/null || true
+    wait "${SERVER_PID}" 2>/dev/null || true
+  fi
+  rm -rf "${TMP}"
+}
+trap cleanup EXIT
+
+mkdir -p "${TMP}/tools" "${TMP}/core"
+cp "${ROOT_DIR}/tools/wbabd" "${TMP}/tools/wbabd"
+cp -r "${ROOT_DIR}/core/"* "${TMP}/core/"
+chmod +x "${TMP}/tools/wbabd"
+
+cat > "${TMP}/tools/winbuild-build.sh" <<'EOF'
+#!/usr/bin/env bash
+set -euo pipefail
+mkdir -p out
+echo "artifact" > out/FakeApp.exe
+EOF
+chmod +x "${TMP}/tools/winbuild-build.sh"
+
+cat > "${TMP}/authz-policy.json" <<EOF
+{
+  "principals": {
+    "local-builder": { "verbs": ["health", "status", "run:build"] }
+  },
+  "peers": { "uid:$(id -u)": "local-builder" }
+}
+EOF
+
+SOCK="${TMP}/wbabd.sock"
+(
+  cd "${TMP}"
+  WBABD_TLS_DISABLE=1 WBABD_AUTH_MODE=token WBABD_API_TOKEN=secret-token WBABD_ALLOW_MULTIPLE_INSTANCES=1 \
+  WBABD_STORE_PATH="${TMP}/store.sqlite" WBABD_AUDIT_LOG_PATH="${TMP}/audit.sqlite" \
+  WBABD_AUTHZ_POLICY_FILE="${TMP}/authz-policy.json" WBAB_MOCK_EXECUTOR=1 \
+  exec ./tools/wbabd serve --host 127.0.0.1 --port 0 --unix "${SOCK}" > "${TMP}/serve.out" 2> "${TMP}/serve.err"
+) &
+SERVER_PID=$!
+
+port=""
+for _ in $(seq 1 100); do
+  port="$(python3 -c 'import json,sys; print(json.loads(open(sys.argv[1]).readline())["port"])' "${TMP}/serve.out" 2>/dev/null || true)"
+  [[ -n "${port}" ]] && break
+  sleep 0.1
+done
+[[ -n "${port}" ]] || { echo "wbabd serve did not start" >&2; cat "${TMP}/serve.err" >&2; exit 1; }
+[[ -S "${SOCK}" ]] || { echo "Expected unix socket at ${SOCK}" >&2; exit 1; }
+[[ "$(stat -c '%a' "${SOCK}")" == "660" ]] || { echo "Expected socket mode 660" >&2; exit 1; }
+
+python3 - "${port}" "${SOCK}" <<'PY'
+import http.client
+import json
+import socket
+import sys
+
+port, sock_path = int(sys.argv[1]), sys.argv[2]
+
+
+class UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost", timeout=10)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def call(conn, method, path, body=None, headers=None):
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers or {})
+    resp = conn.getresponse()
+    return resp, json.loads(resp.read() or b"{}")
+
+
+# 1. TCP still requires the bearer token.
+resp, body = call(http.client.HTTPConnection("127.0.0.1", port, timeout=10), "GET", "/health")
+assert resp.status == 401 and body["error"] == "missing_bearer_token", (resp.status, body)
+
+# 2. The unix socket authenticates by peer uid, mapped to a principal by the policy.
+conn = UnixConnection(sock_path)
+resp, body = call(conn, "GET", "/health")
+assert resp.status == 200, (resp.status, body)
+resp, body = call(conn, "POST", "/run", {"op_id": "unix-op-1", "verb": "build", "args": ["."]})
+assert resp.status == 200 and body["status"] == "succeeded", (resp.status, body)
+
+# 3. A claimed principal header cannot widen a unix peer's permissions.
+resp, body = call(conn, "POST", "/run", {"op_id": "unix-op-2", "verb": "sign", "args": ["."]}, {"X-WBABD-Principal": "admin"})
+assert resp.status == 403 and body["reason"] == "missing_permission:run:sign", (resp.status, body)
+conn.close()
+PY
+
+echo "OK: wbabd unix socket listener with peer credentials"
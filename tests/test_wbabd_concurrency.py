@@ -83,10 +83,9 @@ def run_server(port, stop_event):
         asyncio.set_event_loop(loop)
 
         async def run():
-            server = await asyncio.start_server(
-                lambda r, w: wbabd._handle_http(
-                    r, w, store, planner, executor, "off", "", None, audit, 1024 * 1024
-                ),
+            ctx = wbabd._ServeContext(store, planner, executor, "off", "", None, audit)
+            server = await asyncio.get_running_loop().create_server(
+                wbabd._http_protocol_factory(ctx, wbabd.HttpLimits()),
                 "127.0.0.1",
                 port,
             )
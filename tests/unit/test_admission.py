@@ -0,0 +1,154 @@
+import asyncio
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+# Add repo root to path
+ROOT_DIR = Path(__file__).parents[2]
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.admission import (  # noqa: E402
+    AdmissionController,
+    AdmissionRejected,
+    SingleFlight,
+    TokenBucket,
+    default_run_workers,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_refills_at_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2.0, burst=2, clock=clock)
+        self.assertEqual(bucket.take(), 0.0)
+        self.assertEqual(bucket.take(), 0.0)
+        self.assertAlmostEqual(bucket.take(), 0.5)
+        clock.now += 0.5
+        self.assertEqual(bucket.take(), 0.0)
+
+
+class TestAdmissionController(unittest.IsolatedAsyncioTestCase):
+    async def test_in_flight_limit(self):
+        ac = AdmissionController(max_in_flight=2)
+        ac.enter_request()
+        ac.enter_request()
+        with self.assertRaises(AdmissionRejected) as cm:
+            ac.enter_request()
+        self.assertEqual((cm.exception.status, cm.exception.retry_after), (503, 1))
+        ac.leave_request()
+        ac.enter_request()
+        self.assertEqual(ac.snapshot()["rejected"]["in_flight"], 1)
+        ac.shutdown()
+
+    async def test_rate_limit_is_per_principal(self):
+        clock = FakeClock()
+        ac = AdmissionController(rate_per_sec=0.25, burst=1, clock=clock)
+        ac.check_rate("alice")
+        ac.check_rate("bob")
+        with self.assertRaises(AdmissionRejected) as cm:
+            ac.check_rate("alice")
+        self.assertEqual((cm.exception.status, cm.exception.retry_after), (429, 4))
+        clock.now += 4
+        ac.check_rate("alice")
+        ac.shutdown()
+
+    async def test_rotating_principals_share_overflow_bucket(self):
+        clock = FakeClock()
+        ac = AdmissionController(rate_per_sec=0.25, burst=1, max_buckets=2, clock=clock)
+        ac.check_rate("alice")
+        ac.check_rate("bob")
+        ac.check_rate("rotating-0")
+        for i in range(1, 5):
+            with self.assertRaises(AdmissionRejected):
+                ac.check_rate(f"rotating-{i}")
+        self.assertEqual(set(ac._buckets), {"alice", "bob"})
+        ac.shutdown()
+
+    async def test_run_queue_bound(self):
+        ac = AdmissionController(run_workers=1, max_queued_runs=1)
+        release = threading.Event()
+        first = asyncio.ensure_future(ac.run(release.wait, 5))
+        second = asyncio.ensure_future(ac.run(lambda: "queued"))
+        await asyncio.sleep(0.05)
+        snap = ac.snapshot()
+        self.assertEqual((snap["runs_running"], snap["runs_queued"]), (1, 1))
+        with self.assertRaises(AdmissionRejected) as cm:
+            await ac.run(lambda: "rejected")
+        self.assertEqual(cm.exception.status, 503)
+        self.assertGreaterEqual(cm.exception.retry_after, 1)
+        release.set()
+        self.assertEqual(await second, "queued")
+        self.assertTrue(await first)
+        snap = ac.snapshot()
+        self.assertEqual((snap["runs_running"], snap["runs_queued"]), (0, 0))
+        self.assertEqual(snap["rejected"]["run_queue_full"], 1)
+        ac.shutdown()
+
+    async def test_defaults_are_uncapped(self):
+        ac = AdmissionController(run_workers=1)
+        release = threading.Event()
+        runs = [asyncio.ensure_future(ac.run(release.wait, 5)) for _ in range(20)]
+        await asyncio.sleep(0.05)
+        snap = ac.snapshot()
+        self.assertEqual((snap["runs_running"], snap["runs_queued"]), (1, 19))
+        self.assertEqual((snap["max_in_flight"], snap["max_queued_runs"]), (0, None))
+        release.set()
+        self.assertTrue(all(await asyncio.gather(*runs)))
+        self.assertEqual(snap["rejected"]["run_queue_full"], 0)
+        ac.shutdown()
+        ac = AdmissionController()
+        self.assertEqual(ac.run_workers, default_run_workers())
+        ac.shutdown()
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_duplicates_share_one_execution(self):
+        sf = SingleFlight()
+        calls = []
+        release = asyncio.Event()
+
+        async def work():
+            calls.append(1)
+            await release.wait()
+            return {"status": "succeeded"}
+
+        first = asyncio.ensure_future(sf.run("op", work))
+        second = asyncio.ensure_future(sf.run("op", work))
+        other = asyncio.ensure_future(sf.run("other", work))
+        await asyncio.sleep(0)
+        self.assertTrue(sf.active("op"))
+        release.set()
+        results = await asyncio.gather(first, second, other)
+        self.assertIs(results[0], results[1])
+        self.assertEqual((len(calls), sf.coalesced, sf.active("op")), (2, 1, False))
+        await sf.run("op", work)
+        self.assertEqual(len(calls), 3)
+
+    async def test_caller_leaving_does_not_cancel_the_execution(self):
+        sf = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            raise AdmissionRejected(503, "run_queue_full", 1)
+
+        leader = asyncio.ensure_future(sf.run("op", work))
+        follower = asyncio.ensure_future(sf.run("op", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        release.set()
+        with self.assertRaises(AdmissionRejected):
+            await follower
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add repo root to path
+ROOT_DIR = Path(__file__).parents[2]
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.authz import (  # noqa: E402
+    AuthzPolicy,
+    AuthzPolicyFile,
+    parse_peers,
+    parse_policy,
+    peer_principal,
+)
+
+
+def _write(path: Path, principals: dict) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"principals": principals}), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class TestAuthzPolicy(unittest.TestCase):
+    def setUp(self):
+        self.policy = AuthzPolicy(
+            parse_policy(
+                {
+                    "principals": {
+                        "builder": {"verbs": ["status", "plan", "run:build"]},
+                        "ops": {"verbs": ["*"]},
+                        "*": {"verbs": ["health"]},
+                    }
+                }
+            )
+        )
+
+    def test_decisions(self):
+        d = self.policy.decide
+        self.assertEqual(d("builder", "run", "build"), (True, "allowed"))
+        self.assertEqual(
+            d("builder", "run", "sign"), (False, "missing_permission:run:sign")
+        )
+        self.assertEqual(d("builder", "plan", "sign"), (True, "allowed"))
+        self.assertEqual(d("builder", "preflight_trend"), (True, "allowed"))
+        self.assertEqual(d("builder", "health", "ignored"), (True, "allowed"))
+        self.assertEqual(d("builder", "run"), (False, "missing_verb"))
+        self.assertEqual(d("builder", "deploy"), (False, "unsupported_op:deploy"))
+        self.assertEqual(d("ops", "run", "custom-verb"), (True, "allowed"))
+        self.assertEqual(d("stranger", "health"), (True, "allowed"))
+        self.assertEqual(
+            d("stranger", "status"), (False, "missing_permission:status:-")
+        )
+
+    def test_validation_errors(self):
+        with self.assertRaisesRegex(ValueError, "principals object required"):
+            parse_policy({})
+        with self.assertRaisesRegex(ValueError, "requires verbs"):
+            parse_policy({"principals": {"a": {"verbs": [""]}}})
+
+
+class TestPeerPrincipals(unittest.TestCase):
+    def test_mapping_precedence(self):
+        peers = parse_peers(
+            {"peers": {"uid:1000": "alice", "user:ci": "ci-bot", "gid:50": "staff"}}
+        )
+        self.assertEqual(peer_principal(peers, 1000, 50, "alice"), "alice")
+        self.assertEqual(peer_principal(peers, 1001, 50, "ci"), "ci-bot")
+        self.assertEqual(peer_principal(peers, 1002, 50, "bob"), "staff")
+        self.assertEqual(peer_principal(peers, 1003, 60, "eve"), "uid:1003")
+
+    def test_invalid_peer_keys(self):
+        with self.assertRaisesRegex(ValueError, "peer key 'uid:abc'"):
+            parse_peers({"peers": {"uid:abc": "x"}})
+        with self.assertRaisesRegex(ValueError, "must map to a principal"):
+            parse_peers({"peers": {"uid:1": ""}})
+
+
+class TestAuthzPolicyFile(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "policy.json"
+        _write(self.path, {"alice": {"verbs": ["status"]}})
+        self.events: list[tuple[str, dict]] = []
+        self.policy = AuthzPolicyFile(
+            self.path,
+            check_interval=0,
+            on_reload=lambda status, details: self.events.append((status, details)),
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reloads_when_file_is_replaced(self):
+        self.assertFalse(self.policy.decide("alice", "run", "build")[0])
+        _write(self.path, {"alice": {"verbs": ["status", "run:build"]}})
+        self.assertTrue(self.policy.decide("alice", "run", "build")[0])
+        self.assertEqual(self.events[-1][0], "ok")
+        self.assertEqual(self.events[-1][1]["principals"], ["alice"])
+
+    def test_invalid_update_keeps_previous_policy(self):
+        self.path.write_text("{not json", encoding="utf-8")
+        self.assertTrue(self.policy.decide("alice", "status")[0])
+        self.assertEqual([e[0] for e in self.events], ["failed"])
+        # The same broken file is reported only once.
+        self.assertTrue(self.policy.decide("alice", "status")[0])
+        self.assertEqual(len(self.events), 1)
+
+    def test_missing_file_keeps_previous_policy(self):
+        self.path.unlink()
+        self.assertTrue(self.policy.decide("alice", "status")[0])
+        self.assertEqual(self.events, [])
+
+    def test_initial_load_errors_raise(self):
+        self.path.write_text('{"principals": []}', encoding="utf-8")
+        with self.assertRaisesRegex(ValueError, "principals object required"):
+            AuthzPolicyFile(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 """Property-based tests for Executor._get_backoff_delay() using Hypothesis."""
+
 import shutil
 import sys
 import tempfile
@@ -0,0 +1,66 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add repo root to path
+ROOT_DIR = Path(__file__).parents[2]
+sys.path.insert(0, str(ROOT_DIR))
+
+from bench.wbab_bench import compare, main, percentile, run_suite  # noqa: E402
+
+
+class TestBenchCompare(unittest.TestCase):
+    def test_percentile_nearest_rank(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(
+            (percentile(values, 50), percentile(values, 99), percentile(values, 100)),
+            (50.0, 99.0, 100.0),
+        )
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_regression_respects_direction_and_tolerance(self):
+        baseline = {
+            "store.upsert_per_sec": 1000.0,
+            "http.status_ms_p50": 2.0,
+            "audit.emit_per_sec": 500.0,
+        }
+        current = {
+            "store.upsert_per_sec": 600.0,
+            "http.status_ms_p50": 2.4,
+            "audit.emit_per_sec": 900.0,
+            "new.metric": 1.0,
+        }
+        rows = {r["metric"]: r for r in compare(current, baseline)}
+        self.assertEqual(set(rows), set(baseline))
+        self.assertTrue(rows["store.upsert_per_sec"]["regressed"])
+        self.assertFalse(rows["http.status_ms_p50"]["regressed"])
+        self.assertFalse(rows["audit.emit_per_sec"]["regressed"])
+        self.assertTrue(
+            {r["metric"]: r for r in compare(current, baseline, tolerance=0.1)}[
+                "http.status_ms_p50"
+            ]["regressed"]
+        )
+
+    def test_quick_run_writes_results_and_compares(self):
+        metrics = run_suite(["store", "audit"], quick=True, repeat=1)
+        self.assertEqual(
+            set(metrics),
+            {"store.upsert_per_sec", "store.get_per_sec", "audit.emit_per_sec"},
+        )
+        self.assertTrue(all(v > 0 for v in metrics.values()))
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline = Path(tmp) / "baseline.json"
+            out = Path(tmp) / "latest.json"
+            args = ["--only", "store", "--quick", "--repeat", "1", "--out", str(out)]
+            self.assertEqual(main(args + ["--save-baseline", str(baseline)]), 0)
+            self.assertEqual(json.loads(out.read_text())["meta"]["quick"], True)
+            data = json.loads(baseline.read_text())
+            data["metrics"]["store.upsert_per_sec"] *= 100
+            baseline.write_text(json.dumps(data))
+            self.assertEqual(main(args + ["--compare", str(baseline)]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
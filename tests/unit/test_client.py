@@ -0,0 +1,176 @@
+import json
+import os
+import socketserver
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# Add repo root to path
+ROOT_DIR = Path(__file__).parents[2]
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.client import (  # noqa: E402
+    DaemonClient,
+    DaemonUnavailable,
+    _endpoint_url,
+    _parse_op_args,
+    default_endpoint_path,
+    read_endpoint,
+    remove_endpoint,
+    write_endpoint,
+)
+
+
+class _ScriptedHandler(socketserver.StreamRequestHandler):
+    """Answers each request on a connection with the next scripted raw response."""
+
+    server: "_ScriptedServer"
+
+    def handle(self):
+        self.server.connections += 1
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            length = 0
+            while True:
+                header = self.rfile.readline()
+                if header in (b"\r\n", b""):
+                    break
+                name, _, value = header.decode().partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            self.server.requests.append(
+                (line.decode().strip(), self.rfile.read(length))
+            )
+            self.wfile.write(self.server.responses.pop(0))
+            if not self.server.responses:
+                return
+
+
+class _ScriptedServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, responses):
+        super().__init__(("127.0.0.1", 0), _ScriptedHandler)
+        self.responses = list(responses)
+        self.requests: list[tuple[str, bytes]] = []
+        self.connections = 0
+
+
+def _json_response(status, body, extra=""):
+    data = json.dumps(body).encode()
+    return (
+        f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n{extra}\r\n"
+    ).encode() + data
+
+
+class TestDaemonClient(unittest.TestCase):
+    def serve(self, responses):
+        server = _ScriptedServer(responses)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_reuses_connection(self):
+        server = self.serve(
+            [
+                _json_response(200, {"status": "ok"}),
+                _json_response(404, {"status": "not_found"}),
+            ]
+        )
+        with DaemonClient(f"http://127.0.0.1:{server.server_address[1]}") as client:
+            self.assertEqual(client.status("op-1"), (200, {"status": "ok"}))
+            self.assertEqual(client.status("op 2"), (404, {"status": "not_found"}))
+        self.assertEqual(server.connections, 1)
+        self.assertEqual(server.requests[1][0], "GET /status/op%202 HTTP/1.1")
+
+    def test_chunked_body_and_payload(self):
+        chunked = b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n4\r\n{"a"\r\n3\r\n: 1\r\n1\r\n}\r\n0\r\n\r\n'
+        server = self.serve([chunked])
+        with DaemonClient(f"http://127.0.0.1:{server.server_address[1]}") as client:
+            status, body = client.run("op-1", "build", ["."], git_ref="main")
+        self.assertEqual((status, body), (200, {"a": 1}))
+        self.assertEqual(
+            json.loads(server.requests[0][1]),
+            {"op_id": "op-1", "verb": "build", "args": ["."], "git_ref": "main"},
+        )
+
+    def test_retries_after_retry_after(self):
+        server = self.serve(
+            [
+                _json_response(429, {"error": "rate_limited"}, "Retry-After: 0\r\n"),
+                _json_response(200, {"status": "succeeded"}),
+            ]
+        )
+        with DaemonClient(f"http://127.0.0.1:{server.server_address[1]}") as client:
+            self.assertEqual(client.status("op-1"), (200, {"status": "succeeded"}))
+        self.assertEqual(len(server.requests), 2)
+
+    def test_unreachable(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            client = DaemonClient(f"unix://{tmp}/missing.sock")
+            with self.assertRaises(DaemonUnavailable):
+                client.status("op-1")
+
+
+class TestEndpointFile(unittest.TestCase):
+    def test_round_trip_and_owner_guard(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "wbabd-endpoint.json"
+            write_endpoint(
+                path,
+                {
+                    "pid": os.getpid(),
+                    "host": "0.0.0.0",
+                    "port": 8787,
+                    "tls": False,
+                    "unix": None,
+                },
+            )
+            info = read_endpoint(path)
+            assert info is not None
+            self.assertEqual(_endpoint_url(info), "http://127.0.0.1:8787")
+            remove_endpoint(path, os.getpid() + 1)
+            self.assertTrue(path.exists())
+            remove_endpoint(path, os.getpid())
+            self.assertFalse(path.exists())
+
+    def test_dead_pid_is_ignored(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "wbabd-endpoint.json"
+            with mock.patch("os.kill", side_effect=ProcessLookupError):
+                write_endpoint(path, {"pid": 123456, "host": "127.0.0.1", "port": 1})
+                self.assertIsNone(read_endpoint(path))
+
+    def test_follows_store_path(self):
+        with mock.patch.dict(
+            os.environ, {"WBABD_STORE_PATH": "/srv/wbab/store.sqlite"}, clear=False
+        ):
+            os.environ.pop("WBABD_ENDPOINT_FILE", None)
+            self.assertEqual(
+                default_endpoint_path(ROOT_DIR), Path("/srv/wbab/wbabd-endpoint.json")
+            )
+
+
+class TestParseOpArgs(unittest.TestCase):
+    def test_matches_cli_grammar(self):
+        self.assertEqual(
+            _parse_op_args(
+                ["--git-url", "https://x/r.git", "op-1", "build", ".", "--git-ref=main"]
+            ),
+            ("op-1", "build", ["."], "https://x/r.git", "main"),
+        )
+
+    def test_defers_unusual_arguments(self):
+        self.assertIsNone(_parse_op_args(["op-1"]))
+        self.assertIsNone(_parse_op_args(["op-1", "build", "--verbose"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import asyncio
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add repo root to path
+ROOT_DIR = Path(__file__).parents[2]
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.discovery import (  # noqa: E402
+    DiscoveryBrowser,
+    PeerCache,
+    _collect,
+    _parse_load,
+    load_properties,
+    peer_load_score,
+    rank_peers,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _peer(name, ttl=120):
+    return {
+        "name": name,
+        "address": "10.0.0.1",
+        "port": 8787,
+        "instance_id": name,
+        "ttl": ttl,
+    }
+
+
+class TestPeerCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "peers.json"
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scan_result_expires(self):
+        cache = PeerCache(self.path, ttl=60, clock=self.clock)
+        self.assertIsNone(cache.load())
+        cache.save([_peer("a"), _peer("b", ttl=10)])
+        self.assertEqual(sorted(p["name"] for p in cache.load() or []), ["a", "b"])
+        self.clock.now += 30
+        self.assertEqual([p["name"] for p in cache.load() or []], ["a"])
+        self.clock.now += 31
+        self.assertIsNone(cache.load())
+
+    def test_empty_scan_is_cached(self):
+        cache = PeerCache(self.path, ttl=60, clock=self.clock)
+        cache.save([])
+        self.assertEqual(cache.load(), [])
+
+    def test_put_does_not_count_as_scan(self):
+        cache = PeerCache(self.path, ttl=60, clock=self.clock)
+        cache.put(_peer("local"))
+        self.assertIsNone(cache.load())
+        cache.save([_peer("remote")])
+        cache.put(_peer("local"))
+        self.assertEqual(
+            sorted(p["name"] for p in cache.load() or []), ["local", "remote"]
+        )
+        cache.drop("local")
+        self.assertEqual([p["name"] for p in cache.load() or []], ["remote"])
+
+    def test_browser_answers_from_fresh_cache(self):
+        cache = PeerCache(self.path, ttl=60, clock=self.clock)
+        cache.save([_peer("a")])
+        peers = asyncio.run(DiscoveryBrowser(cache=cache).discover(timeout=5))
+        self.assertEqual([p["name"] for p in peers], ["a"])
+
+
+def _loaded(name, running, capacity, queued=0, disk_free_mb=10000, version="1.0.0"):
+    peer = _peer(name)
+    peer["version"] = version
+    peer["load"] = {
+        "runs_running": running,
+        "runs_queued": queued,
+        "run_capacity": capacity,
+        "disk_free_mb": disk_free_mb,
+        "running_by_verb": {},
+    }
+    return peer
+
+
+class TestPeerLoad(unittest.TestCase):
+    def test_txt_properties_round_trip(self):
+        props = load_properties(
+            {
+                "runs_running": 2,
+                "runs_queued": 1,
+                "run_capacity": 4,
+                "disk_free_bytes": 3 * 1024 * 1024,
+                "running_by_verb": {"build": 2, "lint": 0},
+            }
+        )
+        self.assertEqual(props["verbs"], "build=2")
+        self.assertEqual(
+            _parse_load(props),
+            {
+                "runs_running": 2,
+                "runs_queued": 1,
+                "run_capacity": 4,
+                "disk_free_mb": 3,
+                "running_by_verb": {"build": 2},
+            },
+        )
+        self.assertIsNone(_parse_load({"version": "1.0.0"}))
+        self.assertIsNone(_parse_load({"load_capacity": "x"}))
+
+    def test_rank_prefers_least_loaded_compatible_peer(self):
+        peers = [
+            _loaded("busy", 3, 4),
+            _loaded("idle", 0, 4, disk_free_mb=100),
+            _loaded("idle-roomy", 0, 2, disk_free_mb=900),
+            _loaded("self", 0, 8),
+            _loaded("old", 0, 8, version="0.9.0"),
+            _loaded("full-disk", 0, 8, disk_free_mb=10),
+            dict(_peer("unknown"), version="1.0.0"),
+        ]
+        ranked = rank_peers(
+            peers, version="1.2.0", exclude_instance="self", min_disk_free_mb=50
+        )
+        self.assertEqual(
+            [p["name"] for p in ranked], ["idle-roomy", "idle", "busy", "unknown"]
+        )
+        self.assertEqual(peer_load_score(_loaded("q", 1, 2, queued=1)), 1.0)
+        self.assertEqual(peer_load_score(_peer("unknown")), float("inf"))
+
+
+class TestCollect(unittest.IsolatedAsyncioTestCase):
+    async def test_stops_when_done(self):
+        queue: asyncio.Queue = asyncio.Queue()
+        for name in ("a", "b", "c"):
+            queue.put_nowait(_peer(name))
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        peers = await _collect(queue, 5, done=lambda found: len(found) >= 2)
+        self.assertEqual([p["name"] for p in peers], ["a", "b"])
+        self.assertLess(loop.time() - start, 1)
+
+    async def test_settles_after_answers_stop(self):
+        queue: asyncio.Queue = asyncio.Queue()
+        queue.put_nowait(_peer("a"))
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        peers = await _collect(queue, 5, settle=0.05)
+        self.assertEqual([p["name"] for p in peers], ["a"])
+        self.assertLess(loop.time() - start, 1)
+
+    async def test_waits_full_timeout_without_settle(self):
+        queue: asyncio.Queue = asyncio.Queue()
+        queue.put_nowait(_peer("a"))
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await _collect(queue, 0.2, settle=None)
+        self.assertGreaterEqual(loop.time() - start, 0.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
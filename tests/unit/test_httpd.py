@@ -0,0 +1,152 @@
+import asyncio
+import gzip
+import json
+import sys
+import unittest
+from pathlib import Path
+
+# Add repo root to path
+ROOT_DIR = Path(__file__).parents[2]
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.httpd import HttpLimits, HttpResponse, negotiate_encoding, protocol_factory  # noqa: E402
+
+
+async def _echo(request):
+    payload = {
+        "method": request.method,
+        "path": request.path,
+        "body": request.body.decode(),
+    }
+    if request.path == "/big":
+        payload["pad"] = "x" * 4096
+    if request.path == "/stream":
+
+        async def chunks():
+            for part in (b"one,", b"two,", b"three"):
+                yield part
+
+        return HttpResponse(200, stream=chunks(), content_type="text/plain")
+    return HttpResponse.json(200, payload)
+
+
+class TestHttpProtocol(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.limits = HttpLimits(
+            max_header_bytes=1024, max_body_bytes=64, request_timeout=2.0
+        )
+        loop = asyncio.get_running_loop()
+        self.server = await loop.create_server(
+            protocol_factory(_echo, self.limits), "127.0.0.1", 0
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _exchange(self, raw: bytes) -> bytes:
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(raw)
+        await writer.drain()
+        writer.write_eof()
+        data = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        return data
+
+    @staticmethod
+    def _split(data: bytes):
+        """Splits a stream of sized responses into (status, headers, body) tuples."""
+        out = []
+        while data:
+            head, _, rest = data.partition(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            status = int(lines[0].split(" ")[1])
+            headers = {}
+            for line in lines[1:]:
+                k, _, v = line.partition(":")
+                headers[k.strip().lower()] = v.strip()
+            length = int(headers.get("content-length", "0"))
+            out.append((status, headers, rest[:length]))
+            data = rest[length:]
+        return out
+
+    async def test_chunked_request_body_is_decoded(self):
+        raw = (
+            b"POST /plan HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\nConnection: close\r\n\r\n"
+            b"5\r\nhello\r\n6;ext=1\r\n world\r\n0\r\nX-Trailer: y\r\n\r\n"
+        )
+        [(status, _, body)] = self._split(await self._exchange(raw))
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["body"], "hello world")
+
+    async def test_pipelined_requests_are_answered_in_order(self):
+        raw = (
+            b"GET /a HTTP/1.1\r\nHost: x\r\n\r\n"
+            b"POST /b HTTP/1.1\r\nHost: x\r\nContent-Length: 2\r\n\r\nhi"
+            b"GET /c HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n"
+        )
+        responses = self._split(await self._exchange(raw))
+        self.assertEqual(
+            [json.loads(b)["path"] for _, _, b in responses], ["/a", "/b", "/c"]
+        )
+        self.assertEqual(json.loads(responses[1][2])["body"], "hi")
+        self.assertEqual(responses[0][1]["connection"], "keep-alive")
+        self.assertEqual(responses[2][1]["connection"], "close")
+
+    async def test_oversized_headers_get_431(self):
+        raw = b"GET / HTTP/1.1\r\nX-Pad: " + b"a" * 2048 + b"\r\n\r\n"
+        [(status, headers, body)] = self._split(await self._exchange(raw))
+        self.assertEqual(status, 431)
+        self.assertEqual(headers["connection"], "close")
+        self.assertEqual(int(headers["content-length"]), len(body))
+
+    async def test_content_length_with_transfer_encoding_is_rejected(self):
+        raw = b"POST / HTTP/1.1\r\nContent-Length: 3\r\nTransfer-Encoding: chunked\r\n\r\n0\r\n\r\n"
+        [(status, _, body)] = self._split(await self._exchange(raw))
+        self.assertEqual(status, 400)
+        self.assertEqual(
+            json.loads(body)["error"], "content_length_with_transfer_encoding"
+        )
+
+    async def test_chunked_body_over_limit_gets_413(self):
+        raw = (
+            b"POST / HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n40\r\n"
+            + b"a" * 64
+            + b"\r\n1\r\nb\r\n0\r\n\r\n"
+        )
+        [(status, _, body)] = self._split(await self._exchange(raw))
+        self.assertEqual(status, 413)
+        self.assertTrue(json.loads(body)["error"].startswith("payload_too_large"))
+
+    async def test_large_response_is_gzip_encoded_when_accepted(self):
+        raw = b"GET /big HTTP/1.1\r\nAccept-Encoding: br;q=1, gzip;q=0.8\r\nConnection: close\r\n\r\n"
+        [(status, headers, body)] = self._split(await self._exchange(raw))
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["content-encoding"], "gzip")
+        self.assertEqual(headers["vary"], "Accept-Encoding")
+        self.assertEqual(len(json.loads(gzip.decompress(body))["pad"]), 4096)
+
+    async def test_small_response_is_not_compressed(self):
+        raw = b"GET /a HTTP/1.1\r\nAccept-Encoding: gzip\r\nConnection: close\r\n\r\n"
+        [(_, headers, _)] = self._split(await self._exchange(raw))
+        self.assertNotIn("content-encoding", headers)
+
+    async def test_streamed_response_uses_chunked_encoding(self):
+        data = await self._exchange(
+            b"GET /stream HTTP/1.1\r\nConnection: close\r\n\r\n"
+        )
+        head, _, body = data.partition(b"\r\n\r\n")
+        self.assertIn(b"Transfer-Encoding: chunked", head)
+        self.assertEqual(body, b"4\r\none,\r\n4\r\ntwo,\r\n5\r\nthree\r\n0\r\n\r\n")
+
+    def test_negotiate_encoding(self):
+        self.assertEqual(negotiate_encoding(""), "")
+        self.assertEqual(negotiate_encoding("gzip, deflate"), "gzip")
+        self.assertEqual(negotiate_encoding("gzip;q=0, deflate"), "deflate")
+        self.assertEqual(negotiate_encoding("*;q=0"), "")
+        self.assertEqual(negotiate_encoding("identity"), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
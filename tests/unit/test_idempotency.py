@@ -0,0 +1,217 @@
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+# Add repo root to path
+ROOT_DIR = Path(__file__).parents[2]
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.idempotency import (  # noqa: E402
+    FAILED,
+    RUNNING,
+    SUCCEEDED,
+    IdempotencyRegistry,
+    SharedSQLiteRegistry,
+    SQLiteRegistry,
+    serve_lease_request,
+)
+from core.wbab_core import Executor, OperationStore, Plan  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSQLiteRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.clock = FakeClock()
+        self.registry = SQLiteRegistry(
+            Path(self.tmp.name) / "leases.sqlite", clock=self.clock
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_running_lease_blocks_other_holders(self):
+        acquired, lease = self.registry.acquire("op", "a", 30)
+        self.assertTrue(acquired)
+        self.assertEqual((lease.token, lease.state), (1, RUNNING))
+        acquired, current = self.registry.acquire("op", "b", 30)
+        self.assertFalse(acquired)
+        self.assertEqual((current.holder, current.token), ("a", 1))
+
+    def test_expired_lease_is_taken_over_and_fences_the_old_holder(self):
+        _, old = self.registry.acquire("op", "a", 30)
+        self.clock.now += 31
+        acquired, new = self.registry.acquire("op", "b", 30)
+        self.assertTrue(acquired)
+        self.assertEqual(new.token, 2)
+        self.assertFalse(self.registry.renew(old, 30))
+        self.assertFalse(self.registry.finish(old, SUCCEEDED, {"status": "succeeded"}))
+        self.assertTrue(self.registry.renew(new, 30))
+        self.assertTrue(self.registry.finish(new, SUCCEEDED, {"status": "succeeded"}))
+        current = self.registry.get("op")
+        assert current is not None
+        self.assertEqual(current.holder, "b")
+
+    def test_outcomes(self):
+        _, lease = self.registry.acquire("op", "a", 30)
+        self.registry.finish(lease, FAILED, {"status": "failed"})
+        # A failed op may be retried, except by callers that joined the failed execution.
+        acquired, joined = self.registry.acquire("op", "b", 30, joined_token=1)
+        self.assertFalse(acquired)
+        self.assertEqual(joined.result, {"status": "failed"})
+        acquired, lease = self.registry.acquire("op", "b", 30)
+        self.assertTrue(acquired)
+        self.registry.finish(lease, SUCCEEDED, {"status": "succeeded"})
+        acquired, done = self.registry.acquire("op", "c", 30)
+        self.assertFalse(acquired)
+        self.assertEqual(done.state, SUCCEEDED)
+        acquired, lease = self.registry.acquire("op", "c", 30, rerun=True)
+        self.assertTrue(acquired)
+        self.assertEqual(lease.token, 3)
+
+    def test_abandon_only_matches_holder_prefix(self):
+        self.registry.acquire("op", "node-1/42/x", 30)
+        self.assertFalse(self.registry.abandon("op", "node-2/"))
+        self.assertTrue(self.registry.abandon("op", "node-1/"))
+        self.assertTrue(self.registry.acquire("op", "node-2/7/y", 30)[0])
+
+    def test_lease_service_round_trip(self):
+        code, body = serve_lease_request(
+            self.registry, "op", {"action": "acquire", "holder": "a", "ttl": 30}
+        )
+        self.assertEqual(
+            (code, body["acquired"], body["lease"]["token"]), (200, True, 1)
+        )
+        code, body = serve_lease_request(
+            self.registry, "op", {"action": "renew", "token": 1, "ttl": 60}
+        )
+        self.assertEqual((code, body), (200, {"ok": True}))
+        code, body = serve_lease_request(
+            self.registry,
+            "op",
+            {"action": "finish", "token": 1, "state": "done", "result": {}},
+        )
+        self.assertEqual(code, 400)
+        code, body = serve_lease_request(
+            self.registry,
+            "op",
+            {
+                "action": "finish",
+                "token": 1,
+                "state": SUCCEEDED,
+                "result": {"status": "succeeded"},
+            },
+        )
+        self.assertEqual(body, {"ok": True})
+        self.assertEqual(
+            serve_lease_request(self.registry, "op", {"action": "get"})[1]["lease"][
+                "state"
+            ],
+            SUCCEEDED,
+        )
+        self.assertEqual(
+            serve_lease_request(self.registry, "op", {"action": "steal"})[0], 400
+        )
+
+    def test_shared_registry_uses_a_lock_file(self):
+        path = Path(self.tmp.name) / "shared" / "leases.sqlite"
+        registry = SharedSQLiteRegistry(path, clock=self.clock)
+        self.assertTrue(registry.acquire("op", "a", 30)[0])
+        self.assertTrue(registry.lock_path.exists())
+
+    def test_incomplete_backend_fails_at_construction(self):
+        class Partial(IdempotencyRegistry):
+            def renew(self, lease, ttl):
+                return False
+
+        with self.assertRaisesRegex(TypeError, "abstract"):
+            Partial()  # type: ignore[abstract]
+
+
+class TestExecutorLeases(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root_dir = Path(self.tmp.name)
+        self.store = OperationStore(self.root_dir / "store.sqlite")
+        self.registry = SQLiteRegistry(self.store.path)
+        self.audit = MagicMock()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _executor(self):
+        return Executor(
+            self.root_dir, self.store, audit=self.audit, registry=self.registry
+        )
+
+    def test_duplicate_joins_the_running_execution(self):
+        calls = []
+        started = threading.Event()
+
+        def execute(plan, project_dir, existing):
+            calls.append(plan.op_id)
+            started.set()
+            time.sleep(0.5)
+            return {
+                "status": "succeeded",
+                "op_id": plan.op_id,
+                "verb": plan.verb,
+                "result": {"n": len(calls)},
+            }
+
+        results = []
+        plan = Plan("dup", "build", ["."], [], {"type": "local"})
+        first, second = self._executor(), self._executor()
+        first._execute_locked = execute
+        second._execute_locked = execute
+        t = threading.Thread(
+            target=lambda: results.append(
+                first._execute_in_workspace(plan, self.root_dir)
+            )
+        )
+        t.start()
+        started.wait(5)
+        results.append(second._execute_in_workspace(plan, self.root_dir))
+        t.join()
+        self.assertEqual(calls, ["dup"])
+        self.assertEqual([r["result"] for r in results], [{"n": 1}, {"n": 1}])
+        joined = [
+            c for c in self.audit.emit.call_args_list if c.args[0] == "operation.joined"
+        ]
+        self.assertEqual(len(joined), 1)
+
+    def test_completed_elsewhere_is_returned_as_cached(self):
+        _, lease = self.registry.acquire("done", "other-node/1/x", 30)
+        self.registry.finish(
+            lease,
+            SUCCEEDED,
+            {
+                "status": "succeeded",
+                "op_id": "done",
+                "verb": "build",
+                "result": {"exit_code": 0},
+            },
+        )
+        executor = self._executor()
+        executor._execute_locked = MagicMock()
+        result = executor._execute_in_workspace(
+            Plan("done", "build", ["."], [], {"type": "local"}), self.root_dir
+        )
+        self.assertEqual(result["status"], "cached")
+        self.assertEqual(result["result"], {"exit_code": 0})
+        executor._execute_locked.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
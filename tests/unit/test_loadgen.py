@@ -0,0 +1,78 @@
+import sys
+import unittest
+from pathlib import Path
+
+# Add repo root to path
+ROOT_DIR = Path(__file__).parents[2]
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.loadgen import (  # noqa: E402
+    LatencyRecorder,
+    LoadConfig,
+    LoadGenerator,
+    format_text,
+    parse_mix,
+    percentile,
+)
+
+
+class TestLoadgen(unittest.TestCase):
+    def test_parse_mix(self):
+        self.assertEqual(
+            parse_mix("health=1, status=4,run,plan=0"),
+            {"health": 1.0, "status": 4.0, "run": 1.0},
+        )
+        for bad in ("bogus=1", "health=x", "health=-1", "health=0", ""):
+            with self.assertRaises(ValueError):
+                parse_mix(bad)
+
+    def test_recorder_summary(self):
+        rec = LatencyRecorder()
+        for ms in range(1, 101):
+            rec.add(float(ms), 200)
+        rec.add(20000.0, 0)
+        rec.sample_error = "GET /health: 0 timeout"
+        other = LatencyRecorder()
+        other.add(3.0, 503)
+        rec.merge(other)
+        summary = rec.summary(elapsed_secs=2.0)
+        self.assertEqual((summary["count"], summary["errors"]), (102, 2))
+        self.assertEqual(summary["codes"], {"0": 1, "200": 100, "503": 1})
+        self.assertEqual(summary["throughput_rps"], 51.0)
+        self.assertEqual(summary["latency_ms"]["max"], 20000.0)
+        self.assertEqual(percentile(rec.latencies, 50), 50.0)
+        self.assertEqual(summary["histogram"][0], {"le_ms": 1, "count": 1})
+        self.assertEqual(summary["histogram"][-1], {"le_ms": "+Inf", "count": 1})
+        self.assertEqual(sum(b["count"] for b in summary["histogram"]), 102)
+
+        report = {
+            "config": {
+                "url": "http://x",
+                "rate": 5,
+                "arrival": "constant",
+                "duration_secs": 2,
+                "connections": 1,
+            },
+            "sent": 102,
+            "completed": 102,
+            "elapsed_secs": 2.0,
+            "max_queue_lag_ms": 0.0,
+            "kinds": {"health": summary},
+            "overall": summary,
+        }
+        text = format_text(report)
+        self.assertIn("health", text)
+        self.assertIn("health: GET /health: 0 timeout", text)
+
+    def test_config_validation(self):
+        for cfg in (
+            LoadConfig("http://x", rate=0),
+            LoadConfig("http://x", connections=0),
+            LoadConfig("http://x", arrival="burst"),
+        ):
+            with self.assertRaises(ValueError):
+                LoadGenerator(cfg)
+
+
+if __name__ == "__main__":
+    unittest.main()
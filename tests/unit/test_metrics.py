@@ -0,0 +1,103 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# Add repo root to path
+ROOT_DIR = Path(__file__).parents[2]
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.metrics import DaemonMetrics, MetricsRegistry, method_label, route_label  # noqa: E402
+from core.wbab_core import Executor, OperationStore, Planner  # noqa: E402
+
+
+class TestCollectors(unittest.TestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        registry = MetricsRegistry()
+        hist = registry.histogram("t_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            hist.observe(value, "/run")
+        text = registry.render()
+        self.assertIn('t_seconds_bucket{route="/run",le="0.1"} 1\n', text)
+        self.assertIn('t_seconds_bucket{route="/run",le="1"} 3\n', text)
+        self.assertIn('t_seconds_bucket{route="/run",le="+Inf"} 4\n', text)
+        self.assertIn('t_seconds_sum{route="/run"} 4.05\n', text)
+        self.assertIn('t_seconds_count{route="/run"} 4\n', text)
+        self.assertIn("# TYPE t_seconds histogram\n", text)
+
+    def test_labels_are_escaped_and_callback_counters_typed(self):
+        registry = MetricsRegistry()
+        registry.counter("c_total", "Test.", ("v",)).inc('a"b\\')
+        registry.gauge(
+            "g_total", "Test.", lambda: {("x",): 2}, ("reason",), kind="counter"
+        )
+        text = registry.render()
+        self.assertIn('c_total{v="a\\"b\\\\"} 1\n', text)
+        self.assertIn('# TYPE g_total counter\ng_total{reason="x"} 2\n', text)
+
+    def test_route_label_folds_ids(self):
+        self.assertEqual(route_label("/status/op-1"), "/status/{op_id}")
+        self.assertEqual(route_label("/run"), "/run")
+        self.assertEqual(route_label("/../../etc/passwd"), "other")
+
+    def test_method_label_folds_unknown_methods(self):
+        self.assertEqual(
+            [method_label(m) for m in ("GET", "POST", "HEAD")], ["GET", "POST", "HEAD"]
+        )
+        self.assertEqual(
+            [method_label(m) for m in ("BREW", "get", "DELETE")], ["OTHER"] * 3
+        )
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root_dir = Path(self.tmp.name)
+        tool = self.root_dir / "tools" / "winbuild-build.sh"
+        tool.parent.mkdir()
+        tool.write_text(
+            '#!/usr/bin/env bash\nmkdir -p "$1/out" && echo exe > "$1/out/App.exe"\n'
+        )
+        tool.chmod(0o755)
+        self.metrics = DaemonMetrics()
+        self.store = OperationStore(self.root_dir / "store.sqlite")
+        self.store.metrics = self.metrics
+        self.executor = Executor(self.root_dir, self.store, audit=MagicMock())
+        self.executor.metrics = self.metrics
+        self.env = patch.dict(os.environ, {"WBAB_MOCK_EXECUTOR": "1"})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def test_run_records_operation_step_lock_and_sqlite_metrics(self):
+        plan = Planner().plan("m-1", "build", [str(self.root_dir)])
+        self.assertEqual(self.executor.run(plan)["status"], "succeeded")
+        self.assertEqual(self.executor.run(plan)["status"], "cached")
+        m = self.metrics
+        self.assertEqual(m.operations.value("build", "succeeded"), 1)
+        self.assertEqual(
+            (m.cache.value("build", "hit"), m.cache.value("build", "miss")), (1, 1)
+        )
+        self.assertEqual(m.step_seconds.count("build", "execute_build", "succeeded"), 1)
+        self.assertEqual(m.lock_wait_seconds.count("workspace"), 1)
+        self.assertGreater(m.sqlite_seconds.count("store", "upsert"), 0)
+        self.assertEqual(self.executor._step_clock, {})
+
+    def test_failed_step_is_labelled_failed(self):
+        (self.root_dir / "tools" / "winbuild-build.sh").write_text(
+            "#!/usr/bin/env bash\nexit 4\n"
+        )
+        plan = Planner().plan("m-2", "build", [str(self.root_dir)])
+        self.assertEqual(self.executor.run(plan)["status"], "failed")
+        self.assertEqual(
+            self.metrics.step_seconds.count("build", "execute_build", "failed"), 1
+        )
+        self.assertEqual(self.metrics.operations.value("build", "failed"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import json
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+# Add repo root to path
+ROOT_DIR = Path(__file__).parents[2]
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.profiling import DaemonProfiler, profiler_from_env, startup_session_from_env  # noqa: E402
+
+
+def _busy_json(n=200):
+    for i in range(n):
+        json.loads(json.dumps({"op_id": f"op-{i}", "args": list(range(20))}))
+
+
+class TestDaemonProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.profiler = DaemonProfiler(Path(self.tmp.name) / "profiles")
+
+    def tearDown(self):
+        self.profiler.stop()
+        self.tmp.cleanup()
+
+    def test_cprofile_stops_after_n_requests(self):
+        session = self.profiler.start("cprofile", requests=2)
+        self.assertEqual((session["mode"], session["requests"]), ("cprofile", 2))
+        self.assertTrue(self.profiler.counting)
+        _busy_json()
+        self.profiler.request_done()
+        self.assertIsNotNone(self.profiler.active)
+        self.profiler.request_done()
+        self.assertIsNone(self.profiler.active)
+        self.assertFalse(self.profiler.counting)
+
+        result = self.profiler.recent[0]
+        self.assertEqual((result["reason"], result["requests_seen"]), ("requests", 2))
+        (path,) = result["files"]
+        self.assertTrue(path.endswith("-cprofile.pstats"))
+        functions = set(pstats.Stats(path).get_stats_profile().func_profiles)
+        self.assertIn("dumps", functions)
+        self.assertTrue(result["top"])
+
+    def test_sample_writes_collapsed_stacks_when_the_window_ends(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=lambda: stop.wait(5), name="wbab-run_0")
+        worker.start()
+        try:
+            self.profiler.start("sample", duration_secs=0.2, interval_ms=5)
+            for _ in range(100):
+                if self.profiler.active is None:
+                    break
+                time.sleep(0.05)
+        finally:
+            stop.set()
+            worker.join()
+        result = self.profiler.recent[0]
+        self.assertEqual(result["reason"], "duration")
+        self.assertGreater(result["samples"], 0)
+        lines = Path(result["files"][0]).read_text().splitlines()
+        self.assertTrue(
+            any(line.startswith("wbab-run_0;") for line in lines), lines[:5]
+        )
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertTrue(count.isdigit() and ";" in stack)
+
+    def test_tracemalloc_snapshot(self):
+        self.profiler.start("cprofile", requests=1, with_tracemalloc=True)
+        self.assertTrue(tracemalloc.is_tracing())
+        data = [bytes(1000) for _ in range(100)]  # noqa: F841
+        self.profiler.request_done()
+        self.assertFalse(tracemalloc.is_tracing())
+        files = self.profiler.recent[0]["files"]
+        snapshot = tracemalloc.Snapshot.load(
+            next(f for f in files if f.endswith(".tracemalloc"))
+        )
+        self.assertTrue(snapshot.statistics("filename"))
+        self.assertTrue(
+            Path(next(f for f in files if f.endswith("-tracemalloc.txt"))).read_text()
+        )
+
+    def test_one_session_at_a_time_and_validation(self):
+        self.profiler.start("sample", duration_secs=5)
+        with self.assertRaises(RuntimeError):
+            self.profiler.start("cprofile", requests=1)
+        stopped = self.profiler.stop()
+        assert stopped is not None
+        self.assertEqual(stopped["reason"], "stopped")
+        self.assertIsNone(self.profiler.stop())
+        with self.assertRaises(ValueError):
+            self.profiler.start("perf")
+        with self.assertRaises(ValueError):
+            self.profiler.start("sample", interval_ms=0)
+        self.assertEqual(self.profiler.start("sample")["duration_secs"], 30.0)
+
+    def test_request_bound_session_is_capped(self):
+        self.profiler.max_secs = 0.1
+        self.assertEqual(
+            self.profiler.start("sample", requests=1000)["duration_secs"], 0.1
+        )
+
+    def test_from_env(self):
+        store = Path(self.tmp.name) / "state" / "core-store.sqlite"
+        self.assertEqual(
+            profiler_from_env(store).out_dir, Path(self.tmp.name) / "state" / "profiles"
+        )
+        self.assertIsNone(startup_session_from_env())
+        with patch.dict(
+            os.environ, {"WBABD_PROFILE": "cprofile", "WBABD_PROFILE_REQUESTS": "50"}
+        ):
+            session = startup_session_from_env()
+            assert session is not None
+            self.assertEqual(session["requests"], 50)
+        with patch.dict(os.environ, {"WBABD_PROFILE": "perf"}):
+            with self.assertRaises(ValueError):
+                startup_session_from_env()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,228 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# Add repo root to path
+ROOT_DIR = Path(__file__).parents[2]
+sys.path.insert(0, str(ROOT_DIR))
+
+from core import sbom  # noqa: E402
+from core.sbom import (  # noqa: E402
+    SbomCache,
+    SbomGenerator,
+    analyze_conanfile,
+    analyze_cpm_lock,
+    sbom_from_env,
+)
+from core.wbab_core import Executor, OperationStore, Planner  # noqa: E402
+
+CPM_LOCK = """
+# CPM Package Lock
+CPMDeclarePackage(fmt
+  NAME fmt
+  VERSION 10.1.1
+  GITHUB_REPOSITORY fmtlib/fmt
+)
+CPMDeclarePackage(spdlog
+  VERSION 1.12.0
+  GIT_REPOSITORY https://example.com/spdlog.git
+)
+"""
+
+
+class TestSbomGenerator(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.project = root / "app"
+        (self.project / "out").mkdir(parents=True)
+        (self.project / "out" / "App.exe").write_bytes(b"MZ app")
+        (self.project / "vcpkg.json").write_text(
+            json.dumps(
+                {
+                    "name": "app",
+                    "version": "1.2.0",
+                    "dependencies": ["zlib", {"name": "curl", "version>=": "8.4.0"}],
+                }
+            )
+        )
+        (self.project / "cmake").mkdir()
+        (self.project / "cmake" / "package-lock.cmake").write_text(CPM_LOCK)
+        self.vendored = self.project / "third_party" / "miniz"
+        self.vendored.mkdir(parents=True)
+        (self.vendored / "miniz.c").write_text("int miniz;\n")
+        (self.vendored / "VERSION").write_text("3.0.2\n")
+        (self.vendored / "LICENSE").write_text("MIT License\n\nCopyright ...\n")
+        self.generator = SbomGenerator(SbomCache(root / "store.sqlite"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _sbom(self):
+        return json.loads((self.project / "out" / "sbom.cdx.json").read_text())
+
+    def test_writes_cyclonedx_for_outputs_and_inputs(self):
+        summary = self.generator.generate(self.project, "op-1")
+        self.assertEqual(
+            (summary["inputs"], summary["analyzed"], summary["cached"]), (3, 3, 0)
+        )
+        doc = self._sbom()
+        self.assertEqual((doc["bomFormat"], doc["specVersion"]), ("CycloneDX", "1.6"))
+        self.assertEqual(doc["metadata"]["component"]["name"], "app")
+        self.assertEqual(
+            doc["metadata"]["properties"], [{"name": "wbab:op_id", "value": "op-1"}]
+        )
+        refs = {c["bom-ref"] for c in doc["components"]}
+        self.assertTrue(
+            {
+                "vcpkg.json:zlib",
+                "pkg:generic/curl@8.4.0",
+                "pkg:github/fmtlib/fmt@10.1.1",
+                "pkg:generic/spdlog@1.12.0",
+                "pkg:generic/miniz@3.0.2",
+                "file:out/App.exe",
+            }
+            <= refs,
+            refs,
+        )
+        miniz = next(c for c in doc["components"] if c["name"] == "miniz")
+        self.assertEqual(miniz["licenses"], [{"license": {"id": "MIT"}}])
+        self.assertEqual(len(doc["dependencies"][0]["dependsOn"]), 5)
+        self.assertEqual(summary["components"], 6)
+
+    def test_only_changed_inputs_are_reanalyzed(self):
+        self.generator.generate(self.project, "op-1")
+        summary = self.generator.generate(self.project, "op-2")
+        self.assertEqual((summary["analyzed"], summary["cached"]), (0, 3))
+
+        (self.vendored / "miniz.c").write_text("int miniz_v2;\n")
+        summary = self.generator.generate(self.project, "op-3")
+        self.assertEqual((summary["analyzed"], summary["cached"]), (1, 2))
+
+        # Touching a vendored tree without changing it re-hashes it but reuses the analysis.
+        os.utime(self.vendored / "miniz.c", ns=(1, 1))
+        summary = self.generator.generate(self.project, "op-4")
+        self.assertEqual(summary["analyzed"], 0)
+
+    def test_unchanged_vendored_tree_is_not_reread(self):
+        self.generator.generate(self.project, "op-1")
+        with patch("core.sbom._sha256_file", wraps=sbom._sha256_file) as hashed:
+            self.generator.generate(self.project, "op-2")
+        self.assertEqual([c.args[0].name for c in hashed.call_args_list], ["App.exe"])
+
+    def test_malformed_manifest_is_reported_not_raised(self):
+        (self.project / "vcpkg.json").write_text("{not json")
+        self.generator.generate(self.project, "op-1")
+        broken = next(
+            c for c in self._sbom()["components"] if c["name"] == "vcpkg.json"
+        )
+        self.assertIn("analysis failed", broken["description"])
+
+    def test_analyzers(self):
+        self.assertEqual(
+            [
+                c["purl"]
+                for c in analyze_conanfile(
+                    "[requires]\nzlib/1.3@user/stable\n[generators]\nCMakeDeps\n"
+                )
+            ],
+            ["pkg:conan/zlib@1.3"],
+        )
+        spdlog = analyze_cpm_lock(CPM_LOCK)[1]
+        self.assertEqual(
+            spdlog["externalReferences"],
+            [{"type": "vcs", "url": "https://example.com/spdlog.git"}],
+        )
+
+    def test_disabled_from_env(self):
+        with patch.dict(os.environ, {"WBAB_SBOM_DISABLE": "1"}):
+            self.assertIsNone(sbom_from_env(Path(self.tmp.name) / "store.sqlite"))
+        generator = sbom_from_env(Path(self.tmp.name) / "store.sqlite")
+        assert generator is not None
+        self.assertFalse(generator.strict)
+        with patch.dict(os.environ, {"WBAB_SBOM_STRICT": "1"}):
+            generator = sbom_from_env(Path(self.tmp.name) / "store.sqlite")
+            assert generator is not None
+            self.assertTrue(generator.strict)
+
+
+class TestExecutorSbomStep(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root_dir = Path(self.tmp.name)
+        tool = self.root_dir / "tools" / "winbuild-build.sh"
+        tool.parent.mkdir()
+        tool.write_text(
+            '#!/usr/bin/env bash\nmkdir -p "$1/out" && echo exe > "$1/out/App.exe"\n'
+        )
+        tool.chmod(0o755)
+        self.store = OperationStore(self.root_dir / "store.sqlite")
+        self.audit = MagicMock()
+        self.executor = Executor(self.root_dir, self.store, audit=self.audit)
+        self.executor.sbom = SbomGenerator(SbomCache(self.store.path))
+        self.env = patch.dict(os.environ, {"WBAB_MOCK_EXECUTOR": "1"})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def test_build_records_sbom(self):
+        plan = Planner().plan("sbom-op", "build", [str(self.root_dir)])
+        self.assertEqual(
+            [s["name"] for s in plan.steps],
+            ["validate_inputs", "execute_build", "generate_sbom", "record_result"],
+        )
+        result = self.executor.run(plan)
+        self.assertEqual(result["status"], "succeeded", result)
+        self.assertEqual(
+            result["result"]["sbom"]["path"],
+            str(self.root_dir.resolve() / "out" / "sbom.cdx.json"),
+        )
+        op = self.store.get("sbom-op")
+        assert op is not None
+        self.assertEqual(op["step_state"]["generate_sbom"]["status"], "succeeded")
+
+    def test_sbom_failure_is_recorded_not_fatal(self):
+        plan = Planner().plan("sbom-warn", "build", [str(self.root_dir)])
+        self.executor.sbom = MagicMock(strict=False)
+        self.executor.sbom.generate.side_effect = OSError("disk full")
+        result = self.executor.run(plan)
+        self.assertEqual(result["status"], "succeeded", result)
+        self.assertEqual(
+            result["result"]["sbom"], {"error": "SBOM generation failed: disk full"}
+        )
+        op = self.store.get("sbom-warn")
+        assert op is not None
+        self.assertEqual(op["sbom"], result["result"]["sbom"])
+        warnings = [
+            c for c in self.audit.emit.call_args_list if c.args[0] == "sbom.failed"
+        ]
+        self.assertEqual([c.kwargs["status"] for c in warnings], ["warning"])
+
+    def test_strict_sbom_failure_resumes_at_sbom_step(self):
+        plan = Planner().plan("sbom-retry", "build", [str(self.root_dir)])
+        generator = self.executor.sbom
+        self.executor.sbom = MagicMock(strict=True)
+        self.executor.sbom.generate.side_effect = OSError("disk full")
+        result = self.executor.run(plan)
+        self.assertEqual(result["result"]["step"], "generate_sbom")
+
+        self.executor.sbom = generator
+        op = self.store.get("sbom-retry")
+        assert op is not None
+        op["last_attempt_at"] = 0
+        self.store.upsert("sbom-retry", op)
+        result = self.executor.run(plan)
+        self.assertEqual(result["status"], "succeeded", result)
+        op = self.store.get("sbom-retry")
+        assert op is not None
+        self.assertEqual(op["step_state"]["execute_build"]["attempts"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+# Add repo root to path
+ROOT_DIR = Path(__file__).parents[2]
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.smoke_pool import SmokePool, smoke_pool_from_env  # noqa: E402
+
+
+class FakeCompose:
+    """Records compose calls as (project, args) and answers them from `results`."""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+        self.results = {}
+        self.install_secs = 0.0
+
+    def __call__(self, cmd, **kwargs):
+        project = kwargs["env"]["COMPOSE_PROJECT_NAME"]
+        args = cmd[cmd.index("--profile") + 2 :] if "--profile" in cmd else cmd[1:]
+        with self.lock:
+            self.calls.append((project, args))
+        if "wine" in args and self.install_secs:
+            time.sleep(self.install_secs)
+        for key, (rc, out) in self.results.items():
+            if key in " ".join(args):
+                return subprocess.CompletedProcess(cmd, rc, out, "")
+        return subprocess.CompletedProcess(cmd, 0, "", "")
+
+    def count(self, word, project=None):
+        return sum(
+            1
+            for p, args in self.calls
+            if word in args and (project is None or p == project)
+        )
+
+
+class TestSmokePool(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.root_dir = root / "repo"
+        (self.root_dir / "tools" / "WineBot" / "compose").mkdir(parents=True)
+        (
+            self.root_dir / "tools" / "WineBot" / "compose" / "docker-compose.yml"
+        ).write_text("services: {}\n")
+        self.installers = []
+        for name in ("A", "B", "C"):
+            path = root / f"{name}Setup.exe"
+            path.write_text(name)
+            self.installers.append(str(path))
+        self.env = patch.dict(
+            os.environ, {"WBAB_ARTIFACTS_DIR": str(root / "artifacts")}
+        )
+        self.env.start()
+        self.fake = FakeCompose()
+        self.pool = SmokePool(self.root_dir, 2, project_prefix="t", runner=self.fake)
+
+    def tearDown(self):
+        self.pool.shutdown()
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def test_parallel_smokes_use_separate_warm_sessions(self):
+        self.fake.install_secs = 0.3
+        results = []
+        threads = [
+            threading.Thread(target=lambda i=i: results.append(self.pool.run([i])))
+            for i in self.installers[:2]
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual([r.returncode for r in results], [0, 0])
+        installs = [p for p, args in self.fake.calls if "wine" in args]
+        self.assertEqual(len(set(installs)), 2)
+        self.assertEqual(self.fake.count("pull"), 1)
+        self.assertEqual(self.fake.count("up"), 2)
+
+        # A later smoke reuses a warm session: no new `up`, and its prefix is reset afterwards.
+        self.assertEqual(self.pool.run([self.installers[2]]).returncode, 0)
+        self.assertEqual(self.fake.count("up"), 2)
+        resets = [args for _, args in self.fake.calls if any("-xf" in a for a in args)]
+        self.assertEqual(len(resets), 3)
+        self.assertEqual(
+            self.pool.snapshot(), {"sessions": 2, "ready": 2, "idle": 2, "uses": 3}
+        )
+        staged = list((self.root_dir / "tools" / "WineBot" / "apps").iterdir())
+        self.assertEqual(staged, [])
+
+    def test_failed_reset_recreates_the_session(self):
+        pool = SmokePool(self.root_dir, 1, project_prefix="t", runner=self.fake)
+        self.fake.results["-xf"] = (1, "tar: broken")
+        self.assertEqual(pool.run([self.installers[0]]).returncode, 0)
+        self.assertEqual(self.fake.count("up"), 2)
+        pool.shutdown()
+
+    def test_install_failure_and_content_verification(self):
+        self.fake.results["60s wine"] = (3, "install failed\n")
+        proc = self.pool.run([self.installers[0]])
+        self.assertEqual(proc.returncode, 3)
+        self.assertIn("install failed", proc.stdout)
+        del self.fake.results["60s wine"]
+        self.fake.results["cat /wineprefix/drive_c/out.txt"] = (0, "hello\r\n")
+        with patch.dict(
+            os.environ,
+            {
+                "WBAB_SMOKE_EXTRACT_PATH": "C:\\out.txt",
+                "WBAB_SMOKE_EXPECT_CONTENT": "bye",
+            },
+        ):
+            self.assertEqual(self.pool.run([self.installers[0]]).returncode, 5)
+        with patch.dict(
+            os.environ,
+            {
+                "WBAB_SMOKE_EXTRACT_PATH": "C:\\out.txt",
+                "WBAB_SMOKE_EXPECT_CONTENT": "hello",
+            },
+        ):
+            self.assertEqual(self.pool.run([self.installers[0]]).returncode, 0)
+
+    def test_missing_installer(self):
+        self.assertEqual(
+            self.pool.run([str(Path(self.tmp.name) / "missing.exe")]).returncode, 2
+        )
+        self.assertEqual(self.fake.calls, [])
+
+    def test_size_from_env(self):
+        with patch.dict(os.environ, {"WBABD_SMOKE_POOL_SIZE": "0"}):
+            self.assertIsNone(smoke_pool_from_env(self.root_dir))
+        with patch.dict(os.environ, {"WBABD_SMOKE_POOL_SIZE": "x"}):
+            with self.assertRaises(ValueError):
+                smoke_pool_from_env(self.root_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+
+# Add repo root to path
+ROOT_DIR = Path(__file__).parents[2]
+sys.path.insert(0, str(ROOT_DIR))
+
+# Mock fcntl before importing wbab_core (not available on Windows)
+sys.modules["fcntl"] = MagicMock()
+
+from core.wbab_core import AuditLog, OperationStore  # noqa: E402
+
+
+class TestOperationStoreVersions(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "store.sqlite"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_versions_increase_across_operations(self):
+        store = OperationStore(self.path)
+        v1 = store.upsert("a", {"status": "running"})
+        v2 = store.upsert("b", {"status": "running"})
+        v3 = store.upsert("a", {"status": "succeeded"})
+        self.assertLess(v1, v2)
+        self.assertLess(v2, v3)
+        self.assertEqual(store.get_version("a"), v3)
+        self.assertIsNone(store.get_version("missing"))
+        self.assertEqual(store.get_raw("a"), ('{"status": "succeeded"}', v3))
+
+    def test_listeners_receive_writes(self):
+        store = OperationStore(self.path)
+        seen = []
+        listener = lambda op_id, version: seen.append((op_id, version))  # noqa: E731
+        store.add_listener(listener)
+        version = store.upsert("a", {})
+        store.remove_listener(listener)
+        store.upsert("a", {})
+        self.assertEqual(seen, [("a", version)])
+
+    def test_legacy_table_gains_version_column(self):
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(
+                "CREATE TABLE operations (op_id TEXT PRIMARY KEY, payload TEXT)"
+            )
+            conn.execute(
+                "INSERT INTO operations VALUES ('old', '{\"status\": \"succeeded\"}')"
+            )
+        store = OperationStore(self.path)
+        self.assertEqual(store.get_version("old"), 0)
+        self.assertEqual(store.get("old"), {"status": "succeeded"})
+        self.assertEqual(store.upsert("new", {}), 1)
+
+    def test_legacy_rows_are_indexed_by_status_and_verb(self):
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(
+                "CREATE TABLE operations (op_id TEXT PRIMARY KEY, payload TEXT)"
+            )
+            for i in range(5):
+                conn.execute(
+                    "INSERT INTO operations VALUES (?, ?)",
+                    (
+                        f"old-{i}",
+                        f'{{"status": "succeeded", "verb": "{"build" if i % 2 else "lint"}"}}',
+                    ),
+                )
+        store = OperationStore(self.path)
+        rows = list(store.iter_raw(verbs=["build"], page_size=1))
+        self.assertEqual([op_id for op_id, _, _ in rows], ["old-1", "old-3"])
+        self.assertEqual(len(list(store.iter_raw(page_size=2))), 5)
+
+    def test_iter_raw_filters_and_follows_versions(self):
+        store = OperationStore(self.path)
+        store.upsert("a", {"status": "running", "verb": "build"})
+        store.upsert("b", {"status": "failed", "verb": "lint"})
+        v3 = store.upsert("c", {"status": "running", "verb": "lint"})
+        running = [
+            op_id for op_id, _, _ in store.iter_raw(statuses=["running"], page_size=1)
+        ]
+        self.assertEqual(running, ["a", "c"])
+        self.assertEqual(
+            [r[0] for r in store.iter_raw(statuses=["running"], verbs=["lint"])], ["c"]
+        )
+        v4 = store.upsert("a", {"status": "succeeded", "verb": "build"})
+        self.assertEqual(
+            list(store.iter_raw(since_version=v3)),
+            [("a", '{"status": "succeeded", "verb": "build"}', v4)],
+        )
+        self.assertEqual(store.max_version(), v4)
+
+
+class TestAuditLogTail(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.audit = AuditLog(Path(self.tmp.name) / "audit.sqlite")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_read_since_filters_and_resumes(self):
+        seen: list[int] = []
+        self.audit.add_listener(seen.append)
+        self.audit.emit("command.run", op_id="a", status="started")
+        self.audit.emit("operation.started", op_id="a", verb="build", actor="alice")
+        self.audit.emit(
+            "step.started",
+            op_id="b",
+            verb="build",
+            step="validate_inputs",
+            details={"n": 1},
+        )
+        self.audit.emit("operation.succeeded", op_id="a", verb="build", actor="alice")
+        self.assertEqual(seen, [1, 2, 3, 4])
+        self.assertEqual(self.audit.last_event_id(), 4)
+
+        prefixes = ("operation.", "step.")
+        events = self.audit.read_since(0, prefixes=prefixes)
+        self.assertEqual(
+            [e["event_type"] for e in events],
+            ["operation.started", "step.started", "operation.succeeded"],
+        )
+        self.assertEqual(events[1]["details"], {"n": 1})
+        tail = self.audit.read_since(events[0]["id"], prefixes=prefixes, actor="alice")
+        self.assertEqual([(e["id"], e["op_id"]) for e in tail], [(4, "a")])
+        self.assertEqual(
+            self.audit.read_since(0, op_id="b")[0]["step"], "validate_inputs"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
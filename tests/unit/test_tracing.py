@@ -0,0 +1,181 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+# Add repo root to path
+ROOT_DIR = Path(__file__).parents[2]
+sys.path.insert(0, str(ROOT_DIR))
+
+from core import tracing  # noqa: E402
+from core.tracing import TraceLog, Tracer, folded, folded_lines, tracer_from_env  # noqa: E402
+from core.wbab_core import Executor, OperationStore, Planner  # noqa: E402
+
+
+def _span(span_id, parent_id, name, duration_us):
+    return {
+        "trace_id": "op",
+        "span_id": span_id,
+        "parent_id": parent_id,
+        "name": name,
+        "start": 0,
+        "duration_us": duration_us,
+    }
+
+
+class TestSpans(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log = TraceLog(Path(self.tmp.name) / "traces.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_spans_nest_and_are_written_on_finish(self):
+        tracer = Tracer(self.log)
+        self.assertIsNone(tracing.begin("outside"))
+        with tracer.trace("op-1", verb="build") as root:
+            with tracing.span("child") as child:
+                with tracing.span("leaf", n=1):
+                    pass
+            with self.assertRaises(ValueError), tracing.span("broken"):
+                raise ValueError("boom")
+            self.assertEqual(self.log.read("op-1"), [])
+        spans = {s["name"]: s for s in self.log.read("op-1")}
+        self.assertEqual(set(spans), {"operation", "child", "leaf", "broken"})
+        assert child is not None
+        self.assertEqual(spans["leaf"]["parent_id"], child.span_id)
+        self.assertEqual(spans["child"]["parent_id"], root.span_id)
+        self.assertEqual(spans["broken"]["parent_id"], root.span_id)
+        self.assertEqual(
+            (spans["broken"]["status"], spans["broken"]["attrs"]),
+            ("error", {"error": "ValueError"}),
+        )
+        self.assertEqual(spans["operation"]["attrs"], {"verb": "build"})
+        self.assertIsNone(tracing._current.get())
+
+    def test_unfinished_spans_are_closed_with_the_trace(self):
+        with Tracer(self.log).trace("op-2"):
+            tracing.begin("step.execute_build")
+        self.assertEqual(
+            {s["name"]: s["status"] for s in self.log.read("op-2")},
+            {"operation": "ok", "step.execute_build": "abandoned"},
+        )
+
+    def test_folded_stacks_use_self_time(self):
+        spans = [
+            _span("r", None, "operation", 1000),
+            _span("s", "r", "step.build", 700),
+            _span("e", "s", "exec", 600),
+        ]
+        self.assertEqual(
+            folded(spans),
+            {
+                "operation": 300,
+                "operation;step.build": 100,
+                "operation;step.build;exec": 600,
+            },
+        )
+        self.assertEqual(
+            folded_lines(spans, limit=1), ["operation;step.build;exec 600"]
+        )
+
+    def test_log_rotates_and_reads_across_files(self):
+        log = TraceLog(self.log.path, max_bytes=200, keep=2)
+        for n in range(8):
+            log.write([_span(f"s{n}", None, "operation", n)])
+        self.assertEqual(
+            [p.name for p in log.files()],
+            ["traces.jsonl.2", "traces.jsonl.1", "traces.jsonl"],
+        )
+        self.assertTrue(all(p.stat().st_size <= 200 for p in log.files()))
+        self.assertEqual(
+            [s["span_id"] for s in log.read("op")], ["s2", "s3", "s4", "s5", "s6", "s7"]
+        )
+
+    def test_from_env(self):
+        store = Path(self.tmp.name) / "store.sqlite"
+        with patch.dict(os.environ, {"WBAB_TRACE_DISABLE": "1"}):
+            self.assertIsNone(tracer_from_env(store))
+        with patch.dict(os.environ, {"WBAB_TRACE_KEEP": "0"}):
+            with self.assertRaises(ValueError):
+                tracer_from_env(store)
+        tracer = tracer_from_env(store)
+        assert tracer is not None
+        self.assertEqual(tracer.log.path, Path(self.tmp.name) / "traces.jsonl")
+
+
+class TestExecutorTracing(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root_dir = Path(self.tmp.name)
+        tool = self.root_dir / "tools" / "winbuild-build.sh"
+        tool.parent.mkdir()
+        tool.write_text(
+            '#!/usr/bin/env bash\nmkdir -p "$1/out" && echo exe > "$1/out/App.exe"\n'
+        )
+        tool.chmod(0o755)
+        self.store = OperationStore(self.root_dir / "store.sqlite")
+        self.audit = MagicMock()
+        self.executor = Executor(self.root_dir, self.store, audit=self.audit)
+        self.tracer = Tracer(TraceLog(self.root_dir / "traces.jsonl"))
+        self.executor.tracer = self.tracer
+        self.env = patch.dict(os.environ, {"WBAB_MOCK_EXECUTOR": "1"})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def test_run_records_phases(self):
+        result = self.executor.run(
+            Planner().plan("trace-op", "build", [str(self.root_dir)])
+        )
+        self.assertEqual(result["status"], "succeeded", result)
+        spans = self.tracer.read("trace-op")
+        by_id = {s["span_id"]: s for s in spans}
+        parent = lambda s: by_id[s["parent_id"]]["name"]  # noqa: E731
+        names = [s["name"] for s in spans]
+        for name in (
+            "operation",
+            "lock.workspace",
+            "step.validate_inputs",
+            "step.execute_build",
+            "step.record_result",
+            "exec",
+        ):
+            self.assertIn(name, names)
+        exec_span = next(s for s in spans if s["name"] == "exec")
+        self.assertEqual(parent(exec_span), "step.execute_build")
+        self.assertEqual(
+            exec_span["attrs"], {"command": "winbuild-build.sh", "exit_code": 0}
+        )
+        self.assertTrue(any(s["name"] == "sqlite.store.upsert" for s in spans))
+        root = next(s for s in spans if s["parent_id"] is None)
+        self.assertEqual(
+            root["attrs"], {"verb": "build", "source": "local", "result": "succeeded"}
+        )
+        self.assertFalse(self.executor._step_spans)
+        self.assertNotIn(
+            "operation.slow", [c.args[0] for c in self.audit.emit.call_args_list]
+        )
+
+    def test_slow_run_audits_breakdown(self):
+        self.tracer.slow_secs = 1e-6
+        self.executor.run(Planner().plan("slow-op", "build", [str(self.root_dir)]))
+        events = [
+            c for c in self.audit.emit.call_args_list if c.args[0] == "operation.slow"
+        ]
+        self.assertEqual(len(events), 1)
+        details = events[0].kwargs["details"]
+        self.assertEqual(details["trace"], "/trace/slow-op")
+        self.assertTrue(
+            details["breakdown"]
+            and all(line.startswith("operation") for line in details["breakdown"])
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -18,6 +18,9 @@ set -euo pipefail
 #   WBAB_DEV_CERT_DIR (default agent-privileged/signing/dev): cert material dir
 #   WBAB_SIGN_INPUT (default dist/FakeSetup.exe): sign input for dev-cert mode
 #   WBAB_SIGN_OUTPUT (default dist/FakeSetup-signed.exe): sign output for dev-cert mode
+#   WBAB_SIGN_BATCH (default 0): sign every matched dist/ artifact in parallel in one container
+#     (tools/signing/sign-batch.sh; WBAB_SIGN_BATCH_GLOB, WBAB_SIGN_BATCH_LIST, WBAB_SIGN_BATCH_OUT_DIR,
+#     WBAB_SIGN_BATCH_MANIFEST and WBAB_SIGN_JOBS are passed through)
 
 PROJECT_DIR="${1:-.}"
 if [[ ! -d "${PROJECT_DIR}" ]]; then
@@ -42,8 +45,10 @@ SIGN_AUTOGEN_DEV_CERT="${WBAB_SIGN_AUTOGEN_DEV_CERT:-1}"
 DEV_CERT_DIR="${WBAB_DEV_CERT_DIR:-${ROOT_DIR}/agent-privileged/signing/dev}"
 SIGN_INPUT="${WBAB_SIGN_INPUT:-dist/FakeSetup.exe}"
 SIGN_OUTPUT="${WBAB_SIGN_OUTPUT:-dist/FakeSetup-signed.exe}"
+SIGN_BATCH="${WBAB_SIGN_BATCH:-0}"
+BATCH_SCRIPT="${ROOT_DIR}/tools/signing/sign-batch.sh"
 
-if [[ "${SIGN_USE_DEV_CERT}" == "1" && -z "${WBAB_SIGN_CMD:-}" ]]; then
+if [[ "${SIGN_USE_DEV_CERT}" == "1" && ( -z "${WBAB_SIGN_CMD:-}" || "${SIGN_BATCH}" == "1" ) ]]; then
   if [[ "${SIGN_AUTOGEN_DEV_CERT}" == "1" ]]; then
     if [[ ! -x "${DEV_CERT_SCRIPT}" ]]; then
       echo "ERROR: dev cert script not found/executable: ${DEV_CERT_SCRIPT}" >&2
@@ -54,7 +59,27 @@ if [[ "${SIGN_USE_DEV_CERT}" == "1" && -z "${WBAB_SIGN_CMD:-}" ]]; then
     fi
   fi
 
-  SIGN_CMD="if [[ ! -f ${SIGN_INPUT} ]]; then echo 'missing ${SIGN_INPUT}' >&2; exit 2; fi; if [[ ! -f ${DEV_CERT_DIR}/dev.pfx || ! -f ${DEV_CERT_DIR}/dev.pfx.pass ]]; then echo 'missing dev cert material in ${DEV_CERT_DIR}' >&2; exit 2; fi; if ! command -v osslsigncode >/dev/null 2>&1; then echo 'osslsigncode not found in signer image' >&2; exit 3; fi; mkdir -p \"\$(dirname ${SIGN_OUTPUT})\"; osslsigncode sign -pkcs12 ${DEV_CERT_DIR}/dev.pfx -readpass ${DEV_CERT_DIR}/dev.pfx.pass -h sha256 -in ${SIGN_INPUT} -out ${SIGN_OUTPUT}; echo 'dev cert sign completed' > dist/sign-fixture.txt"
+  if [[ "${SIGN_BATCH}" != "1" ]]; then
+    SIGN_CMD="if [[ ! -f ${SIGN_INPUT} ]]; then echo 'missing ${SIGN_INPUT}' >&2; exit 2; fi; if [[ ! -f ${DEV_CERT_DIR}/dev.pfx || ! -f ${DEV_CERT_DIR}/dev.pfx.pass ]]; then echo 'missing dev cert material in ${DEV_CERT_DIR}' >&2; exit 2; fi; if ! command -v osslsigncode >/dev/null 2>&1; then echo 'osslsigncode not found in signer image' >&2; exit 3; fi; mkdir -p \"\$(dirname ${SIGN_OUTPUT})\"; osslsigncode sign -pkcs12 ${DEV_CERT_DIR}/dev.pfx -readpass ${DEV_CERT_DIR}/dev.pfx.pass -h sha256 -in ${SIGN_INPUT} -out ${SIGN_OUTPUT}; echo 'dev cert sign completed' > dist/sign-fixture.txt"
+  fi
+fi
+
+# Batch mode mounts the batch script so pulled images that predate it can still run it,
+# and mounts the dev cert read-only instead of relying on it living under the project.
+BATCH_RUN_ARGS=()
+if [[ "${SIGN_BATCH}" == "1" ]]; then
+  if [[ ! -f "${BATCH_SCRIPT}" ]]; then
+    echo "ERROR: batch sign script not found: ${BATCH_SCRIPT}" >&2
+    exit 2
+  fi
+  BATCH_RUN_ARGS+=(-v "${BATCH_SCRIPT}:/opt/wbab/sign-batch.sh:ro")
+  for name in WBAB_SIGN_BATCH_GLOB WBAB_SIGN_BATCH_LIST WBAB_SIGN_BATCH_OUT_DIR WBAB_SIGN_BATCH_MANIFEST WBAB_SIGN_JOBS; do
+    [[ -n "${!name:-}" ]] && BATCH_RUN_ARGS+=(-e "${name}=${!name}")
+  done
+  if [[ "${SIGN_USE_DEV_CERT}" == "1" ]]; then
+    BATCH_RUN_ARGS+=(-v "$(cd "${DEV_CERT_DIR}" && pwd):/opt/wbab/dev-cert:ro" -e WBAB_SIGN_USE_DEV_CERT=1 -e WBAB_DEV_CERT_DIR=/opt/wbab/dev-cert)
+  fi
+  SIGN_CMD="bash /opt/wbab/sign-batch.sh"
 fi
 
 if ! command -v docker >/dev/null 2>&1; then
@@ -81,5 +106,6 @@ mkdir -p "${PROJECT_DIR_ABS}/dist"
 docker run --rm \
   -v "${PROJECT_DIR_ABS}:/workspace" \
   -w /workspace \
+  ${BATCH_RUN_ARGS[@]+"${BATCH_RUN_ARGS[@]}"} \
   "${IMAGE_TO_RUN}" \
   bash -lc "${SIGN_CMD}"
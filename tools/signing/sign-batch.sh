@@ -0,0 +1,140 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Batch signing script for wbab signer container.
+# Signs every matched dist/ artifact in parallel and writes a per-file result manifest.
+#
+# Usage (inside /workspace):
+#   wbab-sign-batch [pattern...]
+#
+# Optional env:
+#   WBAB_SIGN_BATCH_GLOB (default "dist/*.exe dist/*.dll dist/*.msi"): patterns used when none are given
+#   WBAB_SIGN_BATCH_LIST: file listing artifacts to sign, one per line (overrides patterns)
+#   WBAB_SIGN_BATCH_OUT_DIR (default dist/signed): signed outputs, mirroring paths below dist/
+#   WBAB_SIGN_BATCH_MANIFEST (default <out-dir>/sign-manifest.tsv): per-file result manifest
+#   WBAB_SIGN_JOBS (default nproc): parallel signing workers
+#   WBAB_SIGN_USE_DEV_CERT (default 0): sign with dev cert + osslsigncode (fixture copy otherwise)
+#   WBAB_DEV_CERT_DIR (default agent-privileged/signing/dev): cert material dir
+#
+# A file is skipped when the manifest from a previous run records the same input hash and the
+# recorded signed output is still in place with the recorded hash.
+
+OUT_DIR="${WBAB_SIGN_BATCH_OUT_DIR:-dist/signed}"
+MANIFEST="${WBAB_SIGN_BATCH_MANIFEST:-${OUT_DIR}/sign-manifest.tsv}"
+JOBS="${WBAB_SIGN_JOBS:-$(nproc 2>/dev/null || echo 1)}"
+DEV_CERT_DIR="${WBAB_DEV_CERT_DIR:-agent-privileged/signing/dev}"
+USE_DEV_CERT="${WBAB_SIGN_USE_DEV_CERT:-0}"
+
+if [[ ! "${JOBS}" =~ ^[0-9]+$ ]] || (( JOBS < 1 )); then
+  echo "ERROR: WBAB_SIGN_JOBS must be a positive integer: ${JOBS}" >&2
+  exit 2
+fi
+
+inputs=()
+if [[ -n "${WBAB_SIGN_BATCH_LIST:-}" ]]; then
+  if [[ ! -f "${WBAB_SIGN_BATCH_LIST}" ]]; then
+    echo "ERROR: batch list not found: ${WBAB_SIGN_BATCH_LIST}" >&2
+    exit 2
+  fi
+  while IFS= read -r line || [[ -n "${line}" ]]; do
+    [[ -z "${line}" || "${line}" == \#* ]] && continue
+    inputs+=("${line}")
+  done < "${WBAB_SIGN_BATCH_LIST}"
+else
+  patterns=("$@")
+  if (( ${#patterns[@]} == 0 )); then
+    read -r -a patterns <<< "${WBAB_SIGN_BATCH_GLOB:-dist/*.exe dist/*.dll dist/*.msi}"
+  fi
+  shopt -s nullglob
+  for pattern in "${patterns[@]}"; do
+    for path in ${pattern}; do
+      [[ -f "${path}" && "${path}" != "${OUT_DIR}/"* ]] && inputs+=("${path}")
+    done
+  done
+  shopt -u nullglob
+fi
+
+if (( ${#inputs[@]} == 0 )); then
+  echo "ERROR: no artifacts to sign" >&2
+  exit 2
+fi
+
+if [[ "${USE_DEV_CERT}" == "1" ]]; then
+  if [[ ! -f "${DEV_CERT_DIR}/dev.pfx" || ! -f "${DEV_CERT_DIR}/dev.pfx.pass" ]]; then
+    echo "ERROR: Dev cert material missing in ${DEV_CERT_DIR}" >&2
+    exit 2
+  fi
+  if ! command -v osslsigncode >/dev/null 2>&1; then
+    echo "ERROR: osslsigncode not found in container" >&2
+    exit 3
+  fi
+fi
+
+WORK="$(mktemp -d)"
+trap 'rm -rf "${WORK}"' EXIT
+touch "${WORK}/previous.tsv"
+[[ -f "${MANIFEST}" ]] && cp "${MANIFEST}" "${WORK}/previous.tsv"
+mkdir -p "${WORK}/results" "${OUT_DIR}" "$(dirname "${MANIFEST}")"
+
+sign_one() {
+  local idx="$1" input="$2"
+  local output="${OUT_DIR}/${input#dist/}"
+  local input_sha prev status output_sha=""
+  input_sha="$(sha256sum "${input}" | cut -d' ' -f1)"
+  prev="$(awk -F'\t' -v p="${input}" '$1 == p { print; exit }' "${WORK}/previous.tsv")"
+
+  if [[ -n "${prev}" && -f "${output}" ]]; then
+    IFS=$'\t' read -r _ prev_status prev_input _ prev_output_sha <<< "${prev}"
+    if [[ "${prev_status}" =~ ^(signed|skipped)$ && "${prev_input}" == "${input_sha}" ]] \
+      && [[ "$(sha256sum "${output}" | cut -d' ' -f1)" == "${prev_output_sha}" ]]; then
+      printf '%s\t%s\t%s\t%s\t%s\n' "${input}" skipped "${input_sha}" "${output}" "${prev_output_sha}" > "${WORK}/results/${idx}"
+      echo "wbab-sign: skipped ${input} (already signed)"
+      return 0
+    fi
+  fi
+
+  mkdir -p "$(dirname "${output}")"
+  local tmp="${output}.tmp.$$"
+  if [[ "${USE_DEV_CERT}" == "1" ]]; then
+    osslsigncode sign \
+      -pkcs12 "${DEV_CERT_DIR}/dev.pfx" \
+      -readpass "${DEV_CERT_DIR}/dev.pfx.pass" \
+      -h sha256 \
+      -in "${input}" \
+      -out "${tmp}" > "${WORK}/results/${idx}.log" 2>&1 && status=signed || status=failed
+  else
+    cp -f "${input}" "${tmp}" && status=signed || status=failed
+  fi
+
+  if [[ "${status}" == "signed" ]]; then
+    mv -f "${tmp}" "${output}"
+    output_sha="$(sha256sum "${output}" | cut -d' ' -f1)"
+    echo "wbab-sign: signed ${input} -> ${output}"
+  else
+    rm -f "${tmp}"
+    echo "wbab-sign: FAILED ${input}" >&2
+    cat "${WORK}/results/${idx}.log" >&2 2>/dev/null || true
+  fi
+  printf '%s\t%s\t%s\t%s\t%s\n' "${input}" "${status}" "${input_sha}" "${output}" "${output_sha}" > "${WORK}/results/${idx}"
+}
+export -f sign_one
+export OUT_DIR DEV_CERT_DIR USE_DEV_CERT WORK
+
+echo "wbab-sign: Batch signing ${#inputs[@]} artifact(s) with ${JOBS} worker(s)..."
+for i in "${!inputs[@]}"; do
+  printf '%s\0%s\0' "${i}" "${inputs[${i}]}"
+done | xargs -0 -n 2 -P "${JOBS}" bash -c 'sign_one "$1" "$2"' _ || true
+
+{
+  printf 'path\tstatus\tinput_sha256\toutput\toutput_sha256\n'
+  for i in "${!inputs[@]}"; do
+    cat "${WORK}/results/${i}" 2>/dev/null || printf '%s\tfailed\t\t\t\n' "${inputs[${i}]}"
+  done
+} > "${MANIFEST}.tmp"
+mv -f "${MANIFEST}.tmp" "${MANIFEST}"
+
+signed="$(awk -F'\t' 'NR > 1 && $2 == "signed"' "${MANIFEST}" | wc -l)"
+skipped="$(awk -F'\t' 'NR > 1 && $2 == "skipped"' "${MANIFEST}" | wc -l)"
+failed="$(awk -F'\t' 'NR > 1 && $2 == "failed"' "${MANIFEST}" | wc -l)"
+echo "wbab-sign: batch complete signed=${signed} skipped=${skipped} failed=${failed} manifest=${MANIFEST}"
+(( failed == 0 ))
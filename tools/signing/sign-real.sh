@@ -5,6 +5,7 @@ set -euo pipefail
 # Supported modes:
 # 1. Fixture mode (default)
 # 2. Dev-cert mode (enabled by WBAB_SIGN_USE_DEV_CERT=1)
+# 3. Batch mode (`wbab-sign --batch [pattern...]` or WBAB_SIGN_BATCH=1), see sign-batch.sh
 
 SIGN_INPUT="${WBAB_SIGN_INPUT:-dist/FakeSetup.exe}"
 SIGN_OUTPUT="${WBAB_SIGN_OUTPUT:-dist/FakeSetup-signed.exe}"
@@ -12,6 +13,11 @@ DEV_CERT_DIR="${WBAB_DEV_CERT_DIR:-agent-privileged/signing/dev}"
 
 echo "wbab-sign: Starting..."
 
+if [[ "${1:-}" == "--batch" || "${WBAB_SIGN_BATCH:-0}" == "1" ]]; then
+    [[ "${1:-}" == "--batch" ]] && shift
+    exec "$(dirname "$(readlink -f "$0")")/wbab-sign-batch" "$@"
+fi
+
 if [[ "${WBAB_SIGN_USE_DEV_CERT:-0}" == "1" ]]; then
     echo "wbab-sign: Dev-cert mode enabled."
     